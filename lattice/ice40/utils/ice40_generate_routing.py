@@ -685,7 +685,8 @@ def patch_rr_graph(filename_in, filename_out, verbose=False):
         rr_graph_file=filename_in,
         verbose=verbose,
         clear_fabric=True,
-        sides=side_for
+        sides=side_for,
+        routing='arrays'
     )
     print('Source g loaded')
     print("Grid size: %s" % (g.block_grid.size, ))
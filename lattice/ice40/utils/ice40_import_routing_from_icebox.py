@@ -71,9 +71,10 @@ Then add globals, then neighbourhood
 
 # Python libs
 import logging
+import multiprocessing
 import operator
 import sys
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 # Third party libs
 import lxml.etree as ET
@@ -88,6 +89,7 @@ import lib.rr_graph.graph as graph
 import lib.rr_graph.points as points
 from lib.rr_graph import Offset
 from lib.asserts import assert_type
+from lib.perf_utils import PhaseLog, add_perf_args
 
 NP = points.NamedPosition
 
@@ -154,7 +156,7 @@ def format_node(g, node):
     """A pretty string from an RoutingGraph node."""
     if node is None:
         return "None"
-    assert isinstance(node, ET._Element), node
+    assert node.tag in ("node", "edge"), node
     if node.tag == "node":
         return RunOnStr(graph.RoutingGraphPrinter.node, node, g.block_grid)
     elif node.tag == "edge":
@@ -356,7 +358,7 @@ def init(device_name, read_rr_graph):
     }[device_name]()
 
     print('Loading rr_graph')
-    g = graph.Graph(read_rr_graph, clear_fabric=True)
+    g = graph.Graph(read_rr_graph, clear_fabric=True, routing='arrays')
     g.set_tooling(
         name="icebox",
         version="dev",
@@ -785,7 +787,7 @@ def create_edge_with_names(
         "On %s add %-8s edge %s - %s:%s (%s) node %s => %s:%s (%s) node %s",
         ipos,
         switch.name,
-        len(g.routing.id2element[graph.RoutingEdge]),
+        g.routing.num_edges,
         vpos,
         src_name,
         src_hlc_name,
@@ -960,48 +962,136 @@ def add_track_with_localnames(g, ic, segment, connections, lines):
     add_track_with_lines(g, ic, segment, lines, connections, hlc_name_f)
 
 
-def add_tracks(g, ic, all_group_segments, segtype_filter=None):
-    """Adding tracks from icebox segment groups."""
-    for group in sorted(all_group_segments):
-        positions = {}
-        for x, y, netname in group:
-            p = PositionIcebox(x, y)
-            if p in positions:
-                positions[p].names.append(netname)
-            else:
-                positions[(x, y)] = points.NamedPosition(p, [netname])
-        positions = list(positions.values())
+TrackGroup = namedtuple(
+    'TrackGroup', 'segtype positions connections lines hlc_name'
+)
+
+
+def tile_columns(ic):
+    """Return the tiles on the chip (except the corners) in column lists."""
+    columns = defaultdict(list)
+    for ipos in tiles(ic):
+        columns[ipos.x].append(ipos)
+    return [columns[x] for x in sorted(columns)]
+
+
+def map_columns(f, columns, pool=None):
+    """Return [f(column) for column in columns], using pool if given."""
+    if pool is None:
+        return [f(column) for column in columns]
+    return pool.map(f, columns, chunksize=1)
+
+
+def plan_track_group(group):
+    """Work out the tracks of an icebox segment group.
+
+    Returns a TrackGroup, or None if the group doesn't create any tracks.
+    """
+    positions = {}
+    for x, y, netname in group:
+        p = PositionIcebox(x, y)
+        if p in positions:
+            positions[p].names.append(netname)
+        else:
+            positions[(x, y)] = points.NamedPosition(p, [netname])
+    positions = list(positions.values())
+
+    segtype = group_seg_type(positions)
+    if segtype == "unknown":
+        logging.debug("Skipping unknown track group: %s", group)
+        return None
+    if segtype == "global":
+        logging.debug("Skipping global track group: %s", group)
+        return None
+
+    fpositions = filter_track_names(positions)
+    if not fpositions:
+        logging.debug("Filtered out track group: %s", positions)
+        return None
+
+    connections, lines = points.decompose_into_straight_lines(fpositions)
+    logging.info("connections:%s lines:%s", connections, lines)
+    return TrackGroup(
+        segtype=segtype,
+        positions=fpositions,
+        connections=connections,
+        lines=lines,
+        hlc_name=group_hlc_name(fpositions),
+    )
 
-        segtype = group_seg_type(positions)
-        if segtype_filter is not None and segtype != segtype_filter:
-            continue
-        if segtype == "unknown":
-            logging.debug("Skipping unknown track group: %s", group)
-            continue
-        if segtype == "global":
-            logging.debug("Skipping global track group: %s", group)
-            continue
-        segment = g.segments[segtype]
 
-        fpositions = filter_track_names(positions)
-        if not fpositions:
-            logging.debug("Filtered out track group: %s", positions)
+def plan_track_column(indexed_groups):
+    """Work out the tracks of a list of (index, group)."""
+    return [(idx, plan_track_group(group)) for idx, group in indexed_groups]
+
+
+def plan_tracks(ic, all_group_segments, pool=None):
+    """Work out the tracks of the icebox segment groups.
+
+    Groups are split by the tile column of their first position, the columns
+    are planned in pool if given.  Returns the TrackGroup (or None) of every
+    group, in sorted group order.
+    """
+    groups = sorted(all_group_segments)
+
+    columns = defaultdict(list)
+    for idx, group in enumerate(groups):
+        columns[min(group)[0]].append((idx, group))
+
+    track_groups = [None] * len(groups)
+    for column in map_columns(plan_track_column,
+                              [columns[x] for x in sorted(columns)], pool):
+        for idx, track_group in column:
+            track_groups[idx] = track_group
+
+    return track_groups
+
+
+def add_tracks(g, ic, track_groups, segtype_filter=None):
+    """Adding tracks from the planned icebox segment groups."""
+    for track_group in track_groups:
+        if track_group is None:
+            continue
+        if segtype_filter is not None and track_group.segtype != segtype_filter:
             continue
+        segment = g.segments[track_group.segtype]
 
-        connections, lines = points.decompose_into_straight_lines(fpositions)
-        logging.info("connections:%s lines:%s", connections, lines)
-        hlc_name = group_hlc_name(fpositions)
-        if hlc_name:
+        if track_group.hlc_name:
             add_track_with_globalname(
-                g, ic, segment, connections, lines, hlc_name
+                g, ic, segment, track_group.connections, track_group.lines,
+                track_group.hlc_name
             )
         else:
-            add_track_with_localnames(g, ic, segment, connections, lines)
+            add_track_with_localnames(
+                g, ic, segment, track_group.connections, track_group.lines
+            )
 
 
-def add_edges(g, ic):
-    """Adding edges to the rr_graph from icebox edges."""
-    for ipos in list(tiles(ic)):
+def entry_skip(ipos, entry):
+    """Return a function logging why an icebox entry is skipped."""
+
+    def skip(m, *args, level=logging.DEBUG, **kw):
+        p = {
+            logging.DEBUG: logging.debug,
+            logging.WARNING: logging.warn,
+            logging.INFO: logging.info,
+        }[level]
+        p(
+            "On %s skipping entry %s: " + m, ipos, format_entry(entry), *args,
+            **kw
+        )
+
+    return skip
+
+
+def tile_edge_entries(ipositions):
+    """Work out the edges of the icebox entries of tiles.
+
+    Returns list of (ipos, entry, src_localname, dst_localname, switch_type,
+    fasm_data), in tile order.
+    """
+    edges = []
+    for ipos in ipositions:
         """
         # FIXME: If IO type, connect PACKAGE_PIN_I and PACKAGE_PIN_O manually...
         tile_type = ic.tile_type(*ipos)
@@ -1041,17 +1131,7 @@ def add_edges(g, ic):
         """
 
         for entry in ic.tile_db(*ipos):
-
-            def skip(m, *args, level=logging.DEBUG, **kw):
-                p = {
-                    logging.DEBUG: logging.debug,
-                    logging.WARNING: logging.warn,
-                    logging.INFO: logging.info,
-                }[level]
-                p(
-                    "On %s skipping entry %s: " + m, ipos, format_entry(entry),
-                    *args, **kw
-                )
+            skip = entry_skip(ipos, entry)
 
             if not ic.tile_has_entry(*ipos, entry):
                 # skip('Non-existent edge!')
@@ -1080,30 +1160,39 @@ def add_edges(g, ic):
             ).to_fasm_entry()
             fasm_data = {'fasm_features': feature}
 
+            edges.append(
+                (
+                    ipos, entry, src_localname, dst_localname, switch_type,
+                    fasm_data
+                )
+            )
+
+    return edges
+
+
+def add_edges(g, ic, pool=None):
+    """Adding edges to the rr_graph from icebox edges.
+
+    The icebox entries are worked out by tile column, in pool if given, the
+    edges are then created in tile order.
+    """
+    for column in map_columns(tile_edge_entries, tile_columns(ic), pool):
+        for (ipos, entry, src_localname, dst_localname, switch_type,
+             fasm_data) in column:
             create_edge_with_names(
                 g,
                 src_localname,
                 dst_localname,
                 ipos,
                 g.switches[switch_type],
-                skip,
+                entry_skip(ipos, entry),
                 metadata=fasm_data
             )
 
 
 def print_nodes_edges(g):
-    print(
-        "Edges: %d (index: %d)" % (
-            len(g.routing._xml_parent(graph.RoutingEdge)),
-            len(g.routing.id2element[graph.RoutingEdge])
-        )
-    )
-    print(
-        "Nodes: %d (index: %d)" % (
-            len(g.routing._xml_parent(graph.RoutingNode)),
-            len(g.routing.id2element[graph.RoutingNode])
-        )
-    )
+    print("Edges: %d" % g.routing.num_edges)
+    print("Nodes: %d" % g.routing.num_nodes)
 
 
 def ram_pin_offset(pin):
@@ -1199,11 +1288,24 @@ def get_pin_meta(block, pin):
     assert False, (block, pin)
 
 
-def main(part, read_rr_graph, write_rr_graph):
+def build_rr_graph(part, read_rr_graph, write_rr_graph, jobs=1, perf=None):
+    """Import the routing of part, writing write_rr_graph.
+
+    With jobs > 1, the tracks and edges are worked out by tile column in a
+    pool of jobs processes: the segment group planning of plan_tracks and the
+    icebox entry filtering of tile_edge_entries.  The results are merged in
+    tile order, so the written graph doesn't depend on jobs.  Loading the
+    graphs, adding the tracks and edges to the graph and saving it stay in
+    this process.  The phases are logged to perf if given.
+    """
     global ic
 
+    if perf is None:
+        perf = PhaseLog()
+
     print('Importing input g', part)
-    ic, g = init(part, read_rr_graph)
+    with perf.phase('Loading rr_graph'):
+        ic, g = init(part, read_rr_graph)
 
     short = graph.Switch(
         id=g.switches.next_id(),
@@ -1239,37 +1341,88 @@ def main(part, read_rr_graph, write_rr_graph):
     print_nodes_edges(g)
     print()
     print()
-    print('Rebuilding block I/O nodes')
-    print('=' * 80)
-
-    g.create_block_pins_fabric(
-        g.switches['__vpr_delayless_switch__'], get_pin_meta
-    )
+    with perf.phase('Rebuilding block I/O nodes') as stats:
+        print('=' * 80)
+        g.create_block_pins_fabric(
+            g.switches['__vpr_delayless_switch__'], get_pin_meta
+        )
+        stats['nodes'] = g.routing.num_nodes
     print_nodes_edges(g)
 
     print()
-    print('Adding pin aliases')
-    print('=' * 80)
-    add_pin_aliases(g, ic)
-
-    segments = ic.group_segments(list(tiles(ic)))
-    add_tracks(g, ic, segments, segtype_filter="local")
-    add_tracks(g, ic, segments, segtype_filter="neigh")
-    add_tracks(g, ic, segments, segtype_filter="span4")
-    add_tracks(g, ic, segments, segtype_filter="span12")
-    # add_global_tracks(g, ic)
+    with perf.phase('Adding pin aliases'):
+        print('=' * 80)
+        add_pin_aliases(g, ic)
+
+    # Workers are forked once ic is set up, they use the global ic.
+    pool = None
+    if jobs > 1:
+        pool = multiprocessing.get_context('fork').Pool(jobs)
+
+    with perf.phase('Planning tracks'):
+        segments = ic.group_segments(list(tiles(ic)))
+        track_groups = plan_tracks(ic, segments, pool)
+
+    with perf.phase('Adding tracks') as stats:
+        add_tracks(g, ic, track_groups, segtype_filter="local")
+        add_tracks(g, ic, track_groups, segtype_filter="neigh")
+        add_tracks(g, ic, track_groups, segtype_filter="span4")
+        add_tracks(g, ic, track_groups, segtype_filter="span12")
+        # add_global_tracks(g, ic)
+        stats['nodes'] = g.routing.num_nodes
 
     print()
-    print('Adding edges')
-    print('=' * 80)
-    add_edges(g, ic)
+    with perf.phase('Adding edges') as stats:
+        print('=' * 80)
+        add_edges(g, ic, pool)
+        stats['edges'] = g.routing.num_edges
+    if pool is not None:
+        pool.close()
+        pool.join()
     print()
     print_nodes_edges(g)
     print()
-    print('Saving')
-    open(write_rr_graph, 'w').write(
-        ET.tostring(g.to_xml(), pretty_print=True).decode('ascii')
+    with perf.phase('Saving'):
+        open(write_rr_graph, 'w').write(
+            ET.tostring(g.to_xml(), pretty_print=True).decode('ascii')
+        )
+
+
+def build_part(part_args):
+    """Build one (part, read_rr_graph, write_rr_graph) of build_parts."""
+    build_rr_graph(*part_args)
+    return part_args[2]
+
+
+def build_parts(parts, jobs=1, perf=None):
+    """Import the routing of each (part, read_rr_graph, write_rr_graph).
+
+    With jobs > 1, the parts are built concurrently in a pool of jobs
+    processes, forked from this process so the icebox databases are only
+    loaded once.  Each part is then built in a single process, and its phases
+    are not logged to perf.
+    """
+    if len(parts) == 1:
+        build_rr_graph(*parts[0], jobs=jobs, perf=perf)
+        return
+
+    if jobs <= 1:
+        for part_args in parts:
+            build_rr_graph(*part_args, perf=perf)
+        return
+
+    # Each part sets the global ic, so only build one part per worker.
+    pool = multiprocessing.get_context('fork').Pool(
+        min(jobs, len(parts)), maxtasksperchild=1
     )
+    for write_rr_graph in pool.imap(build_part, parts):
+        print('Wrote', write_rr_graph)
+    pool.close()
+    pool.join()
+
+
+def main(part, read_rr_graph, write_rr_graph, jobs=1, perf=None):
+    build_rr_graph(part, read_rr_graph, write_rr_graph, jobs=jobs, perf=perf)
     print()
     print('Exiting')
     sys.exit(0)
@@ -1285,6 +1438,22 @@ if __name__ == '__main__':
     parser.add_argument('--device', help='')
     parser.add_argument('--read_rr_graph', help='')
     parser.add_argument('--write_rr_graph', default='out.xml', help='')
+    parser.add_argument(
+        '--part',
+        nargs=3,
+        action='append',
+        metavar=('DEVICE', 'READ_RR_GRAPH', 'WRITE_RR_GRAPH'),
+        help='Part to import, can be given multiple times instead of '
+        '--device, --read_rr_graph and --write_rr_graph'
+    )
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=1,
+        help='Number of processes building the graph, or the parts'
+    )
+    add_perf_args(parser)
 
     args = parser.parse_args()
 
@@ -1294,5 +1463,23 @@ if __name__ == '__main__':
         loglevel = logging.INFO
     logging.basicConfig(level=loglevel)
 
-    mode = args.device.lower()[2:]
-    main(mode, args.read_rr_graph, args.write_rr_graph)
+    with PhaseLog.from_args(args) as perf:
+        if args.part:
+            build_parts(
+                [
+                    (device.lower()[2:], read_rr_graph, write_rr_graph)
+                    for device, read_rr_graph, write_rr_graph in args.part
+                ],
+                jobs=args.jobs,
+                perf=perf
+            )
+            sys.exit(0)
+
+        mode = args.device.lower()[2:]
+        main(
+            mode,
+            args.read_rr_graph,
+            args.write_rr_graph,
+            jobs=args.jobs,
+            perf=perf
+        )
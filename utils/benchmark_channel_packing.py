@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+""" Measures the track packers of lib.rr_graph.channel2.
+
+Synthetic channels are generated for a grid of --grid-dim coordinates, each
+with --tracks random tracks of length 0 to --max-length.  Every channel is
+packed by each packer of channel2.CHANNEL_PACKERS, and the packers are
+checked to produce the same ptc assignment.
+
+"""
+import argparse
+import random
+import time
+
+from lib.rr_graph import channel2
+
+
+def synthetic_channel(rand, grid_dim, num_tracks, max_length):
+    """ Returns list of (low, high, key) tracks of a channel. """
+    tracks = []
+    for key in range(num_tracks):
+        low = rand.randrange(grid_dim)
+        high = min(grid_dim - 1, low + rand.randrange(max_length + 1))
+        tracks.append((low, high, key))
+
+    return tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--grid-dim', type=int, default=2000)
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--tracks', type=int, default=50000)
+    parser.add_argument('--max-length', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--packers',
+        nargs='+',
+        choices=sorted(channel2.CHANNEL_PACKERS),
+        default=sorted(channel2.CHANNEL_PACKERS)
+    )
+    args = parser.parse_args()
+
+    rand = random.Random(args.seed)
+    channels = [
+        synthetic_channel(rand, args.grid_dim, args.tracks, args.max_length)
+        for _ in range(args.channels)
+    ]
+
+    trees = None
+    for packer in args.packers:
+        start = time.perf_counter()
+
+        packer_trees = []
+        for tracks in channels:
+            channel_model = channel2.CHANNEL_PACKERS[packer](tracks)
+            channel_model.pack_tracks()
+            packer_trees.append(channel_model.trees)
+
+        elapsed = time.perf_counter() - start
+
+        if trees is None:
+            trees = packer_trees
+        else:
+            assert packer_trees == trees, packer
+
+        print(
+            '{}: {:.2f} s, {} ptc per channel'.format(
+                packer, elapsed,
+                max(len(channel_trees) for channel_trees in packer_trees)
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
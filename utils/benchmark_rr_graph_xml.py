@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+""" Measures the rr graph XML write and parse throughput.
+
+A synthetic graph of CHANX / CHANY nodes with random edges is written with
+lib.rr_graph_xml.graph2.Graph.serialize_to_xml and read back with
+graph_from_xml.  Throughput is reported in MB/s of XML.
+
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from lib.rr_graph import graph2
+from lib.rr_graph_xml import graph2 as xml_graph2
+
+
+def synthetic_nodes(num_nodes, rand):
+    """ Returns NodeStore with num_nodes random track nodes. """
+    nodes = graph2.NodeStore()
+
+    x_low = rand.integers(0, 100, num_nodes)
+    y_low = rand.integers(0, 100, num_nodes)
+    length = rand.integers(0, 4, num_nodes)
+    is_chanx = rand.random(num_nodes) < 0.5
+    unset = np.full(num_nodes, graph2.NODE_STORE_UNSET)
+
+    nodes.extend_columns(
+        type=np.where(
+            is_chanx, graph2.NodeType.CHANX.value, graph2.NodeType.CHANY.value
+        ),
+        direction=np.full(num_nodes, graph2.NodeDirection.BI_DIR.value),
+        capacity=np.ones(num_nodes),
+        ptc=rand.integers(0, 200, num_nodes),
+        side=np.full(num_nodes, -1),
+        x_low=x_low,
+        y_low=y_low,
+        x_high=np.where(is_chanx, x_low + length, x_low),
+        y_high=np.where(is_chanx, y_low, y_low + length),
+        timing_r=rand.random(num_nodes),
+        timing_c=rand.random(num_nodes),
+        segment_id=np.where(rand.random(num_nodes) < 0.5, 0, unset),
+    )
+
+    return nodes
+
+
+def synthetic_edges(num_nodes, num_edges, rand):
+    """ Yields num_edges random edge tuples. """
+    src_nodes = rand.integers(0, num_nodes, num_edges).tolist()
+    sink_nodes = rand.integers(0, num_nodes, num_edges).tolist()
+    has_metadata = (rand.random(num_edges) < 0.2).tolist()
+
+    for src_node, sink_node, metadata in zip(src_nodes, sink_nodes,
+                                             has_metadata):
+        if metadata:
+            metadata = [('fasm_features', 'TILE.PIP_{}'.format(src_node))]
+        else:
+            metadata = None
+
+        yield src_node, sink_node, 0, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=2000000)
+    parser.add_argument('--edges', type=int, default=10000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--output',
+        help='XML file to write, a temporary file is used by default'
+    )
+    args = parser.parse_args()
+
+    rand = np.random.default_rng(args.seed)
+
+    switch = graph2.Switch(
+        id=0,
+        type=graph2.SwitchType.SHORT,
+        name='__vpr_delayless_switch__',
+        timing=None,
+        sizing=graph2.SwitchSizing(mux_trans_size=0, buf_size=0),
+    )
+    segment = graph2.Segment(id=0, name='dummy', timing=None)
+
+    # Only the graph sections and the output file are needed to write XML.
+    graph = xml_graph2.Graph.__new__(xml_graph2.Graph)
+    graph.root_attrib = {'tool_name': 'benchmark'}
+    graph.output_file_name = args.output
+    graph._write_xml = graph._write_xml_no_debug
+    graph.graph = graph2.Graph(
+        switches=[switch],
+        segments=[segment],
+        block_types=[],
+        grid=[],
+        nodes=[],
+    )
+
+    channels = graph2.Channels(
+        chan_width_max=200,
+        x_min=200,
+        y_min=200,
+        x_max=200,
+        y_max=200,
+        x_list=[graph2.ChannelList(index=idx, info=200) for idx in range(104)],
+        y_list=[graph2.ChannelList(index=idx, info=200) for idx in range(104)],
+    )
+
+    nodes = synthetic_nodes(args.nodes, rand)
+    edges = synthetic_edges(args.nodes, args.edges, rand)
+
+    if graph.output_file_name is None:
+        fd, graph.output_file_name = tempfile.mkstemp(suffix='.xml')
+        os.close(fd)
+
+    try:
+        start = time.perf_counter()
+        graph.serialize_to_xml(
+            channels_obj=channels, nodes_obj=nodes, edges_obj=edges
+        )
+        write_time = time.perf_counter() - start
+
+        size_mb = os.path.getsize(graph.output_file_name) / 1e6
+        print(
+            'Write {:.1f} MB in {:.1f} s, {:.1f} MB/s (includes edge '
+            'generation)'.format(size_mb, write_time, size_mb / write_time)
+        )
+
+        start = time.perf_counter()
+        xml_graph2.graph_from_xml(
+            graph.output_file_name, filter_nodes=False, load_edges=True
+        )
+        parse_time = time.perf_counter() - start
+        print(
+            'Parse {:.1f} MB in {:.1f} s, {:.1f} MB/s'.format(
+                size_mb, parse_time, size_mb / parse_time
+            )
+        )
+    finally:
+        if args.output is None:
+            os.remove(graph.output_file_name)
+
+
+if __name__ == "__main__":
+    main()
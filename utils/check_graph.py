@@ -1,52 +1,20 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import re
-from lib.rr_graph import graph
+import sys
 
+from lib.rr_graph.graph_cache import GraphCache
+from lib.rr_graph.graph2 import NodeType
+from lib.rr_graph.reachability import Reachability
 
-def inaccessible_node_ids(forward_connections, node_id, target_node_ids):
-    """
-    Takes a mapping of forward connectionso from nodes, a starting `node_id` and
-    a set of all the target node ids for which we want to check routability.
-    Returns a set of all the target node ids that are not accessible from `node_id`.
-    """
-    layer = [node_id]
-    visited = set()
-    layer_index = 0
-    while layer:
-        layer_index += 1
-        new_layer = set()
-        for this_node_id in layer:
-            new_layer |= forward_connections[this_node_id]
-        new_layer -= visited
-        visited |= new_layer
-        layer = new_layer
-    return target_node_ids - visited
-
-
-def routing_graph_to_dictionary(routing_graph):
-    edge_map = routing_graph._ids_map(graph.RoutingEdge)
-    edges_by_node = routing_graph.edges_for_allnodes()
-    dict_graph = {}
-    for node in routing_graph._xml_parent(graph.RoutingNode):
-        node_id = int(node.get('id'))
-        dest_ids = set()
-        for edge_id in edges_by_node[node_id]:
-            edge = edge_map[edge_id]
-            if int(edge.get('src_node')) == node_id:
-                dest_ids.add(int(edge.get('sink_node')))
-        dict_graph[node_id] = dest_ids
-    return dict_graph
-
-
-def filter_nodes(all_node_ids, g, f):
-    node_map = g.routing._ids_map(graph.RoutingNode)
+
+def filter_nodes(all_node_ids, cache, block_grid, f):
     f = re.compile(f)
     node_ids = set()
     for nid in all_node_ids:
-        node = node_map[nid]
-        n = graph.RoutingGraphPrinter.node(node, g.block_grid)
+        n = cache.node_name(nid, block_grid)
         if f.search(n):
             print("Filtering out ", n)
             continue
@@ -54,88 +22,109 @@ def filter_nodes(all_node_ids, g, f):
     return node_ids
 
 
-def inaccessible_sink_node_ids_by_source_node_id(g, filter=""):
+def inaccessible_sink_node_ids_by_source_node_id(cache, filter=""):
     """
     Returns a dictionary that maps source node ids to sets of sink node ids
     which are inaccessible to them.
     If a source node id can access all sink nodes it is not present in the
     returned dictionary.
     """
-    routing_graph = g.routing
+    block_grid = cache.skeleton_graph().block_grid
+
+    all_source_node_ids = cache.node_ids(NodeType.SOURCE).tolist()
+    source_node_ids = filter_nodes(
+        all_source_node_ids, cache, block_grid, filter
+    )
 
-    # First convert the graph to a dictionary.
-    cyclic_graph = routing_graph_to_dictionary(routing_graph)
+    all_sink_node_ids = cache.node_ids(NodeType.SINK).tolist()
+    sink_node_ids = filter_nodes(all_sink_node_ids, cache, block_grid, filter)
 
-    all_source_node_ids = set(
-        [
-            int(node.get('id'))
-            for node in routing_graph._xml_parent(graph.RoutingNode)
-            if node.get('type') == 'SOURCE'
-        ]
+    print(
+        'Checking {} source nodes against {} sink nodes'.format(
+            len(source_node_ids), len(sink_node_ids)
+        )
     )
-    source_node_ids = filter_nodes(all_source_node_ids, g, filter)
-
-    all_sink_node_ids = set(
-        [
-            int(node.get('id'))
-            for node in routing_graph._xml_parent(graph.RoutingNode)
-            if node.get('type') == 'SINK'
-        ]
+    reachability = Reachability(cache.out_offsets, cache.out_nodes)
+    return reachability.unreachable_sinks(
+        sorted(source_node_ids), sorted(sink_node_ids)
     )
-    sink_node_ids = filter_nodes(all_sink_node_ids, g, filter)
 
-    inaccessible_by_source_node = {}
-    total = len(source_node_ids)
-    for index, source_node_id in enumerate(source_node_ids):
-        inaccessible_ids = inaccessible_node_ids(
-            cyclic_graph, source_node_id, target_node_ids=sink_node_ids
+
+def write_report(report_file, cache, block_grid, inaccessible_nodes):
+    """ Writes the inaccessible nodes as JSON to report_file. """
+    unreachable = []
+    for source_id, sink_ids in sorted(inaccessible_nodes.items()):
+        sink_ids = sorted(sink_ids)
+        unreachable.append(
+            dict(
+                source=source_id,
+                source_name=cache.node_name(source_id, block_grid),
+                sinks=sink_ids,
+                sink_names=[cache.node_name(i, block_grid) for i in sink_ids],
+            )
         )
-        if inaccessible_ids:
-            inaccessible_by_source_node[source_node_id] = inaccessible_ids
-        if index % 100 == 0:
-            print('Checked {}/{} source nodes'.format(index, total))
-    return inaccessible_by_source_node
 
+    with open(report_file, 'w') as f:
+        report = dict(success=not unreachable, unreachable=unreachable)
+        json.dump(report, f, indent=2)
 
-def check_graph(rr_graph_file, filter):
+
+def check_graph(rr_graph_file, filter, cache_file=None, report_file=None):
     '''
     Check that the rr_graph has connections from all SOURCE nodes to all SINK nodes.
+
+    Returns True on success.
     '''
     print('Loading the routing graph file')
-    g = graph.Graph(rr_graph_file, verbose=True, clear_fabric=False)
-    routing_graph = g.routing
+    cache = GraphCache.open(rr_graph_file, cache_file, verbose=True)
+    block_grid = cache.skeleton_graph().block_grid
     print('Checking if all source nodes connect to all sink nodes.')
     inaccessible_nodes = inaccessible_sink_node_ids_by_source_node_id(
-        g, filter
+        cache, filter
     )
+
+    if report_file is not None:
+        write_report(report_file, cache, block_grid, inaccessible_nodes)
+
     if inaccessible_nodes:
         print('FAIL')
-        node_map = routing_graph._ids_map(graph.RoutingNode)
-        for source_id, sink_ids in inaccessible_nodes.items():
-            source_node = graph.RoutingGraphPrinter.node(
-                node_map[source_id], g.block_grid
-            )
+        for source_id, sink_ids in sorted(inaccessible_nodes.items()):
+            source_node = cache.node_name(source_id, block_grid)
             sink_nodes = [
-                graph.RoutingGraphPrinter.node(node_map[i], g.block_grid)
-                for i in sink_ids
+                cache.node_name(i, block_grid) for i in sorted(sink_ids)
             ]
 
             print('Node {} does not connect to nodes:.'.format(source_node))
             for n in sink_nodes:
                 print('    ', n)
             print()
-        import pdb
-        pdb.set_trace()
+        return False
     else:
         print('SUCCESS')
+        return True
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('rr_graph_file', type=str)
     parser.add_argument('filter', type=str)
+    parser.add_argument(
+        '--cache',
+        type=str,
+        default=None,
+        help='Graph cache file, built on first use. Defaults to the '
+        'rr_graph_file with a .cache suffix'
+    )
+    parser.add_argument(
+        '--report',
+        type=str,
+        default=None,
+        help='Write the unreachable source / sink pairs to this JSON file'
+    )
     args = parser.parse_args()
-    check_graph(args.rr_graph_file, args.filter)
+    if not check_graph(args.rr_graph_file, args.filter, args.cache,
+                       args.report):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
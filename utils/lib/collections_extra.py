@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import array
+import collections
 import enum
 import io
 import pprint
@@ -7,6 +9,8 @@ import sys
 
 from types import MappingProxyType
 
+import numpy as np
+
 
 def frozendict(*args, **kwargs):
     """Version of a dictionary which can't be changed."""
@@ -120,6 +124,174 @@ class MostlyReadOnly:
         return "{}({})".format(self.__class__.__name__, ", ".join(attribs))
 
 
+class UnionFind:
+    """Disjoint sets over the integers [0, size), backed by flat arrays.
+
+    Uses union by size and path halving, so merging n elements is close to
+    linear.
+
+    >>> sets = UnionFind(6)
+    >>> sets.union(0, 3) == sets.find(3)
+    True
+    >>> _ = sets.union(4, 3)
+    >>> _ = sets.union(1, 2)
+    >>> sets.find(4) == sets.find(0)
+    True
+    >>> sets.find(1) == sets.find(0)
+    False
+    >>> [sets.find(i) == sets.find(2) for i in range(6)]
+    [False, True, True, False, False, False]
+    """
+
+    def __init__(self, size):
+        self.parent = array.array('q', range(size))
+        self.size = array.array('q', [1]) * size
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, i):
+        """Return the representative element of the set containing i."""
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+
+        return i
+
+    def union(self, a, b):
+        """Merge the sets containing a and b, return the new representative."""
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return a
+
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+        return a
+
+
+class IntSet:
+    """Immutable set of non-negative integers, backed by numpy arrays.
+
+    Members are stored both as a sorted array and as a bitmap, so single
+    lookups and lookups of whole arrays are cheap.
+
+    >>> nodes = IntSet([5, 1, 5, 3])
+    >>> len(nodes), 3 in nodes, 4 in nodes, 10 in nodes, -1 in nodes
+    (3, True, False, False, False)
+    >>> None in nodes
+    False
+    >>> nodes.contains([0, 1, 5, 7, -1]).tolist()
+    [False, True, True, False, False]
+    >>> list(nodes | IntSet([2]))
+    [1, 2, 3, 5]
+    >>> len(IntSet()), IntSet().contains([1]).tolist()
+    (0, [False])
+    """
+
+    def __init__(self, values=()):
+        if not isinstance(values, np.ndarray):
+            values = list(values)
+
+        self.values = np.unique(np.asarray(values, dtype=np.int64))
+        assert len(self.values) == 0 or self.values[0] >= 0
+
+        size = int(self.values[-1]) + 1 if len(self.values) else 0
+        self.bitmap = np.zeros(size, dtype=bool)
+        self.bitmap[self.values] = True
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values.tolist())
+
+    def __contains__(self, value):
+        if value is None:
+            return False
+
+        return 0 <= value < len(self.bitmap) and bool(self.bitmap[value])
+
+    def __or__(self, other):
+        return IntSet(np.concatenate((self.values, other.values)))
+
+    def contains(self, values):
+        """Return bool array, True for the values in the set."""
+        values = np.asarray(values, dtype=np.int64)
+        in_range = (values >= 0) & (values < len(self.bitmap))
+
+        result = np.zeros(values.shape, dtype=bool)
+        result[in_range] = self.bitmap[values[in_range]]
+        return result
+
+
+class WeightedLru:
+    """Least recently used cache, bounded by the total weight of its values.
+
+    Every value is put with a weight, e.g. its approximate size.  When the
+    total weight exceeds max_weight, least recently used values are evicted,
+    except the value just put.  hits and misses count the get lookups.
+
+    >>> cache = WeightedLru(max_weight=4)
+    >>> cache.put('a', 1, weight=2)
+    >>> cache.put('b', 2, weight=2)
+    >>> cache.get('a')
+    1
+    >>> cache.put('c', 3)
+    >>> 'a' in cache, 'b' in cache, cache.weight
+    (True, False, 3)
+    >>> cache.get('b', 'missing')
+    'missing'
+    >>> cache.put('d', 4, weight=10)
+    >>> list(cache.entries), cache.weight
+    (['d'], 10)
+    >>> cache.hits, cache.misses, cache.evictions
+    (1, 1, 3)
+    """
+
+    def __init__(self, max_weight):
+        self.max_weight = max_weight
+        self.entries = collections.OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """Return the value of key and mark it as recently used."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, weight=1):
+        if key in self.entries:
+            self.weight -= self.entries.pop(key)[1]
+
+        self.entries[key] = (value, weight)
+        self.weight += weight
+
+        while self.weight > self.max_weight and len(self.entries) > 1:
+            _, (_, evicted_weight) = self.entries.popitem(last=False)
+            self.weight -= evicted_weight
+            self.evictions += 1
+
+
 class OrderedEnum(enum.Enum):
     def __ge__(self, other):
         if self.__class__ is other.__class__:
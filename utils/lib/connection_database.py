@@ -1,5 +1,9 @@
 import enum
+import itertools
 import os
+
+import numpy as np
+
 from lib.rr_graph import graph2
 from lib.rr_graph import tracks
 
@@ -124,6 +128,104 @@ def get_track_model(conn, track_pkey):
     return tracks_model, track_nodes
 
 
+def get_track_models(conn, track_pkeys=None):
+    """ Returns dict of track_pkey to the get_track_model result of each track.
+
+    Tracks are loaded with one query on graph_node and one on graph_edge (one
+    per chunk of track_pkeys), in the row order get_track_model reads them.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection database object.
+    track_pkeys : iterable of int, optional
+        Tracks to load.  All tracks with graph nodes are loaded if None.
+        Tracks without graph nodes get an empty model, like get_track_model.
+
+    """
+    if track_pkeys is None:
+        c = conn.cursor()
+        nodes = NodeRowGroups(
+            c.execute(
+                """
+    SELECT track_pkey, pkey, graph_node_type, x_low, x_high, y_low, y_high
+      FROM graph_node WHERE track_pkey IS NOT NULL
+      ORDER BY track_pkey, pkey"""
+            )
+        )
+        c2 = conn.cursor()
+        edges = NodeRowGroups(
+            c2.execute(
+                """
+    SELECT track_pkey, src_graph_node_pkey, dest_graph_node_pkey
+        FROM graph_edge WHERE track_pkey IS NOT NULL
+        ORDER BY track_pkey, rowid"""
+            )
+        )
+    else:
+        track_pkeys = sorted(set(track_pkeys))
+        nodes = NodeRowGroups(
+            execute_in_chunks(
+                conn, """
+    SELECT track_pkey, pkey, graph_node_type, x_low, x_high, y_low, y_high
+      FROM graph_node WHERE track_pkey IN ({})
+      ORDER BY track_pkey, pkey""", track_pkeys
+            )
+        )
+        edges = NodeRowGroups(
+            execute_in_chunks(
+                conn, """
+    SELECT track_pkey, src_graph_node_pkey, dest_graph_node_pkey
+        FROM graph_edge WHERE track_pkey IN ({})
+        ORDER BY track_pkey, rowid""", track_pkeys
+            )
+        )
+
+    track_models = {}
+    while nodes.group is not None:
+        track_pkey = nodes.group[0]
+
+        track_list = []
+        track_nodes = []
+        graph_node_pkey = {}
+        for idx, (pkey, graph_node_type, x_low, x_high, y_low,
+                  y_high) in enumerate(nodes.pop(track_pkey)):
+            node_type = graph2.NodeType(graph_node_type)
+            if node_type == graph2.NodeType.CHANX:
+                direction = 'X'
+            elif node_type == graph2.NodeType.CHANY:
+                direction = 'Y'
+
+            graph_node_pkey[pkey] = idx
+            track_nodes.append(pkey)
+            track_list.append(
+                tracks.Track(
+                    direction=direction,
+                    x_low=x_low,
+                    x_high=x_high,
+                    y_low=y_low,
+                    y_high=y_high
+                )
+            )
+
+        track_connections = set()
+        for src_graph_node_pkey, dest_graph_node_pkey in edges.pop(track_pkey):
+            src_idx = graph_node_pkey[src_graph_node_pkey]
+            dest_idx = graph_node_pkey[dest_graph_node_pkey]
+
+            track_connections.add(tuple(sorted((src_idx, dest_idx))))
+
+        tracks_model = tracks.Tracks(track_list, list(track_connections))
+        track_models[track_pkey] = tracks_model, track_nodes
+
+    if track_pkeys is not None:
+        for track_pkey in track_pkeys:
+            if track_pkey not in track_models:
+                track_models[track_pkey] = tracks.Tracks([], []), []
+
+    return track_models
+
+
 def yield_wire_info_from_node(conn, node_pkey):
     """ Yield tile types and wires attached to specified node.
 
@@ -453,3 +555,415 @@ WHERE
     assert the_site_pin_pkey is not None, (tile_type_str, wire_str)
 
     return wire_in_tile_pkeys, the_site_pin_pkey
+
+
+class NodeRowGroups(object):
+    """ Splits rows of (node_pkey, ...) sorted by node_pkey into groups.
+
+    Rows are consumed lazily, so several grouped queries can be walked in
+    lockstep without holding their results in memory.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        Rows whose first column is node_pkey, sorted by node_pkey.
+
+    """
+
+    def __init__(self, rows):
+        self.groups = itertools.groupby(rows, key=lambda row: row[0])
+        self.group = next(self.groups, None)
+
+    def pop(self, node_pkey):
+        """ Returns the rows of node_pkey, without the node_pkey column.
+
+        node_pkey must be greater than the node_pkey of the previous call.
+        Groups of nodes that were skipped are discarded.
+
+        """
+        while self.group is not None and self.group[0] < node_pkey:
+            self.group = next(self.groups, None)
+
+        if self.group is None or self.group[0] != node_pkey:
+            return []
+
+        rows = [row[1:] for row in self.group[1]]
+        self.group = next(self.groups, None)
+        return rows
+
+
+# Maximum number of keys bound to one IN (...) list by execute_in_chunks.
+MAX_IN_KEYS = 500
+
+
+def execute_in_chunks(conn, query, keys):
+    """ Yields the rows of query for chunks of keys.
+
+    query must contain one "IN ({})" list, which is filled with the
+    placeholders of each chunk.  When keys are sorted and query is ordered by
+    the key, rows are yielded in key order.
+
+    """
+    c = conn.cursor()
+    for start in range(0, len(keys), MAX_IN_KEYS):
+        chunk = keys[start:start + MAX_IN_KEYS]
+        for row in c.execute(query.format(','.join('?' * len(chunk))), chunk):
+            yield row
+
+
+# Grid locations of the wires of each CHANNEL node.
+CHANNEL_WIRE_LOCATIONS = """
+SELECT DISTINCT
+  wire.node_pkey,
+  tile.grid_x,
+  tile.grid_y
+FROM
+  node
+  INNER JOIN wire ON wire.node_pkey = node.pkey
+  INNER JOIN tile ON tile.pkey = wire.tile_pkey
+WHERE
+  node.classification = ?
+ORDER BY
+  wire.node_pkey;
+"""
+
+# Grid locations of the pips that connect each CHANNEL node to another node.
+CHANNEL_PIP_LOCATIONS = """
+SELECT DISTINCT
+  wire.node_pkey,
+  tile.grid_x,
+  tile.grid_y
+FROM
+  node
+  INNER JOIN wire ON wire.node_pkey = node.pkey
+  INNER JOIN undirected_pips ON
+    undirected_pips.wire_in_tile_pkey = wire.wire_in_tile_pkey
+  INNER JOIN wire AS other_wire ON
+    other_wire.wire_in_tile_pkey = undirected_pips.other_wire_in_tile_pkey
+  AND
+    other_wire.phy_tile_pkey = wire.phy_tile_pkey
+  INNER JOIN tile ON tile.pkey = other_wire.tile_pkey
+WHERE
+  node.classification = ?
+AND
+  wire.tile_pkey IS NOT NULL
+ORDER BY
+  wire.node_pkey;
+"""
+
+# Grid locations of the site wires of EDGES_TO_CHANNEL nodes connected by a
+# pip to each CHANNEL node.
+CHANNEL_SITE_LOCATIONS = """
+SELECT DISTINCT
+  wire.node_pkey,
+  tile.grid_x,
+  tile.grid_y
+FROM
+  node
+  INNER JOIN wire ON wire.node_pkey = node.pkey
+  INNER JOIN undirected_pips ON
+    undirected_pips.wire_in_tile_pkey = wire.wire_in_tile_pkey
+  INNER JOIN wire AS other_wire ON
+    other_wire.wire_in_tile_pkey = undirected_pips.other_wire_in_tile_pkey
+  AND
+    other_wire.phy_tile_pkey = wire.phy_tile_pkey
+  INNER JOIN node AS other_node ON other_node.pkey = other_wire.node_pkey
+  INNER JOIN wire AS site_wire ON site_wire.pkey = other_node.site_wire_pkey
+  INNER JOIN tile ON tile.pkey = site_wire.tile_pkey
+WHERE
+  node.classification = ?
+AND
+  wire.tile_pkey IS NOT NULL
+AND
+  other_node.classification = ?
+ORDER BY
+  wire.node_pkey;
+"""
+
+# Wire names of each CHANNEL node.
+CHANNEL_WIRE_NAMES = """
+SELECT DISTINCT
+  wire.node_pkey,
+  wire_in_tile.name
+FROM
+  node
+  INNER JOIN wire ON wire.node_pkey = node.pkey
+  INNER JOIN wire_in_tile ON wire_in_tile.pkey = wire.wire_in_tile_pkey
+WHERE
+  node.classification = ?
+ORDER BY
+  wire.node_pkey;
+"""
+
+
+def yield_channel_nodes(conn):
+    """ Yield the VPR grid locations and wire names of every CHANNEL node.
+
+    The locations of a node are the locations of its wires, of the pips that
+    connect it to other nodes, and of the sites of EDGES_TO_CHANNEL nodes
+    it connects to.  All CHANNEL nodes are handled by a fixed number of
+    queries, instead of several queries per node.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection database object.
+
+    Yields
+    -------
+    node_pkey : int
+        Primary key into node table, in increasing order.
+    unique_pos : set of (int, int)
+        VPR grid locations (grid_x, grid_y) this node connects to.
+    wires : list of str
+        Names of the wire_in_tile rows of the wires in this node.
+
+    """
+    channel = NodeClassification.CHANNEL.value
+    edges_to_channel = NodeClassification.EDGES_TO_CHANNEL.value
+
+    groups = [
+        NodeRowGroups(conn.cursor().execute(query, params))
+        for query, params in (
+            (CHANNEL_WIRE_LOCATIONS, (channel, )),
+            (CHANNEL_PIP_LOCATIONS, (channel, )),
+            (CHANNEL_SITE_LOCATIONS, (channel, edges_to_channel)),
+        )
+    ]
+    wire_names = NodeRowGroups(
+        conn.cursor().execute(CHANNEL_WIRE_NAMES, (channel, ))
+    )
+
+    c = conn.cursor()
+    c.execute(
+        "SELECT pkey FROM node WHERE classification = ? ORDER BY pkey;",
+        (channel, )
+    )
+    for (node_pkey, ) in c:
+        unique_pos = set()
+        for group in groups:
+            unique_pos.update(group.pop(node_pkey))
+
+        yield node_pkey, unique_pos, [
+            wire for (wire, ) in wire_names.pop(node_pkey)
+        ]
+
+
+def load_int_rows(conn, query, params=(), chunk_size=1 << 20):
+    """ Returns the rows of query as a 2D int64 array.
+
+    All columns must be integers, map NULLs with IFNULL.
+
+    """
+    c = conn.cursor()
+    c.execute(query, params)
+
+    chunks = []
+    while True:
+        rows = c.fetchmany(chunk_size)
+        if not rows:
+            break
+
+        chunks.append(np.array(rows, dtype=np.int64))
+
+    if not chunks:
+        return np.zeros((0, len(c.description)), dtype=np.int64)
+
+    return np.concatenate(chunks)
+
+
+def by_pkey(pkeys, values, dtype=np.int32):
+    """ Returns array of values indexed by pkey, -1 for missing pkeys. """
+    array = np.full(pkeys.max() + 1 if len(pkeys) else 0, -1, dtype=dtype)
+    array[pkeys] = values
+    return array
+
+
+class WireIndex(object):
+    """ In memory index of the wire, tile, tile_type and wire_in_tile tables.
+
+    The tables are loaded once, the per wire and per node lookups are then
+    answered without queries.  Methods match the per row functions of this
+    module:
+
+     - logical_wire_info - yield_logical_wire_info_from_node
+     - site_pin_wires - node_to_site_pins
+     - pin_name_of_wire - get_pin_name_of_wire
+
+    Wires of a node are returned in wire pkey order.  Unset (NULL) keys are
+    -1.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection database object.
+
+    """
+
+    def __init__(self, conn):
+        c = conn.cursor()
+
+        self.tile_type_names = dict(
+            c.execute("SELECT pkey, name FROM tile_type;")
+        )
+        self.site_pin_names = dict(
+            c.execute("SELECT pkey, name FROM site_pin;")
+        )
+
+        tiles = load_int_rows(
+            conn, """
+SELECT
+  pkey, tile_type_pkey, IFNULL(site_as_tile_pkey, -1), grid_x, grid_y
+FROM
+  tile;"""
+        )
+        pkeys = tiles[:, 0]
+        self.tile_type = by_pkey(pkeys, tiles[:, 1])
+        self.tile_site_as_tile = by_pkey(pkeys, tiles[:, 2])
+        self.tile_grid_x = by_pkey(pkeys, tiles[:, 3])
+        self.tile_grid_y = by_pkey(pkeys, tiles[:, 4])
+
+        self.wire_in_tile_names = {}
+        site_pins = []
+        for pkey, name, site_pin_pkey in c.execute(
+                "SELECT pkey, name, IFNULL(site_pin_pkey, -1) FROM wire_in_tile;"
+        ):
+            self.wire_in_tile_names[pkey] = name
+            site_pins.append((pkey, site_pin_pkey))
+
+        site_pins = np.array(site_pins, dtype=np.int64).reshape(-1, 2)
+        self.wire_in_tile_site_pin = by_pkey(site_pins[:, 0], site_pins[:, 1])
+
+        nodes = load_int_rows(
+            conn,
+            "SELECT pkey, IFNULL(track_pkey, -1), classification FROM node;"
+        )
+        self.node_track = by_pkey(nodes[:, 0], nodes[:, 1])
+        self.node_classification = by_pkey(nodes[:, 0], nodes[:, 2])
+
+        wires = load_int_rows(
+            conn, """
+SELECT
+  pkey,
+  IFNULL(node_pkey, -1),
+  IFNULL(phy_tile_pkey, -1),
+  IFNULL(tile_pkey, -1),
+  wire_in_tile_pkey
+FROM
+  wire
+ORDER BY
+  pkey;"""
+        )
+        pkeys = wires[:, 0]
+        self.wire_node = by_pkey(pkeys, wires[:, 1])
+        self.wire_phy_tile = by_pkey(pkeys, wires[:, 2])
+        self.wire_tile = by_pkey(pkeys, wires[:, 3])
+        self.wire_in_tile = by_pkey(pkeys, wires[:, 4])
+
+        # Wires of each node, as CSR.
+        node_wires = wires[wires[:, 1] >= 0]
+        num_nodes = max(
+            len(self.node_track),
+            len(self.wire_node) and int(self.wire_node.max()) + 1
+        )
+        order = np.argsort(node_wires[:, 1], kind='stable')
+        self.node_wires = node_wires[order, 0].astype(np.int32)
+        self.node_offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(node_wires[:, 1], minlength=num_nodes),
+            out=self.node_offsets[1:]
+        )
+
+        # Wires by (phy_tile_pkey, wire_in_tile_pkey).
+        self.num_wire_in_tile = int(wires[:, 4].max()) + 1 if len(wires) else 1
+        phy_wires = wires[wires[:, 2] >= 0]
+        phy_keys = phy_wires[:, 2] * self.num_wire_in_tile + phy_wires[:, 4]
+        order = np.argsort(phy_keys, kind='stable')
+        self.phy_wire_keys = phy_keys[order]
+        self.phy_wires = phy_wires[order, 0].astype(np.int32)
+
+    def wires_of_node(self, node_pkey):
+        """ Returns array of the wire pkeys of node_pkey. """
+        if node_pkey + 1 >= len(self.node_offsets):
+            return self.node_wires[:0]
+
+        start, end = self.node_offsets[node_pkey:node_pkey + 2]
+        return self.node_wires[start:end]
+
+    def tile_type_name(self, tile_pkey):
+        return self.tile_type_names[int(self.tile_type[tile_pkey])]
+
+    def tile_loc(self, tile_pkey):
+        """ Returns (grid_x, grid_y) of tile_pkey. """
+        return (
+            int(self.tile_grid_x[tile_pkey]), int(self.tile_grid_y[tile_pkey])
+        )
+
+    def logical_wire_info(self, node_pkey):
+        """ Returns list of (tile_type, wire) of the wires of node_pkey.
+
+        Wires without a VPR tile are skipped.
+
+        """
+        wires = self.wires_of_node(node_pkey)
+        wires = wires[self.wire_tile[wires] >= 0]
+
+        tile_types = self.tile_type[self.wire_tile[wires]].tolist()
+        wire_in_tiles = self.wire_in_tile[wires].tolist()
+        return [
+            (
+                self.tile_type_names[tile_type],
+                self.wire_in_tile_names[wire_in_tile]
+            ) for tile_type, wire_in_tile in zip(tile_types, wire_in_tiles)
+        ]
+
+    def site_pin_wires(self, node_pkey):
+        """ Returns list of (wire_pkey, tile_pkey, wire_in_tile_pkey).
+
+        Only wires of node_pkey connected to a site pin are returned.
+
+        """
+        wires = self.wires_of_node(node_pkey)
+        wire_in_tiles = self.wire_in_tile[wires]
+        wires = wires[self.wire_in_tile_site_pin[wire_in_tiles] >= 0]
+
+        return [
+            (wire_pkey, tile_pkey if tile_pkey >= 0 else None, wire_in_tile)
+            for wire_pkey, tile_pkey, wire_in_tile in zip(
+                wires.tolist(),
+                self.wire_tile[wires].tolist(),
+                self.wire_in_tile[wires].tolist(),
+            )
+        ]
+
+    def pin_name_of_wire(self, wire_pkey):
+        """ Returns VPR pin name of wire_pkey, or None if it is not a pin. """
+        wire_in_tile = int(self.wire_in_tile[wire_pkey])
+        site_pin_pkey = int(self.wire_in_tile_site_pin[wire_in_tile])
+        if site_pin_pkey < 0:
+            return None
+
+        tile_pkey = self.wire_tile[wire_pkey]
+        assert tile_pkey >= 0, wire_pkey
+        if self.tile_site_as_tile[tile_pkey] >= 0:
+            return self.site_pin_names[site_pin_pkey]
+        else:
+            return self.wire_in_tile_names[wire_in_tile]
+
+    def wires_at(self, phy_tile_pkeys, wire_in_tile_pkeys):
+        """ Returns array of the wire pkey at each phy tile and wire_in_tile.
+
+        Wires that do not exist are -1.
+
+        """
+        phy_tile_pkeys = np.asarray(phy_tile_pkeys, dtype=np.int64)
+        wire_in_tile_pkeys = np.asarray(wire_in_tile_pkeys, dtype=np.int64)
+        keys = phy_tile_pkeys * self.num_wire_in_tile + wire_in_tile_pkeys
+
+        if len(self.phy_wire_keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int32)
+
+        idx = np.searchsorted(self.phy_wire_keys, keys)
+        idx[idx == len(self.phy_wire_keys)] = 0
+        found = self.phy_wire_keys[idx] == keys
+        return np.where(found, self.phy_wires[idx], -1)
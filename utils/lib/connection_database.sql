@@ -410,3 +410,13 @@ CREATE TABLE constant_sources(
     FOREIGN KEY(vcc_track_pkey) REFERENCES track(pkey),
     FOREIGN KEY(gnd_track_pkey) REFERENCES track(pkey)
 );
+
+-- Content hashes of the inputs consumed by each stage that wrote to this
+-- database (e.g. tile_type_*.json, tilegrid.json, tileconn.json and the tool
+-- sources).  Used by --incremental builds to keep an up to date database.
+CREATE TABLE build_input(
+    stage TEXT,
+    name TEXT,
+    hash TEXT,
+    PRIMARY KEY (stage, name)
+);
@@ -2,6 +2,11 @@
 """
 Utilities related to performance measurement.
 """
+import contextlib
+import cProfile
+import datetime
+import json
+import os
 import time
 
 # =============================================================================
@@ -9,12 +14,13 @@ import time
 
 def get_memory_usage():
     """
-    Returns memory usage of the current process in GB.
+    Returns memory usage of the current process in GB, the peak virtual
+    memory (peak), resident memory (rss) and peak resident memory (hwm).
     WORKS ONLY ON A LINUX SYSTEM.
     """
 
     status = None
-    result = {'peak': 0.0, 'rss': 0.0}
+    result = {'peak': 0.0, 'rss': 0.0, 'hwm': 0.0}
 
     try:
         # This will only work on systems with a /proc file system
@@ -61,3 +67,147 @@ class MemoryLog(object):
                 time.time() - self.t0, label, mem["peak"], mem["rss"]
             )
         )
+
+
+# =============================================================================
+
+
+def add_perf_args(parser):
+    """
+    Adds the --perf_log and --profile arguments used by PhaseLog.from_args.
+    """
+    parser.add_argument(
+        '--perf_log',
+        help='Write a JSON line with the performance of each phase to this file'
+    )
+    parser.add_argument(
+        '--profile',
+        help='Profile the run with cProfile, write the pstats dump to this file'
+    )
+
+
+class PhaseLog(object):
+    """
+    Per phase performance logging helper class.
+
+    Wrap each phase of a script with the "phase" context manager.  The phase
+    label is printed with a timestamp when the phase starts, and if a log file
+    is given, one JSON object is written per phase with:
+
+     - phase - phase label
+     - start - seconds from the creation of the PhaseLog
+     - wall - wall time [s]
+     - cpu - CPU time of this process [s]
+     - children_cpu - CPU time of the finished child processes [s]
+     - peak_rss, rss - peak and current resident memory at the end of the
+       phase [GB]
+     - statements - sqlite statements executed on conn, when given
+     - rows_written - rows changed on conn, when given
+
+    plus any key set in the dict returned by the context manager, and any key
+    set in the context dict of the PhaseLog (e.g. the settings of the run).
+
+    When used as a context manager itself, the PhaseLog profiles the code it
+    wraps with cProfile, if a profile file is given.
+    """
+
+    def __init__(self, file_name=None, profile_file=None):
+        self.fp = None
+        if file_name is not None:
+            self.fp = open(file_name, "w")
+
+        self.profile_file = profile_file
+        self.profiler = None
+        self.t0 = time.time()
+        self.context = {}
+
+        # Statement counters of the active phases, by id of the connection.
+        self.statement_counters = {}
+
+    @staticmethod
+    def from_args(args):
+        return PhaseLog(args.perf_log, args.profile)
+
+    def __enter__(self):
+        if self.profile_file is not None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_file)
+            self.profiler = None
+
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def _watch_statements(self, conn, counter):
+        counters = self.statement_counters.setdefault(id(conn), [])
+        if not counters:
+
+            def trace(statement):
+                for c in counters:
+                    c[0] += 1
+
+            conn.set_trace_callback(trace)
+
+        counters.append(counter)
+
+    def _unwatch_statements(self, conn, counter):
+        counters = self.statement_counters[id(conn)]
+        counters.remove(counter)
+        if not counters:
+            conn.set_trace_callback(None)
+            del self.statement_counters[id(conn)]
+
+    @contextlib.contextmanager
+    def phase(self, label, conn=None):
+        print('{} {}'.format(datetime.datetime.now(), label))
+
+        stats = {}
+        statements = [0]
+
+        # Statements are only counted when they are logged, the trace
+        # callback slows down every statement.
+        watch = conn is not None and self.fp is not None
+        if watch:
+            total_changes = conn.total_changes
+            self._watch_statements(conn, statements)
+
+        start = time.time()
+        start_times = os.times()
+        try:
+            yield stats
+        finally:
+            end_times = os.times()
+            wall = time.time() - start
+            if watch:
+                self._unwatch_statements(conn, statements)
+
+        if self.fp is None:
+            return
+
+        cpu = sum(end_times[:2]) - sum(start_times[:2])
+        children_cpu = sum(end_times[2:4]) - sum(start_times[2:4])
+        mem = get_memory_usage()
+        record = {
+            'phase': label,
+            'start': round(start - self.t0, 3),
+            'wall': round(wall, 3),
+            'cpu': round(cpu, 3),
+            'children_cpu': round(children_cpu, 3),
+            'peak_rss': round(mem['hwm'], 3),
+            'rss': round(mem['rss'], 3),
+        }
+        if watch:
+            record['statements'] = statements[0]
+            record['rows_written'] = conn.total_changes - total_changes
+        record.update(self.context)
+        record.update(stats)
+
+        self.fp.write(json.dumps(record) + '\n')
+        self.fp.flush()
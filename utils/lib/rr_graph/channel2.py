@@ -4,7 +4,15 @@ channel.py is actually broken for some track configuration, and generates
 an excessive number of dummy tracks to fill empty space (channel.Channel = >2M
 versus channel2.Channel ~70k).
 
+Two packers with the same output are provided, see CHANNEL_PACKERS:
+
+ - Channel scans the grid coordinates for the next non-empty starting value,
+   which is fast for small grids.
+ - SortedChannel keeps the non-empty starting values sorted and bisects
+   them, which scales to grids with thousands of coordinates.
+
 """
+import bisect
 
 
 class Channel(object):
@@ -142,3 +150,64 @@ class Channel(object):
 
             if tracks[-1][1] + 1 <= max_value:
                 yield (idx, tracks[-1][1] + 1, max_value)
+
+
+class SortedChannel(Channel):
+    """ Channel finding the next starting value by bisection.
+
+    Packs tracks exactly like Channel, but keeps the non-empty starting
+    values in a sorted list.  The lowest starting value is the head of the
+    list, and the next bucket after a track is found with bisect, so packing
+    is O(Number of tracks * log(Number of starting values)), independent of
+    the grid dimension.
+
+    >>> tracks = [(1, 3, 0), (1, 1, 1), (4, 5, 2), (4, 4, 3), (0, 10, 4)]
+    >>> channel_model = SortedChannel(tracks)
+    >>> channel_model.pack_tracks()
+    >>> channel_model.trees
+    [[(0, 10, 4)], [(1, 3, 0), (4, 5, 2)], [(1, 1, 1), (4, 4, 3)]]
+    """
+
+    def pack_tracks(self):
+        """pack all tracks, see Channel.pack_tracks """
+        by_low = {}
+
+        for low, high, key in self.tracks:
+            if low not in by_low:
+                by_low[low] = []
+
+            by_low[low].append((high, key))
+
+        lows = sorted(by_low)
+
+        def pop(idx):
+            low = lows[idx]
+            bucket = by_low[low]
+            track_high, key = bucket.pop()
+
+            if len(bucket) == 0:
+                del by_low[low]
+                del lows[idx]
+
+            return (low, track_high, key)
+
+        while len(lows) > 0:
+            track = pop(0)
+            self._start_track(track)
+
+            while True:
+                idx = bisect.bisect_right(lows, track[1])
+                if idx == len(lows):
+                    break
+
+                track = pop(idx)
+                self._add_track_to_tree(track)
+
+        self._verify_trees()
+
+
+# Track packers selectable by name, see graph2.Graph.create_channels.
+CHANNEL_PACKERS = {
+    'scan': Channel,
+    'sorted': SortedChannel,
+}
@@ -38,6 +38,7 @@ class PinClassDirection(enum.Enum):
 XXX: parse comments? Maybe can do a pass removing them
 """
 
+import array
 import enum
 import io
 import re
@@ -1485,6 +1486,7 @@ class RoutingGraphPrinter:
         'X003Y000||05|>X003Y000'
         'X003Y000<|05||X003Y000'
         """
+        xml_node = _as_xml(xml_node)
         assert_type(xml_node, ET._Element)
 
         loc_node = list(xml_node.iterfind("./loc"))[0]
@@ -1677,15 +1679,19 @@ class MappingGlobalNames(dict):
     Class for keeping track of the global names for a given node.
     """
 
+    def __init__(self, *args, type=ET._Element, **kw):
+        self.type = type
+        dict.__init__(self, *args, **kw)
+
     def add(self, name, xml_node):
         self[name] = xml_node
 
     def __setitem__(self, name, xml_node):
         """
-        map[name] = ET._Element
+        map[name] = type
         """
         assert_type(name, str)
-        assert_type(xml_node, ET._Element)
+        assert_type(xml_node, self.type)
         assert name not in self, "{} in {}".format(name, self)
         dict.__setitem__(self, name, xml_node)
 
@@ -1826,6 +1832,13 @@ class RoutingNodeDir(enum.Enum):
     BI_DIR = 'BI_DIR'
 
 
+def _as_xml(node):
+    """Return the XML element of a RoutingNode / RoutingEdge or a handle."""
+    if isinstance(node, ET._Element):
+        return node
+    return node.to_xml()
+
+
 class RoutingNode(ET.ElementBase):
     TAG = "node"
 
@@ -2044,6 +2057,33 @@ class RoutingGraph:
             parent.append(xml_node)
             self._add_cache_node2edge(xml_node, new_node_id)
 
+    @property
+    def num_nodes(self):
+        return len(self.id2element[RoutingNode])
+
+    @property
+    def num_edges(self):
+        return len(self.id2element[RoutingEdge])
+
+    def iter_nodes(self):
+        """Iterate over the RoutingNode objects, in the XML order."""
+        for node in self._xml_parent(RoutingNode):
+            if node.tag == ET.Comment:
+                continue
+            yield node
+
+    def sync_xml(self):
+        """Update the <rr_nodes> and <rr_edges> of the XML graph.
+
+        The XML elements are the graph, so there is nothing to do.
+        """
+        pass
+
+    def _node_type(self, node_id):
+        id2node = self.id2element[RoutingNode]
+        assert node_id in id2node, node_id
+        return RoutingNodeType.from_xml(id2node[node_id])
+
     def _add_cache_node2edge(self, xml_node, node_id):
         xml_type = self._xml_type(xml_node)
         if xml_type == RoutingNode:
@@ -2401,25 +2441,22 @@ class RoutingGraph:
         4 X000Y010[00].SINK-< b'<node id="4" type="SINK" capacity="1"><loc xlow="0" ylow="10" xhigh="0" yhigh="10" ptc="0"/><timing R="0" C="0"/></node>'
         """  # noqa: E501
 
-        id2node = self.id2element[RoutingNode]
-        assert src_node_id in id2node, src_node_id
-        src_node_type = RoutingNodeType.from_xml(id2node[src_node_id])
-        assert sink_node_id in id2node, sink_node_id
-        sink_node_type = RoutingNodeType.from_xml(id2node[sink_node_id])
+        src_node_type = self._node_type(src_node_id)
+        sink_node_type = self._node_type(sink_node_id)
 
         valid, msg = self._is_valid(src_node_type, sink_node_type)
         if not valid:
-            src_node = id2node[src_node_id]
-            sink_node = id2node[sink_node_id]
+            src_node = self.get_node_by_id(src_node_id)
+            sink_node = self.get_node_by_id(sink_node_id)
             raise TypeError(
                 "{} -> {} not valid, {}\n{} {}\n  ->\n{} {}".format(
                     src_node_type,
                     sink_node_type,
                     msg,
                     RoutingGraphPrinter.node(src_node),
-                    ET.tostring(src_node),
+                    ET.tostring(_as_xml(src_node)),
                     RoutingGraphPrinter.node(sink_node),
-                    ET.tostring(sink_node),
+                    ET.tostring(_as_xml(sink_node)),
                 )
             )
 
@@ -2520,6 +2557,533 @@ class RoutingGraph:
         )
 
 
+class _ArrayRoutingElement:
+    """Handle to a node or edge of an ArrayRoutingGraph.
+
+    Stands in for the RoutingNode / RoutingEdge XML elements.  Attributes are
+    read from the graph arrays, and the child elements (<loc>, <timing>, ...)
+    from an XML element created on demand.  XML helpers like node_pos work on
+    handles, but changes to the XML returned are not kept, use set_metadata.
+    """
+    __slots__ = ('routing', 'id')
+
+    def __init__(self, routing, element_id):
+        self.routing = routing
+        self.id = element_id
+
+    def __eq__(self, other):
+        return type(other) is type(self) and \
+            other.routing is self.routing and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, self.id)
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def iterfind(self, path):
+        return self.to_xml().iterfind(path)
+
+    def set_metadata(self, key, value, offset=None):
+        self.routing._metadata(self)[key] = str(value)
+
+    def get_metadata(self, key, default=_get_metadata_sentry):
+        metadata = self.routing._metadata(self, create=False)
+        if key in metadata:
+            return metadata[key]
+        return _get_metadata(self.to_xml(), key, default)
+
+
+class ArrayRoutingNode(_ArrayRoutingElement):
+    __slots__ = ()
+    tag = "node"
+
+    @property
+    def attrib(self):
+        return self.routing._node_attrib(self.id)
+
+    def to_xml(self):
+        return self.routing._node_xml(self.id)
+
+
+class ArrayRoutingEdge(_ArrayRoutingElement):
+    __slots__ = ()
+    tag = "edge"
+
+    @property
+    def attrib(self):
+        return self.routing._edge_attrib(self.id)
+
+    def to_xml(self):
+        return self.routing._edge_xml(self.id)
+
+
+_ROUTING_NODE_TYPES = list(RoutingNodeType)
+# Directions are given as RoutingNodeDir or channel.Track.Direction, which
+# share values.
+_ROUTING_NODE_DIRS = [e.value for e in RoutingNodeDir]
+_ROUTING_NODE_SIDES = list(RoutingNodeSide)
+
+
+class ArrayRoutingGraph(RoutingGraph):
+    """
+    RoutingGraph keeping the nodes and edges in arrays instead of XML.
+
+    Node and edge ids are the array indices.  Node attributes are kept in one
+    array per attribute, node timings are interned, and metadata is kept in
+    dicts by id.  The lookups return ArrayRoutingNode / ArrayRoutingEdge
+    handles.
+
+    The <rr_nodes> and <rr_edges> of the XML graph are only written by
+    sync_xml, which Graph.to_xml calls.
+
+    >>> r = simple_test_routing(ArrayRoutingGraph)
+    >>> RoutingGraphPrinter.node(r.get_node_by_id(2))
+    '2 X000Y000<-00->X000Y010'
+    >>> [RoutingGraphPrinter.edge(r, e) for e in r.edges_for_node(r.get_node_by_id(1))]
+    ['0 X000Y000[00].SRC--> ->>- 1 X000Y000[00].R-PIN>', '1 X000Y000[00].R-PIN> ->>- 2 X000Y000<-00->X000Y010']
+    >>> r.sync_xml()
+    >>> print(ET.tostring(single_element(r._xml_graph, 'rr_edges')).decode())
+    <rr_edges><edge src_node="0" sink_node="1" switch_id="0"/><edge src_node="1" sink_node="2" switch_id="0"/><edge src_node="2" sink_node="3" switch_id="0"/><edge src_node="3" sink_node="4" switch_id="0"/></rr_edges>
+    """  # noqa: E501
+
+    @staticmethod
+    def set_metadata(node, key, value, offset=None):
+        node.set_metadata(key, value, offset)
+
+    @staticmethod
+    def get_metadata(node, key, default=_get_metadata_sentry):
+        return node.get_metadata(key, default)
+
+    def __init__(self, xml_graph=None, verbose=True, clear_fabric=False):
+        self.verbose = verbose
+
+        self.localnames = MappingLocalNames(type=ArrayRoutingNode)
+        self.globalnames = MappingGlobalNames(type=ArrayRoutingNode)
+
+        if xml_graph is None:
+            xml_graph = ET.Element("rr_graph")
+            ET.SubElement(xml_graph, "rr_nodes")
+            ET.SubElement(xml_graph, "rr_edges")
+
+        self._xml_graph = xml_graph
+
+        self.clear()
+        if not clear_fabric:
+            self._import_xml()
+
+        # The XML is written again by sync_xml.
+        self._xml_parent(RoutingNode).clear()
+        self._xml_parent(RoutingEdge).clear()
+
+    def clear(self):
+        """Delete the existing rr_nodes and rr_edges."""
+        self._node_type_idx = array.array('b')
+        self._node_capacity = array.array('i')
+        self._node_dir = array.array('b')
+        self._node_side = array.array('b')
+        self._node_xlow = array.array('i')
+        self._node_ylow = array.array('i')
+        self._node_xhigh = array.array('i')
+        self._node_yhigh = array.array('i')
+        self._node_ptc = array.array('i')
+        self._node_segment = array.array('i')
+        self._node_timing = array.array('i')
+
+        # Few distinct timings are used, they are kept once.
+        self._timings = []
+        self._timing_ids = {}
+
+        self._edge_src = array.array('i')
+        self._edge_sink = array.array('i')
+        self._edge_switch = array.array('i')
+
+        self._node_metadata = {}
+        self._edge_metadata = {}
+
+        # Edges of each node, built when first needed.
+        self._node_edges = {}
+        self._num_indexed_edges = 0
+
+        self.localnames.clear()
+        self.globalnames.clear()
+
+    def _import_xml(self):
+        """Move the <rr_nodes> and <rr_edges> of the XML graph to arrays."""
+
+        def read_metadata(xml_node):
+            metadata = _metadata(xml_node)
+            if metadata is None:
+                return None
+            return OrderedDict(
+                (meta.attrib["name"], meta.text)
+                for meta in metadata.iterfind("./meta")
+            )
+
+        for node in self._xml_parent(RoutingNode):
+            if node.tag == ET.Comment:
+                continue
+
+            node_id = self._get_xml_id(node)
+            assert_eq(node_id, self.num_nodes)
+
+            loc = single_element(node, 'loc')
+            timing = list(node.iterfind('timing'))
+            if timing:
+                timing = RoutingNodeTiming(
+                    R=timing[0].get('R'), C=timing[0].get('C')
+                )
+            else:
+                timing = None
+
+            segment = list(node.iterfind('segment'))
+            if segment:
+                segment_id = int(segment[0].get('segment_id'))
+            else:
+                segment_id = None
+
+            direction = node.get('direction')
+            side = loc.get('side')
+            self._add_node(
+                ntype=RoutingNodeType(node.get('type')),
+                capacity=int(node.get('capacity')),
+                direction=RoutingNodeDir(direction) if direction else None,
+                low=Position(int(loc.get('xlow')), int(loc.get('ylow'))),
+                high=Position(int(loc.get('xhigh')), int(loc.get('yhigh'))),
+                ptc=int(loc.get('ptc')),
+                side=RoutingNodeSide(side) if side else None,
+                timing=timing,
+                segment_id=segment_id,
+                metadata=read_metadata(node),
+            )
+
+        for edge in self._xml_parent(RoutingEdge):
+            if edge.tag == ET.Comment:
+                continue
+
+            src_node_id, sink_node_id = self.node_ids_for_edge(edge)
+            self._add_edge(
+                src_node_id, sink_node_id, int(edge.get('switch_id')),
+                read_metadata(edge)
+            )
+
+    @property
+    def num_nodes(self):
+        return len(self._node_type_idx)
+
+    @property
+    def num_edges(self):
+        return len(self._edge_src)
+
+    def iter_nodes(self):
+        """Iterate over the ArrayRoutingNode objects, in id order."""
+        for node_id in range(self.num_nodes):
+            yield ArrayRoutingNode(self, node_id)
+
+    def _metadata(self, element, create=True):
+        if isinstance(element, ArrayRoutingNode):
+            metadata = self._node_metadata
+        else:
+            metadata = self._edge_metadata
+
+        if create:
+            return metadata.setdefault(element.id, OrderedDict())
+        return metadata.get(element.id, {})
+
+    def _node_type(self, node_id):
+        assert 0 <= node_id < self.num_nodes, node_id
+        return _ROUTING_NODE_TYPES[self._node_type_idx[node_id]]
+
+    def _node_attrib(self, node_id):
+        attrib = OrderedDict(
+            (
+                ('id', str(node_id)),
+                ('type', self._node_type(node_id).value),
+                ('capacity', str(self._node_capacity[node_id])),
+            )
+        )
+        if self._node_dir[node_id] >= 0:
+            attrib['direction'] = _ROUTING_NODE_DIRS[self._node_dir[node_id]]
+        return attrib
+
+    def _node_xml(self, node_id):
+        """Return a new <node> XML element for node_id."""
+        node = ET.Element('node', self._node_attrib(node_id))
+
+        attrib = OrderedDict(
+            (
+                ('xlow', str(self._node_xlow[node_id])),
+                ('ylow', str(self._node_ylow[node_id])),
+                ('xhigh', str(self._node_xhigh[node_id])),
+                ('yhigh', str(self._node_yhigh[node_id])),
+                ('ptc', str(self._node_ptc[node_id])),
+            )
+        )
+        if self._node_side[node_id] >= 0:
+            attrib['side'] = _ROUTING_NODE_SIDES[self._node_side[node_id]
+                                                 ].value
+        ET.SubElement(node, 'loc', attrib)
+
+        if self._node_timing[node_id] >= 0:
+            node.append(self._timings[self._node_timing[node_id]].to_xml())
+
+        if self._node_segment[node_id] >= 0:
+            ET.SubElement(
+                node, 'segment',
+                {'segment_id': str(self._node_segment[node_id])}
+            )
+
+        self._metadata_xml(node, self._node_metadata.get(node_id, None))
+        return node
+
+    def _edge_attrib(self, edge_id):
+        return OrderedDict(
+            (
+                ('src_node', str(self._edge_src[edge_id])),
+                ('sink_node', str(self._edge_sink[edge_id])),
+                ('switch_id', str(self._edge_switch[edge_id])),
+            )
+        )
+
+    def _edge_xml(self, edge_id):
+        """Return a new <edge> XML element for edge_id."""
+        edge = ET.Element('edge', self._edge_attrib(edge_id))
+        self._metadata_xml(edge, self._edge_metadata.get(edge_id, None))
+        return edge
+
+    @staticmethod
+    def _metadata_xml(parent_node, metadata):
+        if not metadata:
+            return
+
+        metadata_xml = ET.SubElement(parent_node, "metadata")
+        for key, value in metadata.items():
+            ET.SubElement(metadata_xml, "meta", {"name": key}).text = value
+
+    def sync_xml(self):
+        """Write the nodes and edges to <rr_nodes> and <rr_edges>."""
+        nodes_xml = self._xml_parent(RoutingNode)
+        nodes_xml.clear()
+        for node_id in range(self.num_nodes):
+            nodes_xml.append(self._node_xml(node_id))
+
+        edges_xml = self._xml_parent(RoutingEdge)
+        edges_xml.clear()
+        for edge_id in range(self.num_edges):
+            edges_xml.append(self._edge_xml(edge_id))
+
+    def get_node_by_id(self, node_id):
+        """Get the ArrayRoutingNode with a given ID.
+
+        >>> r = simple_test_routing(ArrayRoutingGraph)
+        >>> r.get_node_by_id(5)
+        Traceback (most recent call last):
+            ...
+        KeyError: 5
+        """
+        if not 0 <= node_id < self.num_nodes:
+            raise KeyError(node_id)
+        return ArrayRoutingNode(self, node_id)
+
+    def get_edge_by_id(self, edge_id):
+        """Get the ArrayRoutingEdge with a given ID."""
+        if not 0 <= edge_id < self.num_edges:
+            raise KeyError(edge_id)
+        return ArrayRoutingEdge(self, edge_id)
+
+    def node_ids_for_edge(self, xml_node):
+        """Return the (source, sink) node ids of an edge."""
+        if isinstance(xml_node, ArrayRoutingEdge):
+            return (self._edge_src[xml_node.id], self._edge_sink[xml_node.id])
+        return RoutingGraph.node_ids_for_edge(xml_node)
+
+    def nodes_for_edge(self, xml_node):
+        """Return the (source, sink) ArrayRoutingNode of an edge."""
+        src_node_id, snk_node_id = self.node_ids_for_edge(xml_node)
+        return (
+            self.get_node_by_id(src_node_id), self.get_node_by_id(snk_node_id)
+        )
+
+    def _index_edges(self):
+        """Add the edges created since the last call to _node_edges."""
+        for edge_id in range(self._num_indexed_edges, self.num_edges):
+            src_node_id = self._edge_src[edge_id]
+            sink_node_id = self._edge_sink[edge_id]
+            self._node_edges.setdefault(src_node_id, []).append(edge_id)
+            if sink_node_id != src_node_id:
+                self._node_edges.setdefault(sink_node_id, []).append(edge_id)
+
+        self._num_indexed_edges = self.num_edges
+
+    def edges_for_allnodes(self):
+        """Return a mapping from node ID to the IDs of its edges."""
+        self._index_edges()
+        return MappingProxyType(
+            {
+                node_id: set(self._node_edges.get(node_id, ()))
+                for node_id in range(self.num_nodes)
+            }
+        )
+
+    def edges_for_node(self, xml_node):
+        """Return the ArrayRoutingEdge objects of a node, in id order."""
+        self._index_edges()
+        return [
+            ArrayRoutingEdge(self, edge_id)
+            for edge_id in self._node_edges.get(xml_node.id, ())
+        ]
+
+    ######################################################################
+    # Constructor methods
+    ######################################################################
+
+    def _add_node(
+            self, ntype, capacity, direction, low, high, ptc, side, timing,
+            segment_id, metadata
+    ):
+        node_id = self.num_nodes
+
+        self._node_type_idx.append(_ROUTING_NODE_TYPES.index(ntype))
+        self._node_capacity.append(capacity)
+        self._node_dir.append(
+            -1 if direction is None else _ROUTING_NODE_DIRS.
+            index(direction.value)
+        )
+        self._node_side.append(
+            -1 if side is None else _ROUTING_NODE_SIDES.index(side)
+        )
+        self._node_xlow.append(low.x)
+        self._node_ylow.append(low.y)
+        self._node_xhigh.append(high.x)
+        self._node_yhigh.append(high.y)
+        self._node_ptc.append(ptc)
+        self._node_segment.append(-1 if segment_id is None else segment_id)
+
+        if timing is None:
+            self._node_timing.append(-1)
+        else:
+            if timing not in self._timing_ids:
+                self._timing_ids[timing] = len(self._timings)
+                self._timings.append(timing)
+            self._node_timing.append(self._timing_ids[timing])
+
+        if metadata:
+            self._node_metadata[node_id] = metadata
+
+        return ArrayRoutingNode(self, node_id)
+
+    def _add_edge(self, src_node_id, sink_node_id, switch_id, metadata):
+        edge_id = self.num_edges
+        self._edge_src.append(src_node_id)
+        self._edge_sink.append(sink_node_id)
+        self._edge_switch.append(switch_id)
+
+        if metadata:
+            self._edge_metadata[edge_id] = metadata
+
+    def create_node(
+            self,
+            low,
+            high,
+            ptc,
+            ntype,
+            direction=None,
+            segment_id=None,
+            side=None,
+            timing=None,
+            capacity=1,
+            metadata={}
+    ):
+        """Create an node, see RoutingGraph.create_node.
+
+        Returns
+        -------
+        ArrayRoutingNode
+        """
+        if isinstance(ntype, str):
+            ntype = RoutingNodeType[ntype]
+
+        if ntype.track:
+            assert direction is not None
+        else:
+            direction = None
+            if not ntype.pin_class:
+                assert low == high, (low, high)
+
+        if ntype.pin:
+            assert_type(side, RoutingNodeSide)
+        else:
+            assert side is None
+
+        if timing is None:
+            if ntype.track:
+                timing = RoutingNodeTiming(R=1e-9, C=1e-9)
+            else:
+                timing = RoutingNodeTiming(R=0, C=0)
+        assert len(timing) == 2
+        assert_type(timing, RoutingNodeTiming)
+        assert_type(timing.R, (float, int))
+        assert_type(timing.C, (float, int))
+
+        if ntype.track:
+            assert_type(segment_id, int)
+        else:
+            segment_id = None
+
+        node_metadata = OrderedDict()
+        for offset, values in metadata.items():
+            for k, v in values.items():
+                node_metadata[k] = str(v)
+
+        return self._add_node(
+            ntype=ntype,
+            capacity=capacity,
+            direction=direction,
+            low=low,
+            high=high,
+            ptc=ptc,
+            side=side,
+            timing=timing,
+            segment_id=segment_id,
+            metadata=node_metadata,
+        )
+
+    def _create_edge_with_ids(
+            self, src_node_id, sink_node_id, switch, metadata={}
+    ):
+        assert_type(src_node_id, int)
+        assert_type(sink_node_id, int)
+        assert_type(switch, Switch)
+
+        edge_metadata = OrderedDict()
+        for offset, values in metadata.items():
+            for k, v in values.items():
+                edge_metadata[k] = str(v)
+
+        self._add_edge(src_node_id, sink_node_id, switch.id, edge_metadata)
+
+    def create_edge_with_nodes(
+            self, src_node, sink_node, switch, metadata={}, bidir=None
+    ):
+        """Create an edge between two ArrayRoutingNode objects."""
+        assert_type(src_node, ArrayRoutingNode)
+        assert_type(sink_node, ArrayRoutingNode)
+
+        self.create_edge_with_ids(
+            src_node.id, sink_node.id, switch, metadata=metadata, bidir=bidir
+        )
+
+
+# RoutingGraph implementations, see Graph.
+ROUTING_GRAPHS = {
+    'xml': RoutingGraph,
+    'arrays': ArrayRoutingGraph,
+}
+
+
 def pin_meta_always_right(*a, **kw):
     return (RoutingNodeSide.RIGHT, Offset(0, 0))
 
@@ -2536,7 +3100,8 @@ class Graph:
             verbose=False,
             clear_fabric=False,
             switch_name=None,
-            pin_meta=pin_meta_always_right
+            pin_meta=pin_meta_always_right,
+            routing='xml'
     ):
         """
 
@@ -2547,6 +3112,9 @@ class Graph:
         clear_fabric : bool
             Remove the rr_graph (IE All nodes and edges - and thus channels too).
         pin_meta : callable(Block, Pin) -> (RoutingNodeSide, Offset)
+        routing : str
+            RoutingGraph implementation from ROUTING_GRAPHS.  'arrays' keeps
+            nodes and edges out of the XML until to_xml is called.
 
         Examples
         --------
@@ -2627,7 +3195,7 @@ class Graph:
                 )
             )
 
-        self.routing = RoutingGraph(
+        self.routing = ROUTING_GRAPHS[routing](
             self._xml_graph, verbose=verbose, clear_fabric=clear_fabric
         )
 
@@ -2644,10 +3212,7 @@ class Graph:
             self._import_xml_channels()
 
     def _index_pin_localnames(self):
-        for node in self.routing._xml_parent(RoutingNode):
-            if node.tag == ET.Comment:
-                continue
-
+        for node in self.routing.iter_nodes():
             ntype = node.get('type')
             loc = single_element(node, 'loc')
             pos_low, pos_high = node_pos(node)
@@ -2688,7 +3253,7 @@ class Graph:
             self.switches.add(Switch.from_xml(switch_xml))
 
     def _import_xml_channels(self):
-        self.channels.from_xml_nodes(self.routing._xml_parent(RoutingNode))
+        self.channels.from_xml_nodes(self.routing.iter_nodes())
 
     def add_switch(self, sw):
         assert_type(sw, Switch)
@@ -2993,6 +3558,7 @@ class Graph:
         # FIXME: regenerate <block_types>
         # FIXME: regenerate <grid>
 
+        self.routing.sync_xml()
         self.channels.to_xml(self._xml_graph)
         return self._xml_graph
 
@@ -3073,11 +3639,13 @@ class Graph:
         return v_tracks + [track_node]
 
 
-def simple_test_routing():
+def simple_test_routing(routing_graph=None):
     """
     >>> r = simple_test_routing()
     """
-    routing = RoutingGraph()
+    if routing_graph is None:
+        routing_graph = RoutingGraph
+    routing = routing_graph()
     routing.create_node(
         Position(0, 0), Position(0, 0), 0, ntype=RoutingNodeType.SOURCE
     )
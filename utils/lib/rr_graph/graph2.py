@@ -5,7 +5,10 @@ and provides simple fast lookup required to build real FPGA rr graph fabrics.
 from __future__ import print_function
 from collections import namedtuple
 from enum import Enum
-from .tracks import Track
+import array
+import math
+import numpy as np
+from .tracks import Direction
 from lib.rr_graph import channel2
 from lib import progressbar_utils
 
@@ -160,8 +163,191 @@ class GraphInput(namedtuple('GraphInput',
     """
 
 
-def process_track(track):
-    channel_model = channel2.Channel(track)
+# Marks an unset (None) value in the integer columns of NodeStore.
+NODE_STORE_UNSET = -2**31
+
+
+class NodeStore(object):
+    """ Struct of arrays store of the graph nodes.
+
+    Every node field is kept in its own compact array, and node ids are the
+    indices of the nodes.  Indexing and iterating the store returns Node
+    tuples, so it can be used in place of a list of nodes.  Code working on
+    many nodes should use the columns directly:
+
+    type, direction, side - Enum values, -1 if None.
+    capacity, ptc, x_low, y_low, x_high, y_high, segment_id - NODE_STORE_UNSET
+                                                              if None.
+    timing_r, timing_c - Floats, NaN if the node has no timing.
+
+    Node metadata is sparse, so it is kept in the metadata dict.
+
+    """
+
+    NODE_TYPES = {e.value: e for e in NodeType}
+    NODE_DIRECTIONS = {e.value: e for e in NodeDirection}
+    SIDES = {e.value: e for e in Direction}
+
+    def __init__(self, nodes=()):
+        self.type = array.array('b')
+        self.direction = array.array('b')
+        self.capacity = array.array('i')
+        self.ptc = array.array('i')
+        self.side = array.array('b')
+        self.x_low = array.array('i')
+        self.y_low = array.array('i')
+        self.x_high = array.array('i')
+        self.y_high = array.array('i')
+        self.timing_r = array.array('d')
+        self.timing_c = array.array('d')
+        self.segment_id = array.array('i')
+        self.metadata = {}
+
+        for node in nodes:
+            self.append(node)
+
+    def __len__(self):
+        return len(self.type)
+
+    def add(
+            self,
+            type,
+            direction,
+            capacity,
+            x_low,
+            y_low,
+            x_high,
+            y_high,
+            side=None,
+            ptc=None,
+            timing=None,
+            segment_id=None,
+            metadata=None
+    ):
+        """ Adds a node, returns its id. """
+        node_id = len(self.type)
+
+        self.type.append(type.value)
+        self.direction.append(direction.value if direction is not None else -1)
+        self.capacity.append(capacity)
+        self.ptc.append(ptc if ptc is not None else NODE_STORE_UNSET)
+        self.side.append(side.value if side is not None else -1)
+        self.x_low.append(x_low)
+        self.y_low.append(y_low)
+        self.x_high.append(x_high)
+        self.y_high.append(y_high)
+
+        if timing is not None:
+            self.timing_r.append(timing.r)
+            self.timing_c.append(timing.c)
+        else:
+            self.timing_r.append(math.nan)
+            self.timing_c.append(math.nan)
+
+        self.segment_id.append(
+            segment_id if segment_id is not None else NODE_STORE_UNSET
+        )
+
+        if metadata is not None:
+            self.metadata[node_id] = metadata
+
+        return node_id
+
+    def append(self, node):
+        """ Adds a Node, its id must be the next free id. """
+        assert node.id == len(self), (node.id, len(self))
+
+        self.add(
+            type=node.type,
+            direction=node.direction,
+            capacity=node.capacity,
+            x_low=node.loc.x_low,
+            y_low=node.loc.y_low,
+            x_high=node.loc.x_high,
+            y_high=node.loc.y_high,
+            side=node.loc.side,
+            ptc=node.loc.ptc,
+            timing=node.timing,
+            segment_id=node.segment.segment_id
+            if node.segment is not None else None,
+            metadata=node.metadata,
+        )
+
+    def extend_columns(self, **columns):
+        """ Adds nodes given as arrays of column values, without metadata.
+
+        All columns must be given, with unset values encoded as described
+        above.
+        """
+        names = (
+            'type', 'direction', 'capacity', 'ptc', 'side', 'x_low', 'y_low',
+            'x_high', 'y_high', 'timing_r', 'timing_c', 'segment_id'
+        )
+        assert sorted(columns.keys()) == sorted(names), columns.keys()
+
+        count = len(columns['type'])
+        for name in names:
+            column = getattr(self, name)
+            values = np.asarray(columns[name], dtype=column.typecode)
+            assert len(values) == count, name
+            column.frombytes(values.tobytes())
+
+    def __getitem__(self, idx):
+        """ Returns Node with id idx. """
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError(idx)
+
+        direction = self.direction[idx]
+        ptc = self.ptc[idx]
+        side = self.side[idx]
+        timing_r = self.timing_r[idx]
+        segment_id = self.segment_id[idx]
+
+        return Node(
+            id=idx,
+            type=self.NODE_TYPES[self.type[idx]],
+            direction=self.NODE_DIRECTIONS[direction]
+            if direction >= 0 else None,
+            capacity=self.capacity[idx],
+            loc=NodeLoc(
+                x_low=self.x_low[idx],
+                y_low=self.y_low[idx],
+                x_high=self.x_high[idx],
+                y_high=self.y_high[idx],
+                side=self.SIDES[side] if side >= 0 else None,
+                ptc=ptc if ptc != NODE_STORE_UNSET else None,
+            ),
+            timing=NodeTiming(r=timing_r, c=self.timing_c[idx])
+            if not math.isnan(timing_r) else None,
+            metadata=self.metadata.get(idx, None),
+            segment=NodeSegment(segment_id=segment_id)
+            if segment_id != NODE_STORE_UNSET else None,
+        )
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def set_ptc(self, idx, ptc):
+        """ Sets ptc of a node, which must not have been set before. """
+        assert self.ptc[idx] == NODE_STORE_UNSET, self[idx]
+        self.ptc[idx] = ptc
+
+    def set_ptcs(self, ids, ptcs):
+        """ Sets ptc of many nodes, which must not have been set before. """
+        ids = np.asarray(ids, dtype=np.int64)
+        ptc = np.frombuffer(self.ptc, dtype=np.int32)
+
+        already_set = np.flatnonzero(ptc[ids] != NODE_STORE_UNSET)
+        assert len(already_set) == 0, self[int(ids[already_set[0]])]
+
+        ptc[ids] = ptcs
+
+
+def process_track(track, packer='sorted'):
+    channel_model = channel2.CHANNEL_PACKERS[packer](track)
     channel_model.pack_tracks()
 
     return channel_model
@@ -212,8 +398,10 @@ class Graph(object):
         self.grid = grid
 
         self.tracks = []
-        self.nodes = nodes
-        self.nodes.sort(key=lambda node: node.id)
+        if isinstance(nodes, NodeStore):
+            self.nodes = nodes
+        else:
+            self.nodes = NodeStore(sorted(nodes, key=lambda node: node.id))
         self.edges = edges if edges is not None else []
 
         # Map of (x, y) to GridLoc definitions.
@@ -245,27 +433,25 @@ class Graph(object):
                                               pin.ptc)] = pin.name
 
         # Create mapping from grid locations and pins to nodes.
-        for idx, node in enumerate(self.nodes):
-            assert node.id == idx, (idx, node)
-
-            if node.type in (
-                    NodeType.IPIN,
-                    NodeType.OPIN,
-            ):
-                key = (node.loc.x_low, node.loc.y_low, node.loc.ptc)
+        pin_types = (NodeType.IPIN.value, NodeType.OPIN.value)
+        pin_class_types = (NodeType.SOURCE.value, NodeType.SINK.value)
+        for idx, (node_type, x_low, y_low, ptc, side) in enumerate(
+                zip(self.nodes.type, self.nodes.x_low, self.nodes.y_low,
+                    self.nodes.ptc, self.nodes.side)):
+            if node_type in pin_types:
+                key = (x_low, y_low, ptc)
                 if key not in self.loc_pin_map:
                     self.loc_pin_map[key] = []
-                self.loc_pin_map[key].append((node.id, node.loc.side))
+                self.loc_pin_map[key].append(
+                    (idx, NodeStore.SIDES[side] if side >= 0 else None)
+                )
 
-            if node.type in (
-                    NodeType.SOURCE,
-                    NodeType.SINK,
-            ):
-                key = (node.loc.x_low, node.loc.y_low, node.loc.ptc)
+            if node_type in pin_class_types:
+                key = (x_low, y_low, ptc)
                 assert key not in self.loc_pin_class_map, (
-                    node, self.loc_pin_class_map[key]
+                    self.nodes[idx], self.loc_pin_class_map[key]
                 )
-                self.loc_pin_class_map[key] = node.id
+                self.loc_pin_class_map[key] = idx
 
         # Rebuild initial edges of IPIN -> SINK and SOURCE -> OPIN.
         for loc in grid:
@@ -322,21 +508,21 @@ class Graph(object):
             else:
                 timing = NodeTiming(r=0, c=0)
 
-        self.nodes.append(
-            Node(
-                id=len(self.nodes),
-                type=type,
-                direction=direction,
-                capacity=capacity,
-                loc=loc,
-                timing=timing,
-                metadata=metadata,
-                segment=segment,
-            )
+        return self.nodes.add(
+            type=type,
+            direction=direction,
+            capacity=capacity,
+            x_low=loc.x_low,
+            y_low=loc.y_low,
+            x_high=loc.x_high,
+            y_high=loc.y_high,
+            side=loc.side,
+            ptc=loc.ptc,
+            timing=timing,
+            segment_id=segment.segment_id if segment is not None else None,
+            metadata=metadata,
         )
 
-        return self.nodes[-1].id
-
     def get_segment_id_from_name(self, segment_name):
         return self.segment_name_map[segment_name]
 
@@ -477,148 +663,133 @@ class Graph(object):
         return switch.id
 
     def check_ptc(self):
-        for node in self.nodes:
-            assert node.loc.ptc is not None, node
+        if NODE_STORE_UNSET in self.nodes.ptc:
+            idx = self.nodes.ptc.index(NODE_STORE_UNSET)
+            assert False, self.nodes[idx]
 
     def set_track_ptc(self, track, ptc):
-        node_d = self.nodes[track]._asdict()
-        loc_d = self.nodes[track].loc._asdict()
-        assert loc_d['ptc'] is None
-        loc_d['ptc'] = ptc
-        node_d['loc'] = NodeLoc(**loc_d)
-
-        self.nodes[track] = Node(**node_d)
+        self.nodes.set_ptc(track, ptc)
 
-    def create_channels(self, pad_segment, pool=None):
-        """ Pack tracks into channels and return Channels definition for tracks."""
-        assert len(self.tracks) > 0
+    def _channel_tracks(self, chans, lows, highs, tracks):
+        """ Returns dict of channel coordinate to (low, high, track) list.
 
-        xs = []
-        ys = []
+        Tracks are grouped with a stable sort, so they keep their order within
+        a channel.
 
-        for track in self.tracks:
-            track_node = self.nodes[track]
+        """
+        order = np.argsort(chans, kind='stable')
+        chans, starts = np.unique(chans[order], return_index=True)
+        groups = np.split(
+            np.stack((lows[order], highs[order], tracks[order]), axis=1),
+            starts[1:]
+        )
 
-            xs.append(track_node.loc.x_low)
-            xs.append(track_node.loc.x_high)
-            ys.append(track_node.loc.y_low)
-            ys.append(track_node.loc.y_high)
+        return {
+            chan: [tuple(track) for track in group.tolist()]
+            for chan, group in zip(chans.tolist(), groups)
+        }
 
-        x_tracks = {}
-        y_tracks = {}
+    def create_channels(self, pad_segment, pool=None, packer='sorted'):
+        """ Pack tracks into channels and return Channels definition for tracks.
 
-        for track in self.tracks:
-            track_node = self.nodes[track]
+        packer is the name of the track packer in channel2.CHANNEL_PACKERS.
 
-            if track_node.type == NodeType.CHANX:
-                assert track_node.loc.y_low == track_node.loc.y_high
+        Track coordinates are read from the NodeStore columns, packed ptc
+        values are set at once, and padding tracks are appended with
+        NodeStore.extend_columns.
 
-                x1, x2 = sorted((track_node.loc.x_low, track_node.loc.x_high))
+        """
+        assert len(self.tracks) > 0
+        assert packer in channel2.CHANNEL_PACKERS, packer
 
-                if track_node.loc.y_low not in x_tracks:
-                    x_tracks[track_node.loc.y_low] = []
+        nodes = self.nodes
+        tracks = np.array(self.tracks, dtype=np.int64)
 
-                x_tracks[track_node.loc.y_low].append((x1, x2, track))
-            elif track_node.type == NodeType.CHANY:
-                assert track_node.loc.x_low == track_node.loc.x_high
+        def column(name):
+            return np.asarray(getattr(nodes, name))[tracks].astype(np.int64)
 
-                y1, y2 = sorted((track_node.loc.y_low, track_node.loc.y_high))
+        node_type = column('type')
+        x_low = column('x_low')
+        y_low = column('y_low')
+        x_high = column('x_high')
+        y_high = column('y_high')
 
-                if track_node.loc.x_low not in y_tracks:
-                    y_tracks[track_node.loc.x_low] = []
+        is_x = node_type == NodeType.CHANX.value
+        is_y = node_type == NodeType.CHANY.value
 
-                y_tracks[track_node.loc.x_low].append((y1, y2, track))
-            else:
-                assert False, track_node
+        bad = np.flatnonzero(
+            ~(is_x | is_y) | (is_x & (y_low != y_high))
+            | (is_y & (x_low != x_high))
+        )
+        assert len(bad) == 0, nodes[int(tracks[bad[0]])]
 
-        x_list = []
-        y_list = []
+        x_tracks = self._channel_tracks(
+            y_low[is_x],
+            np.minimum(x_low, x_high)[is_x],
+            np.maximum(x_low, x_high)[is_x], tracks[is_x]
+        )
+        y_tracks = self._channel_tracks(
+            x_low[is_y],
+            np.minimum(y_low, y_high)[is_y],
+            np.maximum(y_low, y_high)[is_y], tracks[is_y]
+        )
 
-        x_channel_models = {}
-        y_channel_models = {}
+        # Channels are keyed by (direction, chan), in coordinate order.
+        channel_tracks = {}
+        for direction, chan_tracks in (('X', x_tracks), ('Y', y_tracks)):
+            for chan, chan_track in chan_tracks.items():
+                channel_tracks[direction, chan] = chan_track
 
+        channel_models = {}
         if pool is not None:
-            for y in x_tracks:
-                x_channel_models[y] = pool.apply_async(
-                    process_track, (x_tracks[y], )
+            for key, chan_track in channel_tracks.items():
+                channel_models[key] = pool.apply_async(
+                    process_track, (chan_track, packer)
                 )
 
-            for x in y_tracks:
-                y_channel_models[x] = pool.apply_async(
-                    process_track, (y_tracks[x], )
-                )
-
-        for y in progressbar_utils.progressbar(range(max(x_tracks) + 1)):
-            if y in x_tracks:
-                if pool is None:
-                    x_channel_models[y] = process_track(x_tracks[y])
-                else:
-                    x_channel_models[y] = x_channel_models[y].get()
-
-                x_list.append(len(x_channel_models[y].trees))
-                for idx, tree in enumerate(x_channel_models[y].trees):
-                    for i in tree:
-                        self.set_track_ptc(track=i[2], ptc=idx)
+        track_ids = []
+        track_ptcs = []
+        for key in progressbar_utils.progressbar(list(channel_tracks)):
+            if pool is None:
+                channel_model = process_track(channel_tracks[key], packer)
             else:
-                x_list.append(0)
-
-        for x in progressbar_utils.progressbar(range(max(y_tracks) + 1)):
-            if x in y_tracks:
-                if pool is None:
-                    y_channel_models[x] = process_track(y_tracks[x])
-                else:
-                    y_channel_models[x] = y_channel_models[x].get()
-
-                y_list.append(len(y_channel_models[x].trees))
-                for idx, tree in enumerate(y_channel_models[x].trees):
-                    for i in tree:
-                        self.set_track_ptc(track=i[2], ptc=idx)
+                channel_model = channel_models[key].get()
+
+            channel_models[key] = channel_model
+            for ptc, tree in enumerate(channel_model.trees):
+                for track in tree:
+                    track_ids.append(track[2])
+                    track_ptcs.append(ptc)
+
+        nodes.set_ptcs(track_ids, track_ptcs)
+
+        x_list = [0] * (max(x_tracks) + 1)
+        y_list = [0] * (max(y_tracks) + 1)
+        for (direction, chan), channel_model in channel_models.items():
+            chan_list = x_list if direction == 'X' else y_list
+            chan_list[chan] = len(channel_model.trees)
+
+        x_min = int(min(x_low.min(), x_high.min()))
+        y_min = int(min(y_low.min(), y_high.min()))
+        x_max = int(max(x_low.max(), x_high.max()))
+        y_max = int(max(y_low.max(), y_high.max()))
+
+        # (direction, chan, ptc, start, end) of the padding tracks.
+        padding = []
+        for (direction, chan), channel_model in channel_models.items():
+            if direction == 'X':
+                min_value, max_value = max(x_min, 1), x_max
             else:
-                y_list.append(0)
-
-        x_min = min(xs)
-        y_min = min(ys)
-        x_max = max(xs)
-        y_max = max(ys)
-
-        num_padding = 0
-        for chan, channel_model in x_channel_models.items():
-            for ptc, start, end in channel_model.fill_empty(max(x_min, 1),
-                                                            x_max):
-                num_padding += 1
-                self.add_track(
-                    track=Track(
-                        direction='X',
-                        x_low=start,
-                        y_low=chan,
-                        x_high=end,
-                        y_high=chan,
-                    ),
-                    segment_id=pad_segment,
-                    capacity=0,
-                    timing=None,
-                    ptc=ptc
-                )
+                min_value, max_value = max(y_min, 1), y_max
 
-        for chan, channel_model in y_channel_models.items():
-            for ptc, start, end in channel_model.fill_empty(max(y_min, 1),
-                                                            y_max):
-                num_padding += 1
-                self.add_track(
-                    track=Track(
-                        direction='Y',
-                        x_low=chan,
-                        y_low=start,
-                        x_high=chan,
-                        y_high=end,
-                    ),
-                    segment_id=pad_segment,
-                    capacity=0,
-                    timing=None,
-                    ptc=ptc
-                )
+            for ptc, start, end in channel_model.fill_empty(min_value,
+                                                            max_value):
+                padding.append((direction == 'X', chan, ptc, start, end))
+
+        if len(padding) > 0:
+            self._add_padding_tracks(np.array(padding), pad_segment)
 
-        print('Number padding nodes {}'.format(num_padding))
+        print('Number padding nodes {}'.format(len(padding)))
 
         return Channels(
             chan_width_max=max(max(x_list), max(y_list)),
@@ -630,6 +801,33 @@ class Graph(object):
             y_list=[ChannelList(idx, info) for idx, info in enumerate(y_list)],
         )
 
+    def _add_padding_tracks(self, padding, pad_segment):
+        """ Adds padding tracks, as add_track with capacity 0 would.
+
+        padding is an array of (is CHANX, chan, ptc, start, end) rows.
+
+        """
+        is_x, chan, ptc, start, end = padding.T
+        is_x = is_x.astype(bool)
+        count = len(padding)
+
+        first_id = len(self.nodes)
+        self.nodes.extend_columns(
+            type=np.where(is_x, NodeType.CHANX.value, NodeType.CHANY.value),
+            direction=np.full(count, NodeDirection.BI_DIR.value),
+            capacity=np.zeros(count),
+            ptc=ptc,
+            side=np.full(count, -1),
+            x_low=np.where(is_x, start, chan),
+            y_low=np.where(is_x, chan, start),
+            x_high=np.where(is_x, end, chan),
+            y_high=np.where(is_x, chan, end),
+            timing_r=np.ones(count),
+            timing_c=np.ones(count),
+            segment_id=np.full(count, pad_segment),
+        )
+        self.tracks.extend(range(first_id, first_id + count))
+
     def block_type_at_loc(self, loc):
         return self.block_types[self.loc_map[loc].block_type_id].name
 
@@ -637,4 +835,4 @@ class Graph(object):
         return self.switch_name_map[switch_name]
 
     def sort_nodes(self):
-        self.nodes.sort(key=lambda node: node.id)
+        """ Nodes are always kept in id order by the NodeStore. """
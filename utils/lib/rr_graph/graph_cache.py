@@ -0,0 +1,360 @@
+""" Binary cache of the rr graph XML for the graph debugging tools.
+
+Parsing a full rr graph XML with lxml takes minutes and GBs of memory.  The
+first time a graph is opened, it is streamed once and converted to a cache
+file holding:
+
+ - node attribute columns, indexed by node id,
+ - the edges as CSR adjacency, both by source node (out_*) and by sink node
+   (in_*),
+ - a skeleton XML with every section of the graph but rr_nodes and rr_edges,
+   from which the block grid is rebuilt.
+
+The cache file is a small header followed by the columns:
+
+    magic              8 bytes
+    header_size        uint64
+    header             JSON, column dtypes and offsets, source file stamp
+    columns            each aligned to 8 bytes
+
+The cache is keyed by the source file size, mtime and a digest of its first
+and last CACHE_DIGEST_SIZE bytes, it is rebuilt when any of them changes.
+Later opens use numpy.memmap, so only the pages used are read.
+
+"""
+import array
+import hashlib
+import io
+import json
+import os
+
+import lxml.etree as ET
+import numpy as np
+
+from . import graph
+from .graph2 import NodeDirection, NodeType
+from .tracks import Direction
+
+GRAPH_CACHE_MAGIC = b'RRGCSR01'
+CACHE_DIGEST_SIZE = 1 << 20
+
+# Node attribute columns, unset values are -1.
+NODE_COLUMNS = (
+    ('type', np.int8),
+    ('direction', np.int8),
+    ('side', np.int8),
+    ('capacity', np.int32),
+    ('ptc', np.int32),
+    ('xlow', np.int32),
+    ('ylow', np.int32),
+    ('xhigh', np.int32),
+    ('yhigh', np.int32),
+)
+
+NODE_TYPES = {e.name: e.value for e in NodeType}
+NODE_DIRECTIONS = {e.name: e.value for e in NodeDirection}
+SIDES = {e.name: e.value for e in Direction}
+
+# Sections kept in the skeleton XML.
+SKELETON_SECTIONS = ('channels', 'switches', 'segments', 'block_types', 'grid')
+
+
+def source_stamp(rr_graph_file):
+    """ Returns dict identifying the contents of rr_graph_file. """
+    stat = os.stat(rr_graph_file)
+
+    digest = hashlib.sha1()
+    with open(rr_graph_file, 'rb') as f:
+        digest.update(f.read(CACHE_DIGEST_SIZE))
+        if stat.st_size > CACHE_DIGEST_SIZE:
+            f.seek(max(CACHE_DIGEST_SIZE, stat.st_size - CACHE_DIGEST_SIZE))
+            digest.update(f.read())
+
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'digest': digest.hexdigest(),
+    }
+
+
+def csr(keys, count):
+    """ Returns CSR offsets of keys in range(count) and their sorted order. """
+    order = np.argsort(keys, kind='stable')
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=count), out=offsets[1:])
+
+    return offsets, order
+
+
+def read_rr_graph(rr_graph_file):
+    """ Streams rr_graph_file, returns the cache columns and skeleton XML.
+
+    The skeleton XML is the uint8 skeleton column.
+
+    """
+    nodes = {name: array.array('i') for name, _ in NODE_COLUMNS}
+    node_ids = array.array('i')
+    src_nodes = array.array('i')
+    sink_nodes = array.array('i')
+    switch_ids = array.array('i')
+
+    skeleton = None
+    loc = None
+
+    doc = ET.iterparse(
+        rr_graph_file,
+        events=('end', ),
+        tag=('node', 'loc', 'edge') + SKELETON_SECTIONS,
+        huge_tree=True
+    )
+    for _, element in doc:
+        tag = element.tag
+        parent = element.getparent()
+
+        if tag == 'loc':
+            loc = element.attrib
+            continue
+        elif tag == 'node':
+            get = element.get
+            node_ids.append(int(get('id')))
+            nodes['type'].append(NODE_TYPES[get('type')])
+            nodes['direction'].append(
+                NODE_DIRECTIONS[get('direction', 'NO_DIR')]
+            )
+            nodes['capacity'].append(int(get('capacity')))
+            nodes['side'].append(SIDES.get(loc.get('side', None), -1))
+            nodes['ptc'].append(int(loc['ptc']))
+            nodes['xlow'].append(int(loc['xlow']))
+            nodes['ylow'].append(int(loc['ylow']))
+            nodes['xhigh'].append(int(loc['xhigh']))
+            nodes['yhigh'].append(int(loc['yhigh']))
+            loc = None
+        elif tag == 'edge':
+            get = element.get
+            src_nodes.append(int(get('src_node')))
+            sink_nodes.append(int(get('sink_node')))
+            switch_ids.append(int(get('switch_id')))
+        elif parent is not None and parent.getparent() is None:
+            # Skeleton sections are small, keep them whole.
+            if skeleton is None:
+                skeleton = ET.Element(parent.tag, parent.attrib)
+
+            skeleton.append(ET.fromstring(ET.tostring(element)))
+        else:
+            continue
+
+        element.clear()
+        while element.getprevious() is not None:
+            del parent[0]
+
+    if skeleton is None:
+        skeleton = ET.Element('rr_graph')
+
+    ET.SubElement(skeleton, 'rr_nodes')
+    ET.SubElement(skeleton, 'rr_edges')
+
+    node_ids = np.frombuffer(node_ids, dtype=np.int32)
+    num_nodes = int(node_ids.max()) + 1 if len(node_ids) else 0
+
+    # Node ids missing from the graph are INVALID_NODE_TYPE.
+    columns = {}
+    for name, dtype in NODE_COLUMNS:
+        column = np.full(num_nodes, -1, dtype=dtype)
+        column[node_ids] = np.frombuffer(nodes[name], dtype=np.int32)
+        columns[name] = column
+    columns['type'][columns['type'] < 0] = NodeType.INVALID_NODE_TYPE.value
+
+    src_nodes = np.frombuffer(src_nodes, dtype=np.int32)
+    sink_nodes = np.frombuffer(sink_nodes, dtype=np.int32)
+    switch_ids = np.frombuffer(switch_ids, dtype=np.int32)
+
+    columns['out_offsets'], order = csr(src_nodes, num_nodes)
+    columns['out_nodes'] = sink_nodes[order]
+    columns['out_switches'] = switch_ids[order]
+
+    columns['in_offsets'], order = csr(sink_nodes, num_nodes)
+    columns['in_nodes'] = src_nodes[order]
+    columns['in_switches'] = switch_ids[order]
+
+    columns['skeleton'] = np.frombuffer(ET.tostring(skeleton), dtype=np.uint8)
+
+    return columns
+
+
+def write_graph_cache(cache_file, stamp, columns):
+    """ Writes the columns returned by read_rr_graph to cache_file. """
+    header = {'source': stamp, 'columns': {}}
+
+    offset = 0
+    for name, column in columns.items():
+        header['columns'][name] = [column.dtype.str, offset, len(column)]
+        offset += (column.nbytes + 7) // 8 * 8
+
+    header = json.dumps(header, sort_keys=True).encode()
+    header += b' ' * (-len(header) % 8)
+
+    # Write to a temporary file first, so an interrupted build is not used.
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(GRAPH_CACHE_MAGIC)
+        f.write(np.array([len(header)], dtype=np.uint64).tobytes())
+        f.write(header)
+        for column in columns.values():
+            f.write(column.tobytes())
+            f.write(b'\0' * (-column.nbytes % 8))
+
+    os.replace(tmp_file, cache_file)
+
+
+def read_cache_header(cache_file):
+    """ Returns the header of cache_file and the offset of its columns.
+
+    Returns (None, None) if cache_file does not exist or is not a cache.
+
+    """
+    if not os.path.exists(cache_file):
+        return None, None
+
+    with open(cache_file, 'rb') as f:
+        if f.read(len(GRAPH_CACHE_MAGIC)) != GRAPH_CACHE_MAGIC:
+            return None, None
+
+        header_size = int(np.frombuffer(f.read(8), np.uint64)[0])
+        header = json.loads(f.read(header_size).decode())
+
+    return header, len(GRAPH_CACHE_MAGIC) + 8 + header_size
+
+
+class GraphCache(object):
+    """ Read only view of a graph cache file.
+
+    Node columns (see NODE_COLUMNS) are attributes indexed by node id.  The
+    out / in edges of node are:
+
+        out_nodes[out_offsets[node]:out_offsets[node + 1]]
+        in_nodes[in_offsets[node]:in_offsets[node + 1]]
+
+    with their switches in out_switches / in_switches.
+
+    """
+
+    def __init__(self, cache_file):
+        header, data_offset = read_cache_header(cache_file)
+        assert header is not None, "{} is not a graph cache".format(cache_file)
+
+        self.cache_file = cache_file
+        self.source = header['source']
+
+        for name, (dtype, offset, count) in header['columns'].items():
+            if count == 0:
+                column = np.zeros(0, dtype=dtype)
+            else:
+                column = np.memmap(
+                    cache_file,
+                    dtype=dtype,
+                    mode='r',
+                    offset=data_offset + offset,
+                    shape=(count, )
+                )
+
+            setattr(self, name, column)
+
+        self._skeleton_graph = None
+
+    @staticmethod
+    def open(rr_graph_file, cache_file=None, verbose=False):
+        """ Returns GraphCache of rr_graph_file, building it if stale.
+
+        The cache is stored in cache_file, by default rr_graph_file with a
+        .cache suffix.
+
+        """
+        if cache_file is None:
+            cache_file = rr_graph_file + '.cache'
+
+        stamp = source_stamp(rr_graph_file)
+        header, _ = read_cache_header(cache_file)
+        if header is None or header['source'] != stamp:
+            if verbose:
+                print('Building graph cache {}'.format(cache_file))
+
+            write_graph_cache(cache_file, stamp, read_rr_graph(rr_graph_file))
+
+        return GraphCache(cache_file)
+
+    @property
+    def num_nodes(self):
+        return len(self.type)
+
+    @property
+    def num_edges(self):
+        return len(self.out_nodes)
+
+    def out_edges(self, node_id):
+        """ Returns (sink nodes, switches) of the edges from node_id. """
+        start, end = self.out_offsets[node_id:node_id + 2]
+        return self.out_nodes[start:end], self.out_switches[start:end]
+
+    def in_edges(self, node_id):
+        """ Returns (source nodes, switches) of the edges to node_id. """
+        start, end = self.in_offsets[node_id:node_id + 2]
+        return self.in_nodes[start:end], self.in_switches[start:end]
+
+    def node_ids(self, node_type=None):
+        """ Returns array with the ids of the nodes of node_type, or all. """
+        if node_type is None:
+            node_type = self.type != NodeType.INVALID_NODE_TYPE.value
+        else:
+            node_type = self.type == node_type.value
+
+        return np.flatnonzero(node_type)
+
+    def node_xml(self, node_id):
+        """ Returns <node> element of node_id, without timing and metadata.
+
+        Can be used with graph.RoutingGraphPrinter.node.
+
+        """
+        attrib = {
+            'id': str(node_id),
+            'type': NodeType(int(self.type[node_id])).name,
+            'capacity': str(self.capacity[node_id]),
+        }
+        direction = NodeDirection(int(self.direction[node_id]))
+        if direction != NodeDirection.NO_DIR:
+            attrib['direction'] = direction.name
+
+        node = ET.Element('node', attrib)
+
+        loc = ET.SubElement(
+            node, 'loc', {
+                'xlow': str(self.xlow[node_id]),
+                'ylow': str(self.ylow[node_id]),
+                'xhigh': str(self.xhigh[node_id]),
+                'yhigh': str(self.yhigh[node_id]),
+                'ptc': str(self.ptc[node_id]),
+            }
+        )
+        if self.side[node_id] >= 0:
+            loc.set('side', Direction(int(self.side[node_id])).name)
+
+        return node
+
+    def skeleton_graph(self):
+        """ Returns graph.Graph of the skeleton XML, without nodes and edges.
+
+        Its block_grid, segments and switches are those of the full graph.
+
+        """
+        if self._skeleton_graph is None:
+            self._skeleton_graph = graph.Graph(
+                io.BytesIO(self.skeleton.tobytes())
+            )
+
+        return self._skeleton_graph
+
+    def node_name(self, node_id, block_grid=None):
+        """ Returns the graph.RoutingGraphPrinter name of node_id. """
+        return graph.RoutingGraphPrinter.node(
+            self.node_xml(node_id), block_grid
+        )
@@ -0,0 +1,112 @@
+""" Locality preserving node orders.
+
+Renumbering the rr graph nodes so that nodes close on the grid get close ids
+improves the cache behaviour of VPR.  Nodes are sorted by the distance of
+their (x, y) location along a space filling curve, then by node id.
+
+Orders in NODE_ORDERS:
+
+ - hilbert - Hilbert curve, same curve as hilbertcurve.HilbertCurve(bits, 2)
+ - z_order - Z-order (Morton) curve
+ - row_major - Grid rows, y then x
+
+Distances are computed with numpy for all locations at once.
+
+"""
+import numpy as np
+
+
+def spread_bits(values, bits):
+    """ Returns values with bit i moved to bit 2 * i. """
+    spread = np.zeros_like(values)
+    for bit in range(bits):
+        spread |= ((values >> bit) & 1) << (2 * bit)
+
+    return spread
+
+
+def hilbert_distance(x, y, bits):
+    """ Returns the distance of (x, y) along the Hilbert curve of 2 ** bits.
+
+    This is the vectorized distance_from_coordinates([x, y]) of
+    hilbertcurve.HilbertCurve(bits, 2), using Skilling's transform.
+
+    """
+    x = np.array(x, dtype=np.int64)
+    y = np.array(y, dtype=np.int64)
+    assert np.all((x >> bits) == 0) and np.all((y >> bits) == 0)
+
+    # Inverse undo excess work.
+    q = 1 << (bits - 1)
+    while q > 1:
+        p = q - 1
+        x ^= np.where(x & q, p, 0)
+
+        y_set = (y & q) != 0
+        t = np.where(y_set, 0, (x ^ y) & p)
+        x ^= np.where(y_set, p, t)
+        y ^= t
+        q >>= 1
+
+    # Gray encode.
+    y ^= x
+    t = np.zeros_like(y)
+    q = 1 << (bits - 1)
+    while q > 1:
+        t ^= np.where(y & q, q - 1, 0)
+        q >>= 1
+
+    x ^= t
+    y ^= t
+
+    return (spread_bits(x, bits) << 1) | spread_bits(y, bits)
+
+
+def z_order_distance(x, y, bits):
+    """ Returns the distance of (x, y) along the Z-order curve of 2 ** bits. """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    assert np.all((x >> bits) == 0) and np.all((y >> bits) == 0)
+
+    return (spread_bits(y, bits) << 1) | spread_bits(x, bits)
+
+
+def row_major_distance(x, y, bits):
+    """ Returns the index of (x, y) in a grid of 2 ** bits wide rows. """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    assert np.all((x >> bits) == 0)
+
+    return (y << bits) | x
+
+
+NODE_ORDERS = {
+    'hilbert': hilbert_distance,
+    'z_order': z_order_distance,
+    'row_major': row_major_distance,
+}
+
+
+def node_order_remap(x, y, order='hilbert', bits=1):
+    """ Returns array mapping node ids to their id in the locality order.
+
+    x and y are arrays with the location of every node, indexed by node id.
+    The curve covers at least 2 ** bits locations along each axis, more if
+    needed for the largest coordinate.
+
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    assert len(x) == len(y)
+
+    if len(x) > 0:
+        assert x.min() >= 0 and y.min() >= 0
+        bits = max(bits, int(max(x.max(), y.max())).bit_length())
+
+    distance = NODE_ORDERS[order](x, y, bits)
+
+    # Sort by distance, then node id.
+    remap = np.empty(len(x), dtype=np.int64)
+    remap[np.lexsort((np.arange(len(x)), distance))] = np.arange(len(x))
+
+    return remap
@@ -0,0 +1,132 @@
+""" Compact, memory mappable map between graph nodes and rr graph inodes.
+
+The node map relates the graph_node_pkey's of a connection database to the
+rr graph node id (inode) and NodeType they were emitted as.  It is stored as
+a small header followed by columnar arrays:
+
+    magic              8 bytes
+    count              uint64
+    graph_node_pkey    int64[count], sorted
+    inode              int64[count], inode of each graph_node_pkey
+    sorted_inode       int64[count], sorted
+    inode_pkey         int64[count], graph_node_pkey of each sorted_inode
+    node_type          uint8[count], NodeType of each graph_node_pkey
+
+The file is opened with numpy.memmap, so only the pages touched by lookups
+are read.  Both directions are looked up by binary search.
+
+"""
+import numpy as np
+
+from .graph2 import NodeType
+
+NODE_MAP_MAGIC = b'RRNMAP01'
+HEADER_SIZE = 16
+
+
+def write_node_map(fname, node_mapping):
+    """ Writes a {graph_node_pkey: (inode, NodeType)} dict to fname. """
+    count = len(node_mapping)
+
+    pkeys = np.fromiter(node_mapping.keys(), dtype=np.int64, count=count)
+    inodes = np.fromiter(
+        (inode for inode, _ in node_mapping.values()),
+        dtype=np.int64,
+        count=count
+    )
+    node_types = np.fromiter(
+        (node_type.value for _, node_type in node_mapping.values()),
+        dtype=np.uint8,
+        count=count
+    )
+
+    pkey_order = np.argsort(pkeys, kind='stable')
+    pkeys = pkeys[pkey_order]
+    inodes = inodes[pkey_order]
+    node_types = node_types[pkey_order]
+
+    inode_order = np.argsort(inodes, kind='stable')
+    sorted_inodes = inodes[inode_order]
+    inode_pkeys = pkeys[inode_order]
+
+    assert count == 0 or np.all(sorted_inodes[1:] != sorted_inodes[:-1]), \
+        "rr inodes are not unique"
+
+    with open(fname, 'wb') as f:
+        f.write(NODE_MAP_MAGIC)
+        f.write(np.array([count], dtype=np.uint64).tobytes())
+        for array in (pkeys, inodes, sorted_inodes, inode_pkeys, node_types):
+            f.write(array.tobytes())
+
+
+class NodeMap(object):
+    """ Read only view of a node map written by write_node_map. """
+
+    def __init__(self, fname):
+        with open(fname, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+
+        assert header[:len(NODE_MAP_MAGIC)] == NODE_MAP_MAGIC, \
+            "{} is not a node map".format(fname)
+        count = int(np.frombuffer(header[len(NODE_MAP_MAGIC):], np.uint64)[0])
+
+        def column(idx, dtype):
+            if count == 0:
+                return np.zeros(0, dtype=dtype)
+
+            return np.memmap(
+                fname,
+                dtype=dtype,
+                mode='r',
+                offset=HEADER_SIZE + idx * count * 8,
+                shape=(count, )
+            )
+
+        self.count = count
+        self.pkeys = column(0, np.int64)
+        self.inodes = column(1, np.int64)
+        self.sorted_inodes = column(2, np.int64)
+        self.inode_pkeys = column(3, np.int64)
+        self.node_types = column(4, np.uint8)
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, keys, key):
+        idx = int(np.searchsorted(keys, key))
+        if idx < self.count and keys[idx] == key:
+            return idx
+        else:
+            return None
+
+    def __contains__(self, graph_node_pkey):
+        return self._find(self.pkeys, graph_node_pkey) is not None
+
+    def __getitem__(self, graph_node_pkey):
+        """ Returns (inode, NodeType) of graph_node_pkey. """
+        idx = self._find(self.pkeys, graph_node_pkey)
+        if idx is None:
+            raise KeyError(graph_node_pkey)
+
+        return int(self.inodes[idx]), NodeType(int(self.node_types[idx]))
+
+    def get(self, graph_node_pkey, default=None):
+        if graph_node_pkey in self:
+            return self[graph_node_pkey]
+        else:
+            return default
+
+    def get_graph_node_pkey(self, inode, default=None):
+        """ Returns graph_node_pkey that was emitted as inode. """
+        idx = self._find(self.sorted_inodes, inode)
+        if idx is None:
+            return default
+
+        return int(self.inode_pkeys[idx])
+
+    def items(self):
+        """ Yields (graph_node_pkey, (inode, NodeType)) in pkey order. """
+        for idx in range(self.count):
+            graph_node_pkey = int(self.pkeys[idx])
+            node_type = NodeType(int(self.node_types[idx]))
+            yield graph_node_pkey, (int(self.inodes[idx]), node_type)
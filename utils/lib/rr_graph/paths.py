@@ -0,0 +1,236 @@
+""" k shortest paths between node sets of a CSR graph.
+
+The graph is any object with out_edges(node) and in_edges(node) returning
+(nodes, switches) arrays, like graph_cache.GraphCache.  Edge costs are
+given per switch id, see hop_costs and switch_delays.
+
+Paths are found with Yen's algorithm, each spur path with a bidirectional
+Dijkstra search between the source and target node sets.  Paths are loopless
+and returned in order of increasing cost.
+
+"""
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+Path = namedtuple('Path', 'cost nodes')
+
+
+def hop_costs(num_switches):
+    """ Returns switch costs counting the number of edges. """
+    return np.ones(num_switches)
+
+
+def switch_delays(switches):
+    """ Returns switch costs equal to the switch Tdel.
+
+    switches is an iterable of graph.Switch, switches without timing have no
+    delay.
+
+    """
+    switches = list(switches)
+    delays = np.zeros(max(switch.id for switch in switches) + 1)
+    for switch in switches:
+        if switch.timing is not None:
+            delays[switch.id] = switch.timing.Tdel
+
+    return delays
+
+
+def edge_cost(graph, switch_costs, src_node, sink_node):
+    """ Returns cost of the cheapest edge between src_node and sink_node. """
+    nodes, switches = graph.out_edges(src_node)
+    return min(switch_costs[switches[nodes == sink_node]])
+
+
+def path_cost(graph, switch_costs, nodes):
+    return sum(
+        edge_cost(graph, switch_costs, src_node, sink_node)
+        for src_node, sink_node in zip(nodes[:-1], nodes[1:])
+    )
+
+
+def shortest_path(
+        graph,
+        switch_costs,
+        sources,
+        targets,
+        banned_nodes=frozenset(),
+        banned_next=frozenset(),
+        max_cost=float('inf')
+):
+    """ Returns the cheapest Path from any of sources to any of targets.
+
+    Nodes in banned_nodes are not used, and neither are edges from sources to
+    nodes in banned_next.  Returns None if there is no path of at most
+    max_cost.
+
+    """
+    inf = float('inf')
+    best = inf
+    meet = None
+
+    sources = set(sources)
+    dist = [{}, {}]
+    prev = [{}, {}]
+    heaps = [[], []]
+    done = [set(), set()]
+
+    for side, nodes in enumerate((sources, targets)):
+        for node in nodes:
+            if node not in banned_nodes:
+                dist[side][node] = 0
+                prev[side][node] = None
+                heaps[side].append((0, node))
+
+    for node in dist[0]:
+        if node in dist[1]:
+            best = 0
+            meet = node
+            break
+
+    while heaps[0] and heaps[1]:
+        lower_bound = heaps[0][0][0] + heaps[1][0][0]
+        if lower_bound >= best or lower_bound > max_cost:
+            break
+
+        # Expand the side with the smaller frontier.
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        cost, node = heapq.heappop(heaps[side])
+        if node in done[side]:
+            continue
+        done[side].add(node)
+
+        if side == 0:
+            next_nodes, switches = graph.out_edges(node)
+            banned = banned_next if node in sources else ()
+        else:
+            next_nodes, switches = graph.in_edges(node)
+            banned = sources if node in banned_next else ()
+
+        side_dist = dist[side]
+        other_dist = dist[1 - side]
+        for next_node, next_cost in zip(next_nodes.tolist(),
+                                        switch_costs[switches].tolist()):
+            if next_node in banned_nodes or next_node in banned:
+                continue
+
+            next_cost += cost
+            if next_cost < side_dist.get(next_node, inf):
+                side_dist[next_node] = next_cost
+                prev[side][next_node] = node
+                heapq.heappush(heaps[side], (next_cost, next_node))
+
+                total = next_cost + other_dist.get(next_node, inf)
+                if total < best and total <= max_cost:
+                    best = total
+                    meet = next_node
+
+    if meet is None:
+        return None
+
+    nodes = [meet]
+    while prev[0][nodes[0]] is not None:
+        nodes.insert(0, prev[0][nodes[0]])
+    while prev[1][nodes[-1]] is not None:
+        nodes.append(prev[1][nodes[-1]])
+
+    return Path(cost=best, nodes=tuple(nodes))
+
+
+def k_shortest_paths(
+        graph, switch_costs, sources, targets, max_paths, max_depth=None
+):
+    """ Returns up to max_paths cheapest loopless paths sources to targets.
+
+    Paths are Path tuples, in order of increasing cost.  When max_depth is
+    given, only paths of at most max_depth edges are returned.
+
+    Yen's algorithm is run as if a virtual node was connected to all
+    sources, and all targets to another virtual node.  A spur from the first
+    virtual node is a path from a source not used yet, a spur ending in the
+    second one is a path ending at the spur node.
+
+    """
+    sources = set(sources)
+    targets = set(targets)
+
+    # When costs count the edges, max_depth bounds the searches.
+    hop_bound = max_depth is not None and np.all(switch_costs == 1)
+
+    def within_depth(nodes):
+        return max_depth is None or len(nodes) - 1 <= max_depth
+
+    paths = []
+    candidates = []
+    seen = set()
+
+    path = shortest_path(
+        graph,
+        switch_costs,
+        sources,
+        targets,
+        max_cost=max_depth if hop_bound else float('inf')
+    )
+    if path is not None:
+        candidates.append(path)
+        seen.add(path.nodes)
+
+    while candidates and len(paths) < max_paths:
+        path = heapq.heappop(candidates)
+        if not within_depth(path.nodes):
+            continue
+
+        paths.append(path)
+
+        # Spur from the virtual source (idx -1) and every node of the path.
+        for idx in range(-1, len(path.nodes)):
+            root = path.nodes[:idx + 1]
+
+            # Next nodes already taken after root, None for the virtual target.
+            banned_next = set()
+            for other in paths:
+                if other.nodes[:idx + 1] == root:
+                    if len(other.nodes) > idx + 1:
+                        banned_next.add(other.nodes[idx + 1])
+                    else:
+                        banned_next.add(None)
+
+            if idx < 0:
+                spur_sources = sources - banned_next
+                spur_targets = targets
+                banned_next = set()
+            else:
+                spur_sources = [root[-1]]
+                spur_targets = targets
+                if None in banned_next:
+                    spur_targets = targets - set(root[-1:])
+
+            max_cost = float('inf')
+            if hop_bound:
+                max_cost = max_depth - max(idx, 0)
+
+            spur_path = shortest_path(
+                graph,
+                switch_costs,
+                spur_sources,
+                spur_targets,
+                banned_nodes=set(root[:-1]),
+                banned_next=banned_next,
+                max_cost=max_cost,
+            )
+            if spur_path is None:
+                continue
+
+            nodes = root[:-1] + spur_path.nodes
+            if nodes in seen or not within_depth(nodes):
+                continue
+
+            seen.add(nodes)
+            heapq.heappush(
+                candidates,
+                Path(cost=path_cost(graph, switch_costs, nodes), nodes=nodes)
+            )
+
+    return paths
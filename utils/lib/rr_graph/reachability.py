@@ -0,0 +1,241 @@
+""" Source to sink reachability over a CSR graph.
+
+Graphs are given as CSR adjacency, the successors of node are:
+
+    targets[offsets[node]:offsets[node + 1]]
+
+as stored in graph_cache.GraphCache (out_offsets / out_nodes).
+
+Instead of searching the graph from every source, the graph is condensed
+once into its strongly connected components, which form a DAG.  Every
+component is given a bitset of the sinks it reaches, propagated from the
+sinks to the sources over the DAG, one level of the DAG at a time.  When there
+are many sinks, they are processed in blocks, to bound the size of the
+bitsets.
+
+"""
+import numpy as np
+
+# Maximum number of 64 bit words of sink bitsets kept at once.
+MAX_BITSET_WORDS = 1 << 24
+
+
+def strongly_connected_components(offsets, targets):
+    """ Returns (component of each node, number of components).
+
+    Uses an iterative Tarjan's algorithm.  Components are numbered in the
+    order Tarjan's algorithm finds them, so edges between different
+    components always go from a higher to a lower component number.
+
+    """
+    num_nodes = len(offsets) - 1
+    offsets = np.asarray(offsets).tolist()
+    targets = np.asarray(targets).tolist()
+
+    index = [-1] * num_nodes
+    low = [0] * num_nodes
+    component = [-1] * num_nodes
+    stack = []
+    next_index = 0
+    num_components = 0
+
+    for root in range(num_nodes):
+        if index[root] >= 0:
+            continue
+
+        index[root] = low[root] = next_index
+        next_index += 1
+        stack.append(root)
+
+        # (node, next edge of node to visit)
+        work = [(root, offsets[root])]
+        while work:
+            node, edge = work[-1]
+            end = offsets[node + 1]
+
+            while edge < end:
+                succ = targets[edge]
+                edge += 1
+
+                if index[succ] < 0:
+                    # Visit succ, and continue with node afterwards.
+                    work[-1] = (node, edge)
+                    index[succ] = low[succ] = next_index
+                    next_index += 1
+                    stack.append(succ)
+                    work.append((succ, offsets[succ]))
+                    break
+                elif component[succ] < 0 and index[succ] < low[node]:
+                    # succ is on the stack.
+                    low[node] = index[succ]
+            else:
+                # All successors of node were visited.
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        component[member] = num_components
+                        if member == node:
+                            break
+
+                    num_components += 1
+
+    return np.array(component, dtype=np.int64), num_components
+
+
+def condense(offsets, targets, component, num_components):
+    """ Returns (sources, targets) of the unique edges between components. """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    src_nodes = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    src_components = component[src_nodes]
+    dst_components = component[np.asarray(targets, dtype=np.int64)]
+    keep = src_components != dst_components
+
+    edges = np.unique(
+        src_components[keep] * num_components + dst_components[keep]
+    )
+    return edges // num_components, edges % num_components
+
+
+def dag_levels(src_components, dst_components, num_components):
+    """ Returns the level of each component of the condensed DAG.
+
+    Components without successors are level 0, other components are one
+    level above their highest successor.
+
+    """
+    out_degree = np.bincount(src_components, minlength=num_components)
+
+    # Edges by destination, to find the predecessors of each level.
+    order = np.argsort(dst_components, kind='stable')
+    pred_offsets = np.zeros(num_components + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(dst_components, minlength=num_components),
+        out=pred_offsets[1:]
+    )
+    preds = src_components[order]
+
+    levels = np.full(num_components, -1, dtype=np.int64)
+    frontier = np.flatnonzero(out_degree == 0)
+    level = 0
+    while len(frontier):
+        levels[frontier] = level
+
+        starts = pred_offsets[frontier]
+        counts = pred_offsets[frontier + 1] - starts
+        edges = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        edges += np.arange(len(edges))
+
+        frontier_preds = preds[edges]
+        np.subtract.at(out_degree, frontier_preds, 1)
+        frontier_preds = np.unique(frontier_preds)
+        frontier = frontier_preds[out_degree[frontier_preds] == 0]
+        level += 1
+
+    assert np.all(levels >= 0)
+    return levels
+
+
+class Reachability(object):
+    """ Sink reachability of a CSR graph.
+
+    The graph is condensed on construction, unreachable_sinks can then be
+    queried for any sources and sinks.
+
+    """
+
+    def __init__(self, offsets, targets):
+        self.component, self.num_components = strongly_connected_components(
+            offsets, targets
+        )
+        src_components, dst_components = condense(
+            offsets, targets, self.component, self.num_components
+        )
+        levels = dag_levels(
+            src_components, dst_components, self.num_components
+        )
+
+        # Group the DAG edges by the level of their source, then by source.
+        order = np.lexsort((src_components, levels[src_components]))
+        self.src_components = src_components[order]
+        self.dst_components = dst_components[order]
+
+        edge_levels = levels[self.src_components]
+        self.level_offsets = np.searchsorted(
+            edge_levels,
+            np.arange(edge_levels.max() + 2) if len(edge_levels) else [0]
+        )
+
+    def _reach_bitsets(self, sink_components, num_words):
+        """ Returns array of the sink bitsets of every component.
+
+        Bit i of the bitset of a component is set if sink_components[i] is
+        reachable from it.
+
+        """
+        reach = np.zeros((self.num_components, num_words), dtype=np.uint64)
+
+        bits = np.arange(len(sink_components))
+        np.bitwise_or.at(
+            reach, (sink_components, bits // 64),
+            np.left_shift(np.uint64(1), (bits % 64).astype(np.uint64))
+        )
+
+        # Level 0 components have no successors.
+        for level in range(1, len(self.level_offsets) - 1):
+            start, end = self.level_offsets[level:level + 2]
+            if start == end:
+                continue
+
+            src_components = self.src_components[start:end]
+            group_starts = np.flatnonzero(
+                np.concatenate(
+                    ([True], src_components[1:] != src_components[:-1])
+                )
+            )
+
+            reach[src_components[group_starts]] |= np.bitwise_or.reduceat(
+                reach[self.dst_components[start:end]], group_starts, axis=0
+            )
+
+        return reach
+
+    def unreachable_sinks(self, sources, sinks):
+        """ Returns dict of the sinks not reachable from each source.
+
+        Sources reaching every sink are not in the returned dict.
+
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        sinks = np.asarray(sinks, dtype=np.int64)
+        source_components = self.component[sources]
+
+        # Limit the size of the bitsets.
+        block_size = 64 * max(1, MAX_BITSET_WORDS // self.num_components)
+
+        unreachable = {}
+        for start in range(0, len(sinks), block_size):
+            block = sinks[start:start + block_size]
+            reach = self._reach_bitsets(
+                self.component[block], (len(block) + 63) // 64
+            )
+
+            reached = np.unpackbits(
+                reach[source_components].view(np.uint8),
+                axis=1,
+                count=len(block),
+                bitorder='little'
+            ).astype(bool)
+
+            for source_idx in np.flatnonzero(~reached.all(axis=1)).tolist():
+                unreachable.setdefault(int(sources[source_idx]), set()).update(
+                    block[~reached[source_idx]].tolist()
+                )
+
+        return unreachable
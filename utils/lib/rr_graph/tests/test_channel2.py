@@ -1,6 +1,7 @@
+import random
 import unittest
 
-from ..channel2 import Channel
+from ..channel2 import CHANNEL_PACKERS, Channel, SortedChannel
 
 
 class ChannelTests(unittest.TestCase):
@@ -21,3 +22,51 @@ class ChannelTests(unittest.TestCase):
             [xx for xx in self.channel.trees[1]], [(1, 2, 0), (3, 5, 2)]
         )
         self.assertEqual([xx for xx in self.channel.trees[0]], [(1, 3, 1)])
+
+
+class SortedChannelTests(unittest.TestCase):
+    def random_tracks(self, rand, num_tracks, grid_dim):
+        tracks = []
+        for key in range(num_tracks):
+            low = rand.randrange(grid_dim)
+            high = min(grid_dim - 1, low + rand.randrange(12))
+            tracks.append((low, high, key))
+
+        return tracks
+
+    def check_packers(self, tracks, grid_dim):
+        expected = Channel(tracks)
+        expected.pack_tracks()
+
+        actual = SortedChannel(tracks)
+        actual.pack_tracks()
+
+        self.assertEqual(actual.trees, expected.trees)
+        self.assertEqual(
+            list(actual.fill_empty(0, grid_dim)),
+            list(expected.fill_empty(0, grid_dim))
+        )
+
+    def test_packers(self):
+        self.assertEqual(
+            CHANNEL_PACKERS, {
+                'scan': Channel,
+                'sorted': SortedChannel
+            }
+        )
+
+    def test_pack(self):
+        rand = random.Random(0)
+        for grid_dim in (1, 5, 50, 1000):
+            self.check_packers(
+                self.random_tracks(rand, 20 * grid_dim, grid_dim), grid_dim
+            )
+
+    def test_sparse(self):
+        rand = random.Random(1)
+        self.check_packers(self.random_tracks(rand, 100, 5000), 5000)
+
+    def test_empty(self):
+        channel = SortedChannel([])
+        channel.pack_tracks()
+        self.assertEqual(channel.trees, [])
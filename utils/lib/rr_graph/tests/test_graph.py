@@ -3,9 +3,10 @@
 import unittest
 
 from .. import graph, P, Size
+from ..channel import Track
 from ..graph import (
     Pin, PinClass, PinClassDirection, Block, BlockGrid, BlockType, Segment,
-    Switch, SwitchType, RoutingGraph, RoutingGraphPrinter
+    Switch, SwitchType, RoutingGraph, RoutingGraphPrinter, ArrayRoutingGraph
 )
 
 import lxml.etree as ET
@@ -573,5 +574,100 @@ class TestGraph(unittest.TestCase):
         self.assertEqual('OBUF', g.block_grid.block_types[2].name)
 
 
+class TestArrayRoutingGraph(unittest.TestCase):
+    def build_graph(self, routing, clear_fabric):
+        g = graph.simple_test_graph(
+            clear_fabric=clear_fabric, switch_name='mux', routing=routing
+        )
+        segment = g.segments['local']
+        switch = g.switches['mux']
+
+        tracks = []
+        for idx, (start, end) in enumerate([((0, 1), (0, 1)), ((1, 1), (1,
+                                                                        1))]):
+            track, track_node = g.create_xy_track(
+                start,
+                end,
+                segment,
+                name='track{}'.format(idx),
+                typeh=Track.Type.Y,
+                direction=Track.Direction.BI
+            )
+            track_node.set_metadata('hlc_name', 'track{}'.format(idx))
+            tracks.append(track)
+
+        g.connect_track_to_track(tracks[0], tracks[1], switch)
+        track_node = g.routing.globalnames['track0']
+        for block in g.block_grid:
+            for pin in block.block_type.pins:
+                key = (block.position, pin.name)
+                if key not in g.routing.localnames:
+                    continue
+
+                pin_node = g.routing.localnames[key]
+                if pin.direction == PinClassDirection.OUTPUT:
+                    src_node, sink_node = pin_node, track_node
+                else:
+                    src_node, sink_node = track_node, pin_node
+
+                metadata = {'fasm_features': pin.name}
+                g.routing.create_edge_with_nodes(
+                    src_node, sink_node, switch, metadata={P(0, 0): metadata}
+                )
+
+        return g
+
+    def test_same_xml(self):
+        for clear_fabric in (False, True):
+            xml_graph = self.build_graph('xml', clear_fabric)
+            array_graph = self.build_graph('arrays', clear_fabric)
+
+            self.assertEqual(
+                xml_graph.routing.num_nodes, array_graph.routing.num_nodes
+            )
+            self.assertEqual(
+                xml_graph.routing.num_edges, array_graph.routing.num_edges
+            )
+            # Imported nodes are written with the attributes in the usual
+            # order, so compare the canonical XML.
+            self.assertEqual(
+                ET.tostring(array_graph.to_xml(), method='c14n'),
+                ET.tostring(xml_graph.to_xml(), method='c14n')
+            )
+
+    def test_routing(self):
+        xml_routing = graph.simple_test_routing()
+        routing = graph.simple_test_routing(ArrayRoutingGraph)
+
+        for node_id in range(routing.num_nodes):
+            node = routing.get_node_by_id(node_id)
+            xml_node = xml_routing.get_node_by_id(node_id)
+            self.assertEqual(ET.tostring(node.to_xml()), ET.tostring(xml_node))
+            self.assertEqual(
+                [
+                    RoutingGraphPrinter.edge(routing, e)
+                    for e in routing.edges_for_node(node)
+                ], [
+                    RoutingGraphPrinter.edge(xml_routing, e)
+                    for e in xml_routing.edges_for_node(xml_node)
+                ]
+            )
+
+        edge = routing.get_edge_by_id(3)
+        self.assertEqual(routing.node_ids_for_edge(edge), (3, 4))
+        self.assertEqual(edge.get('switch_id'), '0')
+        self.assertEqual(edge.get_metadata('test', default=None), None)
+        edge.set_metadata('test', 123)
+        self.assertEqual(routing.get_metadata(edge, 'test'), '123')
+        with self.assertRaises(ValueError):
+            edge.get_metadata('not_found')
+
+        sw = Switch(id=0, type=SwitchType.MUX, name="sw")
+        with self.assertRaises(TypeError):
+            routing.create_edge_with_ids(0, 2, sw)
+        with self.assertRaises(KeyError):
+            routing.get_node_by_id(5)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,11 +1,13 @@
+import random
 import unittest
 
 from copy import deepcopy
+from multiprocessing.pool import ThreadPool
 
 from ..graph2 import SwitchTiming, SwitchSizing, Switch, SwitchType, \
     Graph, SegmentTiming, Segment, PinClass, Pin, PinType, \
     BlockType, GridLoc, NodeTiming, NodeSegment, Node, NodeType, \
-    NodeDirection, NodeLoc
+    NodeDirection, NodeLoc, NodeMetadata, NodeStore
 from ..tracks import Track, Direction
 
 
@@ -375,5 +377,163 @@ class Graph2MediumTests(unittest.TestCase):
         with self.assertRaises(AssertionError):
             self.graph.get_nodes_for_pin((0, 0), 'p3')
 
+    def add_random_tracks(self, graph, num_tracks, grid_dim):
+        rand = random.Random(0)
+        for _ in range(num_tracks):
+            low = rand.randrange(1, grid_dim)
+            high = min(grid_dim - 1, low + rand.randrange(4))
+            chan = rand.randrange(grid_dim)
+            if rand.random() < 0.5:
+                track = Track(
+                    direction='X',
+                    x_low=low,
+                    y_low=chan,
+                    x_high=high,
+                    y_high=chan
+                )
+            else:
+                track = Track(
+                    direction='Y',
+                    x_low=chan,
+                    y_low=low,
+                    x_high=chan,
+                    y_high=high
+                )
+
+            graph.add_track(track, segment_id=0)
+
+    def create_channels(self, **kwargs):
+        graph = deepcopy(self.graph)
+        self.add_random_tracks(graph, num_tracks=500, grid_dim=20)
+        num_tracks = len(graph.tracks)
+
+        channels = graph.create_channels(pad_segment=1, **kwargs)
+        graph.check_ptc()
+
+        return graph, num_tracks, channels
+
     def test_create_channels(self):
-        pass
+        graph, num_tracks, channels = self.create_channels()
+
+        # Every ptc of every channel is covered from 1 to the max coordinate.
+        coverage = {}
+        for idx, track in enumerate(graph.tracks):
+            node = graph.nodes[track]
+            if node.type == NodeType.CHANX:
+                key = ('X', node.loc.y_low, node.loc.ptc)
+                low, high = node.loc.x_low, node.loc.x_high
+                max_value = channels.x_max
+                self.assertLess(
+                    node.loc.ptc, channels.x_list[node.loc.y_low].info
+                )
+            else:
+                key = ('Y', node.loc.x_low, node.loc.ptc)
+                low, high = node.loc.y_low, node.loc.y_high
+                max_value = channels.y_max
+                self.assertLess(
+                    node.loc.ptc, channels.y_list[node.loc.x_low].info
+                )
+
+            self.assertEqual(node.capacity, int(idx < num_tracks))
+            coverage.setdefault(key, []).extend(range(low, high + 1))
+
+        for key, coords in coverage.items():
+            self.assertEqual(sorted(coords), list(range(1, max_value + 1)))
+
+        self.assertEqual(
+            channels.chan_width_max,
+            max(chan.info for chan in channels.x_list + channels.y_list)
+        )
+
+    def test_create_channels_pool(self):
+        expected = self.create_channels()
+        for kwargs in (dict(packer='scan'), dict(pool=ThreadPool(2))):
+            graph, num_tracks, channels = self.create_channels(**kwargs)
+            self.assertEqual(channels, expected[2])
+            self.assertEqual(list(graph.nodes), list(expected[0].nodes))
+
+
+class NodeStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.nodes = [
+            Node(
+                id=0,
+                type=NodeType.CHANX,
+                direction=NodeDirection.INC_DIR,
+                capacity=1,
+                loc=NodeLoc(
+                    x_low=1, x_high=4, y_low=2, y_high=2, side=None, ptc=3
+                ),
+                timing=NodeTiming(r=1.5, c=2.5),
+                metadata=[
+                    NodeMetadata(
+                        name='fasm_features',
+                        x_offset=0,
+                        y_offset=0,
+                        z_offset=0,
+                        value='A.B'
+                    )
+                ],
+                segment=NodeSegment(segment_id=-1),
+            ),
+            Node(
+                id=1,
+                type=NodeType.IPIN,
+                direction=None,
+                capacity=0,
+                loc=NodeLoc(
+                    x_low=0,
+                    x_high=0,
+                    y_low=0,
+                    y_high=0,
+                    side=Direction.TOP_RIGHT,
+                    ptc=None
+                ),
+                timing=None,
+                metadata=None,
+                segment=None,
+            ),
+        ]
+
+    def test_round_trip(self):
+        node_store = NodeStore(self.nodes)
+
+        self.assertEqual(len(node_store), 2)
+        self.assertEqual(list(node_store), self.nodes)
+        self.assertEqual(node_store[-1], self.nodes[-1])
+
+        with self.assertRaises(IndexError):
+            node_store[2]
+
+    def test_set_ptc(self):
+        node_store = NodeStore(self.nodes)
+
+        with self.assertRaises(AssertionError):
+            node_store.set_ptc(0, 1)
+
+        node_store.set_ptc(1, 5)
+        self.assertEqual(node_store[1].loc.ptc, 5)
+
+    def test_extend_columns(self):
+        node_store = NodeStore(self.nodes)
+
+        columns = NodeStore()
+        columns.extend_columns(
+            **{
+                name: getattr(node_store, name)
+                for name in (
+                    'type', 'direction', 'capacity', 'ptc', 'side', 'x_low',
+                    'y_low', 'x_high', 'y_high', 'timing_r', 'timing_c',
+                    'segment_id'
+                )
+            }
+        )
+
+        self.assertEqual(
+            list(columns),
+            [node._replace(metadata=None) for node in self.nodes]
+        )
+
+    def test_out_of_order(self):
+        with self.assertRaises(AssertionError):
+            NodeStore(self.nodes[1:])
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import lxml.etree as ET
+
+from .. import graph
+from ..graph2 import NodeType
+from ..graph_cache import GraphCache
+
+
+class GraphCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.graph = graph.simple_test_graph()
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.rr_graph_file = os.path.join(self.tmp_dir, 'rr_graph.xml')
+        with open(self.rr_graph_file, 'wb') as f:
+            f.write(ET.tostring(self.graph._xml_graph))
+
+        self.cache_file = self.rr_graph_file + '.cache'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_nodes(self):
+        cache = GraphCache.open(self.rr_graph_file)
+        block_grid = cache.skeleton_graph().block_grid
+
+        nodes = self.graph.routing._ids_map(graph.RoutingNode)
+        self.assertEqual(cache.node_ids().tolist(), sorted(nodes.keys()))
+        for node_id, node in nodes.items():
+            self.assertEqual(
+                cache.node_name(node_id, block_grid),
+                graph.RoutingGraphPrinter.node(node, self.graph.block_grid)
+            )
+
+        self.assertEqual(
+            cache.node_ids(NodeType.SOURCE).tolist(), [
+                node_id for node_id, node in nodes.items()
+                if node.get('type') == 'SOURCE'
+            ]
+        )
+
+    def test_edges(self):
+        cache = GraphCache.open(self.rr_graph_file)
+
+        edges = [
+            (
+                int(edge.get('src_node')), int(edge.get('sink_node')),
+                int(edge.get('switch_id'))
+            ) for edge in self.graph.routing._xml_parent(graph.RoutingEdge)
+        ]
+        self.assertEqual(cache.num_edges, len(edges))
+
+        out_edges = []
+        in_edges = []
+        for node_id in range(cache.num_nodes):
+            sink_nodes, switches = cache.out_edges(node_id)
+            for sink_node, switch in zip(sink_nodes, switches):
+                out_edges.append((node_id, sink_node, switch))
+
+            src_nodes, switches = cache.in_edges(node_id)
+            for src_node, switch in zip(src_nodes, switches):
+                in_edges.append((src_node, node_id, switch))
+
+        self.assertEqual(sorted(out_edges), sorted(edges))
+        self.assertEqual(sorted(in_edges), sorted(edges))
+
+    def test_rebuild(self):
+        GraphCache.open(self.rr_graph_file)
+        mtime_ns = os.stat(self.cache_file).st_mtime_ns
+
+        # Up to date cache is reused.
+        GraphCache.open(self.rr_graph_file)
+        self.assertEqual(os.stat(self.cache_file).st_mtime_ns, mtime_ns)
+
+        # Changed graph is read again.
+        root = self.graph._xml_graph.getroot()
+        edges = root.find('rr_edges')
+        edges.remove(edges[0])
+        with open(self.rr_graph_file, 'wb') as f:
+            f.write(ET.tostring(root))
+
+        cache = GraphCache.open(self.rr_graph_file)
+        self.assertEqual(cache.num_edges, len(edges))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import random
+import unittest
+
+import numpy as np
+from hilbertcurve.hilbertcurve import HilbertCurve
+
+from ..locality import hilbert_distance, node_order_remap, \
+    row_major_distance, z_order_distance
+
+
+def grid_points(bits):
+    x, y = np.meshgrid(np.arange(1 << bits), np.arange(1 << bits))
+    return x.ravel(), y.ravel()
+
+
+class LocalityTests(unittest.TestCase):
+    def test_hilbert(self):
+        for bits in range(1, 6):
+            hilbert_curve = HilbertCurve(bits, 2)
+            x, y = grid_points(bits)
+            self.assertEqual(
+                hilbert_distance(x, y, bits).tolist(), [
+                    hilbert_curve.distance_from_coordinates([int(a),
+                                                             int(b)])
+                    for a, b in zip(x, y)
+                ]
+            )
+
+    def test_curves(self):
+        x, y = grid_points(4)
+        for distance in (hilbert_distance, z_order_distance,
+                         row_major_distance):
+            self.assertEqual(
+                sorted(distance(x, y, 4).tolist()), list(range(1 << 8))
+            )
+
+        self.assertEqual(
+            z_order_distance([0, 1, 0, 1, 2], [0, 0, 1, 1, 0], 2).tolist(),
+            [0, 1, 2, 3, 4]
+        )
+        self.assertEqual(
+            row_major_distance([3, 0, 1], [0, 1, 1], 2).tolist(), [3, 4, 5]
+        )
+
+    def test_node_order_remap(self):
+        rand = random.Random(0)
+        x = [rand.randrange(40) for _ in range(1000)]
+        y = [rand.randrange(40) for _ in range(1000)]
+
+        for order in ('hilbert', 'z_order', 'row_major'):
+            remap = node_order_remap(x, y, order=order, bits=3)
+            self.assertEqual(sorted(remap.tolist()), list(range(len(x))))
+
+        # Nodes at the same location keep their relative order.
+        remap = node_order_remap(x, y, order='row_major')
+        expected = sorted(range(len(x)), key=lambda idx: (y[idx], x[idx], idx))
+        self.assertEqual(remap[expected].tolist(), list(range(len(x))))
+
+    def test_empty(self):
+        self.assertEqual(node_order_remap([], []).tolist(), [])
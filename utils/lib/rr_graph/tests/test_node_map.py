@@ -0,0 +1,60 @@
+import os
+import random
+import tempfile
+import unittest
+
+from ..graph2 import NodeType
+from ..node_map import NodeMap, write_node_map
+
+
+class NodeMapTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.fname = tempfile.mkstemp(suffix='.node_map')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def test_round_trip(self):
+        rand = random.Random(0)
+        pkeys = rand.sample(range(100000), 1000)
+        inodes = rand.sample(range(100000), 1000)
+        node_types = list(NodeType)
+
+        node_mapping = {}
+        for pkey, inode in zip(pkeys, inodes):
+            node_mapping[pkey] = (inode, rand.choice(node_types))
+
+        write_node_map(self.fname, node_mapping)
+        node_map = NodeMap(self.fname)
+
+        self.assertEqual(len(node_map), len(node_mapping))
+        self.assertEqual(dict(node_map.items()), node_mapping)
+
+        for pkey, (inode, node_type) in node_mapping.items():
+            self.assertIn(pkey, node_map)
+            self.assertEqual(node_map[pkey], (inode, node_type))
+            self.assertEqual(node_map.get_graph_node_pkey(inode), pkey)
+
+        missing = set(range(100000)) - set(pkeys)
+        for pkey in rand.sample(sorted(missing), 100):
+            self.assertNotIn(pkey, node_map)
+            self.assertIsNone(node_map.get(pkey))
+            with self.assertRaises(KeyError):
+                node_map[pkey]
+
+        missing = set(range(100000)) - set(inodes)
+        for inode in rand.sample(sorted(missing), 100):
+            self.assertIsNone(node_map.get_graph_node_pkey(inode))
+
+    def test_empty(self):
+        write_node_map(self.fname, {})
+        node_map = NodeMap(self.fname)
+
+        self.assertEqual(len(node_map), 0)
+        self.assertNotIn(0, node_map)
+        self.assertIsNone(node_map.get_graph_node_pkey(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
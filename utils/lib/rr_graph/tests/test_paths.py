@@ -0,0 +1,128 @@
+import random
+import unittest
+
+import numpy as np
+
+from .. import graph as rr_graph
+from .. import paths
+
+
+class CsrGraph(object):
+    """ Graph with the out_edges / in_edges of graph_cache.GraphCache. """
+
+    def __init__(self, num_nodes, edges):
+        self.edges = edges
+        self.out = [[] for _ in range(num_nodes)]
+        self.into = [[] for _ in range(num_nodes)]
+        for src, dst, switch in edges:
+            self.out[src].append((dst, switch))
+            self.into[dst].append((src, switch))
+
+    @staticmethod
+    def _arrays(edges):
+        return (
+            np.array([node for node, _ in edges], dtype=np.int64),
+            np.array([switch for _, switch in edges], dtype=np.int64),
+        )
+
+    def out_edges(self, node):
+        return self._arrays(self.out[node])
+
+    def in_edges(self, node):
+        return self._arrays(self.into[node])
+
+
+def all_paths(graph, switch_costs, sources, targets):
+    """ Returns all loopless paths sources to targets, cheapest first. """
+    found = []
+
+    def visit(nodes):
+        if nodes[-1] in targets:
+            found.append(
+                paths.Path(
+                    cost=paths.path_cost(graph, switch_costs, nodes),
+                    nodes=tuple(nodes)
+                )
+            )
+
+        for next_node, _ in graph.out[nodes[-1]]:
+            if next_node not in nodes:
+                visit(nodes + [next_node])
+
+    for source in sources:
+        visit([source])
+
+    return sorted(set(found))
+
+
+def random_graph(rand, num_nodes, num_edges, num_switches):
+    edges = set()
+    for _ in range(num_edges):
+        src, dst = rand.sample(range(num_nodes), 2)
+        edges.add((src, dst, rand.randrange(num_switches)))
+
+    return CsrGraph(num_nodes, sorted(edges))
+
+
+class PathsTests(unittest.TestCase):
+    def check_paths(self, graph, switch_costs, sources, targets, max_depth):
+        expected = all_paths(graph, switch_costs, sources, targets)
+        if max_depth is not None:
+            expected = [p for p in expected if len(p.nodes) - 1 <= max_depth]
+
+        for max_paths in [1, 3, 10]:
+            actual = paths.k_shortest_paths(
+                graph, switch_costs, sources, targets, max_paths, max_depth
+            )
+
+            # Equal cost paths may be found in any order.
+            self.assertEqual(
+                [p.cost for p in actual],
+                [p.cost for p in expected[:max_paths]]
+            )
+            self.assertEqual(len(set(actual)), len(actual))
+            self.assertTrue(set(actual) <= set(expected))
+
+    def test_random_graphs(self):
+        rand = random.Random(0)
+        switch_costs = np.array([1.0, 2.0, 5.0])
+
+        for _ in range(30):
+            graph = random_graph(rand, 12, 30, len(switch_costs))
+            sources = rand.sample(range(12), rand.randrange(1, 3))
+            targets = rand.sample(range(12), rand.randrange(1, 3))
+
+            self.check_paths(graph, switch_costs, sources, targets, None)
+            self.check_paths(
+                graph, paths.hop_costs(3), sources, targets, max_depth=3
+            )
+
+    def test_source_is_target(self):
+        graph = CsrGraph(3, [(0, 1, 0), (1, 2, 0), (2, 0, 0)])
+        actual = paths.k_shortest_paths(
+            graph, paths.hop_costs(1), [0], [0, 2], max_paths=10
+        )
+        self.assertEqual(
+            actual, [
+                paths.Path(cost=0, nodes=(0, )),
+                paths.Path(cost=2, nodes=(0, 1, 2)),
+            ]
+        )
+
+    def test_no_path(self):
+        graph = CsrGraph(3, [(0, 1, 0)])
+        self.assertEqual(
+            paths.k_shortest_paths(
+                graph, paths.hop_costs(1), [0], [2], max_paths=10
+            ), []
+        )
+
+    def test_switch_delays(self):
+        switches = rr_graph.simple_test_graph().switches._ids.values()
+        np.testing.assert_array_equal(
+            paths.switch_delays(switches), [5.80000006e-11, 0]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
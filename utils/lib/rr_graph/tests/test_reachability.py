@@ -0,0 +1,88 @@
+import random
+import unittest
+
+import numpy as np
+
+from .. import reachability
+from ..reachability import Reachability, strongly_connected_components
+
+
+def random_graph(rand, num_nodes, num_edges):
+    """ Returns CSR offsets and targets of a random graph. """
+    edges = sorted(
+        (rand.randrange(num_nodes), rand.randrange(num_nodes))
+        for _ in range(num_edges)
+    )
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount([src for src, _ in edges], minlength=num_nodes),
+        out=offsets[1:]
+    )
+    return offsets, np.array([dst for _, dst in edges], dtype=np.int64)
+
+
+def reachable(offsets, targets, node):
+    """ Returns set of nodes reachable from node, including node. """
+    visited = set([node])
+    stack = [node]
+    while stack:
+        src = stack.pop()
+        for succ in targets[offsets[src]:offsets[src + 1]].tolist():
+            if succ not in visited:
+                visited.add(succ)
+                stack.append(succ)
+
+    return visited
+
+
+class ReachabilityTests(unittest.TestCase):
+    def test_components(self):
+        # 0 -> 1 -> 2 -> 0 is a cycle, 3 -> 0, 2 -> 4
+        offsets = np.array([0, 1, 2, 4, 5, 5])
+        targets = np.array([1, 2, 0, 4, 0])
+        component, num_components = strongly_connected_components(
+            offsets, targets
+        )
+
+        self.assertEqual(num_components, 3)
+        self.assertEqual(len(set(component[[0, 1, 2]])), 1)
+        self.assertEqual(len(set(component)), 3)
+
+        # Edges between components go to lower components.
+        self.assertGreater(component[3], component[0])
+        self.assertGreater(component[2], component[4])
+
+    def check_graph(self, rand, num_nodes, num_edges):
+        offsets, targets = random_graph(rand, num_nodes, num_edges)
+
+        sources = rand.sample(range(num_nodes), num_nodes // 4)
+        sinks = rand.sample(range(num_nodes), num_nodes // 4)
+
+        expected = {}
+        for source in sources:
+            missing = set(sinks) - reachable(offsets, targets, source)
+            if missing:
+                expected[source] = missing
+
+        actual = Reachability(offsets,
+                              targets).unreachable_sinks(sources, sinks)
+        self.assertEqual(actual, expected)
+
+    def test_random_graphs(self):
+        rand = random.Random(0)
+        for num_nodes, num_edges in [(1, 0), (10, 5), (200, 200), (300, 900),
+                                     (500, 2000)]:
+            self.check_graph(rand, num_nodes, num_edges)
+
+    def test_sink_blocks(self):
+        # Force sinks to be processed in several blocks.
+        old_max_words = reachability.MAX_BITSET_WORDS
+        reachability.MAX_BITSET_WORDS = 1
+        try:
+            self.check_graph(random.Random(1), 1000, 1500)
+        finally:
+            reachability.MAX_BITSET_WORDS = old_max_words
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,802 @@
+""" Columnar writer for the rr graph node and edge lists.
+
+Setting every field of 5-50 million capnp structs from Python dominates the
+time spent writing a rr graph.  This module instead lays out the node and edge
+lists (and everything they point to) directly in numpy arrays, using the
+struct layouts reported by the loaded schema.
+
+Each list is placed in its own extra message segment.  The rest of the message
+is built with pycapnp as usual, with the list holder fields (rrNodes, rrEdges)
+left unset.  When the message is written, the unset root pointers are replaced
+by far pointers into the extra segments.
+
+See https://capnproto.org/encoding.html for the encoding details.
+
+"""
+from collections import namedtuple
+import array
+
+import numpy as np
+
+from lib.rr_graph.graph2 import NODE_STORE_UNSET
+
+# Columns of the rr graph node list.
+#
+# id, capacity, ptc, x_low, y_low, x_high, y_high - Integer arrays.
+# type, direction, side - Enum values (graph2.NodeType, graph2.NodeDirection,
+#                         tracks.Direction), -1 if not set.
+# timing_r, timing_c - Float arrays, NaN if the node has no timing.
+# segment_id - Integer array, -1 if the node has no segment.
+# metadata - Metadata, see below.
+NodeColumns = namedtuple(
+    'NodeColumns', 'id type direction capacity ptc side x_low y_low x_high '
+    'y_high timing_r timing_c segment_id metadata'
+)
+
+# Columns of the rr graph edge list.
+#
+# src_node, sink_node, switch_id - Integer arrays.
+# metadata - Metadata, see below.
+EdgeColumns = namedtuple(
+    'EdgeColumns', 'src_node sink_node switch_id metadata'
+)
+
+# Metadata of a list, stored as parallel lists, one element per (name, value)
+# pair, grouped by index.
+#
+# index - Index of the node or edge the pair belongs to, in increasing order.
+# name, value - Strings.
+Metadata = namedtuple('Metadata', 'index name value')
+
+POINTER_STRUCT = 0
+POINTER_LIST = 1
+POINTER_FAR = 2
+
+LIST_BYTE = 2
+LIST_COMPOSITE = 7
+
+# Maximum offset of a struct or list pointer (30 bits, signed).
+MAX_POINTER_OFFSET = 2**29 - 1
+
+SCALAR_TYPES = {
+    'int8': np.int8,
+    'int16': np.int16,
+    'int32': np.int32,
+    'int64': np.int64,
+    'uint8': np.uint8,
+    'uint16': np.uint16,
+    'uint32': np.uint32,
+    'uint64': np.uint64,
+    'float32': np.float32,
+    'float64': np.float64,
+    'enum': np.uint16,
+}
+
+
+def enum_table(capnp_enum, enum_type, to_capnp_enum):
+    """ Returns array mapping enum_type values to capnp enum ordinals.
+
+    Values without a capnp enumerant map to -1.
+    """
+    table = np.full(max(e.value for e in enum_type) + 1, -1, dtype=np.int32)
+    for e in enum_type:
+        try:
+            table[e.value] = to_capnp_enum(capnp_enum, e)
+        except KeyError:
+            pass
+
+    return table
+
+
+def lookup_enum(table, values, default):
+    """ Converts enum values to capnp enum ordinals using an enum_table.
+
+    Unset (-1) values are converted to the field default.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    ordinals = np.where(values < 0, default, table[values])
+    assert len(ordinals) == 0 or ordinals.min() >= 0, \
+        'Enum value without capnp enumerant'
+
+    return ordinals
+
+
+def edges_to_columns(edges, num_edges):
+    """ Converts an iterable of edge tuples to EdgeColumns.
+
+    edge tuples are (src_node, sink_node, switch_id, metadata), where
+    metadata is None or a sequence of (name, value) pairs.
+
+    """
+    src_nodes = array.array('q')
+    sink_nodes = array.array('q')
+    switch_ids = array.array('q')
+    metadata = Metadata(index=array.array('q'), name=[], value=[])
+
+    for idx, (src_node, sink_node, switch_id,
+              edge_metadata) in enumerate(edges):
+        src_nodes.append(src_node)
+        sink_nodes.append(sink_node)
+        switch_ids.append(switch_id)
+
+        if edge_metadata:
+            for name, value in edge_metadata:
+                metadata.index.append(idx)
+                metadata.name.append(name)
+                metadata.value.append(value)
+
+    assert len(src_nodes) == num_edges, 'Unwritten edges!'
+
+    return EdgeColumns(
+        src_node=np.frombuffer(src_nodes, dtype=np.int64),
+        sink_node=np.frombuffer(sink_nodes, dtype=np.int64),
+        switch_id=np.frombuffer(switch_ids, dtype=np.int64),
+        metadata=metadata,
+    )
+
+
+def nodes_to_columns(nodes, num_nodes):
+    """ Converts an iterable of graph2.Node to NodeColumns. """
+    ints = {
+        name: array.array('q')
+        for name in (
+            'id', 'type', 'direction', 'capacity', 'ptc', 'side', 'x_low',
+            'y_low', 'x_high', 'y_high', 'segment_id'
+        )
+    }
+    floats = {name: array.array('d') for name in ('timing_r', 'timing_c')}
+    metadata = Metadata(index=array.array('q'), name=[], value=[])
+
+    ids = ints['id']
+    types = ints['type']
+    directions = ints['direction']
+    capacities = ints['capacity']
+    ptcs = ints['ptc']
+    sides = ints['side']
+    x_lows = ints['x_low']
+    y_lows = ints['y_low']
+    x_highs = ints['x_high']
+    y_highs = ints['y_high']
+    segment_ids = ints['segment_id']
+    timing_rs = floats['timing_r']
+    timing_cs = floats['timing_c']
+    nan = float('nan')
+
+    for idx, node in enumerate(nodes):
+        ids.append(node.id)
+        types.append(node.type.value)
+        directions.append(
+            node.direction.value if node.direction is not None else -1
+        )
+        capacities.append(node.capacity)
+
+        loc = node.loc
+        ptcs.append(loc.ptc)
+        sides.append(loc.side.value if loc.side is not None else -1)
+        x_lows.append(loc.x_low)
+        y_lows.append(loc.y_low)
+        x_highs.append(loc.x_high)
+        y_highs.append(loc.y_high)
+
+        if node.timing is not None:
+            timing_rs.append(node.timing.r)
+            timing_cs.append(node.timing.c)
+        else:
+            timing_rs.append(nan)
+            timing_cs.append(nan)
+
+        if node.segment is not None:
+            segment_ids.append(node.segment.segment_id)
+        else:
+            segment_ids.append(-1)
+
+        if node.metadata:
+            for meta in node.metadata:
+                metadata.index.append(idx)
+                metadata.name.append(meta.name)
+                metadata.value.append(meta.value)
+
+    assert len(ids) == num_nodes, 'Unwritten nodes!'
+
+    columns = {
+        name: np.frombuffer(values, dtype=np.int64)
+        for name, values in ints.items()
+    }
+    columns.update(
+        (name, np.frombuffer(values, dtype=np.float64))
+        for name, values in floats.items()
+    )
+
+    return NodeColumns(metadata=metadata, **columns)
+
+
+def node_store_columns(node_store):
+    """ Returns NodeColumns of a graph2.NodeStore, without copying arrays. """
+    columns = {
+        name: np.frombuffer(getattr(node_store, name), dtype=dtype)
+        for name, dtype in (
+            ('type', np.int8),
+            ('direction', np.int8),
+            ('capacity', np.int32),
+            ('ptc', np.int32),
+            ('side', np.int8),
+            ('x_low', np.int32),
+            ('y_low', np.int32),
+            ('x_high', np.int32),
+            ('y_high', np.int32),
+            ('timing_r', np.float64),
+            ('timing_c', np.float64),
+        )
+    }
+    columns['id'] = np.arange(len(node_store), dtype=np.int64)
+
+    segment_id = np.frombuffer(node_store.segment_id, dtype=np.int32)
+    columns['segment_id'] = np.where(
+        segment_id == NODE_STORE_UNSET, -1, segment_id
+    )
+
+    metadata = Metadata(index=array.array('q'), name=[], value=[])
+    for idx in sorted(node_store.metadata):
+        for meta in node_store.metadata[idx]:
+            metadata.index.append(idx)
+            metadata.name.append(meta.name)
+            metadata.value.append(meta.value)
+
+    return NodeColumns(metadata=metadata, **columns)
+
+
+class StructLayout(object):
+    """ Layout of a capnp struct type, as reported by its schema. """
+
+    def __init__(self, struct_schema):
+        self.schema = struct_schema
+        node = struct_schema.node.struct
+        self.data_words = node.dataWordCount
+        self.pointer_count = node.pointerCount
+        self.words = self.data_words + self.pointer_count
+
+    def field(self, name):
+        return self.schema.fields[name].proto.slot
+
+    def scalar(self, name):
+        """ Returns (byte offset, dtype, default) of a scalar field. """
+        slot = self.field(name)
+        type_name = slot.type.which()
+        dtype = np.dtype(SCALAR_TYPES[type_name])
+        default = getattr(slot.defaultValue, type_name)
+
+        return slot.offset * dtype.itemsize, dtype, default
+
+    def pointer(self, name):
+        """ Returns the index of a pointer field in the pointer section. """
+        slot = self.field(name)
+        assert slot.type.which() in ('struct', 'list', 'text'), name
+        return slot.offset
+
+    def child(self, name):
+        """ Returns layout of a struct field, or of a struct list elements. """
+        schema = self.schema.fields[name].schema
+        if self.field(name).type.which() == 'list':
+            schema = schema.elementType
+
+        return StructLayout(schema)
+
+    def supports(self, scalars, pointers):
+        """ Returns True if the named fields can be written by this module. """
+        for name in scalars:
+            if name not in self.schema.fields:
+                return False
+
+            slot = self.field(name)
+            if slot.type.which() not in SCALAR_TYPES:
+                return False
+
+        for name in pointers:
+            if name not in self.schema.fields:
+                return False
+
+            if self.field(name).type.which() not in ('struct', 'list', 'text'):
+                return False
+
+        return True
+
+
+def encode_offsets(pointer_words, target_words):
+    """ Returns the 30 bit offset field of pointers, shifted into place. """
+    offsets = np.asarray(target_words, dtype=np.int64) - \
+        (np.asarray(pointer_words, dtype=np.int64) + 1)
+    assert len(offsets) == 0 or (
+        offsets.min() >= -MAX_POINTER_OFFSET
+        and offsets.max() <= MAX_POINTER_OFFSET
+    )
+
+    return (offsets & 0x3fffffff).astype(np.uint64) << np.uint64(2)
+
+
+def struct_pointers(pointer_words, target_words, layout):
+    """ Encodes struct pointers located at pointer_words to target_words. """
+    return encode_offsets(pointer_words, target_words) | np.uint64(
+        POINTER_STRUCT | (layout.data_words << 32)
+        | (layout.pointer_count << 48)
+    )
+
+
+def list_pointers(pointer_words, target_words, element_size, counts):
+    """ Encodes list pointers located at pointer_words to target_words. """
+    return encode_offsets(
+        pointer_words, target_words
+    ) | np.uint64(POINTER_LIST | (element_size << 32)) | (
+        np.asarray(counts).astype(np.uint64) << np.uint64(35)
+    )
+
+
+def composite_tag(layout, count):
+    """ Returns the tag word of a composite (struct) list. """
+    return np.uint64(
+        (count << 2) | (layout.data_words << 32)
+        | (layout.pointer_count << 48)
+    )
+
+
+class SegmentBuilder(object):
+    """ Builds one message segment as a numpy array of words. """
+
+    def __init__(self):
+        self.size = 0
+
+    def allocate(self, words):
+        """ Reserve words, returns index of the first word. """
+        start = self.size
+        self.size += words
+        return start
+
+    def finish(self):
+        self.words = np.zeros(self.size, dtype=np.uint64)
+        self.data = self.words.view(np.uint8)
+        return self.words
+
+    def set_words(self, word_idx, values):
+        self.words[word_idx] = values
+
+    def set_scalar(self, base_words, stride_words, layout, name, values):
+        """ Sets field name of the structs at base_words + n * stride_words. """
+        if len(values) == 0:
+            return
+
+        byte_offset, dtype, default = layout.scalar(name)
+        column = np.ndarray(
+            shape=(len(values), ),
+            dtype=dtype,
+            buffer=self.data,
+            offset=base_words * 8 + byte_offset,
+            strides=(stride_words * 8, )
+        )
+        values = np.asarray(values).astype(dtype)
+
+        if default:
+            # Non-zero defaults are XORed into the stored value.
+            default_bits = np.array([default], dtype=dtype).view(
+                'u{}'.format(dtype.itemsize)
+            )
+            values = (
+                values.view('u{}'.format(dtype.itemsize)) ^ default_bits
+            ).view(dtype)
+
+        column[:] = values
+
+
+class TextTable(object):
+    """ Deduplicated table of Text values placed in a segment. """
+
+    def __init__(self):
+        self.ids = {}
+        self.encoded = []
+
+    def add(self, s):
+        text_id = self.ids.get(s)
+        if text_id is None:
+            text_id = len(self.encoded)
+            self.ids[s] = text_id
+            self.encoded.append(s.encode('utf-8') + b'\0')
+
+        return text_id
+
+    def allocate(self, segment):
+        lengths = np.fromiter(
+            (len(b) for b in self.encoded),
+            dtype=np.int64,
+            count=len(self.encoded)
+        )
+        words = (lengths + 7) // 8
+
+        self.lengths = lengths
+        self.start = segment.allocate(int(words.sum()))
+        self.text_words = self.start + np.concatenate(
+            ([0], np.cumsum(words)[:-1])
+        ).astype(np.int64)
+
+    def write(self, segment):
+        if not self.encoded:
+            return
+
+        blob = b''.join(b + b'\0' * (-len(b) % 8) for b in self.encoded)
+        segment.data[self.start * 8:self.start * 8 + len(blob)] = \
+            np.frombuffer(blob, dtype=np.uint8)
+
+    def pointers(self, pointer_words, text_ids):
+        return list_pointers(
+            pointer_words, self.text_words[text_ids], LIST_BYTE,
+            self.lengths[text_ids]
+        )
+
+
+class MetadataWriter(object):
+    """ Lays out MetadataType structs for the entries of a list. """
+
+    def __init__(self, metadata_layout, metadata, texts):
+        self.layout = metadata_layout
+        self.meta_layout = metadata_layout.child('metas')
+        self.index = np.asarray(metadata.index, dtype=np.int64)
+
+        self.name_ids = np.fromiter(
+            (texts.add(name) for name in metadata.name),
+            dtype=np.int64,
+            count=len(metadata.name)
+        )
+        self.value_ids = np.fromiter(
+            (texts.add(value) for value in metadata.value),
+            dtype=np.int64,
+            count=len(metadata.value)
+        )
+
+        # Entries with metadata and number of metas for each of them.
+        self.entries, self.first_meta, self.counts = np.unique(
+            self.index, return_index=True, return_counts=True
+        )
+        assert np.all(np.diff(self.index) >= 0), \
+            'Metadata must be grouped by index'
+
+    def allocate(self, segment):
+        """ Reserve MetadataType structs, list tags and Meta structs. """
+        num_entries = len(self.entries)
+        self.struct_start = segment.allocate(num_entries * self.layout.words)
+
+        # Each list is a tag word followed by its Meta structs.
+        list_words = 1 + self.counts * self.meta_layout.words
+        self.list_start = segment.allocate(int(list_words.sum()))
+        self.list_tags = self.list_start + np.concatenate(
+            ([0], np.cumsum(list_words)[:-1])
+        ).astype(np.int64)
+
+    def write(self, segment, pointer_words, texts):
+        """ Write metadata, pointer_words are the entries' metadata pointers. """
+        if len(self.entries) == 0:
+            return
+
+        struct_words = self.struct_start + np.arange(
+            len(self.entries), dtype=np.int64
+        ) * self.layout.words
+
+        segment.set_words(
+            pointer_words[self.entries],
+            struct_pointers(
+                pointer_words[self.entries], struct_words, self.layout
+            )
+        )
+
+        metas_pointers = struct_words + self.layout.data_words + \
+            self.layout.pointer('metas')
+        segment.set_words(
+            metas_pointers,
+            list_pointers(
+                metas_pointers, self.list_tags, LIST_COMPOSITE,
+                self.counts * self.meta_layout.words
+            )
+        )
+        segment.set_words(
+            self.list_tags, [
+                composite_tag(self.meta_layout, int(count))
+                for count in self.counts
+            ]
+        )
+
+        # Position of every meta within its list.
+        entry_of_meta = np.repeat(np.arange(len(self.entries)), self.counts)
+        position = np.arange(len(self.index)) - self.first_meta[entry_of_meta]
+        meta_words = self.list_tags[entry_of_meta] + 1 + \
+            position * self.meta_layout.words
+
+        meta_pointers = meta_words + self.meta_layout.data_words
+        name_pointers = meta_pointers + self.meta_layout.pointer('name')
+        value_pointers = meta_pointers + self.meta_layout.pointer('value')
+        segment.set_words(
+            name_pointers, texts.pointers(name_pointers, self.name_ids)
+        )
+        segment.set_words(
+            value_pointers, texts.pointers(value_pointers, self.value_ids)
+        )
+
+
+def can_write_edges(rr_graph_schema):
+    """ Returns True if the schema edge layout is supported. """
+    edge = StructLayout(rr_graph_schema.RrEdges.schema).child('edges')
+    return edge.supports(('srcNode', 'sinkNode', 'switchId'), ('metadata', ))
+
+
+def can_write_nodes(rr_graph_schema):
+    """ Returns True if the schema node layout is supported. """
+    node = StructLayout(rr_graph_schema.RrNodes.schema).child('nodes')
+    if not node.supports(('id', 'type', 'capacity', 'direction'),
+                         ('loc', 'timing', 'segment', 'metadata')):
+        return False
+
+    return node.child('loc').supports(
+        ('ptc', 'side', 'xlow', 'ylow', 'xhigh', 'yhigh'), ()
+    ) and node.child('timing').supports(('r', 'c'), (
+    )) and node.child('segment').supports(('segmentId', ), ())
+
+
+def remap_nodes(node_remap, node_ids):
+    """ Applies node_remap to an array of node ids.
+
+    node_remap is None, a function or an array indexed by node id.
+
+    """
+    if node_remap is None:
+        return node_ids
+
+    if isinstance(node_remap, np.ndarray):
+        return node_remap[node_ids]
+
+    return np.fromiter(
+        (node_remap(node_id) for node_id in node_ids.tolist()),
+        dtype=np.int64,
+        count=len(node_ids)
+    )
+
+
+def list_holder_segment(holder_layout, list_field, element_layout, count):
+    """ Starts a segment holding a struct with one struct list field.
+
+    Returns the segment, the first element word and the landing pad contents.
+
+    """
+    assert count * element_layout.words < 2**29, 'List too large'
+
+    segment = SegmentBuilder()
+    pad = segment.allocate(1)
+    holder = segment.allocate(holder_layout.words)
+    tag = segment.allocate(1)
+    elements = segment.allocate(count * element_layout.words)
+
+    def finish():
+        segment.finish()
+        segment.set_words(
+            np.array([pad]),
+            struct_pointers(
+                np.array([pad]), np.array([holder]), holder_layout
+            )
+        )
+        list_pointer = holder + holder_layout.data_words + \
+            holder_layout.pointer(list_field)
+        segment.set_words(
+            np.array([list_pointer]),
+            list_pointers(
+                np.array([list_pointer]), np.array([tag]), LIST_COMPOSITE,
+                np.array([count * element_layout.words])
+            )
+        )
+        segment.set_words(tag, composite_tag(element_layout, count))
+
+    return segment, elements, finish
+
+
+def build_edge_segment(rr_graph_schema, edges, node_remap=None):
+    """ Lays out RrEdges for EdgeColumns edges, returns a SegmentBuilder. """
+    holder_layout = StructLayout(rr_graph_schema.RrEdges.schema)
+    layout = holder_layout.child('edges')
+    count = len(edges.src_node)
+
+    segment, elements, finish = list_holder_segment(
+        holder_layout, 'edges', layout, count
+    )
+
+    texts = TextTable()
+    metadata = MetadataWriter(layout.child('metadata'), edges.metadata, texts)
+    metadata.allocate(segment)
+    texts.allocate(segment)
+    finish()
+
+    segment.set_scalar(
+        elements, layout.words, layout, 'srcNode',
+        remap_nodes(node_remap, np.asarray(edges.src_node))
+    )
+    segment.set_scalar(
+        elements, layout.words, layout, 'sinkNode',
+        remap_nodes(node_remap, np.asarray(edges.sink_node))
+    )
+    segment.set_scalar(
+        elements, layout.words, layout, 'switchId', edges.switch_id
+    )
+
+    element_words = elements + np.arange(count, dtype=np.int64) * layout.words
+    metadata.write(
+        segment,
+        element_words + layout.data_words + layout.pointer('metadata'), texts
+    )
+    texts.write(segment)
+
+    return segment
+
+
+def build_node_segment(rr_graph_schema, nodes, enum_tables, node_remap=None):
+    """ Lays out RrNodes for NodeColumns nodes, returns a SegmentBuilder.
+
+    enum_tables are the enum_table's of the node type, node direction and
+    loc side enums.
+
+    """
+    node_types, node_directions, loc_sides = enum_tables
+
+    holder_layout = StructLayout(rr_graph_schema.RrNodes.schema)
+    layout = holder_layout.child('nodes')
+    loc_layout = layout.child('loc')
+    timing_layout = layout.child('timing')
+    segment_layout = layout.child('segment')
+    count = len(nodes.id)
+
+    segment, elements, finish = list_holder_segment(
+        holder_layout, 'nodes', layout, count
+    )
+
+    timing_r = np.asarray(nodes.timing_r)
+    has_timing = np.flatnonzero(~np.isnan(timing_r))
+    segment_id = np.asarray(nodes.segment_id)
+    has_segment = np.flatnonzero(segment_id >= 0)
+
+    locs = segment.allocate(count * loc_layout.words)
+    timings = segment.allocate(len(has_timing) * timing_layout.words)
+    segments = segment.allocate(len(has_segment) * segment_layout.words)
+
+    texts = TextTable()
+    metadata = MetadataWriter(layout.child('metadata'), nodes.metadata, texts)
+    metadata.allocate(segment)
+    texts.allocate(segment)
+    finish()
+
+    element_words = elements + np.arange(count, dtype=np.int64) * layout.words
+    pointer_words = element_words + layout.data_words
+
+    def set_node(name, values):
+        segment.set_scalar(elements, layout.words, layout, name, values)
+
+    set_node('id', remap_nodes(node_remap, np.asarray(nodes.id)))
+    set_node('type', lookup_enum(node_types, nodes.type, 0))
+    set_node(
+        'direction',
+        lookup_enum(
+            node_directions, nodes.direction,
+            layout.scalar('direction')[2]
+        )
+    )
+    set_node('capacity', nodes.capacity)
+
+    # Node locations
+    loc_words = locs + np.arange(count, dtype=np.int64) * loc_layout.words
+    loc_pointers = pointer_words + layout.pointer('loc')
+    segment.set_words(
+        loc_pointers, struct_pointers(loc_pointers, loc_words, loc_layout)
+    )
+
+    def set_loc(name, values):
+        segment.set_scalar(locs, loc_layout.words, loc_layout, name, values)
+
+    set_loc('ptc', nodes.ptc)
+    set_loc(
+        'side',
+        lookup_enum(loc_sides, nodes.side,
+                    loc_layout.scalar('side')[2])
+    )
+    set_loc('xhigh', nodes.x_high)
+    set_loc('xlow', nodes.x_low)
+    set_loc('yhigh', nodes.y_high)
+    set_loc('ylow', nodes.y_low)
+
+    # Node timing
+    timing_words = timings + np.arange(
+        len(has_timing), dtype=np.int64
+    ) * timing_layout.words
+    timing_pointers = pointer_words[has_timing] + layout.pointer('timing')
+    segment.set_words(
+        timing_pointers,
+        struct_pointers(timing_pointers, timing_words, timing_layout)
+    )
+    segment.set_scalar(
+        timings, timing_layout.words, timing_layout, 'c',
+        np.asarray(nodes.timing_c)[has_timing]
+    )
+    segment.set_scalar(
+        timings, timing_layout.words, timing_layout, 'r', timing_r[has_timing]
+    )
+
+    # Node segment
+    segment_words = segments + np.arange(
+        len(has_segment), dtype=np.int64
+    ) * segment_layout.words
+    segment_pointers = pointer_words[has_segment] + layout.pointer('segment')
+    segment.set_words(
+        segment_pointers,
+        struct_pointers(segment_pointers, segment_words, segment_layout)
+    )
+    segment.set_scalar(
+        segments, segment_layout.words, segment_layout, 'segmentId',
+        segment_id[has_segment]
+    )
+
+    metadata.write(segment, pointer_words + layout.pointer('metadata'), texts)
+    texts.write(segment)
+
+    return segment
+
+
+def root_struct_location(segments):
+    """ Returns (segment index, word index) of the message root struct. """
+    root_pointer = int(segments[0][0])
+    kind = root_pointer & 3
+
+    if kind == POINTER_FAR:
+        assert (root_pointer >> 2) & 1 == 0, 'Double far root pointer'
+        segment_idx = root_pointer >> 32
+        pad_word = (root_pointer >> 3) & 0x1fffffff
+        pad = int(segments[segment_idx][pad_word])
+        assert pad & 3 == POINTER_STRUCT
+        offset = ((pad >> 2) & 0x3fffffff)
+        offset -= (offset & 0x20000000) << 1
+        return segment_idx, pad_word + 1 + offset
+
+    assert kind == POINTER_STRUCT
+    offset = ((root_pointer >> 2) & 0x3fffffff)
+    offset -= (offset & 0x20000000) << 1
+    return 0, 1 + offset
+
+
+def write_message(f, root, root_layout, extra_segments):
+    """ Writes message root to f, attaching segments to unset root fields.
+
+    extra_segments is a list of (field name, SegmentBuilder).  Each
+    SegmentBuilder starts with a landing pad to the struct placed in it.
+
+    """
+    segments = [
+        np.frombuffer(segment, dtype=np.uint64).copy()
+        for segment in root.to_segments()
+    ]
+
+    root_segment, root_word = root_struct_location(segments)
+
+    extra_words = []
+    for field, extra in extra_segments:
+        pointer_word = root_word + root_layout.data_words + \
+            root_layout.pointer(field)
+        assert segments[root_segment][pointer_word] == 0, \
+            '{} must not be set in the message'.format(field)
+
+        # Single far pointer to the landing pad at word 0.
+        segment_idx = len(segments) + len(extra_words)
+        segments[root_segment][pointer_word] = POINTER_FAR | (
+            segment_idx << 32
+        )
+        extra_words.append(extra.words)
+
+    all_segments = segments + extra_words
+
+    # Stream framing: segment count - 1, segment sizes, padded to a word.
+    header = np.zeros((len(all_segments) + 2) // 2 * 2, dtype=np.uint32)
+    header[0] = len(all_segments) - 1
+    for idx, words in enumerate(all_segments):
+        assert len(words) < 2**32
+        header[idx + 1] = len(words)
+
+    f.write(header.tobytes())
+    for words in all_segments:
+        f.write(memoryview(words).cast('B'))
@@ -2,10 +2,13 @@ import os.path
 import re
 from lib.rr_graph import graph2
 from lib.rr_graph import tracks
+from lib.rr_graph_capnp import columnar
+from lib.rr_graph_capnp import mapped
 import gc
 
 import capnp
 import capnp.lib.capnp
+import numpy as np
 capnp.remove_import_hook()
 
 CAMEL_CASE_CAPITALS = re.compile('([A-Z]+)')
@@ -202,6 +205,309 @@ def read_edge(edge):
     )
 
 
+def read_mapped_enum(structs, name, enum_type):
+    return [enum_from_string(enum_type, s) for s in structs.enum_names(name)]
+
+
+def read_mapped_metadata(structs):
+    """ Returns metadata of each mapped.StructArray struct, see read_metadata.
+    """
+    index, metas = structs.struct('metadata').list('metas')
+
+    metadata = [None] * len(structs)
+    for idx, name, value in zip(index.tolist(), metas.text('name'),
+                                metas.text('value')):
+        if metadata[idx] is None:
+            metadata[idx] = []
+        metadata[idx].append((name, value))
+
+    return metadata
+
+
+def read_mapped_switches(switches):
+    timing = switches.struct('timing')
+    sizing = switches.struct('sizing')
+
+    return [
+        graph2.Switch(
+            id=switch_id,
+            name=name,
+            type=switch_type,
+            timing=graph2.SwitchTiming(
+                r=r,
+                c_in=c_in,
+                c_out=c_out,
+                c_internal=c_internal,
+                t_del=t_del,
+            ),
+            sizing=graph2.SwitchSizing(
+                buf_size=buf_size,
+                mux_trans_size=mux_trans_size,
+            ),
+        ) for (
+            switch_id, name, switch_type, r, c_in, c_out, c_internal, t_del,
+            buf_size, mux_trans_size
+        ) in zip(
+            switches.scalar('id').tolist(),
+            switches.text('name'),
+            read_mapped_enum(switches, 'type', graph2.SwitchType),
+            timing.scalar('r').tolist(),
+            timing.scalar('cin').tolist(),
+            timing.scalar('cout').tolist(),
+            timing.scalar('cinternal').tolist(),
+            timing.scalar('tdel').tolist(),
+            sizing.scalar('bufSize').tolist(),
+            sizing.scalar('muxTransSize').tolist(),
+        )
+    ]
+
+
+def read_mapped_segments(segments):
+    timing = segments.struct('timing')
+
+    return [
+        graph2.Segment(
+            id=segment_id,
+            name=name,
+            timing=graph2.SegmentTiming(
+                r_per_meter=r_per_meter,
+                c_per_meter=c_per_meter,
+            )
+        ) for segment_id, name, r_per_meter, c_per_meter in zip(
+            segments.scalar('id').tolist(),
+            segments.text('name'),
+            timing.scalar('rPerMeter').tolist(),
+            timing.scalar('cPerMeter').tolist(),
+        )
+    ]
+
+
+def read_mapped_block_types(block_types):
+    class_index, pin_classes = block_types.list('pinClasses')
+    pin_index, pins = pin_classes.list('pins')
+
+    pin_class_pins = [[] for _ in range(len(pin_classes))]
+    for idx, ptc, name in zip(pin_index.tolist(), pins.scalar('ptc').tolist(),
+                              pins.text('value')):
+        pin_class_pins[idx].append(graph2.Pin(ptc=ptc, name=name))
+
+    block_type_pin_classes = [[] for _ in range(len(block_types))]
+    for idx, pin_type, pin in zip(class_index.tolist(), read_mapped_enum(
+            pin_classes, 'type', graph2.PinType), pin_class_pins):
+        block_type_pin_classes[idx].append(
+            graph2.PinClass(type=pin_type, pin=pin)
+        )
+
+    return [
+        graph2.BlockType(
+            id=block_type_id,
+            name=name,
+            width=width,
+            height=height,
+            pin_class=pin_class,
+        ) for block_type_id, name, width, height, pin_class in zip(
+            block_types.scalar('id').tolist(),
+            block_types.text('name'),
+            block_types.scalar('width').tolist(),
+            block_types.scalar('height').tolist(),
+            block_type_pin_classes,
+        )
+    ]
+
+
+def read_mapped_grid(grid_locs):
+    return [
+        graph2.GridLoc(
+            x=x,
+            y=y,
+            block_type_id=block_type_id,
+            width_offset=width_offset,
+            height_offset=height_offset,
+        ) for x, y, block_type_id, width_offset, height_offset in zip(
+            grid_locs.scalar('x').tolist(),
+            grid_locs.scalar('y').tolist(),
+            grid_locs.scalar('blockTypeId').tolist(),
+            grid_locs.scalar('widthOffset').tolist(),
+            grid_locs.scalar('heightOffset').tolist(),
+        )
+    ]
+
+
+def read_mapped_nodes(nodes):
+    """ Returns graph2.Node of each mapped node, see read_node. """
+    loc = nodes.struct('loc')
+    timing = nodes.struct('timing')
+
+    return [
+        graph2.Node(
+            id=node_id,
+            type=node_type,
+            direction=direction,
+            capacity=capacity,
+            loc=graph2.NodeLoc(
+                x_low=x_low,
+                y_low=y_low,
+                x_high=x_high,
+                y_high=y_high,
+                ptc=ptc,
+                side=side,
+            ),
+            timing=graph2.NodeTiming(r=r, c=c),
+            metadata=None,
+            segment=graph2.NodeSegment(segment_id=segment_id),
+        ) for (
+            node_id, node_type, direction, capacity, x_low, y_low, x_high,
+            y_high, ptc, side, r, c, segment_id
+        ) in zip(
+            nodes.scalar('id').tolist(),
+            read_mapped_enum(nodes, 'type', graph2.NodeType),
+            read_mapped_enum(nodes, 'direction', graph2.NodeDirection),
+            nodes.scalar('capacity').tolist(),
+            loc.scalar('xlow').tolist(),
+            loc.scalar('ylow').tolist(),
+            loc.scalar('xhigh').tolist(),
+            loc.scalar('yhigh').tolist(),
+            loc.scalar('ptc').tolist(),
+            read_mapped_enum(loc, 'side', tracks.Direction),
+            timing.scalar('r').tolist(),
+            timing.scalar('c').tolist(),
+            nodes.struct('segment').scalar('segmentId').tolist(),
+        )
+    ]
+
+
+def read_mapped_enum_values(structs, name, enum_type):
+    """ Returns array of enum_type values of an enum field, -1 for None. """
+    enumerants = structs.layout.schema.fields[name].schema.enumerants
+    table = np.full(max(enumerants.values()) + 1, -1, dtype=np.int64)
+    for s, ordinal in enumerants.items():
+        e = enum_from_string(enum_type, s)
+        if e is not None:
+            table[ordinal] = e.value
+
+    return table[structs.scalar(name)]
+
+
+def read_mapped_node_store(nodes):
+    """ Returns graph2.NodeStore of the mapped nodes, with new ids.
+
+    This is equivalent to read_mapped_nodes with new ids 0 .. len(nodes) - 1,
+    without creating a graph2.Node for each node.
+    """
+    loc = nodes.struct('loc')
+    timing = nodes.struct('timing')
+
+    node_store = graph2.NodeStore()
+    node_store.extend_columns(
+        type=read_mapped_enum_values(nodes, 'type', graph2.NodeType),
+        direction=read_mapped_enum_values(
+            nodes, 'direction', graph2.NodeDirection
+        ),
+        capacity=nodes.scalar('capacity'),
+        ptc=loc.scalar('ptc'),
+        side=read_mapped_enum_values(loc, 'side', tracks.Direction),
+        x_low=loc.scalar('xlow'),
+        y_low=loc.scalar('ylow'),
+        x_high=loc.scalar('xhigh'),
+        y_high=loc.scalar('yhigh'),
+        timing_r=timing.scalar('r'),
+        timing_c=timing.scalar('c'),
+        segment_id=nodes.struct('segment').scalar('segmentId'),
+    )
+
+    return node_store
+
+
+def read_mapped_edges(edges):
+    """ Returns graph2.Edge of each mapped edge, see read_edge. """
+    return [
+        graph2.Edge(
+            src_node=src_node,
+            sink_node=sink_node,
+            switch_id=switch_id,
+            metadata=metadata,
+        ) for src_node, sink_node, switch_id, metadata in zip(
+            edges.scalar('srcNode').tolist(),
+            edges.scalar('sinkNode').tolist(),
+            edges.scalar('switchId').tolist(),
+            read_mapped_metadata(edges),
+        )
+    ]
+
+
+def graph_from_mapped_capnp(
+        rr_graph_schema,
+        input_file_name,
+        progressbar=None,
+        filter_nodes=True,
+        load_edges=False,
+        rebase_nodes=False,
+):
+    """
+    Loads the same information as graph_from_capnp, using a memory mapped
+    reader.
+
+    Nodes and edges are decoded field by field for the whole list.  If nodes
+    are rebased, they are returned as a graph2.NodeStore, otherwise only the
+    nodes kept are converted to graph2.Node.  No capnp objects are created
+    while reading, so no leak cleanup is needed.
+    """
+    if rebase_nodes:
+        assert not load_edges
+
+    if progressbar is None:
+        progressbar = lambda x: x  # noqa: E731
+
+    with mapped.Message(input_file_name) as message:
+        graph = message.root(rr_graph_schema.RrGraph.schema)
+
+        root_attrib = {
+            'tool_comment': graph.text('toolComment')[0],
+            'tool_name': graph.text('toolName')[0],
+            'tool_version': graph.text('toolVersion')[0],
+        }
+
+        switches = read_mapped_switches(
+            graph.struct('switches').list('switches')[1]
+        )
+        segments = read_mapped_segments(
+            graph.struct('segments').list('segments')[1]
+        )
+        block_types = read_mapped_block_types(
+            graph.struct('blockTypes').list('blockTypes')[1]
+        )
+        grid = read_mapped_grid(graph.struct('grid').list('gridLocs')[1])
+
+        all_nodes = graph.struct('rrNodes').list('nodes')[1]
+        if filter_nodes:
+            enumerants = rr_graph_schema.NodeType.schema.enumerants
+            pin_types = [
+                enumerants[name]
+                for name in ['source', 'sink', 'opin', 'ipin']
+            ]
+            keep = np.isin(all_nodes.scalar('type'), pin_types)
+            all_nodes = all_nodes[np.flatnonzero(keep)]
+
+        if rebase_nodes:
+            nodes = read_mapped_node_store(all_nodes)
+        else:
+            nodes = list(progressbar(read_mapped_nodes(all_nodes)))
+
+        edges = []
+        if load_edges:
+            edges = read_mapped_edges(graph.struct('rrEdges').list('edges')[1])
+
+        return dict(
+            root_attrib=root_attrib,
+            switches=switches,
+            segments=segments,
+            block_types=block_types,
+            grid=grid,
+            nodes=nodes,
+            edges=edges
+        )
+
+
 def graph_from_capnp(
         rr_graph_schema,
         input_file_name,
@@ -209,11 +515,24 @@ def graph_from_capnp(
         filter_nodes=True,
         load_edges=False,
         rebase_nodes=False,
+        mmap=False,
 ):
     """
     Loads relevant information about the routing resource graph from an capnp
     file.
+
+    If mmap is set, the file is read with graph_from_mapped_capnp.
     """
+    if mmap:
+        return graph_from_mapped_capnp(
+            rr_graph_schema=rr_graph_schema,
+            input_file_name=input_file_name,
+            progressbar=progressbar,
+            filter_nodes=filter_nodes,
+            load_edges=load_edges,
+            rebase_nodes=rebase_nodes,
+        )
+
     if rebase_nodes:
         assert not load_edges
 
@@ -285,6 +604,7 @@ class Graph(object):
             build_pin_edges=True,
             rebase_nodes=True,
             filter_nodes=True,
+            mmap=False,
     ):
         if progressbar is None:
             progressbar = lambda x: x  # noqa: E731
@@ -304,6 +624,7 @@ class Graph(object):
             progressbar=progressbar,
             filter_nodes=filter_nodes,
             rebase_nodes=rebase_nodes,
+            mmap=mmap,
         )
         graph_input['build_pin_edges'] = build_pin_edges
 
@@ -525,10 +846,18 @@ class Graph(object):
             nodes_obj,
             num_edges,
             edges_obj,
-            node_remap=lambda x: x
+            node_remap=None
     ):
         """
         Writes the routing graph to the capnp file.
+
+        nodes_obj and edges_obj are either iterables of nodes and edge tuples,
+        or columnar.NodeColumns and columnar.EdgeColumns.  nodes_obj may also
+        be a graph2.NodeStore.  If the schema
+        layout is supported, nodes and edges are laid out in bulk by the
+        columnar writer.
+
+        node_remap is a function or an array mapping node ids to output ids.
         """
 
         self.graph.check_ptc()
@@ -543,6 +872,23 @@ class Graph(object):
         self._write_segments(rr_graph)
         self._write_block_types(rr_graph)
         self._write_grid(rr_graph)
+
+        if columnar.can_write_nodes(self.rr_graph_schema) and \
+                columnar.can_write_edges(self.rr_graph_schema):
+            self._write_columnar(
+                rr_graph, num_nodes, nodes_obj, num_edges, edges_obj,
+                node_remap
+            )
+            return
+
+        assert not isinstance(nodes_obj, columnar.NodeColumns)
+        assert not isinstance(edges_obj, columnar.EdgeColumns)
+
+        if node_remap is None:
+            node_remap = lambda x: x  # noqa: E731
+        elif isinstance(node_remap, np.ndarray):
+            node_remap = node_remap.item
+
         self._write_nodes(rr_graph, num_nodes, nodes_obj, node_remap)
         self._write_edges(rr_graph, num_edges, edges_obj, node_remap)
 
@@ -550,6 +896,51 @@ class Graph(object):
         with open(self.output_file_name, "wb") as f:
             rr_graph.write(f)
 
+    def _write_columnar(
+            self, rr_graph, num_nodes, nodes, num_edges, edges, node_remap
+    ):
+        """ Lays out nodes and edges in bulk and writes the message. """
+        if isinstance(nodes, graph2.NodeStore):
+            nodes = columnar.node_store_columns(nodes)
+        elif not isinstance(nodes, columnar.NodeColumns):
+            nodes = columnar.nodes_to_columns(nodes, num_nodes)
+        assert len(nodes.id) == num_nodes, 'Unwritten nodes!'
+
+        enum_tables = (
+            columnar.enum_table(
+                self.rr_graph_schema.NodeType, graph2.NodeType, to_capnp_enum
+            ),
+            columnar.enum_table(
+                self.rr_graph_schema.NodeDirection, graph2.NodeDirection,
+                to_capnp_enum
+            ),
+            columnar.enum_table(
+                self.rr_graph_schema.LocSide, tracks.Direction, to_capnp_enum
+            ),
+        )
+        node_segment = columnar.build_node_segment(
+            self.rr_graph_schema, nodes, enum_tables, node_remap
+        )
+        del nodes
+
+        if not isinstance(edges, columnar.EdgeColumns):
+            edges = columnar.edges_to_columns(edges, num_edges)
+        assert len(edges.src_node) == num_edges, 'Unwritten edges!'
+
+        edge_segment = columnar.build_edge_segment(
+            self.rr_graph_schema, edges, node_remap
+        )
+        del edges
+
+        with open(self.output_file_name, "wb") as f:
+            columnar.write_message(
+                f, rr_graph,
+                columnar.StructLayout(self.rr_graph_schema.RrGraph.schema), [
+                    ('rrNodes', node_segment),
+                    ('rrEdges', edge_segment),
+                ]
+            )
+
     def add_switch(self, switch):
         """ Add switch into graph model.
 
@@ -0,0 +1,289 @@
+""" Memory mapped, lazily decoded reader for capnp messages.
+
+pycapnp creates one Python object per struct accessed, and file backed readers
+keep the input file alive through their _parent pointers (see
+graph2.cleanup_capnp_leak).  This module instead memory maps the message file
+and decodes the fields of whole struct lists at once into numpy arrays, using
+the struct layouts reported by the loaded schema.
+
+Only the pages actually read are loaded.  Nothing returned by this module
+refers to the mapping, except StructArray's themselves, which are only valid
+while their Message is open:
+
+    with Message(fname) as message:
+        rr_graph = message.root(schema.RrGraph.schema)
+        nodes = rr_graph.struct('rrNodes').list('nodes')[1]
+        node_ids = nodes.scalar('id')
+
+See https://capnproto.org/encoding.html for the encoding details.
+
+"""
+import mmap
+
+import numpy as np
+
+from .columnar import POINTER_FAR, LIST_BYTE, LIST_COMPOSITE, StructLayout
+
+
+def signed_offsets(pointers):
+    """ Returns the signed 30 bit offset field of pointers. """
+    offsets = ((pointers >> np.uint64(2)) & np.uint64(0x3fffffff)).astype(
+        np.int64
+    )
+    offsets -= (offsets & 0x20000000) << 1
+    return offsets
+
+
+def bit_field(values, shift, mask):
+    return ((values >> np.uint64(shift)) & np.uint64(mask)).astype(np.int64)
+
+
+class Message(object):
+    """ Read only capnp message file, memory mapped while open. """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.words = None
+
+    def __enter__(self):
+        self.file = open(self.file_name, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Stream framing: segment count - 1, segment sizes, padded to a word.
+        num_segments = int(np.frombuffer(self.map, np.uint32, count=1)[0]) + 1
+        sizes = np.frombuffer(
+            self.map, np.uint32, count=num_segments, offset=4
+        ).astype(np.int64)
+        header_words = (num_segments + 2) // 2
+
+        # All segments are contiguous, so word addresses are global.
+        self.words = np.frombuffer(self.map, np.uint64)
+        self.bytes = self.words.view(np.uint8)
+        self.segment_base = header_words + np.concatenate(
+            ([0], np.cumsum(sizes)[:-1])
+        ).astype(np.int64)
+        assert len(self.words) >= header_words + sizes.sum(), \
+            'Truncated message {}'.format(self.file_name)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Drop the views first, mmap cannot be closed while they exist.
+        self.words = None
+        self.bytes = None
+        self.map.close()
+        self.file.close()
+
+    def root(self, struct_schema):
+        """ Returns StructArray with the message root struct. """
+        return StructArray(
+            self, StructLayout(struct_schema),
+            *self.follow_pointers(self.segment_base[:1])
+        )
+
+    def follow_pointers(self, addrs):
+        """ Follows struct pointers at word addresses addrs.
+
+        Returns the struct addresses (-1 for null pointers), data and pointer
+        section sizes.
+
+        """
+        pointers, targets = self._resolve(addrs)
+        return (
+            targets, bit_field(pointers, 32, 0xffff),
+            bit_field(pointers, 48, 0xffff)
+        )
+
+    def follow_list_pointers(self, addrs):
+        """ Follows list pointers at word addresses addrs.
+
+        Returns the first element addresses (-1 for null pointers), element
+        size codes and element counts.  For composite lists the counts are
+        the number of words and the address is of the tag word.
+
+        """
+        pointers, targets = self._resolve(addrs)
+        return (
+            targets, bit_field(pointers, 32, 7),
+            (pointers >> np.uint64(35)).astype(np.int64)
+        )
+
+    def _far_targets(self, far_pointers):
+        """ Returns the addresses far pointers point to. """
+        segments = bit_field(far_pointers, 32, 0xffffffff)
+        return self.segment_base[segments] + bit_field(
+            far_pointers, 3, 0x1fffffff
+        )
+
+    def _resolve(self, addrs):
+        """ Returns pointers with far pointers resolved and their targets. """
+        addrs = np.asarray(addrs, dtype=np.int64)
+        if self.words is None:
+            raise ValueError('Message {} is closed'.format(self.file_name))
+
+        pointers = self.words[addrs]
+        origins = addrs.copy()
+
+        far = np.flatnonzero(
+            (pointers & np.uint64(3)) == np.uint64(POINTER_FAR)
+        )
+        if len(far):
+            far_pointers = pointers[far]
+            pads = self._far_targets(far_pointers)
+            double = bit_field(far_pointers, 2, 1) == 1
+            single_far = far[~double]
+            double_far = far[double]
+
+            # Single far: landing pad is a regular pointer to the target.
+            pointers[single_far] = self.words[pads[~double]]
+            origins[single_far] = pads[~double]
+
+            # Double far: landing pad is a far pointer to the target,
+            # followed by a tag word describing it.
+            starts = self._far_targets(self.words[pads[double]])
+            pointers[double_far] = self.words[pads[double] + 1]
+            origins[double_far] = starts - 1 - signed_offsets(
+                pointers[double_far]
+            )
+
+        targets = origins + 1 + signed_offsets(pointers)
+        targets[pointers == 0] = -1
+
+        return pointers, targets
+
+
+class StructArray(object):
+    """ Array of structs of one type, decoded field by field. """
+
+    def __init__(self, message, layout, addrs, data_words, pointer_counts):
+        self.message = message
+        self.layout = layout
+        self.addrs = np.asarray(addrs, dtype=np.int64)
+        self.data_words = np.asarray(data_words, dtype=np.int64)
+        self.pointer_counts = np.asarray(pointer_counts, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.addrs)
+
+    def __getitem__(self, idx):
+        """ Returns StructArray of the selected structs. """
+        if isinstance(idx, (int, np.integer)):
+            idx = [idx]
+
+        return StructArray(
+            self.message, self.layout, self.addrs[idx], self.data_words[idx],
+            self.pointer_counts[idx]
+        )
+
+    def scalar(self, name):
+        """ Returns array with the values of a scalar or enum field. """
+        byte_offset, dtype, default = self.layout.scalar(name)
+
+        values = np.full(len(self), default, dtype=dtype)
+        present = np.flatnonzero(
+            (self.addrs >= 0) &
+            (byte_offset + dtype.itemsize <= self.data_words * 8)
+        )
+        if len(present) == 0:
+            return values
+
+        if self.message.words is None:
+            raise ValueError(
+                'Message {} is closed'.format(self.message.file_name)
+            )
+
+        stored = self.message.bytes.view(dtype)[
+            (self.addrs[present] * 8 + byte_offset) // dtype.itemsize]
+        if default:
+            # Non-zero defaults are XORed into the stored value.
+            bits = 'u{}'.format(dtype.itemsize)
+            default_bits = np.array([default], dtype=dtype).view(bits)
+            stored = (stored.view(bits) ^ default_bits).view(dtype)
+
+        values[present] = stored
+        return values
+
+    def enum_names(self, name):
+        """ Returns list with the enumerant names of an enum field. """
+        enumerants = self.layout.schema.fields[name].schema.enumerants
+        names = {ordinal: s for s, ordinal in enumerants.items()}
+        return [names[ordinal] for ordinal in self.scalar(name).tolist()]
+
+    def _pointer_addrs(self, name):
+        """ Returns address of pointer field name, -1 where not present. """
+        idx = self.layout.pointer(name)
+        present = (self.addrs >= 0) & (idx < self.pointer_counts)
+        return np.where(present, self.addrs + self.data_words + idx, -1)
+
+    def _follow(self, follow, name):
+        addrs = self._pointer_addrs(name)
+        present = np.flatnonzero(addrs >= 0)
+        results = [np.full(len(self), -1, dtype=np.int64) for _ in range(3)]
+        for result, values in zip(results, follow(addrs[present])):
+            result[present] = values
+
+        return results
+
+    def struct(self, name):
+        """ Returns StructArray of a struct field.
+
+        Unset structs have address -1, their fields read as defaults.
+
+        """
+        addrs, data_words, pointer_counts = self._follow(
+            self.message.follow_pointers, name
+        )
+        return StructArray(
+            self.message, self.layout.child(name), addrs,
+            np.maximum(data_words, 0), np.maximum(pointer_counts, 0)
+        )
+
+    def list(self, name):
+        """ Returns the elements of a struct list field of every struct.
+
+        Returns (index, elements), where index is the struct index of each
+        element, in increasing order, and elements is a StructArray.
+
+        """
+        addrs, sizes, _ = self._follow(self.message.follow_list_pointers, name)
+        present = np.flatnonzero(addrs >= 0)
+        assert np.all(sizes[present] == LIST_COMPOSITE), name
+
+        # Each composite list starts with a tag word describing its elements.
+        counts = np.zeros(len(self), dtype=np.int64)
+        data_words = np.zeros(len(self), dtype=np.int64)
+        pointer_counts = np.zeros(len(self), dtype=np.int64)
+        tags = self.message.words[addrs[present]]
+        counts[present] = bit_field(tags, 2, 0x3fffffff)
+        data_words[present] = bit_field(tags, 32, 0xffff)
+        pointer_counts[present] = bit_field(tags, 48, 0xffff)
+
+        index = np.repeat(np.arange(len(self), dtype=np.int64), counts)
+        first = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        position = np.arange(len(index), dtype=np.int64) - first[index]
+        element_words = data_words + pointer_counts
+
+        return index, StructArray(
+            self.message, self.layout.child(name),
+            addrs[index] + 1 + position * element_words[index],
+            data_words[index], pointer_counts[index]
+        )
+
+    def text(self, name):
+        """ Returns list with the values of a Text field, '' if unset. """
+        addrs, sizes, counts = self._follow(
+            self.message.follow_list_pointers, name
+        )
+        assert np.all(sizes[addrs >= 0] == LIST_BYTE), name
+
+        data = self.message.bytes
+        texts = []
+        for addr, count in zip(addrs.tolist(), counts.tolist()):
+            if addr < 0:
+                texts.append('')
+            else:
+                # Text includes the NUL terminator.
+                start = addr * 8
+                texts.append(bytes(data[start:start + count - 1]).decode())
+
+        return texts
@@ -0,0 +1,207 @@
+import os
+import random
+import tempfile
+import unittest
+
+import capnp
+import numpy as np
+
+from lib.rr_graph import graph2
+from lib.rr_graph import tracks
+from .. import columnar
+from ..graph2 import Graph, to_capnp_enum
+
+SCHEMA = os.path.join(os.path.dirname(__file__), 'rr_graph_test.capnp')
+
+
+def random_nodes(rand, num_nodes):
+    node_types = [t for t in graph2.NodeType if t.value > 0]
+    directions = [None] + [d for d in graph2.NodeDirection if d.value > 0]
+    sides = [None] + [s for s in tracks.Direction if s.value > 0]
+
+    for node_id in range(num_nodes):
+        metadata = None
+        if rand.random() < 0.3:
+            metadata = [
+                graph2.NodeMetadata(
+                    name='name{}'.format(rand.randrange(3)),
+                    x_offset=0,
+                    y_offset=0,
+                    z_offset=0,
+                    value='value{}'.format(rand.randrange(100))
+                ) for _ in range(rand.randrange(4))
+            ]
+
+        timing = None
+        if rand.random() < 0.5:
+            timing = graph2.NodeTiming(r=rand.random(), c=rand.random())
+
+        segment = None
+        if rand.random() < 0.5:
+            segment = graph2.NodeSegment(segment_id=rand.randrange(5))
+
+        yield graph2.Node(
+            id=node_id,
+            type=rand.choice(node_types),
+            direction=rand.choice(directions),
+            capacity=rand.randrange(1, 3),
+            loc=graph2.NodeLoc(
+                x_low=rand.randrange(100),
+                y_low=rand.randrange(100),
+                x_high=rand.randrange(100),
+                y_high=rand.randrange(100),
+                side=rand.choice(sides),
+                ptc=rand.randrange(1000),
+            ),
+            timing=timing,
+            metadata=metadata,
+            segment=segment,
+        )
+
+
+def random_edges(rand, num_nodes, num_edges):
+    for _ in range(num_edges):
+        metadata = None
+        if rand.random() < 0.8:
+            metadata = [
+                ('fasm_features', 'TILE_{}.PIP'.format(rand.randrange(1000)))
+            ]
+
+        yield (
+            rand.randrange(num_nodes), rand.randrange(num_nodes),
+            rand.randrange(10), metadata
+        )
+
+
+class ColumnarTests(unittest.TestCase):
+    def setUp(self):
+        self.schema = capnp.load(SCHEMA)
+
+        # Only the schema is needed by the per object writers.
+        self.graph = Graph.__new__(Graph)
+        self.graph.rr_graph_schema = self.schema
+
+        fd, self.fname = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def new_message(self):
+        rr_graph = self.schema.RrGraph.new_message()
+        rr_graph.toolName = 'test'
+        rr_graph.toolComment = 'columnar'
+        return rr_graph
+
+    def read_message(self):
+        with open(self.fname, 'rb') as f:
+            return self.schema.RrGraph.read(
+                f, traversal_limit_in_words=2**63 - 1
+            ).to_dict()
+
+    def write_per_object(self, nodes, edges, node_remap):
+        rr_graph = self.new_message()
+        self.graph._write_nodes(rr_graph, len(nodes), nodes, node_remap)
+        self.graph._write_edges(rr_graph, len(edges), edges, node_remap)
+
+        with open(self.fname, 'wb') as f:
+            rr_graph.write(f)
+
+        return self.read_message()
+
+    def write_columnar(self, nodes, edges, node_remap):
+        enum_tables = (
+            columnar.enum_table(
+                self.schema.NodeType, graph2.NodeType, to_capnp_enum
+            ),
+            columnar.enum_table(
+                self.schema.NodeDirection, graph2.NodeDirection, to_capnp_enum
+            ),
+            columnar.enum_table(
+                self.schema.LocSide, tracks.Direction, to_capnp_enum
+            ),
+        )
+        if isinstance(nodes, graph2.NodeStore):
+            node_columns = columnar.node_store_columns(nodes)
+        else:
+            node_columns = columnar.nodes_to_columns(nodes, len(nodes))
+
+        node_segment = columnar.build_node_segment(
+            self.schema, node_columns, enum_tables, node_remap
+        )
+        edge_segment = columnar.build_edge_segment(
+            self.schema, columnar.edges_to_columns(edges, len(edges)),
+            node_remap
+        )
+
+        with open(self.fname, 'wb') as f:
+            columnar.write_message(
+                f, self.new_message(),
+                columnar.StructLayout(self.schema.RrGraph.schema), [
+                    ('rrNodes', node_segment),
+                    ('rrEdges', edge_segment),
+                ]
+            )
+
+        return self.read_message()
+
+    def check_graph(self, num_nodes, num_edges, node_remap=None):
+        rand = random.Random(num_nodes)
+        nodes = list(random_nodes(rand, num_nodes))
+        edges = list(random_edges(rand, num_nodes, num_edges))
+
+        expected = self.write_per_object(
+            nodes, edges, node_remap or (lambda x: x)
+        )
+        actual = self.write_columnar(nodes, edges, node_remap)
+
+        self.assertEqual(actual, expected)
+
+    def test_supported(self):
+        self.assertTrue(columnar.can_write_nodes(self.schema))
+        self.assertTrue(columnar.can_write_edges(self.schema))
+
+    def test_graph(self):
+        self.check_graph(num_nodes=500, num_edges=2000)
+
+    def test_node_remap(self):
+        self.check_graph(
+            num_nodes=100, num_edges=300, node_remap=lambda x: 1000 - x
+        )
+
+    def test_node_remap_array(self):
+        rand = random.Random(2)
+        nodes = list(random_nodes(rand, 100))
+        edges = list(random_edges(rand, 100, 300))
+        node_remap = np.arange(100)[::-1] * 2
+
+        expected = self.write_per_object(nodes, edges, node_remap.item)
+        actual = self.write_columnar(nodes, edges, node_remap)
+
+        self.assertEqual(actual, expected)
+
+    def test_node_store(self):
+        rand = random.Random(1)
+        nodes = list(random_nodes(rand, 200))
+        edges = list(random_edges(rand, 200, 500))
+
+        expected = self.write_per_object(nodes, edges, lambda x: x)
+        actual = self.write_columnar(graph2.NodeStore(nodes), edges, None)
+
+        self.assertEqual(actual, expected)
+
+    def test_empty(self):
+        self.check_graph(num_nodes=0, num_edges=0)
+
+    def test_unknown_enum(self):
+        table = columnar.enum_table(
+            self.schema.NodeDirection, graph2.NodeDirection, to_capnp_enum
+        )
+        with self.assertRaises(AssertionError):
+            columnar.lookup_enum(
+                table, [graph2.NodeDirection.NO_DIR.value], default=0
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+import random
+import tempfile
+import unittest
+
+import capnp
+
+from .. import mapped
+from ..graph2 import Graph, graph_from_capnp
+from .test_columnar import SCHEMA, random_edges, random_nodes
+
+
+class MappedTests(unittest.TestCase):
+    def setUp(self):
+        self.schema = capnp.load(SCHEMA)
+
+        # Only the schema is needed by the per object writers.
+        self.graph = Graph.__new__(Graph)
+        self.graph.rr_graph_schema = self.schema
+
+        rand = random.Random(0)
+        self.nodes = list(random_nodes(rand, 1000))
+        self.edges = list(random_edges(rand, 1000, 5000))
+
+        fd, self.fname = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def new_message(self):
+        rr_graph = self.schema.RrGraph.new_message()
+        rr_graph.toolComment = 'comment'
+        rr_graph.toolName = 'test'
+        rr_graph.toolVersion = '1.0'
+
+        switches = rr_graph.switches.init('switches', 3)
+        for idx, (switch, switch_type) in enumerate(zip(
+                switches, ['mux', 'short', 'passGate'])):
+            switch.id = idx
+            switch.name = 'switch{}'.format(idx)
+            switch.type = switch_type
+            switch.timing.r = 0.5 * idx
+            switch.timing.tdel = 1e-11 * idx
+            switch.sizing.bufSize = 2.5
+
+        segments = rr_graph.segments.init('segments', 2)
+        for idx, segment in enumerate(segments):
+            segment.id = idx
+            segment.name = 'segment{}'.format(idx)
+            segment.timing.rPerMeter = 0.25 * idx
+
+        block_types = rr_graph.blockTypes.init('blockTypes', 2)
+        for idx, block_type in enumerate(block_types):
+            block_type.id = idx
+            block_type.name = 'block{}'.format(idx)
+            block_type.width = 1
+            block_type.height = idx + 1
+
+            # First block type has no pin classes.
+            pin_classes = block_type.init('pinClasses', idx * 2)
+            for class_idx, pin_class in enumerate(pin_classes):
+                pin_class.type = ['input', 'output'][class_idx]
+                pins = pin_class.init('pins', class_idx + 1)
+                for ptc, pin in enumerate(pins):
+                    pin.ptc = ptc
+                    pin.value = 'block{}.pin{}'.format(idx, ptc)
+
+        grid_locs = rr_graph.grid.init('gridLocs', 4)
+        for idx, grid_loc in enumerate(grid_locs):
+            grid_loc.x = idx
+            grid_loc.y = idx // 2
+            grid_loc.blockTypeId = idx % 2
+            grid_loc.heightOffset = idx % 2
+
+        return rr_graph
+
+    def write_per_object(self):
+        rr_graph = self.new_message()
+        self.graph._write_nodes(
+            rr_graph, len(self.nodes), self.nodes, lambda x: x
+        )
+        self.graph._write_edges(
+            rr_graph, len(self.edges), self.edges, lambda x: x
+        )
+
+        with open(self.fname, 'wb') as f:
+            rr_graph.write(f)
+
+    def write_columnar(self):
+        self.graph.output_file_name = self.fname
+        self.graph._write_columnar(
+            self.new_message(), len(self.nodes), self.nodes, len(self.edges),
+            self.edges, None
+        )
+
+    def check_graph(self):
+        for kwargs in [
+                dict(filter_nodes=True, rebase_nodes=True),
+                dict(filter_nodes=False, load_edges=True),
+        ]:
+            expected = graph_from_capnp(self.schema, self.fname, **kwargs)
+            actual = graph_from_capnp(
+                self.schema, self.fname, mmap=True, **kwargs
+            )
+
+            # Rebased nodes are returned as a NodeStore.
+            actual['nodes'] = list(actual['nodes'])
+            self.assertEqual(actual, expected)
+
+        self.assertEqual(len(actual['nodes']), len(self.nodes))
+        self.assertEqual(len(actual['edges']), len(self.edges))
+
+    def test_per_object_graph(self):
+        self.write_per_object()
+        self.check_graph()
+
+    def test_columnar_graph(self):
+        self.write_columnar()
+        self.check_graph()
+
+    def test_closed_message(self):
+        self.write_per_object()
+
+        with mapped.Message(self.fname) as message:
+            rr_graph = message.root(self.schema.RrGraph.schema)
+            nodes = rr_graph.struct('rrNodes').list('nodes')[1]
+            node_ids = nodes.scalar('id')
+
+        self.assertEqual(node_ids.tolist(), list(range(len(self.nodes))))
+        with self.assertRaises(ValueError):
+            nodes.scalar('capacity')
+
+    def test_far_pointers(self):
+        self.write_columnar()
+
+        # The node and edge lists are in their own segments, behind far
+        # pointers from the root struct.
+        with mapped.Message(self.fname) as message:
+            self.assertEqual(len(message.segment_base), 3)
+
+            rr_graph = message.root(self.schema.RrGraph.schema)
+            edges = rr_graph.struct('rrEdges').list('edges')[1]
+            self.assertGreaterEqual(edges.addrs.min(), message.segment_base[2])
+            self.assertEqual(
+                edges.scalar('srcNode').tolist(),
+                [src_node for src_node, _, _, _ in self.edges]
+            )
+
+            metadata = edges.struct('metadata')
+            index, metas = metadata.list('metas')
+            self.assertEqual(
+                list(zip(index.tolist(), metas.text('value'))), [
+                    (idx, value)
+                    for idx, (_, _, _, meta) in enumerate(self.edges)
+                    for _, value in (meta or [])
+                ]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -54,225 +54,425 @@ def iterate_xml(xml_file, load_edges):
     root.clear()
 
 
-def graph_from_xml(
-        input_file_name, progressbar=None, filter_nodes=True, load_edges=False
-):
-    """
-    Loads relevant information about the routing resource graph from an XML
-    file.
+# Sections of the rr graph read by graph_from_xml, other than rr_edges.
+GRAPH_SECTIONS = ('switches', 'segments', 'block_types', 'grid', 'rr_nodes')
+
+NODE_TYPES = {e.name: e for e in graph2.NodeType}
+SIDES = {e.name: e for e in tracks.Direction}
+PIN_NODE_TYPES = (
+    graph2.NodeType.SOURCE,
+    graph2.NodeType.SINK,
+    graph2.NodeType.OPIN,
+    graph2.NodeType.IPIN,
+)
+
+
+class GraphXmlReader(object):
+    """ Streaming reader of the rr graph XML.
+
+    Only the end events of the elements of interest are reported by lxml.
+    Each element is dispatched on its (parent tag, tag) pair to a handler,
+    which stores its contents, and the element is then freed.  Reading stops
+    once all sections needed are read.
     """
 
-    if progressbar is None:
-        progressbar = lambda x: x  # noqa: E731
+    def __init__(self, filter_nodes, load_edges):
+        self.filter_nodes = filter_nodes
+        self.load_edges = load_edges
+
+        self.root_attrib = {}
+        self.switches = []
+        self.segments = []
+        self.block_types = []
+        self.grid = []
+        self.nodes = []
+        self.edges = []
+
+        self.switch_timing = None
+        self.switch_sizing = None
+        self.segment_timing = None
+        self.pins = []
+        self.pin_classes = []
+        self.node_loc = None
+        self.node_timing = None
+        self.node_segment = None
+
+        self.sections_left = set(GRAPH_SECTIONS)
+        if load_edges:
+            self.sections_left.add('rr_edges')
+
+        self.handlers = {
+            ('switch', 'timing'): self.read_switch_timing,
+            ('switch', 'sizing'): self.read_switch_sizing,
+            ('switches', 'switch'): self.read_switch,
+            ('segment', 'timing'): self.read_segment_timing,
+            ('segments', 'segment'): self.read_segment,
+            ('pin_class', 'pin'): self.read_pin,
+            ('block_type', 'pin_class'): self.read_pin_class,
+            ('block_types', 'block_type'): self.read_block_type,
+            ('grid', 'grid_loc'): self.read_grid_loc,
+            ('node', 'loc'): self.read_node_loc,
+            ('node', 'timing'): self.read_node_timing,
+            ('node', 'segment'): self.read_node_segment,
+            ('rr_nodes', 'node'): self.read_node,
+            ('rr_edges', 'edge'): self.read_edge,
+        }
 
-    root_attrib = {}
-    switches = []
-    segments = []
-    block_types = []
-    grid = []
-    nodes = []
-    edges = []
-
-    # Itertate over XML elements
-    switch_timing = None
-    switch_sizing = None
-    segment_timing = None
-    pins = []
-    pin_classes = []
-    node_loc = None
-    node_timing = None
-    node_segment = None
-
-    for path, element in progressbar(iterate_xml(input_file_name,
-                                                 load_edges=load_edges)):
-
-        # Root tag
-        if path == "" and element.tag == "rr_graph":
-            root_attrib = dict(element.attrib)
-
-        # Switch timing
-        if path == "rr_graph/switches/switch" and element.tag == "timing":
-            switch_timing = graph2.SwitchTiming(
-                r=float(element.attrib.get('R', 0)),
-                c_in=float(element.attrib.get('Cin', 0)),
-                c_out=float(element.attrib.get('Cout', 0)),
-                c_internal=float(element.attrib.get('Cinternal', 0)),
-                t_del=float(element.attrib.get('Tdel', 0)),
-            )
+        # Tags reported by lxml.
+        self.tags = set(tag for _, tag in self.handlers)
+        self.tags |= self.sections_left
+        if not load_edges:
+            self.tags.remove('edge')
 
-        # Switch sizing
-        if path == "rr_graph/switches/switch" and element.tag == "sizing":
-            switch_sizing = graph2.SwitchSizing(
-                mux_trans_size=float(element.attrib['mux_trans_size']),
-                buf_size=float(element.attrib['buf_size']),
-            )
+    def read(self, xml_file, progressbar):
+        doc = ET.iterparse(
+            xml_file, events=('end', ), tag=sorted(self.tags), huge_tree=True
+        )
 
-        # Switch
-        if path == "rr_graph/switches" and element.tag == "switch":
-            switches.append(
-                graph2.Switch(
-                    id=int(element.attrib['id']),
-                    type=enum_from_string(
-                        graph2.SwitchType, element.attrib['type']
-                    ),
-                    name=element.attrib['name'],
-                    timing=switch_timing,
-                    sizing=switch_sizing,
-                )
-            )
+        handlers = self.handlers
+        sections = GRAPH_SECTIONS + ('rr_edges', )
+        for _, element in progressbar(doc):
+            tag = element.tag
+            parent = element.getparent()
+            parent_tag = parent.tag
 
-            switch_timing = None
-            switch_sizing = None
+            if tag in sections:
+                # A section of the graph was read.
+                if not self.root_attrib:
+                    self.root_attrib = dict(parent.attrib)
 
-        # Segment timing
-        if path == "rr_graph/segments/segment" and element.tag == "timing":
-            segment_timing = graph2.SegmentTiming(
-                r_per_meter=float(element.get('R_per_meter', 0.0)),
-                c_per_meter=float(element.get('C_per_meter', 0.0)),
-            )
+                self.sections_left.discard(tag)
+                element.clear()
+                if not self.sections_left:
+                    break
 
-        # Segment
-        if path == "rr_graph/segments" and element.tag == "segment":
-            segments.append(
-                graph2.Segment(
-                    id=int(element.attrib['id']),
-                    name=element.attrib['name'],
-                    timing=segment_timing,
-                )
-            )
+                continue
 
-            segment_timing = None
+            handler = handlers.get((parent_tag, tag), None)
+            if handler is not None:
+                handler(element)
 
-        # Block type - pin
-        if path == "rr_graph/block_types/block_type/pin_class" and element.tag == "pin":
-            pins.append(
-                graph2.Pin(
-                    ptc=int(element.attrib['ptc']),
-                    name=element.text,
-                )
-            )
+            # Free the items of the sections once read, their children are
+            # freed with them.
+            if parent_tag in sections:
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    def read_switch_timing(self, element):
+        attrib = element.attrib
+        self.switch_timing = graph2.SwitchTiming(
+            r=float(attrib.get('R', 0)),
+            c_in=float(attrib.get('Cin', 0)),
+            c_out=float(attrib.get('Cout', 0)),
+            c_internal=float(attrib.get('Cinternal', 0)),
+            t_del=float(attrib.get('Tdel', 0)),
+        )
 
-        # Block type - pin_class
-        if path == "rr_graph/block_types/block_type" and element.tag == "pin_class":
-            pin_classes.append(
-                graph2.PinClass(
-                    type=enum_from_string(
-                        graph2.PinType, element.attrib['type']
-                    ),
-                    pin=pins,
-                )
-            )
+    def read_switch_sizing(self, element):
+        self.switch_sizing = graph2.SwitchSizing(
+            mux_trans_size=float(element.attrib['mux_trans_size']),
+            buf_size=float(element.attrib['buf_size']),
+        )
 
-            pins = []
-
-        # Block type
-        if path == "rr_graph/block_types" and element.tag == "block_type":
-            block_types.append(
-                graph2.BlockType(
-                    id=int(element.attrib['id']),
-                    name=element.attrib['name'],
-                    width=int(element.attrib['width']),
-                    height=int(element.attrib['height']),
-                    pin_class=pin_classes,
-                )
+    def read_switch(self, element):
+        self.switches.append(
+            graph2.Switch(
+                id=int(element.attrib['id']),
+                type=enum_from_string(
+                    graph2.SwitchType, element.attrib['type']
+                ),
+                name=element.attrib['name'],
+                timing=self.switch_timing,
+                sizing=self.switch_sizing,
             )
+        )
 
-            pin_classes = []
-
-        # Grid
-        if path == "rr_graph/grid" and element.tag == "grid_loc":
-            grid.append(
-                graph2.GridLoc(
-                    x=int(element.attrib['x']),
-                    y=int(element.attrib['y']),
-                    block_type_id=int(element.attrib['block_type_id']),
-                    width_offset=int(element.attrib['width_offset']),
-                    height_offset=int(element.attrib['height_offset']),
-                )
+        self.switch_timing = None
+        self.switch_sizing = None
+
+    def read_segment_timing(self, element):
+        self.segment_timing = graph2.SegmentTiming(
+            r_per_meter=float(element.get('R_per_meter', 0.0)),
+            c_per_meter=float(element.get('C_per_meter', 0.0)),
+        )
+
+    def read_segment(self, element):
+        self.segments.append(
+            graph2.Segment(
+                id=int(element.attrib['id']),
+                name=element.attrib['name'],
+                timing=self.segment_timing,
             )
+        )
 
-        # Node - loc
-        if path == "rr_graph/rr_nodes/node" and element.tag == "loc":
-            if 'side' in element.attrib:
-                side = enum_from_string(
-                    tracks.Direction, element.attrib['side']
-                )
-            else:
-                side = None
+        self.segment_timing = None
 
-            node_loc = graph2.NodeLoc(
-                x_low=int(element.attrib['xlow']),
-                y_low=int(element.attrib['ylow']),
-                x_high=int(element.attrib['xhigh']),
-                y_high=int(element.attrib['yhigh']),
+    def read_pin(self, element):
+        self.pins.append(
+            graph2.Pin(
                 ptc=int(element.attrib['ptc']),
-                side=side
+                name=element.text,
             )
+        )
 
-        # Node - timing
-        if path == "rr_graph/rr_nodes/node" and element.tag == "timing":
-            node_timing = graph2.NodeTiming(
-                r=float(element.attrib['R']),
-                c=float(element.attrib['C']),
+    def read_pin_class(self, element):
+        self.pin_classes.append(
+            graph2.PinClass(
+                type=enum_from_string(graph2.PinType, element.attrib['type']),
+                pin=self.pins,
             )
+        )
 
-        # Node - segment
-        if path == "rr_graph/rr_nodes/node" and element.tag == "segment":
-            node_segment = int(element.attrib['segment_id'])
+        self.pins = []
 
-        # Node
-        if path == "rr_graph/rr_nodes" and element.tag == "node":
-            node_type = enum_from_string(
-                graph2.NodeType, element.attrib['type']
+    def read_block_type(self, element):
+        self.block_types.append(
+            graph2.BlockType(
+                id=int(element.attrib['id']),
+                name=element.attrib['name'],
+                width=int(element.attrib['width']),
+                height=int(element.attrib['height']),
+                pin_class=self.pin_classes,
             )
+        )
 
-            if filter_nodes and node_type not in [
-                    graph2.NodeType.SOURCE, graph2.NodeType.SINK,
-                    graph2.NodeType.OPIN, graph2.NodeType.IPIN
-            ]:
-                continue
+        self.pin_classes = []
+
+    def read_grid_loc(self, element):
+        get = element.get
+        self.grid.append(
+            graph2.GridLoc(
+                x=int(get('x')),
+                y=int(get('y')),
+                block_type_id=int(get('block_type_id')),
+                width_offset=int(get('width_offset')),
+                height_offset=int(get('height_offset')),
+            )
+        )
 
-            # Dropping metadata for now
-            metadata = None
+    def read_node_loc(self, element):
+        get = element.get
+        side = get('side')
+
+        self.node_loc = graph2.NodeLoc(
+            x_low=int(get('xlow')),
+            y_low=int(get('ylow')),
+            x_high=int(get('xhigh')),
+            y_high=int(get('yhigh')),
+            ptc=int(get('ptc')),
+            side=SIDES[side.upper()] if side is not None else None,
+        )
+
+    def read_node_timing(self, element):
+        self.node_timing = graph2.NodeTiming(
+            r=float(element.get('R')),
+            c=float(element.get('C')),
+        )
+
+    def read_node_segment(self, element):
+        self.node_segment = graph2.NodeSegment(
+            segment_id=int(element.get('segment_id'))
+        )
 
-            nodes.append(
+    def read_node(self, element):
+        get = element.get
+        node_type = NODE_TYPES[get('type').upper()]
+
+        if not self.filter_nodes or node_type in PIN_NODE_TYPES:
+            # Dropping metadata for now
+            self.nodes.append(
                 graph2.Node(
-                    id=int(element.attrib['id']),
+                    id=int(get('id')),
                     type=node_type,
                     direction=graph2.NodeDirection.NO_DIR,
-                    capacity=int(element.attrib['capacity']),
-                    loc=node_loc,
-                    timing=node_timing,
-                    metadata=metadata,
-                    segment=node_segment,
+                    capacity=int(get('capacity')),
+                    loc=self.node_loc,
+                    timing=self.node_timing,
+                    metadata=None,
+                    segment=self.node_segment,
                 )
             )
 
-            node_loc = None
-            node_timing = None
-            node_segment = None
-
-        # Edge
-        if path == "rr_graph/rr_edges" and element.tag == "edge":
-            if load_edges:
-                edges.append(
-                    graph2.Edge(
-                        src_node=int(element.attrib['src_node']),
-                        sink_node=int(element.attrib['sink_node']),
-                        switch_id=int(element.attrib['switch_id']),
-                        metadata=None  # FIXME: Add reading edge metadata
-                    )
-                )
+        self.node_loc = None
+        self.node_timing = None
+        self.node_segment = None
+
+    def read_edge(self, element):
+        get = element.get
+        self.edges.append(
+            graph2.Edge(
+                src_node=int(get('src_node')),
+                sink_node=int(get('sink_node')),
+                switch_id=int(get('switch_id')),
+                metadata=None  # FIXME: Add reading edge metadata
+            )
+        )
+
+
+def graph_from_xml(
+        input_file_name, progressbar=None, filter_nodes=True, load_edges=False
+):
+    """
+    Loads relevant information about the routing resource graph from an XML
+    file.
+    """
+
+    if progressbar is None:
+        progressbar = lambda x: x  # noqa: E731
+
+    reader = GraphXmlReader(filter_nodes=filter_nodes, load_edges=load_edges)
+    reader.read(input_file_name, progressbar)
 
     return dict(
-        root_attrib=root_attrib,
-        switches=switches,
-        segments=segments,
-        block_types=block_types,
-        grid=grid,
-        nodes=nodes,
-        edges=edges
+        root_attrib=reader.root_attrib,
+        switches=reader.switches,
+        segments=reader.segments,
+        block_types=reader.block_types,
+        grid=reader.grid,
+        nodes=reader.nodes,
+        edges=reader.edges
+    )
+
+
+# Number of nodes or edges formatted before writing them to the file.
+WRITE_CHUNK_SIZE = 16384
+
+
+def format_metadata(metadata):
+    """ Returns XML text of a list of (name, value) metadata. """
+    metas = []
+    for name, value in metadata:
+        if value:
+            metas.append('<meta name="{}">{}</meta>'.format(name, value))
+        else:
+            metas.append('<meta name="{}"/>'.format(name))
+
+    return "<metadata>{}</metadata>".format("".join(metas))
+
+
+def node_rows(nodes):
+    """ Yields the fields of Node objects written to XML. """
+    no_dir = NodeDirection.NO_DIR
+    for node in nodes:
+        loc = node.loc
+        timing = node.timing
+        metadata = node.metadata
+        segment = node.segment
+
+        yield (
+            node.id,
+            node.type.name,
+            node.capacity,
+            node.direction.name if node.direction != no_dir else None,
+            loc.x_low,
+            loc.x_high,
+            loc.y_low,
+            loc.y_high,
+            loc.ptc,
+            loc.side.name if loc.side is not None else None,
+            (timing.r, timing.c) if timing is not None else None,
+            [(m.name, m.value) for m in metadata] if metadata else None,
+            segment.segment_id if segment is not None else None,
+        )
+
+
+def node_store_rows(nodes):
+    """ Yields the fields of NodeStore nodes written to XML.
+
+    Same as node_rows, reading the NodeStore columns directly.
+
+    """
+    type_names = {
+        value: node_type.name
+        for value, node_type in nodes.NODE_TYPES.items()
+    }
+    direction_names = {
+        value: direction.name
+        for value, direction in nodes.NODE_DIRECTIONS.items()
+        if direction != NodeDirection.NO_DIR
+    }
+    side_names = {value: side.name for value, side in nodes.SIDES.items()}
+    metadata = nodes.metadata
+    unset = graph2.NODE_STORE_UNSET
+
+    columns = zip(
+        nodes.type, nodes.capacity, nodes.direction, nodes.x_low, nodes.x_high,
+        nodes.y_low, nodes.y_high, nodes.ptc, nodes.side, nodes.timing_r,
+        nodes.timing_c, nodes.segment_id
     )
+    for node_id, (node_type, capacity, direction, x_low, x_high, y_low, y_high,
+                  ptc, side, timing_r, timing_c,
+                  segment_id) in enumerate(columns):
+        node_metadata = metadata.get(node_id, None)
+
+        yield (
+            node_id,
+            type_names[node_type],
+            capacity,
+            direction_names.get(direction, None),
+            x_low,
+            x_high,
+            y_low,
+            y_high,
+            ptc if ptc != unset else None,
+            side_names.get(side, None),
+            (timing_r, timing_c) if timing_r == timing_r else None,
+            [(m.name, m.value) for m in node_metadata]
+            if node_metadata else None,
+            segment_id if segment_id != unset else None,
+        )
+
+
+def format_nodes(rows, node_remap):
+    """ Yields XML text of each node of rows, see node_rows. """
+    node_format = '<node id="{}" type="{}" capacity="{}"'
+    loc_format = '><loc xlow="{}" xhigh="{}" ylow="{}" yhigh="{}" ptc="{}"'
+    timing_format = '<timing R="{}" C="{}"/>'
+    segment_format = '<segment segment_id="{}"/>'
+
+    for (node_id, node_type, capacity, direction, x_low, x_high, y_low, y_high,
+         ptc, side, timing, metadata, segment_id) in rows:
+        text = [
+            node_format.format(node_remap(node_id), node_type, capacity),
+        ]
+
+        if direction is not None:
+            text.append(' direction="{}"'.format(direction))
+
+        text.append(loc_format.format(x_low, x_high, y_low, y_high, ptc))
+
+        if side is not None:
+            text.append(' side="{}"'.format(side))
+
+        text.append("/>")
+
+        if timing is not None:
+            text.append(timing_format.format(*timing))
+
+        if metadata:
+            text.append(format_metadata(metadata))
+
+        if segment_id is not None:
+            text.append(segment_format.format(segment_id))
+
+        text.append("</node>")
+        yield "".join(text)
+
+
+def format_edges(edges, node_remap):
+    """ Yields XML text of each edge tuple. """
+    edge_format = '<edge src_node="{}" sink_node="{}" switch_id="{}"'
+
+    for src_node, sink_node, switch_id, metadata in edges:
+        text = edge_format.format(
+            node_remap(src_node), node_remap(sink_node), switch_id
+        )
+
+        if metadata:
+            yield text + ">" + format_metadata(metadata) + "</edge>"
+        else:
+            yield text + "/>"
 
 
 class Graph(object):
@@ -402,8 +602,62 @@ class Graph(object):
 
         self._end_xml_tag()
 
+    def _write_chunks(self, texts):
+        """ Writes an iterable of strings, joined in chunks. """
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) >= WRITE_CHUNK_SIZE:
+                self.xf.write("".join(chunk))
+                chunk = []
+
+        self.xf.write("".join(chunk))
+
     def _write_nodes(self, nodes, node_remap):
-        """ Serialize list of Node objects to XML.
+        """ Serialize list of Node objects or a NodeStore to XML.
+
+        Note that this method is extremely hot, len(nodes) is order 1-10 million.
+        The XML text of the nodes is formatted directly and written in large
+        chunks.  The output must match _write_nodes_tags, which is used when
+        debugging.
+
+        """
+        if DEBUG > 0:
+            self._write_nodes_tags(nodes, node_remap)
+            return
+
+        if isinstance(nodes, graph2.NodeStore):
+            rows = node_store_rows(nodes)
+        else:
+            rows = node_rows(nodes)
+
+        self._begin_xml_tag("rr_nodes")
+        self._write_chunks(format_nodes(rows, node_remap))
+        self._end_xml_tag()
+
+    def _write_edges(self, edges, node_remap):
+        """ Serialize list of edge tuples objects to XML.
+
+        edge tuples are (src_node(int), sink_node(int), switch_id(int), metadata(NodeMetadata)).
+
+        metadata may be None.
+
+        Note that this method is extremely hot, len(edges) is order 5-50 million.
+        The XML text of the edges is formatted directly and written in large
+        chunks.  The output must match _write_edges_tags, which is used when
+        debugging.
+
+        """
+        if DEBUG > 0:
+            self._write_edges_tags(edges, node_remap)
+            return
+
+        self._begin_xml_tag("rr_edges")
+        self._write_chunks(format_edges(edges, node_remap))
+        self._end_xml_tag()
+
+    def _write_nodes_tags(self, nodes, node_remap):
+        """ Serialize list of Node objects to XML, tag by tag.
 
         Note that this method is extremely hot, len(nodes) is order 1-10 million.
         Almost any modification of this function has a significant effect on
@@ -463,8 +717,8 @@ class Graph(object):
 
         self._end_xml_tag()
 
-    def _write_edges(self, edges, node_remap):
-        """ Serialize list of edge tuples objects to XML.
+    def _write_edges_tags(self, edges, node_remap):
+        """ Serialize list of edge tuples objects to XML, tag by tag.
 
         edge tuples are (src_node(int), sink_node(int), switch_id(int), metadata(NodeMetadata)).
 
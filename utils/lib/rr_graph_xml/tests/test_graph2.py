@@ -0,0 +1,255 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from lib.rr_graph import graph2
+from lib.rr_graph import tracks
+from lib.rr_graph_xml import graph2 as xml_graph2
+
+RR_GRAPH_XML = """<rr_graph tool_name="test" tool_version="1.0">
+<channels>
+<channel chan_width_max="2" x_min="2" y_min="2" x_max="2" y_max="2"/>
+<x_list index="0" info="2"/>
+<y_list index="0" info="2"/>
+</channels>
+<switches>
+<switch id="0" type="mux" name="mux">
+<timing R="1.5" Cin="0" Cout="0" Tdel="1e-11" Cinternal="0"/>
+<sizing mux_trans_size="1" buf_size="2"/>
+</switch>
+<switch id="1" type="short" name="__vpr_delayless_switch__">
+<sizing mux_trans_size="0" buf_size="0"/>
+</switch>
+</switches>
+<segments>
+<segment id="0" name="dummy"><timing R_per_meter="1" C_per_meter="2"/></segment>
+</segments>
+<block_types>
+<block_type id="0" name="EMPTY" width="1" height="1"/>
+<block_type id="1" name="BLK" width="1" height="1">
+<pin_class type="INPUT"><pin ptc="0">BLK.I[0]</pin></pin_class>
+<pin_class type="OUTPUT"><pin ptc="1">BLK.O[0]</pin></pin_class>
+</block_type>
+</block_types>
+<grid>
+<grid_loc x="0" y="0" block_type_id="0" width_offset="0" height_offset="0"/>
+<grid_loc x="1" y="0" block_type_id="1" width_offset="0" height_offset="0"/>
+</grid>
+<rr_nodes>
+<node id="0" type="SINK" capacity="1">
+<loc xlow="1" xhigh="1" ylow="0" yhigh="0" ptc="0"/>
+<timing R="0" C="0"/>
+</node>
+<node id="1" type="IPIN" capacity="1">
+<loc xlow="1" xhigh="1" ylow="0" yhigh="0" ptc="0" side="TOP"/>
+<timing R="0" C="0"/>
+</node>
+<node id="2" type="SOURCE" capacity="1">
+<loc xlow="1" xhigh="1" ylow="0" yhigh="0" ptc="1"/>
+<timing R="0" C="0"/>
+</node>
+<node id="3" type="OPIN" capacity="1">
+<loc xlow="1" xhigh="1" ylow="0" yhigh="0" ptc="1" side="TOP"/>
+<timing R="0" C="0"/>
+</node>
+<node id="4" type="CHANX" direction="INC_DIR" capacity="1">
+<loc xlow="1" xhigh="1" ylow="0" yhigh="0" ptc="0"/>
+<timing R="1" C="2"/>
+<metadata><meta name="fasm">FEATURE</meta></metadata>
+<segment segment_id="0"/>
+</node>
+</rr_nodes>
+<rr_edges>
+<edge src_node="3" sink_node="4" switch_id="0"/>
+<edge src_node="4" sink_node="1" switch_id="0"/>
+<edge src_node="1" sink_node="0" switch_id="1"/>
+<edge src_node="2" sink_node="3" switch_id="1"/>
+</rr_edges>
+</rr_graph>
+"""
+
+
+def random_nodes(rand, num_nodes):
+    node_types = list(graph2.NodeType)
+    sides = [None] + list(tracks.Direction)
+
+    for node_id in range(num_nodes):
+        metadata = None
+        if rand.random() < 0.3:
+            metadata = [
+                graph2.NodeMetadata(
+                    name='name{}'.format(idx),
+                    x_offset=0,
+                    y_offset=0,
+                    z_offset=0,
+                    value=rand.choice(['', 'value{}'.format(idx)])
+                ) for idx in range(rand.randrange(3))
+            ]
+
+        timing = None
+        if rand.random() < 0.5:
+            timing = graph2.NodeTiming(r=rand.random(), c=rand.random())
+
+        segment = None
+        if rand.random() < 0.5:
+            segment = graph2.NodeSegment(segment_id=rand.randrange(5))
+
+        yield graph2.Node(
+            id=node_id,
+            type=rand.choice(node_types),
+            direction=rand.choice(list(graph2.NodeDirection)),
+            capacity=rand.randrange(1, 3),
+            loc=graph2.NodeLoc(
+                x_low=rand.randrange(100),
+                y_low=rand.randrange(100),
+                x_high=rand.randrange(100),
+                y_high=rand.randrange(100),
+                side=rand.choice(sides),
+                ptc=rand.randrange(1000),
+            ),
+            timing=timing,
+            metadata=metadata,
+            segment=segment,
+        )
+
+
+def random_edges(rand, num_nodes, num_edges):
+    for _ in range(num_edges):
+        metadata = None
+        if rand.random() < 0.5:
+            metadata = [('fasm_features', 'PIP{}'.format(rand.randrange(9)))]
+
+        yield (
+            rand.randrange(num_nodes), rand.randrange(num_nodes),
+            rand.randrange(10), metadata
+        )
+
+
+class GraphXmlTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.fname = tempfile.mkstemp(suffix='.xml')
+        with os.fdopen(fd, 'w') as f:
+            f.write(RR_GRAPH_XML)
+
+        fd, self.output_fname = tempfile.mkstemp(suffix='.xml')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+        os.remove(self.output_fname)
+
+    def test_read(self):
+        graph = xml_graph2.graph_from_xml(self.fname, load_edges=True)
+
+        self.assertEqual(
+            graph['root_attrib'], {
+                'tool_name': 'test',
+                'tool_version': '1.0'
+            }
+        )
+        self.assertEqual(
+            [s.name for s in graph['switches']],
+            ['mux', '__vpr_delayless_switch__']
+        )
+        self.assertEqual(graph['switches'][0].timing.r, 1.5)
+        self.assertIsNone(graph['switches'][1].timing)
+        self.assertEqual(graph['segments'][0].timing.c_per_meter, 2)
+        self.assertEqual(
+            [len(b.pin_class) for b in graph['block_types']], [0, 2]
+        )
+        self.assertEqual(
+            graph['block_types'][1].pin_class[1].pin,
+            [graph2.Pin(ptc=1, name='BLK.O[0]')]
+        )
+        self.assertEqual(len(graph['grid']), 2)
+
+        # Track nodes are filtered out.
+        self.assertEqual([node.id for node in graph['nodes']], [0, 1, 2, 3])
+        self.assertEqual(graph['nodes'][1].loc.side, tracks.Direction.TOP)
+        self.assertEqual(
+            [(e.src_node, e.sink_node, e.switch_id) for e in graph['edges']],
+            [(3, 4, 0), (4, 1, 0), (1, 0, 1), (2, 3, 1)]
+        )
+
+    def test_read_nodes(self):
+        graph = xml_graph2.graph_from_xml(self.fname, filter_nodes=False)
+
+        self.assertEqual(graph['edges'], [])
+        self.assertEqual(len(graph['nodes']), 5)
+        self.assertEqual(
+            graph['nodes'][4].segment, graph2.NodeSegment(segment_id=0)
+        )
+        self.assertEqual(
+            graph['nodes'][4].timing, graph2.NodeTiming(r=1.0, c=2.0)
+        )
+
+    def test_round_trip(self):
+        graph = xml_graph2.Graph(
+            self.fname, output_file_name=self.output_fname, filter_nodes=False
+        )
+        edges = xml_graph2.graph_from_xml(self.fname, load_edges=True)['edges']
+        channels = graph2.Channels(
+            chan_width_max=2,
+            x_min=2,
+            y_min=2,
+            x_max=2,
+            y_max=2,
+            x_list=[graph2.ChannelList(index=0, info=2)],
+            y_list=[graph2.ChannelList(index=0, info=2)],
+        )
+        graph.serialize_to_xml(
+            channels_obj=channels,
+            nodes_obj=graph.graph.nodes,
+            edges_obj=edges,
+        )
+
+        expected = xml_graph2.graph_from_xml(
+            self.fname, filter_nodes=False, load_edges=True
+        )
+        actual = xml_graph2.graph_from_xml(
+            self.output_fname, filter_nodes=False, load_edges=True
+        )
+        self.assertEqual(actual, expected)
+
+    def check_writer(self, method, tags_method, objs):
+        """ Checks the bulk writer output matches the per tag writer. """
+        graph = xml_graph2.Graph.__new__(xml_graph2.Graph)
+        graph._write_xml = graph._write_xml_no_debug
+
+        outputs = []
+        for write in [method, tags_method]:
+            graph.xf = io.StringIO()
+            graph.xf_tag = []
+            write(graph, objs, lambda x: x + 10)
+            outputs.append(graph.xf.getvalue())
+
+        self.assertEqual(outputs[0], outputs[1])
+        return outputs[0]
+
+    def test_write_nodes(self):
+        nodes = list(random_nodes(random.Random(0), 500))
+
+        output = self.check_writer(
+            xml_graph2.Graph._write_nodes, xml_graph2.Graph._write_nodes_tags,
+            nodes
+        )
+        self.assertEqual(
+            self.check_writer(
+                xml_graph2.Graph._write_nodes,
+                xml_graph2.Graph._write_nodes_tags, graph2.NodeStore(nodes)
+            ), output
+        )
+
+    def test_write_edges(self):
+        edges = list(random_edges(random.Random(0), 100, 500))
+
+        self.check_writer(
+            xml_graph2.Graph._write_edges, xml_graph2.Graph._write_edges_tags,
+            edges
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
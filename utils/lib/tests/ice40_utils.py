@@ -0,0 +1,31 @@
+""" Imports the lattice/ice40/utils scripts for the tests of the stages. """
+import importlib
+import os
+import sys
+
+ICE40_UTILS = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), '..', '..', '..', 'lattice', 'ice40',
+        'utils'
+    )
+)
+FASM_ICEBOX = os.path.join(ICE40_UTILS, 'fasm_icebox')
+
+
+def import_ice40_utils(name):
+    """ Returns the module name of lattice/ice40/utils.
+
+    Returns None when icebox is not installed, the tests using the module
+    are then skipped.
+
+    """
+    for path in (ICE40_UTILS, FASM_ICEBOX):
+        if path not in sys.path:
+            sys.path.append(path)
+
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        if e.name in ('icebox', 'icebox_asc2hlc'):
+            return None
+        raise
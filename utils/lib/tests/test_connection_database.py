@@ -0,0 +1,390 @@
+import random
+import sqlite3
+import unittest
+
+from ..connection_database import create_tables, yield_channel_nodes, \
+    NodeClassification, NodeRowGroups, WireIndex, get_track_model, \
+    get_track_models, get_pin_name_of_wire, node_to_site_pins, \
+    yield_logical_wire_info_from_node
+from ..rr_graph import graph2
+
+# Per node queries used by prjxray_form_channels.form_tracks before
+# yield_channel_nodes, kept as the reference output.
+WIRE_LOCATIONS = """
+SELECT DISTINCT grid_x, grid_y FROM tile WHERE pkey IN (
+    SELECT tile_pkey FROM wire WHERE node_pkey = ? AND tile_pkey IS NOT NULL
+    )"""
+
+PIP_LOCATIONS = """
+WITH wires_from_node(wire_in_tile_pkey, phy_tile_pkey) AS (
+  SELECT
+    wire_in_tile_pkey,
+    phy_tile_pkey
+  FROM
+    wire
+  WHERE
+    node_pkey = ? AND tile_pkey IS NOT NULL
+),
+  other_wires(phy_tile_pkey, wire_in_tile_pkey) AS (
+    SELECT
+        wires_from_node.phy_tile_pkey,
+        undirected_pips.other_wire_in_tile_pkey
+    FROM undirected_pips
+    INNER JOIN wires_from_node ON
+        undirected_pips.wire_in_tile_pkey = wires_from_node.wire_in_tile_pkey)
+SELECT tile.grid_x, tile.grid_y
+FROM tile
+WHERE pkey IN (
+    SELECT wire.tile_pkey FROM wire
+    INNER JOIN other_wires ON
+        wire.wire_in_tile_pkey = other_wires.wire_in_tile_pkey
+    AND
+        wire.phy_tile_pkey = other_wires.phy_tile_pkey
+        );"""
+
+SITE_LOCATIONS = """
+WITH wires_from_node(wire_in_tile_pkey, phy_tile_pkey) AS (
+  SELECT
+    wire_in_tile_pkey,
+    phy_tile_pkey
+  FROM
+    wire
+  WHERE
+    node_pkey = ? AND tile_pkey IS NOT NULL
+),
+  other_wires(phy_tile_pkey, wire_in_tile_pkey) AS (
+    SELECT
+        wires_from_node.phy_tile_pkey,
+        undirected_pips.other_wire_in_tile_pkey
+    FROM undirected_pips
+    INNER JOIN wires_from_node ON
+        undirected_pips.wire_in_tile_pkey = wires_from_node.wire_in_tile_pkey),
+  other_nodes(other_node_pkey) AS (
+    SELECT wire.node_pkey FROM wire
+    INNER JOIN other_wires ON
+        wire.wire_in_tile_pkey = other_wires.wire_in_tile_pkey
+    AND
+        wire.phy_tile_pkey = other_wires.phy_tile_pkey),
+  other_tiles(site_wire_pkey) AS (
+    SELECT node.site_wire_pkey FROM node
+    WHERE
+        pkey IN (SELECT other_node_pkey FROM other_nodes)
+    AND
+        classification = ?
+  )
+SELECT tile.grid_x, tile.grid_y
+FROM tile
+WHERE pkey IN (
+    SELECT DISTINCT tile_pkey
+    FROM wire
+    WHERE pkey IN (
+        SELECT other_tiles.site_wire_pkey FROM other_tiles
+        )
+    );"""
+
+WIRE_NAMES = """
+SELECT name FROM wire_in_tile WHERE pkey IN (
+    SELECT wire_in_tile_pkey FROM wire WHERE node_pkey = ?
+);"""
+
+
+def build_database(seed, grid_size=6, wires_per_tile=8, num_pips=12):
+    """ Build a random connection database with nodes spanning tiles. """
+    rng = random.Random(seed)
+
+    conn = sqlite3.connect(':memory:')
+    create_tables(conn)
+    cur = conn.cursor()
+
+    cur.execute("INSERT INTO tile_type(name) VALUES ('INT')")
+    tile_type_pkey = cur.lastrowid
+
+    wire_in_tile_pkeys = []
+    for idx in range(wires_per_tile):
+        cur.execute(
+            """
+INSERT INTO wire_in_tile(name, phy_tile_type_pkey, tile_type_pkey)
+VALUES (?, ?, ?)""", ('W{}'.format(idx), tile_type_pkey, tile_type_pkey)
+        )
+        wire_in_tile_pkeys.append(cur.lastrowid)
+
+    for _ in range(num_pips):
+        a, b = rng.sample(wire_in_tile_pkeys, 2)
+        cur.execute(
+            """
+INSERT INTO undirected_pips(wire_in_tile_pkey, other_wire_in_tile_pkey)
+VALUES (?, ?), (?, ?)""", (a, b, b, a)
+        )
+
+    wires = []
+    for x in range(grid_size):
+        for y in range(grid_size):
+            cur.execute(
+                """
+INSERT INTO phy_tile(name, tile_type_pkey, grid_x, grid_y)
+VALUES (?, ?, ?, ?)""", ('INT_X{}Y{}'.format(x, y), tile_type_pkey, x, y)
+            )
+            phy_tile_pkey = cur.lastrowid
+
+            # Some physical tiles have no VPR tile.
+            tile_pkey = None
+            if rng.random() > 0.1:
+                cur.execute(
+                    """
+INSERT INTO tile(phy_tile_pkey, tile_type_pkey, grid_x, grid_y)
+VALUES (?, ?, ?, ?)""", (phy_tile_pkey, tile_type_pkey, x, y)
+                )
+                tile_pkey = cur.lastrowid
+
+            for wire_in_tile_pkey in wire_in_tile_pkeys:
+                cur.execute(
+                    """
+INSERT INTO wire(phy_tile_pkey, tile_pkey, wire_in_tile_pkey)
+VALUES (?, ?, ?)""", (phy_tile_pkey, tile_pkey, wire_in_tile_pkey)
+                )
+                wires.append(cur.lastrowid)
+
+    rng.shuffle(wires)
+    classifications = [
+        NodeClassification.CHANNEL,
+        NodeClassification.CHANNEL,
+        NodeClassification.EDGES_TO_CHANNEL,
+        NodeClassification.NULL,
+    ]
+    while wires:
+        node_wires = [wires.pop() for _ in range(rng.randint(1, 4)) if wires]
+        classification = rng.choice(classifications)
+        site_wire_pkey = None
+        if classification == NodeClassification.EDGES_TO_CHANNEL:
+            site_wire_pkey = rng.choice(node_wires)
+
+        cur.execute(
+            """
+INSERT INTO node(classification, site_wire_pkey) VALUES (?, ?)""",
+            (classification.value, site_wire_pkey)
+        )
+        node_pkey = cur.lastrowid
+        for wire_pkey in node_wires:
+            cur.execute(
+                "UPDATE wire SET node_pkey = ? WHERE pkey = ?",
+                (node_pkey, wire_pkey)
+            )
+
+    conn.commit()
+    return conn
+
+
+def add_pins_and_tracks(conn, seed):
+    """ Add site pins, split tiles and track graph nodes to a database. """
+    rng = random.Random(seed)
+    cur = conn.cursor()
+
+    wire_in_tile_pkeys = [
+        pkey for (pkey, ) in cur.execute("SELECT pkey FROM wire_in_tile")
+    ]
+    for wire_in_tile_pkey in rng.sample(wire_in_tile_pkeys, 3):
+        cur.execute(
+            "INSERT INTO site_pin(name) VALUES (?)",
+            ('PIN{}'.format(wire_in_tile_pkey), )
+        )
+        cur.execute(
+            "UPDATE wire_in_tile SET site_pin_pkey = ? WHERE pkey = ?",
+            (cur.lastrowid, wire_in_tile_pkey)
+        )
+
+    cur.execute("INSERT INTO tile_type(name) VALUES ('SLICE')")
+    tile_type_pkey = cur.lastrowid
+    cur.execute(
+        "INSERT INTO site_as_tile(tile_type_pkey) VALUES (?)",
+        (tile_type_pkey, )
+    )
+    site_as_tile_pkey = cur.lastrowid
+
+    tile_pkeys = [pkey for (pkey, ) in cur.execute("SELECT pkey FROM tile")]
+    for tile_pkey in rng.sample(tile_pkeys, len(tile_pkeys) // 4):
+        cur.execute(
+            """
+UPDATE tile SET tile_type_pkey = ?, site_as_tile_pkey = ? WHERE pkey = ?""",
+            (tile_type_pkey, site_as_tile_pkey, tile_pkey)
+        )
+
+    channel_nodes = [
+        pkey for (pkey, ) in cur.execute(
+            "SELECT pkey FROM node WHERE classification = ?",
+            (NodeClassification.CHANNEL.value, )
+        )
+    ]
+    for node_pkey in channel_nodes:
+        cur.execute("INSERT INTO track(alive) VALUES (1)")
+        track_pkey = cur.lastrowid
+        cur.execute(
+            "UPDATE node SET track_pkey = ? WHERE pkey = ?",
+            (track_pkey, node_pkey)
+        )
+
+        graph_nodes = []
+        for _ in range(rng.randint(1, 4)):
+            x, y = rng.randrange(6), rng.randrange(6)
+            cur.execute(
+                """
+INSERT INTO graph_node(
+    graph_node_type, track_pkey, x_low, x_high, y_low, y_high)
+VALUES (?, ?, ?, ?, ?, ?)""", (
+                    rng.choice(
+                        (
+                            graph2.NodeType.CHANX.value,
+                            graph2.NodeType.CHANY.value
+                        )
+                    ), track_pkey, x, x, y, y
+                )
+            )
+            graph_nodes.append(cur.lastrowid)
+
+        for src, dest in zip(graph_nodes[1:], graph_nodes[:-1]):
+            cur.execute(
+                """
+INSERT INTO graph_edge(src_graph_node_pkey, dest_graph_node_pkey, track_pkey)
+VALUES (?, ?, ?)""", (src, dest, track_pkey)
+            )
+
+    conn.commit()
+
+
+def reference_channel_nodes(conn):
+    cur = conn.cursor()
+    cur2 = conn.cursor()
+    cur.execute(
+        "SELECT pkey FROM node WHERE classification == ?;",
+        (NodeClassification.CHANNEL.value, )
+    )
+    for (node_pkey, ) in cur:
+        unique_pos = set()
+        for query, params in (
+            (WIRE_LOCATIONS, (node_pkey, )),
+            (PIP_LOCATIONS, (node_pkey, )),
+            (SITE_LOCATIONS, (node_pkey,
+                              NodeClassification.EDGES_TO_CHANNEL.value)),
+        ):
+            unique_pos |= set(cur2.execute(query, params))
+
+        wires = [wire for (wire, ) in cur2.execute(WIRE_NAMES, (node_pkey, ))]
+
+        yield node_pkey, unique_pos, sorted(wires)
+
+
+class ConnectionDatabaseTests(unittest.TestCase):
+    def test_node_row_groups(self):
+        groups = NodeRowGroups(
+            [(1, 'a'), (1, 'b'), (3, 'c'), (4, 'd'), (6, 'e')]
+        )
+
+        self.assertEqual(groups.pop(1), [('a', ), ('b', )])
+        self.assertEqual(groups.pop(2), [])
+        self.assertEqual(groups.pop(4), [('d', )])
+        self.assertEqual(groups.pop(7), [])
+
+    def test_yield_channel_nodes(self):
+        for seed in range(5):
+            conn = build_database(seed)
+
+            channel_nodes = [
+                (node_pkey, unique_pos, sorted(wires))
+                for node_pkey, unique_pos, wires in yield_channel_nodes(conn)
+            ]
+            reference = list(reference_channel_nodes(conn))
+
+            self.assertGreater(len(reference), 0)
+            self.assertEqual(channel_nodes, reference)
+
+    def test_wire_index(self):
+        for seed in range(3):
+            conn = build_database(seed)
+            add_pins_and_tracks(conn, seed)
+            index = WireIndex(conn)
+            cur = conn.cursor()
+
+            for (node_pkey, ) in cur.execute("SELECT pkey FROM node"):
+                self.assertEqual(
+                    sorted(index.logical_wire_info(node_pkey)),
+                    sorted(yield_logical_wire_info_from_node(conn, node_pkey))
+                )
+                self.assertEqual(
+                    index.site_pin_wires(node_pkey),
+                    sorted(node_to_site_pins(conn, node_pkey))
+                )
+
+            wires = list(
+                conn.execute(
+                    """
+SELECT pkey, phy_tile_pkey, wire_in_tile_pkey, node_pkey FROM wire
+WHERE tile_pkey IS NOT NULL"""
+                )
+            )
+            for wire_pkey, _, _, _ in wires:
+                self.assertEqual(
+                    index.pin_name_of_wire(wire_pkey),
+                    get_pin_name_of_wire(conn, wire_pkey)
+                )
+
+            phy_tiles, wire_in_tiles = [], []
+            for _, phy_tile_pkey, wire_in_tile_pkey, _ in wires:
+                phy_tiles.append(phy_tile_pkey)
+                wire_in_tiles.append(wire_in_tile_pkey)
+
+            self.assertEqual(
+                index.wires_at(phy_tiles, wire_in_tiles).tolist(),
+                [wire_pkey for wire_pkey, _, _, _ in wires]
+            )
+            self.assertEqual(index.wires_at([1000], [1]).tolist(), [-1])
+
+            for wire_pkey, _, _, node_pkey in wires:
+                self.assertEqual(index.wire_node[wire_pkey], node_pkey)
+
+    def test_get_track_models(self):
+        conn = build_database(0)
+        add_pins_and_tracks(conn, 0)
+
+        track_models = get_track_models(conn)
+        track_pkeys = [
+            pkey for (pkey, ) in conn.execute("SELECT pkey FROM track")
+        ]
+        self.assertEqual(sorted(track_models), track_pkeys)
+
+        for track_pkey in track_pkeys:
+            tracks_model, track_nodes = track_models[track_pkey]
+            ref_model, ref_nodes = get_track_model(conn, track_pkey)
+
+            self.assertEqual(track_nodes, ref_nodes)
+            self.assertEqual(tracks_model.tracks, ref_model.tracks)
+            self.assertEqual(
+                sorted(tracks_model.track_connections),
+                sorted(ref_model.track_connections)
+            )
+
+    def test_get_selected_track_models(self):
+        conn = build_database(1)
+        add_pins_and_tracks(conn, 1)
+
+        # Select some tracks, including a track without graph nodes.
+        track_pkeys = [
+            pkey for (pkey, ) in conn.execute("SELECT pkey FROM track")
+        ]
+        cur = conn.cursor()
+        cur.execute("INSERT INTO track(alive) VALUES (0)")
+        selected = track_pkeys[::3] + [cur.lastrowid]
+
+        all_models = get_track_models(conn)
+        track_models = get_track_models(conn, reversed(selected))
+        self.assertEqual(sorted(track_models), sorted(selected))
+
+        for track_pkey in selected:
+            tracks_model, track_nodes = track_models[track_pkey]
+            ref_model, ref_nodes = get_track_model(conn, track_pkey)
+
+            self.assertEqual(track_nodes, ref_nodes)
+            self.assertEqual(tracks_model.tracks, ref_model.tracks)
+            if track_pkey in all_models:
+                self.assertEqual(
+                    tracks_model.track_connections,
+                    all_models[track_pkey][0].track_connections
+                )
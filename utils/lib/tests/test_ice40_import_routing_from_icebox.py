@@ -0,0 +1,141 @@
+import multiprocessing
+import unittest
+from unittest import mock
+
+from .ice40_utils import import_ice40_utils
+
+ice40_import_routing_from_icebox = import_ice40_utils(
+    'ice40_import_routing_from_icebox'
+)
+
+
+class StubIceConfig(object):
+    """ The parts of icebox.iceconfig used by plan_tracks and add_edges. """
+
+    max_x = 6
+    max_y = 6
+
+    def tile_type(self, x, y):
+        if x in (0, self.max_x) or y in (0, self.max_y):
+            return 'IO'
+        return 'LOGIC'
+
+    def tile_db(self, x, y):
+        return [
+            [
+                ['B0[{}]'.format(x)], 'routing', 'sp4_h_r_{}'.format(y),
+                'sp4_v_b_{}'.format(x)
+            ],
+            [
+                ['!B1[2]', 'B1[{}]'.format(y)], 'buffer',
+                'local_g0_{}'.format(x), 'lutff_{}/in_0'.format(y)
+            ],
+            [['B2[3]'], 'buffer', 'sp12_v_b_{}'.format(x), 'local_g1_0'],
+            [['B3[4]'], 'ColBufCtrl', 'glb_netwk_{}'.format(y)],
+            [['B4[5]'], 'routing', 'lutff_0/lout', 'sp4_h_l_0'],
+        ]
+
+    def tile_has_entry(self, x, y, entry):
+        return (x + y + len(entry[2])) % 3 != 0
+
+    def group_segments(self, all_tiles):
+        """ Returns groups of (x, y, netname) within all_tiles. """
+        groups = set()
+        for i in range(1, self.max_x):
+            # From right to left, so the groups are not sorted by column.
+            groups.add(
+                tuple(
+                    (x, i, 'sp4_h_r_{}'.format(i))
+                    for x in reversed(range(1, self.max_x))
+                )
+            )
+            groups.add(
+                tuple(
+                    (i, y, 'sp12_v_b_{}'.format(i))
+                    for y in range(1, self.max_y)
+                )
+            )
+            groups.add(((i, 1, 'local_g0_{}'.format(i)), ))
+            groups.add(((i, 2, 'lutff_{}/lout'.format(i)), ))
+
+        # A cross, decomposed into two lines and a connection.
+        groups.add(
+            (
+                (1, 3, 'sp4_h_r_9'), (2, 3, 'sp4_h_r_9'), (3, 3, 'sp4_h_r_9'),
+                (2, 2, 'sp4_v_b_9'), (2, 4, 'sp4_v_b_9')
+            )
+        )
+
+        return set(
+            group for group in groups
+            if all((x, y) in all_tiles for x, y, _ in group)
+        )
+
+
+@unittest.skipIf(
+    ice40_import_routing_from_icebox is None, 'icebox is not installed'
+)
+class ColumnPoolTests(unittest.TestCase):
+    def setUp(self):
+        # Workers are forked with the global ic, like in build_rr_graph.
+        self.ic = StubIceConfig()
+        self.segments = self.ic.group_segments(
+            list(ice40_import_routing_from_icebox.tiles(self.ic))
+        )
+        patcher = mock.patch.object(
+            ice40_import_routing_from_icebox, 'ic', self.ic
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.pool = multiprocessing.get_context('fork').Pool(2)
+        self.addCleanup(self.pool.join)
+        self.addCleanup(self.pool.close)
+
+    def test_plan_tracks(self):
+        """ plan_tracks gives the track groups in group order with a pool. """
+        track_groups = ice40_import_routing_from_icebox.plan_tracks(
+            self.ic, self.segments
+        )
+        self.assertTrue(any(track_groups))
+        self.assertIn(None, track_groups)
+
+        # StraightSegment equality ignores the direction, so compare repr.
+        self.assertEqual(
+            repr(
+                [
+                    ice40_import_routing_from_icebox.plan_track_group(group)
+                    for group in sorted(self.segments)
+                ]
+            ), repr(track_groups)
+        )
+        self.assertEqual(
+            repr(
+                ice40_import_routing_from_icebox.plan_tracks(
+                    self.ic, self.segments, self.pool
+                )
+            ), repr(track_groups)
+        )
+
+    def add_edges(self, pool):
+        """ Returns the create_edge_with_names calls of add_edges. """
+        edges = []
+
+        def create_edge_with_names(
+                g, src_name, dst_name, ipos, switch, skip, metadata
+        ):
+            edges.append((ipos, src_name, dst_name, switch, metadata))
+
+        g = mock.Mock(switches={'routing': 'routing', 'buffer': 'buffer'})
+        with mock.patch.object(ice40_import_routing_from_icebox,
+                               'create_edge_with_names',
+                               create_edge_with_names):
+            ice40_import_routing_from_icebox.add_edges(g, self.ic, pool)
+
+        return edges
+
+    def test_add_edges(self):
+        """ add_edges creates the same edges in the same order with a pool. """
+        edges = self.add_edges(pool=None)
+        self.assertTrue(edges)
+        self.assertEqual(self.add_edges(pool=self.pool), edges)
@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import pstats
+import sqlite3
+import tempfile
+import unittest
+
+from ..perf_utils import PhaseLog, add_perf_args
+
+
+class TestPhaseLog(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.perf_log = os.path.join(self.tmpdir.name, 'perf.jsonl')
+        self.profile = os.path.join(self.tmpdir.name, 'run.pstats')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_records(self):
+        with open(self.perf_log) as f:
+            return [json.loads(line) for line in f]
+
+    def test_phases(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE a(x INT)')
+
+        with PhaseLog(self.perf_log) as perf:
+            perf.context['db_profile'] = 'build'
+            with perf.phase('insert', conn) as stats:
+                conn.executemany(
+                    'INSERT INTO a VALUES (?)', [(x, ) for x in range(10)]
+                )
+                with perf.phase('update', conn):
+                    conn.execute('UPDATE a SET x = x + 1 WHERE x < 3')
+
+                stats['rows'] = 10
+
+            with perf.phase('no connection'):
+                pass
+
+        records = self.read_records()
+        self.assertEqual(
+            [record['phase'] for record in records],
+            ['update', 'insert', 'no connection']
+        )
+
+        update, insert, no_conn = records
+        self.assertEqual(update['rows_written'], 3)
+        self.assertEqual(update['statements'], 1)
+        self.assertEqual(insert['rows_written'], 13)
+        self.assertGreaterEqual(insert['statements'], 2)
+        self.assertEqual(insert['rows'], 10)
+        self.assertNotIn('statements', no_conn)
+
+        for record in records:
+            self.assertGreaterEqual(record['wall'], 0)
+            self.assertGreaterEqual(record['cpu'], 0)
+            self.assertIn('peak_rss', record)
+            self.assertEqual(record['db_profile'], 'build')
+
+        # The trace callback is removed after the outer phase.
+        self.assertEqual(perf.statement_counters, {})
+
+    def test_args(self):
+        parser = argparse.ArgumentParser()
+        add_perf_args(parser)
+        args = parser.parse_args(
+            ['--perf_log', self.perf_log, '--profile', self.profile]
+        )
+
+        with PhaseLog.from_args(args) as perf:
+            with perf.phase('sum'):
+                sum(range(1000))
+
+        self.assertEqual(len(self.read_records()), 1)
+        stats = pstats.Stats(self.profile)
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_no_log(self):
+        conn = sqlite3.connect(':memory:')
+        traced = []
+        conn.set_trace_callback(traced.append)
+
+        with PhaseLog() as perf:
+            with perf.phase('nothing', conn) as stats:
+                stats['rows'] = 1
+                conn.execute('SELECT 1')
+
+        # Without a log, the trace callback of conn is left alone.
+        self.assertEqual(traced, ['SELECT 1'])
+        self.assertEqual(perf.statement_counters, {})
+
+        self.assertFalse(os.path.exists(self.perf_log))
+        self.assertFalse(os.path.exists(self.profile))
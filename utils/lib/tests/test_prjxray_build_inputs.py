@@ -0,0 +1,177 @@
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from ..connection_database import create_tables
+from .xilinx_utils import import_xilinx_utils
+
+prjxray_build_inputs = import_xilinx_utils('prjxray_build_inputs')
+
+STAGE = prjxray_build_inputs.FORM_CHANNELS_STAGE
+
+
+class TestBuildInputs(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.tmpdir.name, *names)
+
+    def write(self, fname, data):
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        with open(fname, 'w') as f:
+            f.write(data)
+
+    def is_up_to_date(self, old_hashes, new_hashes, outputs):
+        """ Returns is_up_to_date and the message it printed. """
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            up_to_date = prjxray_build_inputs.is_up_to_date(
+                STAGE, old_hashes, new_hashes, outputs
+            )
+
+        return up_to_date, out.getvalue()
+
+    def test_hash_prjxray_inputs(self):
+        """ A changed tile type only changes the hash of its definition. """
+        db_root = self.path('db')
+        self.write(os.path.join(db_root, 'tile_type_INT_L.json'), '{}')
+        self.write(os.path.join(db_root, 'tile_type_INT_R.json'), '{}')
+        for name in prjxray_build_inputs.FABRIC_FILES:
+            self.write(os.path.join(db_root, 'fabric', name), '{}')
+
+        hashes = prjxray_build_inputs.hash_prjxray_inputs(
+            db_root, 'part', 'fabric'
+        )
+        self.assertEqual(
+            sorted(hashes), [
+                'fabric/tileconn.json', 'fabric/tilegrid.json', 'part',
+                'tile_type_INT_L.json', 'tile_type_INT_R.json'
+            ]
+        )
+
+        self.write(os.path.join(db_root, 'tile_type_INT_L.json'), '{"a": 1}')
+        self.assertEqual(
+            prjxray_build_inputs.changed_build_inputs(
+                hashes,
+                prjxray_build_inputs.hash_prjxray_inputs(
+                    db_root, 'part', 'fabric'
+                )
+            ), ['tile_type_INT_L.json']
+        )
+
+    def test_hash_sources(self):
+        hashes = prjxray_build_inputs.hash_sources(['prjxray_build_inputs'])
+        self.assertIn('source:utils/prjxray_build_inputs.py', hashes)
+
+        hashes = prjxray_build_inputs.hash_sources([__name__])
+        self.assertIn('source:tests/test_prjxray_build_inputs.py', hashes)
+
+    def test_read_build_inputs(self):
+        connection_database = self.path('channels.db')
+        self.assertEqual(
+            prjxray_build_inputs.read_build_inputs(connection_database, STAGE),
+            {}
+        )
+
+        # Database from before the build_input table.
+        conn = sqlite3.connect(connection_database)
+        conn.execute('CREATE TABLE phy_tile(pkey INTEGER PRIMARY KEY)')
+        conn.commit()
+        self.assertEqual(
+            prjxray_build_inputs.read_build_inputs(connection_database, STAGE),
+            {}
+        )
+
+        conn.execute('DROP TABLE phy_tile')
+        create_tables(conn)
+        prjxray_build_inputs.record_build_inputs(
+            conn, STAGE, {
+                'a.json': '1',
+                'b.json': '2'
+            }
+        )
+        prjxray_build_inputs.record_build_inputs(conn, 'other', {'a': '3'})
+        conn.close()
+        self.assertEqual(
+            prjxray_build_inputs.read_build_inputs(connection_database, STAGE),
+            {
+                'a.json': '1',
+                'b.json': '2'
+            }
+        )
+
+        # Interrupted write.
+        with open(connection_database, 'rb') as f:
+            data = f.read()
+        with open(connection_database, 'wb') as f:
+            f.write(data[:100])
+        self.assertEqual(
+            prjxray_build_inputs.read_build_inputs(connection_database, STAGE),
+            {}
+        )
+
+    def test_read_json_build_inputs(self):
+        pin_assignments = self.path('pin_assignments.json')
+        self.assertEqual(
+            prjxray_build_inputs.read_json_build_inputs(pin_assignments), {}
+        )
+
+        data = json.dumps(
+            {
+                'pin_directions': {},
+                'build_inputs': {
+                    'a.json': '1'
+                }
+            }
+        )
+        self.write(pin_assignments, data)
+        self.assertEqual(
+            prjxray_build_inputs.read_json_build_inputs(pin_assignments),
+            {'a.json': '1'}
+        )
+
+        self.write(pin_assignments, data[:len(data) // 2])
+        self.assertEqual(
+            prjxray_build_inputs.read_json_build_inputs(pin_assignments), {}
+        )
+
+    def test_is_up_to_date(self):
+        """ Outputs are only kept when they exist and no input changed. """
+        outputs = [self.path('channels.db'), self.path('vpr_grid_map.csv')]
+        hashes = {'a.json': '1', 'b.json': '2'}
+
+        up_to_date, message = self.is_up_to_date(hashes, hashes, outputs)
+        self.assertFalse(up_to_date)
+        self.assertIn('missing', message)
+
+        for fname in outputs:
+            self.write(fname, '')
+            os.utime(fname, (0, 0))
+
+        for old_hashes, reason in (
+            ({}, 'no recorded inputs'),
+            ({'a.json': '1', 'b.json': '3'}, 'inputs changed (b.json)'),
+            ({'a.json': '1'}, 'inputs changed (b.json)'),
+        ):
+            up_to_date, message = self.is_up_to_date(
+                old_hashes, hashes, outputs
+            )
+            self.assertFalse(up_to_date)
+            self.assertIn(reason, message)
+            self.assertEqual(
+                [os.path.getmtime(fname) for fname in outputs], [0, 0]
+            )
+
+        up_to_date, message = self.is_up_to_date(hashes, dict(hashes), outputs)
+        self.assertTrue(up_to_date)
+        self.assertIn('inputs unchanged', message)
+        for fname in outputs:
+            self.assertGreater(os.path.getmtime(fname), 0)
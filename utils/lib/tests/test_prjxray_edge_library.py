@@ -0,0 +1,369 @@
+import sqlite3
+import unittest
+from collections import namedtuple
+
+from ..connection_database import NodeClassification, create_tables
+from ..rr_graph import graph2
+from .xilinx_utils import import_xilinx_utils
+
+prjxray_form_channels = import_xilinx_utils('prjxray_form_channels')
+prjxray_edge_library = import_xilinx_utils('prjxray_edge_library')
+
+# Pips of the INT tile type, as (name, net_from, net_to, is_directional).
+INT_PIPS = (
+    ('INT.OUT->>E0', 'OUT', 'E0', True),
+    ('INT.OUT->>N0', 'OUT', 'N0', True),
+    ('INT.E1->>IN', 'E1', 'IN', True),
+    ('INT.N1->>IN', 'N1', 'IN', True),
+    ('INT.E1->>N0', 'E1', 'N0', True),
+    ('INT.N1->E0', 'N1', 'E0', False),
+)
+
+TilePip = namedtuple(
+    'TilePip', 'name net_from net_to is_directional is_pseudo'
+)
+
+
+class TileType(object):
+    def __init__(self, pips):
+        self.pips = pips
+
+    def get_pips(self):
+        return self.pips
+
+
+class Database(object):
+    """ Tile types of the fabric, like prjxray.db.Database. """
+
+    def get_tile_type(self, tile_type):
+        assert tile_type == 'INT', tile_type
+        return TileType(
+            [
+                TilePip(name, net_from, net_to, is_directional, False)
+                for name, net_from, net_to, is_directional in INT_PIPS
+            ]
+        )
+
+
+class Segments(object):
+    """ All the channels are in the unknown segment. """
+
+    def get_segment_for_wires(self, wires):
+        return 'unknown'
+
+
+GridInfo = namedtuple('GridInfo', 'tile_type')
+
+
+class Grid(object):
+    """ Grid of INT tiles, like prjxray.grid.Grid. """
+
+    def __init__(self, size):
+        self.size = size
+
+    def tile_locations(self):
+        return [(x, y) for x in range(self.size) for y in range(self.size)]
+
+    def tilename_at_loc(self, loc):
+        return 'INT_X{}Y{}'.format(*loc)
+
+    def gridinfo_at_loc(self, loc):
+        return GridInfo('INT')
+
+    def gridinfo_at_tilename(self, tilename):
+        assert tilename in map(self.tilename_at_loc, self.tile_locations()), \
+            tilename
+        return GridInfo('INT')
+
+
+def build_fabric(size):
+    """ Returns the connection database of a size x size grid of INT tiles.
+
+    Each tile has a site output pin OUT and input pin IN, and the channels
+    E0 -> E1 to the tile to the east and N0 -> N1 to the tile to the north.
+    Tracks are formed with form_tracks, the edges are left to create.
+
+    """
+    conn = sqlite3.connect(':memory:')
+    create_tables(conn)
+    cur = conn.cursor()
+
+    cur.execute("INSERT INTO tile_type(name) VALUES ('INT')")
+    tile_type_pkey = cur.lastrowid
+
+    cur.executemany(
+        "INSERT INTO segment(name) VALUES (?)", [
+            (name, ) for name in (
+                'unknown', prjxray_form_channels.VCC_NET,
+                prjxray_form_channels.GND_NET
+            )
+        ]
+    )
+    cur.executemany(
+        "INSERT INTO switch(name) VALUES (?)",
+        [(name, ) for name in ('pip', 'pip_backward', 'site_pin')]
+    )
+    switches = dict(
+        (name, pkey)
+        for pkey, name in cur.execute("SELECT pkey, name FROM switch")
+    )
+
+    cur.execute("INSERT INTO site_type(name) VALUES ('TIEOFF')")
+    cur.executemany(
+        "INSERT INTO site_pin(name, site_type_pkey) VALUES (?, ?)",
+        [('HARD1', cur.lastrowid), ('HARD0', cur.lastrowid)]
+    )
+
+    wire_in_tile = {}
+    for name in ('OUT', 'IN', 'E0', 'E1', 'N0', 'N1'):
+        cur.execute(
+            """
+INSERT INTO wire_in_tile(
+  name, phy_tile_type_pkey, tile_type_pkey, site_pin_switch_pkey,
+  capacitance, resistance)
+VALUES (?, ?, ?, ?, ?, ?)""", (
+                name, tile_type_pkey, tile_type_pkey,
+                switches['site_pin'] if name in ('OUT', 'IN') else None,
+                len(wire_in_tile) * 1e-15, len(wire_in_tile)
+            )
+        )
+        wire_in_tile[name] = cur.lastrowid
+
+    for name, net_from, net_to, is_directional in INT_PIPS:
+        cur.execute(
+            """
+INSERT INTO pip_in_tile(
+  name, tile_type_pkey, src_wire_in_tile_pkey, dest_wire_in_tile_pkey,
+  switch_pkey, backward_switch_pkey, is_directional, is_pseudo, can_invert)
+VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0)""", (
+                name, tile_type_pkey, wire_in_tile[net_from],
+                wire_in_tile[net_to], switches['pip'], switches['pip']
+                if is_directional else switches['pip_backward'], is_directional
+            )
+        )
+        cur.execute(
+            """
+INSERT INTO undirected_pips(wire_in_tile_pkey, other_wire_in_tile_pkey)
+VALUES (?, ?), (?, ?)""", (
+                wire_in_tile[net_from], wire_in_tile[net_to],
+                wire_in_tile[net_to], wire_in_tile[net_from]
+            )
+        )
+
+    # Keep an empty border around the tiles, like the VPR grid.
+    wires = {}
+    for x, y in Grid(size).tile_locations():
+        cur.execute(
+            """
+INSERT INTO phy_tile(name, tile_type_pkey, grid_x, grid_y)
+VALUES (?, ?, ?, ?)""",
+            ('INT_X{}Y{}'.format(x, y), tile_type_pkey, x + 1, y + 1)
+        )
+        phy_tile_pkey = cur.lastrowid
+
+        cur.execute(
+            """
+INSERT INTO tile(phy_tile_pkey, tile_type_pkey, grid_x, grid_y)
+VALUES (?, ?, ?, ?)""", (phy_tile_pkey, tile_type_pkey, x + 1, y + 1)
+        )
+        tile_pkey = cur.lastrowid
+
+        for name, wire_in_tile_pkey in wire_in_tile.items():
+            cur.execute(
+                """
+INSERT INTO wire(phy_tile_pkey, tile_pkey, wire_in_tile_pkey)
+VALUES (?, ?, ?)""", (phy_tile_pkey, tile_pkey, wire_in_tile_pkey)
+            )
+            wires[x, y, name] = cur.lastrowid
+
+    def add_node(classification, node_wires, site_wire_pkey=None):
+        cur.execute(
+            "INSERT INTO node(classification, site_wire_pkey) VALUES (?, ?)",
+            (classification.value, site_wire_pkey)
+        )
+        node_pkey = cur.lastrowid
+        for wire_pkey in node_wires:
+            cur.execute(
+                "UPDATE wire SET node_pkey = ? WHERE pkey = ?",
+                (node_pkey, wire_pkey)
+            )
+
+        return node_pkey
+
+    # The E1 and N1 wires of the tiles on the west and south border have no
+    # node.
+    for x, y in Grid(size).tile_locations():
+        for begin, end, other in (('E0', 'E1', (x + 1, y)), ('N0', 'N1',
+                                                             (x, y + 1))):
+            node_wires = [wires[x, y, begin]]
+            if other[0] < size and other[1] < size:
+                node_wires.append(wires[other + (end, )])
+
+            add_node(NodeClassification.CHANNEL, node_wires)
+
+    prjxray_form_channels.form_tracks(conn, Segments())
+
+    # Site pins, with a graph node on each side of the tile.
+    for x, y in Grid(size).tile_locations():
+        for name, node_type in (('OUT', graph2.NodeType.OPIN),
+                                ('IN', graph2.NodeType.IPIN)):
+            wire_pkey = wires[x, y, name]
+            node_pkey = add_node(
+                NodeClassification.EDGES_TO_CHANNEL, [wire_pkey], wire_pkey
+            )
+
+            graph_nodes = []
+            for _ in range(4):
+                cur.execute(
+                    """
+INSERT INTO graph_node(
+  graph_node_type, node_pkey, x_low, x_high, y_low, y_high, capacity)
+VALUES (?, ?, ?, ?, ?, ?, 1)""",
+                    (node_type.value, node_pkey, x + 1, x + 1, y + 1, y + 1)
+                )
+                graph_nodes.append(cur.lastrowid)
+
+            cur.execute(
+                """
+UPDATE wire SET
+  top_graph_node_pkey = ?, bottom_graph_node_pkey = ?,
+  left_graph_node_pkey = ?, right_graph_node_pkey = ?
+WHERE pkey = ?""", graph_nodes + [wire_pkey]
+            )
+
+    conn.commit()
+    return conn
+
+
+def dump_graph(conn):
+    return {
+        table: list(conn.execute(query))
+        for table, query in (
+            ('graph_edge', 'SELECT * FROM graph_edge ORDER BY rowid'),
+            ('graph_node', 'SELECT * FROM graph_node ORDER BY pkey'),
+            ('track', 'SELECT * FROM track ORDER BY pkey'),
+            (
+                'wire',
+                'SELECT pkey, site_pin_graph_node_pkey FROM wire ORDER BY pkey'
+            ),
+        )
+    }
+
+
+@unittest.skipIf(prjxray_edge_library is None, 'prjxray is not installed')
+class CreateEdgesTests(unittest.TestCase):
+    def create_edges(
+            self, size, jobs, connector_pool_size, snapshot_tables=None
+    ):
+        conn = build_fabric(size)
+        num_graph_nodes = conn.execute("SELECT count() FROM graph_node"
+                                       ).fetchone()[0]
+
+        stats = {}
+        prjxray_edge_library.create_and_insert_edges(
+            db=Database(),
+            grid=Grid(size),
+            conn=conn,
+            use_roi=False,
+            roi=None,
+            input_only_nodes=prjxray_edge_library.IntSet(),
+            output_only_nodes=prjxray_edge_library.IntSet(),
+            jobs=jobs,
+            connector_pool_size=connector_pool_size,
+            stats=stats,
+            snapshot_tables=snapshot_tables,
+        )
+
+        graph = dump_graph(conn)
+
+        # The site pin wire nodes are created with the edges.
+        self.assertGreater(len(graph['graph_node']), num_graph_nodes)
+        self.assertGreater(stats['connector_misses'], 0)
+
+        return graph
+
+    def test_jobs(self):
+        """ The edges do not depend on the number of jobs. """
+        graph = self.create_edges(
+            size=4,
+            jobs=1,
+            connector_pool_size=prjxray_edge_library.CONNECTOR_POOL_SIZE
+        )
+
+        # Every connected site pin wire gets a wire node. The IN pin of the
+        # south west tile has no channel to it.
+        site_pin_wires = [
+            wire for wire in graph['wire'] if wire[1] is not None
+        ]
+        self.assertEqual(len(site_pin_wires), 2 * 4 * 4 - 1)
+
+        for jobs, connector_pool_size, snapshot_tables in (
+            (2, 1 << 22, None),
+            (1, 8, None),
+            (2, 8, None),
+            (2, 8, ['wire', 'graph_node']),
+        ):
+            self.assertEqual(
+                graph,
+                self.create_edges(
+                    size=4,
+                    jobs=jobs,
+                    connector_pool_size=connector_pool_size,
+                    snapshot_tables=snapshot_tables
+                ), (jobs, connector_pool_size, snapshot_tables)
+            )
+
+
+@unittest.skipIf(prjxray_edge_library is None, 'prjxray is not installed')
+class FindRoiNodesTests(unittest.TestCase):
+    def test_synth_tiles_outside_grid(self):
+        """ Synth tiles that are not in the grid are skipped. """
+        conn = build_fabric(2)
+
+        def synth_tile(port_type, wire, wires_outside_roi):
+            return {
+                'pins': [{
+                    'port_type': port_type,
+                    'wire': wire
+                }],
+                'wires_outside_roi': wires_outside_roi,
+            }
+
+        synth_tiles = {
+            'tiles':
+                {
+                    'INT_X0Y0':
+                        synth_tile('input', 'IN', {}),
+                    'INT_X1Y0':
+                        synth_tile('output', 'OUT', {'INT_X1Y1': ['E0']}),
+                    'INT_X5Y5':
+                        synth_tile('input', 'IN', {}),
+                }
+        }
+
+        def wire_node(tile_name, wire):
+            return conn.execute(
+                """
+SELECT wire.node_pkey FROM wire
+INNER JOIN phy_tile ON phy_tile.pkey = wire.phy_tile_pkey
+INNER JOIN wire_in_tile ON wire_in_tile.pkey = wire.wire_in_tile_pkey
+WHERE phy_tile.name = ? AND wire_in_tile.name = ?""", (tile_name, wire)
+            ).fetchone()[0]
+
+        input_only_nodes, output_only_nodes = \
+            prjxray_edge_library.find_roi_nodes(conn, Grid(2), synth_tiles)
+        self.assertEqual(list(input_only_nodes), [wire_node('INT_X0Y0', 'IN')])
+        self.assertEqual(
+            sorted(output_only_nodes),
+            sorted(
+                [wire_node('INT_X1Y0', 'OUT'),
+                 wire_node('INT_X1Y1', 'E0')]
+            )
+        )
+
+        del synth_tiles['tiles']['INT_X0Y0']
+        del synth_tiles['tiles']['INT_X1Y0']
+        input_only_nodes, output_only_nodes = \
+            prjxray_edge_library.find_roi_nodes(conn, Grid(2), synth_tiles)
+        self.assertEqual(list(input_only_nodes), [])
+        self.assertEqual(list(output_only_nodes), [])
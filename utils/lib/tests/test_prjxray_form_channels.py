@@ -0,0 +1,114 @@
+import random
+import unittest
+from unittest import mock
+
+from ..connection_database import NodeClassification
+from .test_connection_database import build_database, \
+    reference_channel_nodes
+from .xilinx_utils import import_xilinx_utils
+
+prjxray_form_channels = import_xilinx_utils('prjxray_form_channels')
+
+
+class SegmentsByWire(object):
+    """ Segments of wires W0 to W3, like SegmentWireMap. """
+
+    def get_segment_for_wires(self, wires):
+        segments = set('SEG_{}'.format(wire) for wire in wires if wire < 'W4')
+        if len(segments) == 1:
+            return segments.pop()
+
+        return 'unknown'
+
+
+def build_channels_database(seed):
+    """ Returns a random connection database, ready for form_tracks. """
+    conn = build_database(seed)
+    rng = random.Random(seed)
+    cur = conn.cursor()
+
+    cur.execute(
+        "UPDATE wire_in_tile SET capacitance = pkey * 1e-15, resistance = pkey"
+    )
+    cur.executemany(
+        "INSERT INTO segment(name) VALUES (?)", [
+            (name, ) for name in (
+                'unknown', prjxray_form_channels.VCC_NET,
+                prjxray_form_channels.GND_NET, 'SEG_W0', 'SEG_W1', 'SEG_W2',
+                'SEG_W3'
+            )
+        ]
+    )
+
+    # Like the VPR grid, keep an empty border around the tiles.
+    cur.execute("UPDATE tile SET grid_x = grid_x + 1, grid_y = grid_y + 1")
+
+    # Every channel of a real part has a location.
+    cur.executemany(
+        "UPDATE node SET classification = ? WHERE pkey = ?", [
+            (NodeClassification.NULL.value, node_pkey)
+            for node_pkey, unique_pos, _ in reference_channel_nodes(conn)
+            if not unique_pos
+        ]
+    )
+
+    # Tie two wires to the constant network.
+    cur.execute("INSERT INTO site_type(name) VALUES ('TIEOFF')")
+    site_type_pkey = cur.lastrowid
+    wire_in_tile_pkeys = [
+        pkey for (pkey, ) in cur.execute("SELECT pkey FROM wire_in_tile")
+    ]
+    for pin, wire_in_tile_pkey in zip(('HARD1', 'HARD0'),
+                                      rng.sample(wire_in_tile_pkeys, 2)):
+        cur.execute(
+            "INSERT INTO site_pin(name, site_type_pkey) VALUES (?, ?)",
+            (pin, site_type_pkey)
+        )
+        cur.execute(
+            "UPDATE wire_in_tile SET site_pin_pkey = ? WHERE pkey = ?",
+            (cur.lastrowid, wire_in_tile_pkey)
+        )
+
+    conn.commit()
+    return conn
+
+
+def dump_tracks(conn):
+    return {
+        table: list(conn.execute(query))
+        for table, query in (
+            ('track', 'SELECT * FROM track ORDER BY pkey'),
+            ('graph_node', 'SELECT * FROM graph_node ORDER BY pkey'),
+            ('graph_edge', 'SELECT * FROM graph_edge ORDER BY rowid'),
+            ('node', 'SELECT pkey, track_pkey FROM node ORDER BY pkey'),
+            ('wire', 'SELECT pkey, graph_node_pkey FROM wire ORDER BY pkey'),
+        )
+    }
+
+
+@unittest.skipIf(prjxray_form_channels is None, 'prjxray is not installed')
+class FormTracksTests(unittest.TestCase):
+    def test_form_tracks(self):
+        """ form_tracks matches the per node queries it used before. """
+        for seed in range(3):
+            conn = build_channels_database(seed)
+            prjxray_form_channels.form_tracks(conn, SegmentsByWire())
+
+            reference_conn = build_channels_database(seed)
+            with mock.patch.object(prjxray_form_channels,
+                                   'yield_channel_nodes',
+                                   reference_channel_nodes):
+                prjxray_form_channels.form_tracks(
+                    reference_conn, SegmentsByWire()
+                )
+
+            tables = dump_tracks(conn)
+            self.assertEqual(tables, dump_tracks(reference_conn))
+
+            # One track per channel, including the VCC and GND channels.
+            num_channels = conn.execute(
+                "SELECT count() FROM node WHERE classification = ?",
+                (NodeClassification.CHANNEL.value, )
+            ).fetchone()[0]
+            self.assertEqual(len(tables['track']), num_channels)
+            self.assertGreater(len(tables['graph_node']), num_channels)
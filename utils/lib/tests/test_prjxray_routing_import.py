@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+from ..rr_graph import graph2
+from .xilinx_utils import import_xilinx_utils
+
+prjxray_routing_import = import_xilinx_utils('prjxray_routing_import')
+prjxray_routing_import_benchmark = import_xilinx_utils(
+    'prjxray_routing_import_benchmark'
+)
+
+
+@unittest.skipIf(prjxray_routing_import is None, 'prjxray is not installed')
+class PipFeatureTests(unittest.TestCase):
+    def setUp(self):
+        # The populate functions replace these module tables.
+        patcher = mock.patch.multiple(
+            prjxray_routing_import,
+            HCLK_CMT_TILES={},
+            REBUF_NODES={},
+            REBUF_SOURCES={},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.conn = prjxray_routing_import_benchmark.build_edge_database(
+            num_tiles=500, num_pips=20, num_edges=2000, seed=0
+        )
+        self.extra_features = \
+            prjxray_routing_import_benchmark.populate_features(self.conn)
+
+    def test_get_pip_feature(self):
+        """ get_pip_feature matches check_feature on every pip of every tile.
+        """
+        get_pip_feature = prjxray_routing_import.create_get_pip_feature(
+            self.conn, self.extra_features
+        )
+
+        pip_edges = [
+            (tile_name, pip_pkey, backward)
+            for tile_name, pip_pkey in self.conn.execute(
+                """
+SELECT phy_tile.name, pip_in_tile.pkey
+FROM phy_tile
+INNER JOIN pip_in_tile
+  ON pip_in_tile.tile_type_pkey = phy_tile.tile_type_pkey
+ORDER BY phy_tile.pkey, pip_in_tile.pkey;"""
+            )
+            for backward in (0, 1)
+        ]
+        features = prjxray_routing_import_benchmark.check_pip_features(
+            self.conn, self.extra_features, pip_edges
+        )
+
+        cases = set()
+        for (tile_name, pip_pkey, backward), feature in zip(pip_edges,
+                                                            features):
+            self.assertEqual(
+                get_pip_feature(tile_name, pip_pkey, backward), feature,
+                (tile_name, pip_pkey, backward)
+            )
+
+            if 'IOI3_SING' in tile_name and tile_name.endswith('Y0'):
+                cases.add('IOI3_SING bottom')
+            elif 'IOI3_SING' in tile_name:
+                cases.add('IOI3_SING top')
+            elif 'ENABLE_BELOW' in feature or 'ENABLE_ABOVE' in feature:
+                cases.add('REBUF')
+            elif 'HCLK_CMT_CK_BUFHCLK' in feature:
+                cases.add('HCLK_OUT')
+            elif 'FREQ_BB' in feature and '_ACTIVE' in feature:
+                cases.add('extra_features')
+
+        self.assertEqual(
+            cases, {
+                'IOI3_SING bottom', 'IOI3_SING top', 'REBUF', 'HCLK_OUT',
+                'extra_features'
+            }
+        )
+
+    def test_import_graph_edges(self):
+        """ import_graph_edges yields the check_feature of each pip edge. """
+        node_mapping = dict(
+            (graph_node_pkey, (graph_node_pkey, graph2.NodeType.CHANX))
+            for graph_node_pkey in range(2000)
+        )
+
+        features = [
+            dict(edge[3]).get('fasm_features')
+            for edge in prjxray_routing_import.import_graph_edges(
+                self.conn, prjxray_routing_import_benchmark.Graph(),
+                self.extra_features, node_mapping
+            )
+        ]
+
+        pip_edges = prjxray_routing_import_benchmark.load_pip_edges(self.conn)
+        self.assertEqual(
+            [feature for feature in features if feature is not None],
+            prjxray_routing_import_benchmark.check_pip_features(
+                self.conn, self.extra_features, pip_edges
+            )
+        )
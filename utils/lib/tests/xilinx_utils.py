@@ -0,0 +1,29 @@
+""" Imports the xilinx/common/utils scripts for the tests of the stages. """
+import importlib
+import os
+import sys
+
+XILINX_UTILS = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), '..', '..', '..', 'xilinx', 'common',
+        'utils'
+    )
+)
+
+
+def import_xilinx_utils(name):
+    """ Returns the module name of xilinx/common/utils.
+
+    Returns None when prjxray is not installed, the tests using the module
+    are then skipped.
+
+    """
+    if XILINX_UTILS not in sys.path:
+        sys.path.append(XILINX_UTILS)
+
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        if e.name == 'prjxray' or e.name.startswith('prjxray.'):
+            return None
+        raise
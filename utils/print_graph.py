@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-import lib.rr_graph.graph as graph
+from lib.rr_graph.graph_cache import GraphCache
 
 
 def print_block_types(g):
@@ -46,67 +46,52 @@ def print_grid(g):
         print()
 
 
-def print_nodes(g, lim=None):
-    '''Display source/sink edges on all XML nodes'''
+def print_nodes(g, cache, lim=None):
+    '''Display source/sink edges on all nodes'''
 
-    def node_name(node):
-        return graph.RoutingGraphPrinter.node(node, g.block_grid)
+    def node_name(node_id):
+        return cache.node_name(node_id, g.block_grid)
 
-    def edge_name(node, flip=False):
-        return graph.RoutingGraphPrinter.edge(
-            g.routing, node, block_grid=g.block_grid, flip=flip
-        )
+    def edge_name(src_node, sink_node, flip=False):
+        if flip:
+            s = "{} -<<- {}"
+        else:
+            s = "{} ->>- {}"
+        return s.format(node_name(src_node), node_name(sink_node))
 
-    routing = g.routing
-    print(
-        'Nodes: {}, edges {}'.format(
-            len(routing._ids_map(graph.RoutingNode)),
-            len(routing._ids_map(graph.RoutingEdge))
-        )
-    )
+    node_ids = cache.node_ids()
+    print('Nodes: {}, edges {}'.format(len(node_ids), cache.num_edges))
 
-    nodemap = routing._ids_map(graph.RoutingNode)
-    edgemap = routing._ids_map(graph.RoutingEdge)
-    node2edges = routing.edges_for_allnodes()
-    for i, node_id in enumerate(sorted(node2edges.keys())):
-        node = nodemap[node_id]
+    for i, node_id in enumerate(node_ids.tolist()):
         print()
         if lim and i >= lim:
             print('...')
             break
-        print('{} - {} ({})'.format(i, node_name(node), node_id))
-        srcs = []
-        snks = []
-        for e in node2edges[node_id]:
-            edge = edgemap[e]
-            src, snk = routing.nodes_for_edge(edge)
-            if src == node:
-                srcs.append(edge)
-            elif snk == node:
-                snks.append(edge)
-            else:
-                print("!?@", edge_name(edge))
+        print('{} - {} ({})'.format(i, node_name(node_id), node_id))
+
+        sink_nodes, _ = cache.out_edges(node_id)
+        src_nodes, _ = cache.in_edges(node_id)
 
         print("  Sources:")
-        for e in srcs:
-            print("   ", edge_name(e))
-        if not srcs:
+        for sink_node in sink_nodes.tolist():
+            print("   ", edge_name(node_id, sink_node))
+        if not len(sink_nodes):
             print("   ", None)
 
         print("  Sink:")
-        for e in snks:
-            print("   ", edge_name(e, flip=True))
-        if not snks:
+        for src_node in src_nodes.tolist():
+            print("   ", edge_name(src_node, node_id, flip=True))
+        if not len(src_nodes):
             print("   ", None)
 
 
-def print_graph(g, lim=0):
+def print_graph(g, cache, lim=0):
     print()
     print_block_types(g)
     print()
     print_grid(g)
     print()
-    print_nodes(g, lim=lim)
+    print_nodes(g, cache, lim=lim)
     print()
 
 
@@ -115,11 +100,16 @@ def main():
 
     parser = argparse.ArgumentParser("Print rr_graph.xml file")
     parser.add_argument("--lim", type=int, default=0)
+    parser.add_argument(
+        "--cache",
+        help="Graph cache file, built on first use. Defaults to the rr_graph "
+        "file with a .cache suffix"
+    )
     parser.add_argument("rr_graph")
     args = parser.parse_args()
 
-    g = graph.Graph(args.rr_graph)
-    print_graph(g, lim=args.lim)
+    cache = GraphCache.open(args.rr_graph, args.cache)
+    print_graph(cache.skeleton_graph(), cache, lim=args.lim)
 
 
 if __name__ == "__main__":
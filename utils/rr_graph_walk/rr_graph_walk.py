@@ -3,16 +3,20 @@
 This utility script allows to walk through the routing graph from a given
 starting node id to a given target node id. If the target node id is not
 given then it lists all available routes which start at the starting node.
+
+With --max-paths, the cheapest routes from any of the start nodes to any of
+the end nodes are searched instead, by hop count or by switch delay.
 """
 
 import sys
 import argparse
-import gc
 from collections import namedtuple
 
-import lxml.etree as ET
+import numpy as np
 
-from progressbar import progressbar
+from lib.rr_graph import paths
+from lib.rr_graph.graph_cache import GraphCache
+from lib.rr_graph.graph2 import NodeType
 
 # =============================================================================
 
@@ -25,105 +29,57 @@ class RoutingGraph(object):
     Node = namedtuple("Node", "id type xlow ylow xhigh yhigh")
     WalkContext = namedtuple("WalkContext", "node_id depth")
 
-    def __init__(self, xml_file):
+    def __init__(self, xml_file, cache_file=None):
         """
         Constructs the graph given a VPR routing graph file
 
         Args:
             xml_file: Name of the XML file with the graph.
+            cache_file: Name of the graph cache file, see
+                lib.rr_graph.graph_cache. Built from the XML if missing or
+                stale.
         """
 
-        self.nodes = {}
-
-        self.edges_from = {}
-        self.edges_to = {}
+        print("Loading routing graph...")
+        self.cache = GraphCache.open(xml_file, cache_file, verbose=True)
 
-        # Load and parse the routing graph
-        self._load_and_parse_rr_graph(xml_file)
+        print(
+            "{} nodes, {} edges".format(
+                len(self.cache.node_ids()), self.cache.num_edges
+            )
+        )
 
-    def _load_and_parse_rr_graph(self, xml_file):
+    def node(self, node_id):
         """
-        Loads the routing graph, extracts nodes and edges from the XML.
-
-        Args:
-            xml_file: Name of the XML file with the graph.
+        Returns the Node of a node id
         """
 
-        def append_edge(edge_dict, key_node, target_node):
-            if key_node not in edge_dict.keys():
-                edge_dict[key_node] = [target_node]
-            else:
-                edge_dict[key_node].append(target_node)
-
-        print("Loading and parsing XML file...")
-
-        # Load and initialize parser
-        parser = ET.iterparse(xml_file, events=("start", "end"))
-        parser = iter(parser)
-
-        # Parse
-        expect_nodes = False
-        expect_edges = False
-
-        for event, element in progressbar(parser):
-
-            # Start
-            if event == "start":
-
-                # Begin "rr_nodes"
-                if element.tag == "rr_nodes":
-                    expect_nodes = True
-                # Begin "rr_edges"
-                if element.tag == "rr_edges":
-                    expect_edges = True
-
-            # End
-            elif event == "end":
-
-                # End "rr_nodes"
-                if element.tag == "rr_nodes":
-                    expect_nodes = False
-                # End "rr_edges"
-                if element.tag == "rr_edges":
-                    expect_edges = False
-
-                # Got a complete node element
-                if expect_nodes and element.tag == "node":
-
-                    # Find the "loc" tag
-                    xml_loc = element.find("loc")
-
-                    # Append the node
-                    node = RoutingGraph.Node(
-                        id=int(element.get("id")),
-                        type=element.get("type"),
-                        xlow=int(xml_loc.get("xlow")),
-                        ylow=int(xml_loc.get("ylow")),
-                        xhigh=int(xml_loc.get("xhigh")),
-                        yhigh=int(xml_loc.get("yhigh"))
-                    )
-                    self.nodes[node.id] = node
-
-                # Got a complete edge element
-                if expect_edges and element.tag == "edge":
-                    src_node = int(element.get("src_node"))
-                    dst_node = int(element.get("sink_node"))
+        cache = self.cache
+        return RoutingGraph.Node(
+            id=node_id,
+            type=NodeType(int(cache.type[node_id])).name,
+            xlow=int(cache.xlow[node_id]),
+            ylow=int(cache.ylow[node_id]),
+            xhigh=int(cache.xhigh[node_id]),
+            yhigh=int(cache.yhigh[node_id])
+        )
 
-                    # Append edge
-                    append_edge(self.edges_from, src_node, dst_node)
-                    append_edge(self.edges_to, dst_node, src_node)
+    def next_nodes(self, node_id, walk_direction):
+        """
+        Returns list of node ids connected to a node along the walk direction
 
-                # Clear the element
-                if element.tag != "loc":
-                    element.clear()
+        Args:
+            node_id: Numerical identifier of a graph node
+            walk_direction: When > 0 its along graph edges direction, when < 0
+                its the opposite direction.
+        """
 
-        # Clean up
-        del parser
-        gc.collect()
+        if walk_direction > 0:
+            nodes, _ = self.cache.out_edges(node_id)
+        else:
+            nodes, _ = self.cache.in_edges(node_id)
 
-        print(
-            "{} nodes, {} edges".format(len(self.nodes), len(self.edges_from))
-        )
+        return nodes.tolist()
 
     def node_to_string(self, node_id):
         """
@@ -136,7 +92,7 @@ class RoutingGraph(object):
             String with a pretty node description
         """
 
-        node = self.nodes[node_id]
+        node = self.node(node_id)
 
         return "%s:%d [%d,%d,%d,%d]" % (
             node.type, node.id, node.xlow, node.ylow, node.xhigh, node.yhigh
@@ -165,21 +121,7 @@ class RoutingGraph(object):
             dst_id = route[i + 1]
 
             # Find edge from src to dst
-            edge_valid = False
-
-            if walk_direction > 0:
-                if src_id in self.edges_from:
-                    for dst in self.edges_from[src_id]:
-                        if dst == dst_id:
-                            edge_valid = True
-                            break
-
-            if walk_direction < 0:
-                if src_id in self.edges_to:
-                    for dst in self.edges_to[src_id]:
-                        if dst == dst_id:
-                            edge_valid = True
-                            break
+            edge_valid = dst_id in self.next_nodes(src_id, walk_direction)
 
             # Edge not valid
             if not edge_valid:
@@ -197,6 +139,44 @@ class RoutingGraph(object):
 
         return True
 
+    def shortest_paths(
+            self,
+            start_node_ids,
+            end_node_ids,
+            max_paths,
+            max_depth=None,
+            cost="hops"
+    ):
+        """
+        Finds the cheapest routes from any start node to any end node
+
+        Args:
+            start_node_ids: Identifiers of the start nodes.
+            end_node_ids: Identifiers of the end nodes.
+            max_paths: Maximum number of routes to return.
+            max_depth: Maximum number of edges of a route, or None.
+            cost: "hops" to count edges, "delay" to sum the switch Tdel.
+
+        Returns:
+            List of lib.rr_graph.paths.Path, in order of increasing cost
+        """
+
+        num_switches = int(self.cache.out_switches.max()) + 1 \
+            if self.cache.num_edges else 1
+
+        if cost == "hops":
+            switch_costs = paths.hop_costs(num_switches)
+        elif cost == "delay":
+            switches = self.cache.skeleton_graph().switches._ids.values()
+            switch_costs = paths.switch_delays(switches)
+        else:
+            assert False, cost
+
+        return paths.k_shortest_paths(
+            self.cache, switch_costs, start_node_ids, end_node_ids, max_paths,
+            max_depth
+        )
+
     def walk(self, start_node_id, route_callback, walk_direction):
         """
         Walk the routing graph from a given starting node id.
@@ -212,8 +192,9 @@ class RoutingGraph(object):
                 stops, if returns true then the walk continues.
         """
 
-        # Copy all nodes. A node is removed from this set once visited.
-        walk_nodes = set([node.id for node in self.nodes.values()])
+        # Nodes visited so far.
+        visited = np.zeros(self.cache.num_nodes, dtype=bool)
+        visited[start_node_id] = True
 
         # Add the starting node id
         stack = list()
@@ -236,33 +217,14 @@ class RoutingGraph(object):
             # Add all nodes that can be reached from this one through edges
             is_leaf = True
 
-            # Walking forward
-            if walk_direction > 0:
-                if context.node_id in self.edges_from.keys():
-                    for dst in self.edges_from[context.node_id]:
-                        # We haven't visited the target
-                        if dst in walk_nodes:
-                            stack.append(
-                                RoutingGraph.WalkContext(
-                                    dst, context.depth + 1
-                                )
-                            )
-                            walk_nodes.remove(dst)
-                            is_leaf = False
-
-            # Walking backward
-            if walk_direction < 0:
-                if context.node_id in self.edges_to.keys():
-                    for src in self.edges_to[context.node_id]:
-                        # We haven't visited the target
-                        if src in walk_nodes:
-                            stack.append(
-                                RoutingGraph.WalkContext(
-                                    src, context.depth + 1
-                                )
-                            )
-                            walk_nodes.remove(src)
-                            is_leaf = False
+            for next_id in self.next_nodes(context.node_id, walk_direction):
+                # We haven't visited the target
+                if not visited[next_id]:
+                    stack.append(
+                        RoutingGraph.WalkContext(next_id, context.depth + 1)
+                    )
+                    visited[next_id] = True
+                    is_leaf = False
 
             # We are in a leaf node
             if is_leaf:
@@ -332,20 +294,52 @@ def main():
     parser.add_argument(
         "--rr_graph", type=str, required=True, help="Routing graph XML file"
     )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="Graph cache file, built on first use. Defaults to the routing"
+        " graph file name with a .cache suffix"
+    )
     parser.add_argument(
         "-s",
         "--start_inode",
         type=int,
+        nargs="+",
         required=True,
-        help="Start node id (required)"
+        help="Start node id (required). Several start node ids may be given"
+        " with --max-paths"
     )
     parser.add_argument(
         "-e",
         "--end_inode",
         type=int,
-        default=-1,
+        nargs="+",
+        default=None,
         help="End node id. If not specified then all reachable"
-        "leaf nodes will be reported."
+        "leaf nodes will be reported. Several end node ids may be given with"
+        " --max-paths"
+    )
+    parser.add_argument(
+        "--max-paths",
+        type=int,
+        default=None,
+        help="Search for at most this many cheapest routes from any start"
+        " node to any end node, instead of walking all routes"
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=None,
+        help="Maximum number of edges of the routes searched with"
+        " --max-paths"
+    )
+    parser.add_argument(
+        "--cost",
+        choices=("hops", "delay"),
+        default="hops",
+        help="Cost of the routes searched with --max-paths, number of edges"
+        " or sum of the switch delays"
     )
     parser.add_argument(
         "--route",
@@ -372,11 +366,45 @@ def main():
 
     args = parser.parse_args()
 
+    if args.max_paths is not None:
+        if args.end_inode is None:
+            parser.error("--max-paths requires --end_inode")
+    elif len(args.start_inode) > 1 or len(args.end_inode or []) > 1:
+        parser.error("Several start or end nodes require --max-paths")
+
     # Load the routing graph
-    rr_graph = RoutingGraph(args.rr_graph)
+    rr_graph = RoutingGraph(args.rr_graph, args.cache)
 
     # Open the route file
     route_file = open(args.route, "w")
+
+    # Search for the cheapest routes
+    if args.max_paths is not None:
+        print(
+            "Searching for %d cheapest routes by %s..." %
+            (args.max_paths, args.cost)
+        )
+
+        routes = rr_graph.shortest_paths(
+            args.start_inode, args.end_inode, args.max_paths, args.max_depth,
+            args.cost
+        )
+
+        for route in routes:
+            save_route(route.nodes, route_file)
+
+            if args.print:
+                print("cost %g: " % route.cost, end="")
+                print_route(rr_graph, route.nodes)
+
+        if not routes:
+            print("No route to the target node!")
+            exit(-1)
+
+        return
+
+    start_inode = args.start_inode[0]
+    end_inode = args.end_inode[0] if args.end_inode is not None else -1
     target_reached = False
 
     # The route callback
@@ -384,7 +412,7 @@ def main():
         nonlocal target_reached
 
         # Get endpoint
-        endpoint = graph.nodes[route[-1]]
+        endpoint = graph.node(route[-1])
 
         # Check if we hit CHANX/CHANY if we do not want to output them then
         # skip those routes.
@@ -394,7 +422,7 @@ def main():
 
         # If we are looking for a particular target node then do not save/print
         # other routes.
-        if args.end_inode >= 0 and endpoint.id != args.end_inode:
+        if end_inode >= 0 and endpoint.id != end_inode:
             return True
 
         # Save the route
@@ -405,34 +433,34 @@ def main():
             print_route(graph, route)
 
         # Hit anything
-        if args.end_inode < 0:
+        if end_inode < 0:
             target_reached = True
 
         # Hit target, stop
-        if args.end_inode == endpoint.id:
+        if end_inode == endpoint.id:
             target_reached = True
             return False
 
         return True
 
     # Determine walk direction
-    node = rr_graph.nodes[args.start_inode]
+    node = rr_graph.node(start_inode)
 
     if node.type == "SOURCE" or node.type == "OPIN":
         walk_direction = +1
-        print("Walking forward from %d" % args.start_inode, end="")
+        print("Walking forward from %d" % start_inode, end="")
 
     if node.type == "SINK" or node.type == "IPIN":
         walk_direction = -1
-        print("Walking backward from %d" % args.start_inode, end="")
+        print("Walking backward from %d" % start_inode, end="")
 
-    if args.end_inode >= 0:
-        print(" to %d..." % args.end_inode)
+    if end_inode >= 0:
+        print(" to %d..." % end_inode)
     else:
         print("...")
 
     # Start the walk
-    rr_graph.walk(args.start_inode, route_callback, walk_direction)
+    rr_graph.walk(start_inode, route_callback, walk_direction)
 
     # Check if we have reached the target
     if not target_reached:
@@ -141,7 +141,7 @@ function(ADD_XC_ARCH_DEFINE)
         --part \${PART} \
         --read_rr_graph \${OUT_RRXML_VIRT} \
         --write_rr_graph \${OUT_RRXML_REAL} \
-        --write_rr_node_map \${OUT_RRXML_REAL}.node_map.pickle \
+        --write_rr_node_map \${OUT_RRXML_REAL}.node_map \
         --vpr_capnp_schema_dir ${VPR_CAPNP_SCHEMA_DIR}
         "
     PLACE_TOOL_CMD "${CMAKE_COMMAND} -E env \
@@ -256,6 +256,7 @@ function(PROJECT_RAY_PREPARE_DATABASE)
       --part ${PROTOTYPE_PART}
       --connection_database ${CMAKE_CURRENT_BINARY_DIR}/${CHANNELS}
       --grid_map_output ${CMAKE_CURRENT_BINARY_DIR}/${VPR_GRID_MAP}
+      --incremental
       DEPENDS
       ${FORM_CHANNELS}
       ${DEPS} ${DEPS2} ${DEPS3}
@@ -284,6 +285,7 @@ function(PROJECT_RAY_PREPARE_DATABASE)
     --part ${PROTOTYPE_PART}
     --connection_database ${CMAKE_CURRENT_BINARY_DIR}/${PROTOTYPE_CHANNELS}
     --pin_assignments ${CMAKE_CURRENT_BINARY_DIR}/${PIN_ASSIGNMENTS}
+    --incremental
     DEPENDS
     ${ASSIGN_PINS}
     ${DEPS} ${DEPS2} ${DEPS3}
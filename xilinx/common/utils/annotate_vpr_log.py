@@ -3,18 +3,20 @@
 """
 import argparse
 import functools
-import pickle
 import re
 import sqlite3
 import sys
 
+from lib.rr_graph.node_map import NodeMap
 
-def create_lookup_inode(conn, inode_to_graph_map):
+
+def create_lookup_inode(conn, node_map):
     cur = conn.cursor()
 
     @functools.lru_cache(maxsize=1024 * 1024)
     def lookup_inode(inode):
-        if inode not in inode_to_graph_map:
+        graph_node_pkey = node_map.get_graph_node_pkey(inode)
+        if graph_node_pkey is None:
             return '{}'.format(inode)
         else:
             cur.execute(
@@ -25,7 +27,7 @@ INNER JOIN wire ON graph_node.node_pkey = wire.node_pkey
 INNER JOIN wire_in_tile ON wire.wire_in_tile_pkey = wire_in_tile.pkey
 INNER JOIN phy_tile ON wire.phy_tile_pkey = phy_tile.pkey
 WHERE graph_node.pkey = ?
-LIMIT 1;""", (inode_to_graph_map[inode], )
+LIMIT 1;""", (graph_node_pkey, )
             )
             tile, wire = cur.fetchone()
 
@@ -41,19 +43,13 @@ def main():
 
     args = parser.parse_args()
 
-    with open(args.rrgraph_node_map, 'rb') as f:
-        node_map = pickle.load(f)
-
-    inode_to_graph_map = {}
-    for graph_node_pkey, rr_inode in node_map.items():
-        assert rr_inode not in inode_to_graph_map
-        inode_to_graph_map[rr_inode] = graph_node_pkey
+    node_map = NodeMap(args.rrgraph_node_map)
 
     conn = sqlite3.connect(
         'file:{}?mode=ro'.format(args.connection_database), uri=True
     )
 
-    lookup_inode = create_lookup_inode(conn, inode_to_graph_map)
+    lookup_inode = create_lookup_inode(conn, node_map)
 
     def replace_inode(match):
         return match.group(1) + ' ' + lookup_inode(int(match.group(2)))
@@ -20,6 +20,7 @@ import sys
 
 import lxml.etree as ET
 
+from lib.perf_utils import PhaseLog, add_perf_args
 from prjxray_db_cache import DatabaseCache
 from prjxray_tile_import import add_vpr_tile_prefix
 
@@ -939,41 +940,8 @@ def insert_constant_tiles(conn, model_xml, complexblocklist_xml, tiles_xml):
     return synth_tile_map, synth_loc_map
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Generate arch.xml")
-    parser.add_argument(
-        '--db_root', required=True, help="Project X-Ray database to use."
-    )
-    parser.add_argument('--part', required=True, help="FPGA part")
-    parser.add_argument(
-        '--output-arch',
-        nargs='?',
-        type=argparse.FileType('w'),
-        help="""File to output arch."""
-    )
-    parser.add_argument(
-        '--tile-types', required=True, help="Semi-colon seperated tile types."
-    )
-    parser.add_argument(
-        '--pb_types',
-        required=True,
-        help="Semi-colon seperated pb_types types."
-    )
-    parser.add_argument(
-        '--pin_assignments', required=True, type=argparse.FileType('r')
-    )
-    parser.add_argument('--use_roi', required=False)
-    parser.add_argument('--use_overlay', required=False)
-    parser.add_argument('--device', required=True)
-    parser.add_argument('--synth_tiles', required=False)
-    parser.add_argument('--connection_database', required=True)
-    parser.add_argument(
-        '--graph_limit',
-        help='Limit grid to specified dimensions in x_min,y_min,x_max,y_max',
-    )
-
-    args = parser.parse_args()
-
+def import_arch(args, perf):
+    """ Writes the arch.xml of args.device to args.output_arch. """
     tile_types = args.tile_types.split(',')
     pb_types = args.pb_types.split(',')
 
@@ -1180,24 +1148,27 @@ def main():
             }
         )
 
-        for vpr_tile_type, grid_x, grid_y, metadata_function in get_tiles(
-                conn=conn,
-                g=g,
-                roi=roi,
-                synth_loc_map=synth_loc_map,
-                synth_tile_map=synth_tile_map,
-                tile_types=tile_types,
-                tile_capacity=tile_capacity,
-        ):
-            single_xml = ET.SubElement(
-                fixed_layout_xml, 'single', {
-                    'priority': '1',
-                    'type': vpr_tile_type,
-                    'x': str(grid_x),
-                    'y': str(grid_y),
-                }
-            )
-            metadata_function(single_xml)
+        with perf.phase('Creating layout', conn) as stats:
+            for vpr_tile_type, grid_x, grid_y, metadata_function in get_tiles(
+                    conn=conn,
+                    g=g,
+                    roi=roi,
+                    synth_loc_map=synth_loc_map,
+                    synth_tile_map=synth_tile_map,
+                    tile_types=tile_types,
+                    tile_capacity=tile_capacity,
+            ):
+                single_xml = ET.SubElement(
+                    fixed_layout_xml, 'single', {
+                        'priority': '1',
+                        'type': vpr_tile_type,
+                        'x': str(grid_x),
+                        'y': str(grid_y),
+                    }
+                )
+                metadata_function(single_xml)
+
+            stats['tiles'] = len(fixed_layout_xml)
 
         switchlist_xml = ET.SubElement(arch_xml, 'switchlist')
 
@@ -1439,9 +1410,51 @@ WHERE
 
             add_direct(directlist_xml, direct)
 
-    arch_xml_str = ET.tostring(arch_xml, pretty_print=True).decode('utf-8')
-    args.output_arch.write(arch_xml_str)
-    args.output_arch.close()
+    with perf.phase('Writing arch'):
+        arch_xml_str = ET.tostring(arch_xml, pretty_print=True).decode('utf-8')
+        args.output_arch.write(arch_xml_str)
+        args.output_arch.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate arch.xml")
+    parser.add_argument(
+        '--db_root', required=True, help="Project X-Ray database to use."
+    )
+    parser.add_argument('--part', required=True, help="FPGA part")
+    parser.add_argument(
+        '--output-arch',
+        nargs='?',
+        type=argparse.FileType('w'),
+        help="""File to output arch."""
+    )
+    parser.add_argument(
+        '--tile-types', required=True, help="Semi-colon seperated tile types."
+    )
+    parser.add_argument(
+        '--pb_types',
+        required=True,
+        help="Semi-colon seperated pb_types types."
+    )
+    parser.add_argument(
+        '--pin_assignments', required=True, type=argparse.FileType('r')
+    )
+    parser.add_argument('--use_roi', required=False)
+    parser.add_argument('--use_overlay', required=False)
+    parser.add_argument('--device', required=True)
+    parser.add_argument('--synth_tiles', required=False)
+    parser.add_argument('--connection_database', required=True)
+    parser.add_argument(
+        '--graph_limit',
+        help='Limit grid to specified dimensions in x_min,y_min,x_max,y_max',
+    )
+
+    add_perf_args(parser)
+
+    args = parser.parse_args()
+
+    with PhaseLog.from_args(args) as perf:
+        import_arch(args, perf)
 
 
 if __name__ == '__main__':
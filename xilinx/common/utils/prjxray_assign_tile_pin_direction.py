@@ -15,18 +15,22 @@ prjxray_assign_tile_pin_direction.
 """
 import argparse
 from collections import namedtuple
+import numpy as np
 import prjxray.db
 import prjxray.tile
 import simplejson as json
 from lib.rr_graph import tracks
 from lib.connection_database import (
-    NodeClassification, yield_logical_wire_info_from_node, get_track_model,
-    node_to_site_pins, get_pin_name_of_wire
+    NodeClassification, WireIndex, get_track_model, get_track_models
 )
 from prjxray_constant_site_pins import yield_ties_to_wire
 from lib import progressbar_utils
 import datetime
 
+from prjxray_build_inputs import (
+    ASSIGN_PINS_STAGE, FORM_CHANNELS_STAGE, add_upstream_build_inputs,
+    hash_prjxray_inputs, hash_sources, is_up_to_date, read_json_build_inputs
+)
 from prjxray_db_cache import DatabaseCache
 
 now = datetime.datetime.now
@@ -35,83 +39,46 @@ DirectConnection = namedtuple(
 )
 
 
-def handle_direction_connections(conn, direct_connections, edge_assignments):
+def handle_direction_connections(
+        conn, index, direct_connections, edge_assignments
+):
     # Edges with mux should have one source tile and one destination_tile.
     # The pin from the source_tile should face the destination_tile.
     #
     # It is expected that all edges_with_mux will lies in a line (e.g. X only or
     # Y only).
     c = conn.cursor()
+    switch_names = dict(c.execute("SELECT pkey, name FROM switch;"))
+
+    def site_pin_of_wire(wire_pkey):
+        """ Returns (tile type, pin name, grid loc) of the site pin of wire. """
+        # Find the wire connected to the site pin of the node of wire_pkey.
+        site_pin_wires = index.site_pin_wires(int(index.wire_node[wire_pkey]))
+        assert len(site_pin_wires) == 1
+        site_pin_wire_pkey, tile_pkey, _ = site_pin_wires[0]
+
+        return (
+            index.tile_type_name(tile_pkey),
+            index.pin_name_of_wire(site_pin_wire_pkey),
+            index.tile_loc(tile_pkey),
+        )
+
     for src_wire_pkey, dest_wire_pkey, pip_in_tile_pkey, switch_pkey in \
             progressbar_utils.progressbar(
             c.execute("""
 SELECT src_wire_pkey, dest_wire_pkey, pip_in_tile_pkey, switch_pkey FROM edge_with_mux;"""
                       )):
-
-        c2 = conn.cursor()
-
-        # Get the node that is attached to the source.
-        c2.execute(
-            """
-SELECT node_pkey FROM wire WHERE pkey = ?""", (src_wire_pkey, )
+        source_tile_type, source_wire, source_loc = site_pin_of_wire(
+            src_wire_pkey
         )
-        (src_node_pkey, ) = c2.fetchone()
-
-        # Find the wire connected to the source.
-        src_wire = list(node_to_site_pins(conn, src_node_pkey))
-        assert len(src_wire) == 1
-        source_wire_pkey, src_tile_pkey, src_wire_in_tile_pkey = src_wire[0]
+        source_loc_grid_x, source_loc_grid_y = source_loc
 
-        c2.execute(
-            """
-SELECT tile_type_pkey, grid_x, grid_y FROM tile WHERE pkey = ?""",
-            (src_tile_pkey, )
-        )
-        src_tile_type_pkey, source_loc_grid_x, source_loc_grid_y = c2.fetchone(
-        )
-
-        c2.execute(
-            """
-SELECT name FROM tile_type WHERE pkey = ?""", (src_tile_type_pkey, )
-        )
-        (source_tile_type, ) = c2.fetchone()
-
-        source_wire = get_pin_name_of_wire(conn, source_wire_pkey)
-
-        # Get the node that is attached to the sink.
-        c2.execute(
-            """
-SELECT node_pkey FROM wire WHERE pkey = ?""", (dest_wire_pkey, )
+        destination_tile_type, destination_wire, destination_loc = site_pin_of_wire(
+            dest_wire_pkey
         )
-        (dest_node_pkey, ) = c2.fetchone()
+        destination_loc_grid_x, destination_loc_grid_y = destination_loc
 
-        # Find the wire connected to the sink.
-        dest_wire = list(node_to_site_pins(conn, dest_node_pkey))
-        assert len(dest_wire) == 1
-        destination_wire_pkey, dest_tile_pkey, dest_wire_in_tile_pkey = dest_wire[
-            0]
-
-        c2.execute(
-            """
-SELECT tile_type_pkey, grid_x, grid_y FROM tile WHERE pkey = ?;""",
-            (dest_tile_pkey, )
-        )
-        dest_tile_type_pkey, destination_loc_grid_x, destination_loc_grid_y = c2.fetchone(
-        )
-
-        c2.execute(
-            """
-SELECT name FROM tile_type WHERE pkey = ?""", (dest_tile_type_pkey, )
-        )
-        (destination_tile_type, ) = c2.fetchone()
-
-        destination_wire = get_pin_name_of_wire(conn, destination_wire_pkey)
-
-        c2.execute(
-            "SELECT name FROM switch WHERE pkey = ?"
-            "", (switch_pkey, )
-        )
-        switch_name = c2.fetchone()[0]
+        switch_name = switch_names[switch_pkey]
 
         direct_connections.add(
             DirectConnection(
@@ -144,8 +111,36 @@ SELECT name FROM tile_type WHERE pkey = ?""", (dest_tile_type_pkey, )
                           destination_wire)].append((destination_dir, ))
 
 
+def load_directional_pips(conn):
+    """ Returns dict of wire_in_tile_pkey to the directional pips of the wire.
+
+    Pips are (other_wire_in_tile_pkey, pip_in_tile_pkey) tuples, pseudo pips
+    are not included.
+
+    """
+    directional_pips = {}
+    for wire_in_tile_pkey, other_wire_in_tile_pkey, pip_pkey in conn.execute(
+            """
+SELECT
+  undirected_pips.wire_in_tile_pkey,
+  undirected_pips.other_wire_in_tile_pkey,
+  pip_in_tile.pkey
+FROM
+  undirected_pips
+INNER JOIN pip_in_tile
+ON pip_in_tile.pkey == undirected_pips.pip_in_tile_pkey
+WHERE
+  pip_in_tile.is_directional = 1 AND pip_in_tile.is_pseudo = 0;
+  """):
+        directional_pips.setdefault(wire_in_tile_pkey, []).append(
+            (other_wire_in_tile_pkey, pip_pkey)
+        )
+
+    return directional_pips
+
+
 def handle_edges_to_channels(
-        conn, null_tile_wires, edge_assignments, channel_wires_to_tracks
+        conn, index, null_tile_wires, edge_assignments, channel_wires_to_tracks
 ):
     c = conn.cursor()
 
@@ -160,6 +155,8 @@ SELECT vcc_track_pkey, gnd_track_pkey FROM constant_sources;
         1: vcc_track_pkey,
     }
 
+    directional_pips = load_directional_pips(conn)
+
     for node_pkey, classification in progressbar_utils.progressbar(c.execute(
             """
 SELECT pkey, classification FROM node WHERE classification != ?;
@@ -167,120 +164,69 @@ SELECT pkey, classification FROM node WHERE classification != ?;
         reason = NodeClassification(classification)
 
         if reason == NodeClassification.NULL:
-            for (tile_type,
-                 wire) in yield_logical_wire_info_from_node(conn, node_pkey):
+            for (tile_type, wire) in index.logical_wire_info(node_pkey):
                 null_tile_wires.add((tile_type, wire))
 
         if reason != NodeClassification.EDGES_TO_CHANNEL:
             continue
 
-        c2 = conn.cursor()
-        for wire_pkey, phy_tile_pkey, tile_pkey, wire_in_tile_pkey in c2.execute(
-                """
-SELECT
-    pkey, phy_tile_pkey, tile_pkey, wire_in_tile_pkey
-FROM
-    wire
-WHERE
-    node_pkey = ?;
-    """, (node_pkey, )):
-            c3 = conn.cursor()
-            c3.execute(
-                """
-SELECT grid_x, grid_y FROM tile WHERE pkey = ?;""", (tile_pkey, )
-            )
-            (grid_x, grid_y) = c3.fetchone()
+        wires = index.wires_of_node(node_pkey)
+
+        # Find the directional pips of all wires of the node.  Every site pin
+        # of the node faces the tracks of all of these pips.
+        other_phy_tile_pkeys = []
+        other_wire_in_tile_pkeys = []
+        pip_pkeys = []
+        phy_wires = wires[index.wire_phy_tile[wires] >= 0]
+        for phy_tile_pkey, wire_in_tile_pkey in zip(
+                index.wire_phy_tile[phy_wires].tolist(),
+                index.wire_in_tile[phy_wires].tolist()):
+            for other_wire_in_tile_pkey, pip_pkey in directional_pips.get(
+                    wire_in_tile_pkey, ()):
+                other_phy_tile_pkeys.append(phy_tile_pkey)
+                other_wire_in_tile_pkeys.append(other_wire_in_tile_pkey)
+                pip_pkeys.append(pip_pkey)
+
+        # Need to walk from the wire_in_tile table, to the wire table,
+        # to the node table and get track_pkey.
+        # other_wire_in_tile_pkey -> wire pkey -> node_pkey -> track_pkey
+        other_wires = index.wires_at(
+            other_phy_tile_pkeys, other_wire_in_tile_pkeys
+        )
+        other_nodes = np.where(
+            other_wires >= 0, index.wire_node[other_wires], -1
+        )
+        track_pkeys = np.where(
+            other_nodes >= 0, index.node_track[other_nodes], -1
+        )
 
-            c3.execute(
-                """
-SELECT
-  name
-FROM
-  tile_type
-WHERE
-  pkey = (
-    SELECT
-      tile_type_pkey
-    FROM
-      tile
-    WHERE
-      pkey = ?
-  );
-                """, (tile_pkey, )
-            )
-            (tile_type, ) = c3.fetchone()
+        for wire_pkey, tile_pkey, wire_in_tile_pkey in zip(
+                wires.tolist(), index.wire_tile[wires].tolist(),
+                index.wire_in_tile[wires].tolist()):
+            assert tile_pkey >= 0, (node_pkey, wire_pkey)
+            grid_x, grid_y = index.tile_loc(tile_pkey)
+            tile_type = index.tile_type_name(tile_pkey)
 
-            wire = get_pin_name_of_wire(conn, wire_pkey)
+            wire = index.pin_name_of_wire(wire_pkey)
             if wire is None:
                 # This node has no site pin, don't need to assign pin direction.
                 continue
 
-            for other_phy_tile_pkey, other_wire_in_tile_pkey, pip_pkey, pip in c3.execute(
-                    """
-WITH wires_from_node(wire_in_tile_pkey, phy_tile_pkey) AS (
-  SELECT
-    wire_in_tile_pkey,
-    phy_tile_pkey
-  FROM
-    wire
-  WHERE
-    node_pkey = ? AND phy_tile_pkey IS NOT NULL
-),
-  other_wires(other_phy_tile_pkey, pip_pkey, other_wire_in_tile_pkey) AS (
-    SELECT
-        wires_from_node.phy_tile_pkey,
-        undirected_pips.pip_in_tile_pkey,
-        undirected_pips.other_wire_in_tile_pkey
-    FROM undirected_pips
-    INNER JOIN wires_from_node ON
-        undirected_pips.wire_in_tile_pkey = wires_from_node.wire_in_tile_pkey)
-SELECT
-  other_wires.other_phy_tile_pkey,
-  other_wires.other_wire_in_tile_pkey,
-  pip_in_tile.pkey,
-  pip_in_tile.name
-FROM
-  other_wires
-INNER JOIN pip_in_tile
-ON pip_in_tile.pkey == other_wires.pip_pkey
-WHERE
-  pip_in_tile.is_directional = 1 AND pip_in_tile.is_pseudo = 0;
-  """, (node_pkey, )):
-                # Need to walk from the wire_in_tile table, to the wire table,
-                # to the node table and get track_pkey.
-                # other_wire_in_tile_pkey -> wire pkey -> node_pkey -> track_pkey
-                c4 = conn.cursor()
-                c4.execute(
-                    """
-SELECT
-  track_pkey,
-  classification
-FROM
-  node
-WHERE
-  pkey = (
-    SELECT
-      node_pkey
-    FROM
-      wire
-    WHERE
-      phy_tile_pkey = ?
-      AND wire_in_tile_pkey = ?
-  );""", (other_phy_tile_pkey, other_wire_in_tile_pkey)
-                )
-                result = c4.fetchone()
-                assert result is not None, (
+            for pip_pkey, other_wire_in_tile_pkey, other_node_pkey, track_pkey in zip(
+                    pip_pkeys, other_wire_in_tile_pkeys, other_nodes.tolist(),
+                    track_pkeys.tolist()):
+                assert other_node_pkey >= 0, (
                     wire_pkey, pip_pkey, tile_pkey, wire_in_tile_pkey,
                     other_wire_in_tile_pkey
                 )
-                (track_pkey, classification) = result
 
                 # Some pips do connect to a track at all, e.g. null node
-                if track_pkey is None:
+                if track_pkey < 0:
                     # TODO: Handle weird connections.
-                    # other_node_class = NodeClassification(classification)
+                    # other_node_class = NodeClassification(
+                    #        index.node_classification[other_node_pkey])
                     # assert other_node_class == NodeClassification.NULL, (
-                    #        node_pkey, pip_pkey, pip, other_node_class)
+                    #        node_pkey, pip_pkey, other_node_class)
                     continue
 
                 tracks_model = channel_wires_to_tracks[track_pkey]
@@ -450,11 +396,31 @@ def main():
 Output JSON assigning pins to tile types and direction connections""",
         required=True
     )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Keep the pin assignments if they were built from the same '
+        'inputs, see prjxray_build_inputs'
+    )
 
     args = parser.parse_args()
 
     db = prjxray.db.Database(args.db_root, args.part)
 
+    # The connection database is not modified by this stage, so its inputs
+    # are recorded in the pin assignments output instead.
+    input_hashes = hash_prjxray_inputs(args.db_root, args.part, db.fabric)
+    input_hashes.update(hash_sources(['prjxray', 'lib', __name__]))
+    add_upstream_build_inputs(
+        input_hashes, args.connection_database, FORM_CHANNELS_STAGE
+    )
+
+    if args.incremental:
+        recorded_hashes = read_json_build_inputs(args.pin_assignments)
+        if is_up_to_date(ASSIGN_PINS_STAGE, recorded_hashes, input_hashes,
+                         [args.pin_assignments]):
+            return
+
     edge_assignments = {}
 
     with DatabaseCache(args.connection_database, read_only=True) as conn:
@@ -464,10 +430,14 @@ Output JSON assigning pins to tile types and direction connections""",
             db, conn
         )
 
+        print('{} Loading wires and tracks.'.format(now()))
+        index = WireIndex(conn)
+        track_models = get_track_models(conn)
+
         direct_connections = set()
         print('{} Processing direct connections.'.format(now()))
         handle_direction_connections(
-            conn, direct_connections, edge_assignments
+            conn, index, direct_connections, edge_assignments
         )
 
         wires_not_in_channels = {}
@@ -479,8 +449,7 @@ Output JSON assigning pins to tile types and direction connections""",
     """, (NodeClassification.CHANNEL.value, ))):
             reason = NodeClassification(classification)
 
-            for (tile_type,
-                 wire) in yield_logical_wire_info_from_node(conn, node_pkey):
+            for (tile_type, wire) in index.logical_wire_info(node_pkey):
                 key = (tile_type, wire)
 
                 # Sometimes nodes in particular tile instances are disconnected,
@@ -513,12 +482,16 @@ Output JSON assigning pins to tile types and direction connections""",
     """, (NodeClassification.CHANNEL.value, ))):
             assert track_pkey is not None
 
-            tracks_model, _ = get_track_model(conn, track_pkey)
+            if track_pkey in track_models:
+                tracks_model, _ = track_models[track_pkey]
+            else:
+                # Track without graph nodes.
+                tracks_model, _ = get_track_model(conn, track_pkey)
+
             channel_nodes.append(tracks_model)
             channel_wires_to_tracks[track_pkey] = tracks_model
 
-            for (tile_type,
-                 wire) in yield_logical_wire_info_from_node(conn, node_pkey):
+            for (tile_type, wire) in index.logical_wire_info(node_pkey):
                 key = (tile_type, wire)
                 # Make sure all wires in channels always are in channels
                 assert key not in wires_not_in_channels
@@ -546,7 +519,8 @@ Output JSON assigning pins to tile types and direction connections""",
         # been marked as NULL during channel formation.
         print('{} Handling edges to channels.'.format(now()))
         handle_edges_to_channels(
-            conn, null_tile_wires, edge_assignments, channel_wires_to_tracks
+            conn, index, null_tile_wires, edge_assignments,
+            channel_wires_to_tracks
         )
 
         print('{} Processing edge assignments.'.format(now()))
@@ -628,10 +602,10 @@ Output JSON assigning pins to tile types and direction connections""",
         with open(args.pin_assignments, 'w') as f:
             json.dump(
                 {
-                    'pin_directions':
-                        pin_directions,
+                    'pin_directions': pin_directions,
                     'direct_connections':
                         [d._asdict() for d in direct_connections],
+                    'build_inputs': input_hashes,
                 },
                 f,
                 indent=2
@@ -0,0 +1,207 @@
+""" Tracks the inputs consumed by the channels.db build stages.
+
+The stages preparing the connection database (prjxray_form_channels and
+prjxray_assign_tile_pin_direction) hash the prjxray database files they read
+(tile_type_*.json, site_type_*.json, tilegrid.json, tileconn.json, ...) and
+the python sources of the tools.  prjxray_form_channels records the hashes in
+the build_input table of the connection database, and
+prjxray_assign_tile_pin_direction in its pin assignments JSON.
+
+CMake reruns a stage whenever one of its dependencies is newer than its
+outputs, e.g. after a checkout of the prjxray database.  With --incremental, a
+stage whose recorded hashes match its current inputs keeps its outputs, and
+only updates their timestamps.  Any difference falls back to a full rebuild:
+wire, node, track and graph node pkeys are numbered across the whole grid, so
+the rows of a changed tile type cannot be recomputed on their own.
+
+"""
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+FORM_CHANNELS_STAGE = 'form_channels'
+ASSIGN_PINS_STAGE = 'assign_tile_pin_direction'
+
+FABRIC_FILES = ('tilegrid.json', 'tileconn.json')
+
+# Number of changed inputs listed when a stage is rebuilt.
+MAX_REPORTED_CHANGES = 5
+
+
+def hash_file(fname):
+    """ Returns the SHA-256 hex digest of the contents of fname. """
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def hash_string(s):
+    """ Returns the SHA-256 hex digest of the string s. """
+    return hashlib.sha256(s.encode('utf-8')).hexdigest()
+
+
+def hash_prjxray_inputs(db_root, part, fabric):
+    """ Returns map of input name to content hash for a prjxray database.
+
+    Covers every JSON file in the root of the database (tile and site type
+    definitions, segment and timing data) and the tilegrid.json and
+    tileconn.json of the fabric used by part.
+
+    """
+    hashes = {'part': hash_string(part)}
+
+    for fname in sorted(glob.glob(os.path.join(db_root, '*.json'))):
+        hashes[os.path.basename(fname)] = hash_file(fname)
+
+    for name in FABRIC_FILES:
+        hashes['{}/{}'.format(fabric, name)] = hash_file(
+            os.path.join(db_root, fabric, name)
+        )
+
+    return hashes
+
+
+def hash_sources(module_names):
+    """ Returns map of source name to content hash of the tools.
+
+    For each of the imported modules in module_names, all python files in
+    the directory of the module (and below it) are hashed.  Names are
+    relative to the parent of each directory.
+
+    """
+    hashes = {}
+    for module_name in module_names:
+        root = os.path.dirname(
+            os.path.abspath(sys.modules[module_name].__file__)
+        )
+        for fname in sorted(glob.glob(os.path.join(root, '**', '*.py'),
+                                      recursive=True)):
+            name = os.path.relpath(fname, os.path.dirname(root))
+            hashes['source:{}'.format(name)] = hash_file(fname)
+
+    return hashes
+
+
+def get_build_inputs(conn, stage):
+    """ Returns map of input name to hash recorded for stage. """
+    c = conn.cursor()
+    c.execute("SELECT name, hash FROM build_input WHERE stage = ?;", (stage, ))
+    return dict(c)
+
+
+def read_build_inputs(connection_database, stage):
+    """ Returns hashes recorded for stage in a database file, or {} if none. """
+    if not os.path.exists(connection_database):
+        return {}
+
+    conn = sqlite3.connect(
+        'file:{}?mode=ro'.format(connection_database), uri=True
+    )
+    try:
+        return get_build_inputs(conn, stage)
+    except sqlite3.DatabaseError:
+        # Database was created before build_input was added, or its write
+        # was interrupted.
+        return {}
+    finally:
+        conn.close()
+
+
+def read_json_build_inputs(fname):
+    """ Returns hashes recorded in the build_inputs of a JSON file, or {}. """
+    if not os.path.exists(fname):
+        return {}
+
+    with open(fname) as f:
+        try:
+            return json.load(f).get('build_inputs', {})
+        except ValueError:
+            # The write of the file was interrupted.
+            return {}
+
+
+def add_upstream_build_inputs(hashes, connection_database, stage):
+    """ Add the inputs recorded by an earlier stage to hashes.
+
+    Lets a later stage notice when the connection database it reads was
+    formed from different inputs.
+
+    """
+    for name, value in read_build_inputs(connection_database, stage).items():
+        hashes['{}:{}'.format(stage, name)] = value
+
+
+def record_build_inputs(conn, stage, hashes):
+    """ Replace the input hashes recorded for stage. """
+    c = conn.cursor()
+    c.execute("DELETE FROM build_input WHERE stage = ?;", (stage, ))
+    c.executemany(
+        "INSERT INTO build_input(stage, name, hash) VALUES (?, ?, ?);",
+        ((stage, name, value) for name, value in sorted(hashes.items()))
+    )
+    conn.commit()
+
+
+def changed_build_inputs(old_hashes, new_hashes):
+    """ Returns sorted names of the inputs that differ between two hash maps.
+
+    Inputs that were added or removed are included.
+
+    >>> changed_build_inputs({'a.json': '1'}, {'a.json': '1'})
+    []
+    >>> changed_build_inputs(
+    ...     {'tile_type_INT_L.json': '1', 'tileconn.json': '2'},
+    ...     {'tile_type_INT_L.json': '3', 'tilegrid.json': '2'},
+    ... )
+    ['tile_type_INT_L.json', 'tileconn.json', 'tilegrid.json']
+
+    """
+    return sorted(
+        name for name in old_hashes.keys() | new_hashes.keys()
+        if old_hashes.get(name) != new_hashes.get(name)
+    )
+
+
+def is_up_to_date(stage, old_hashes, new_hashes, outputs):
+    """ Returns True if stage can keep its outputs.
+
+    The outputs are kept when they all exist and old_hashes, the hashes
+    recorded when they were built, match new_hashes.  Their modification
+    time is then updated, so CMake considers them newer than the inputs.
+    Otherwise the reason for the full rebuild is printed.
+
+    """
+    missing = [fname for fname in outputs if not os.path.exists(fname)]
+    changed = changed_build_inputs(old_hashes, new_hashes)
+
+    if missing:
+        print(
+            '{}: missing {}, full rebuild.'.format(stage, ', '.join(missing))
+        )
+        return False
+
+    if not old_hashes:
+        print('{}: no recorded inputs, full rebuild.'.format(stage))
+        return False
+
+    if changed:
+        if len(changed) > MAX_REPORTED_CHANGES:
+            changed = changed[:MAX_REPORTED_CHANGES] + ['...']
+        print(
+            '{}: inputs changed ({}), full rebuild.'.format(
+                stage, ', '.join(changed)
+            )
+        )
+        return False
+
+    print('{}: inputs unchanged, keeping outputs.'.format(stage))
+    for fname in outputs:
+        os.utime(fname)
+
+    return True
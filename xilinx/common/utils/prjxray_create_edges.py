@@ -23,9 +23,13 @@ fill empty spaces.  This is required by VPR to allocate the right data.
 
 import argparse
 import datetime
-import sqlite3
 
+from lib.perf_utils import PhaseLog, add_perf_args
+from prjxray_db_cache import (
+    BUILD_PROFILE, CACHE_MODES, MEMORY_MODE, PRAGMA_PROFILES, connect
+)
 from prjxray_edge_library import (
+    CONNECTOR_POOL_SIZE,
     create_edges,
     build_channels,
     set_track_canonical_loc,
@@ -35,6 +39,43 @@ from prjxray_edge_library import (
 )
 
 
+def create_and_verify_edges(args, perf):
+    """ Creates the edges and channels of args.connection_database. """
+    now = datetime.datetime.now
+
+    perf.context['db_profile'] = args.db_profile
+
+    with perf.phase('Creating edges') as stats:
+        ccio_sites = create_edges(args, stats)
+    print("{}: Done with edges".format(now()))
+
+    with connect(args.connection_database, profile=args.db_profile) as conn:
+        with perf.phase('Build channels', conn):
+            build_channels(conn)
+        print("{}: Channels built".format(now()))
+
+    with connect(args.connection_database, profile=args.db_profile) as conn:
+        with perf.phase('Set track canonical loc', conn):
+            set_track_canonical_loc(conn)
+
+        with perf.phase('Annotate pin feeds', conn):
+            annotate_pin_feeds(conn, ccio_sites)
+
+        with perf.phase('Compute segment lengths', conn):
+            compute_segment_lengths(conn)
+
+        print(
+            '{} Flushing database back to file "{}"'.format(
+                now(), args.connection_database
+            )
+        )
+
+    with connect(args.connection_database, read_only=True) as conn:
+        with perf.phase('Verify channels', conn):
+            verify_channels(conn)
+        print("{}: Channels verified".format(now()))
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -64,39 +105,46 @@ def main():
         '--graph_limit',
         help='Limit grid to specified dimensions in x_min,y_min,x_max,y_max',
     )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes used to create edges',
+    )
+    parser.add_argument(
+        '--connector_pool_size',
+        type=int,
+        default=CONNECTOR_POOL_SIZE,
+        help='Size of the pool of connectors used to create edges, in graph '
+        'nodes, shared by the --jobs workers',
+    )
+    parser.add_argument(
+        '--db_cache_mode',
+        choices=CACHE_MODES,
+        default=MEMORY_MODE,
+        help='How the connection database is accessed, see prjxray_db_cache'
+    )
+    parser.add_argument(
+        '--db_profile',
+        choices=sorted(PRAGMA_PROFILES),
+        default=BUILD_PROFILE,
+        help='sqlite pragma profile, see prjxray_db_cache'
+    )
+    parser.add_argument(
+        '--db_cache_tables',
+        nargs='+',
+        help='Tables the --jobs workers copy into memory from their read only '
+        'snapshot of the connection database, see prjxray_db_cache'
+    )
 
-    args = parser.parse_args()
-
-    now = datetime.datetime.now
-    print("{}: Creating edges".format(now()))
-    ccio_sites = create_edges(args)
-    print("{}: Done with edges".format(now()))
-
-    with sqlite3.connect(args.connection_database) as conn:
-        print("{}: Build channels".format(now()))
-        build_channels(conn)
-        print("{}: Channels built".format(now()))
-
-    with sqlite3.connect(args.connection_database) as conn:
-        print('{} Set track canonical loc'.format(now()))
-        set_track_canonical_loc(conn)
-
-        print('{} Annotate pin feeds'.format(now()))
-        annotate_pin_feeds(conn, ccio_sites)
-
-        print('{} Compute segment lengths'.format(now()))
-        compute_segment_lengths(conn)
+    add_perf_args(parser)
 
-        print(
-            '{} Flushing database back to file "{}"'.format(
-                now(), args.connection_database
-            )
-        )
+    args = parser.parse_args()
+    assert args.db_cache_tables is None or args.jobs > 1, \
+        "--db_cache_tables only applies to the --jobs workers"
 
-    with sqlite3.connect('file:{}?mode=ro'.format(args.connection_database),
-                         uri=True) as conn:
-        verify_channels(conn)
-        print("{}: Channels verified".format(now()))
+    with PhaseLog.from_args(args) as perf:
+        create_and_verify_edges(args, perf)
 
 
 if __name__ == '__main__':
@@ -4,18 +4,133 @@ which operates on a memory copy of the database.
 
 Upon object creation the database is "backed up" to memory. All subsequent
 operations are then pefromed on this copy which yields in performance increase.
+
+Alternatively the cache can operate in "mmap" mode. The database file is then
+opened directly, memory mapped by sqlite and accessed through a larger page
+cache. This avoids the copy in and out of memory, and peak memory usage stays
+close to the working set instead of twice the database size. In this mode a
+list of tables can be given, only those tables are then copied into memory
+(as temporary tables shadowing the file ones, including their indices).
+
+Every connection is set up with a pragma profile from PRAGMA_PROFILES.  By
+default writable databases use the build profile, which gives up durability
+for speed, since a stage that fails rebuilds its database from scratch.
+Stages that open the database without the cache use connect, so they get the
+same profile.
 """
+import re
 import sqlite3
 from lib.progressbar_utils import ProgressBar
 
+# Cache modes
+MEMORY_MODE = "memory"
+MMAP_MODE = "mmap"
+CACHE_MODES = (MEMORY_MODE, MMAP_MODE)
+
+# Tuning used in the mmap mode
+MMAP_SIZE = 1 << 40
+CACHE_SIZE_KB = 1 << 20
+
+# Page size of new databases
+PAGE_SIZE = 1 << 14
+
+# Pragma profiles
+DEFAULT_PROFILE = "default"
+BUILD_PROFILE = "build"
+READ_PROFILE = "read"
+
+PRAGMA_PROFILES = {
+    # sqlite defaults, to compare against.
+    DEFAULT_PROFILE: (),
+    # Bulk writes.  The rollback journal is kept in memory and nothing is
+    # synced, a crash leaves a corrupt database.  page_size only applies to
+    # databases that are still empty.
+    BUILD_PROFILE:
+        (
+            ("page_size", PAGE_SIZE),
+            ("journal_mode", "MEMORY"),
+            ("synchronous", "OFF"),
+            ("cache_size", -CACHE_SIZE_KB),
+            ("temp_store", "MEMORY"),
+        ),
+    # Read only access.
+    READ_PROFILE: (
+        ("cache_size", -CACHE_SIZE_KB),
+        ("temp_store", "MEMORY"),
+    ),
+}
+
+# =============================================================================
+
+
+def apply_pragmas(conn, profile):
+    """
+    Sets the pragmas of the given profile on the connection.
+    """
+    c = conn.cursor()
+    for pragma, value in PRAGMA_PROFILES[profile]:
+        c.execute("PRAGMA {} = {};".format(pragma, value))
+
+
+def default_profile(read_only):
+    return READ_PROFILE if read_only else BUILD_PROFILE
+
+
+def connect(file_name, read_only=False, profile=None):
+    """
+    Opens the database file, with the pragmas of profile applied.
+
+    When no profile is given, the build profile is used for writable
+    connections and the read profile for read only ones.
+    """
+    if read_only:
+        uri = "file:%s?mode=ro" % file_name
+    else:
+        uri = "file:%s?mode=rwc" % file_name
+
+    conn = sqlite3.connect(uri, uri=True)
+    apply_pragmas(
+        conn, profile if profile is not None else default_profile(read_only)
+    )
+    return conn
+
+
+def analyze(conn):
+    """
+    Updates the statistics of the query planner.
+
+    Run after bulk writes and index creation, before phases that mostly
+    query the database.
+    """
+    conn.commit()
+    conn.execute("ANALYZE;")
+    conn.commit()
+
+
 # =============================================================================
 
 
 class DatabaseCache(object):
-    def __init__(self, file_name, read_only=False):
+    def __init__(
+            self,
+            file_name,
+            read_only=False,
+            mode=MEMORY_MODE,
+            tables=None,
+            profile=None
+    ):
+        assert mode in CACHE_MODES, mode
+        if profile is None:
+            profile = default_profile(read_only)
+        assert profile in PRAGMA_PROFILES, profile
+        assert tables is None or (mode == MMAP_MODE and read_only), \
+            "Only read only mmap caches can load a subset of tables"
 
         self.file_name = file_name
         self.read_only = read_only
+        self.mode = mode
+        self.tables = tables
+        self.profile = profile
         self.bar = None
 
     def __enter__(self):
@@ -29,9 +144,14 @@ class DatabaseCache(object):
         else:
             uri = "file:%s?mode=rwc" % self.file_name
 
+        if self.mode == MMAP_MODE:
+            return self._open_mmap(uri)
+
         # Open connections
         self.memory_connection = sqlite3.connect(":memory:")
         self.file_connection = sqlite3.connect(uri, uri=True)
+        apply_pragmas(self.memory_connection, self.profile)
+        apply_pragmas(self.file_connection, self.profile)
 
         # Load the database
         print("Loading database from '{}'".format(self.file_name))
@@ -50,6 +170,10 @@ class DatabaseCache(object):
         Writes back the database to file if the database was open as not read-only
         """
 
+        if self.mode == MMAP_MODE:
+            self._close_mmap(exc_type)
+            return
+
         # Write back only if not read-only
         if not self.read_only:
             if self.memory_connection.in_transaction:
@@ -68,6 +192,74 @@ class DatabaseCache(object):
         self.memory_connection.close()
         self.file_connection.close()
 
+    def _open_mmap(self, uri):
+        """
+        Opens the database file directly, with memory mapping enabled.
+        """
+        print("Opening database '{}' (mmap)".format(self.file_name))
+        self.file_connection = sqlite3.connect(uri, uri=True)
+
+        c = self.file_connection.cursor()
+        c.execute("PRAGMA mmap_size = {};".format(MMAP_SIZE))
+        apply_pragmas(self.file_connection, self.profile)
+
+        if self.tables is not None:
+            self._load_tables(self.tables)
+
+        return self.file_connection
+
+    def _load_tables(self, tables):
+        """
+        Copies the given tables (and their indices) into memory.
+
+        The copies are temporary tables, which take precedence over the tables
+        in the file when referred to by an unqualified name.
+        """
+        c = self.file_connection.cursor()
+        print("Loading tables {} into memory".format(", ".join(tables)))
+
+        for table in tables:
+            c.execute(
+                "CREATE TEMP TABLE {0} AS SELECT * FROM main.{0};".
+                format(table)
+            )
+
+            indices = list(
+                c.execute(
+                    """
+SELECT sql FROM main.sqlite_master
+    WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL;""", (table, )
+                )
+            )
+            for (sql, ) in indices:
+                c.execute(
+                    re.sub(
+                        r"^CREATE (UNIQUE )?INDEX (IF NOT EXISTS )?",
+                        r"\g<0>temp.", sql
+                    )
+                )
+
+        self.file_connection.commit()
+
+    def _close_mmap(self, exc_type):
+        """
+        Closes the database file.
+
+        The journal mode is restored, and a WAL left by a profile using one is
+        checkpointed, so the database file is self contained once closed and
+        can be copied as usual.
+        """
+        if not self.read_only:
+            if self.file_connection.in_transaction:
+                assert exc_type is not None, "Outstanding transaction, but no exception?"
+                self.file_connection.rollback()
+
+            c = self.file_connection.cursor()
+            c.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            c.execute("PRAGMA journal_mode = DELETE;")
+
+        self.file_connection.close()
+
     def _progress(self, status, remaining, total):
         """
         Prints database copy progress.
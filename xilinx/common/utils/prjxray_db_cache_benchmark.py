@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+""" Compares wall time and peak RSS of a tool under each DatabaseCache mode.
+
+The tool command line is given after "--". Each occurrence of "{db}" is
+replaced with a fresh copy of the connection database (so tools modifying the
+database, like prjxray_create_edges.py, always start from the same state), and
+"--db_cache_mode <mode>" is appended.
+
+When --profiles is given, every mode is also run with each pragma profile,
+appending "--db_profile <profile>".  With --table_subsets, the mmap mode is
+also run with each subset of tables loaded into memory, appending
+"--db_cache_tables <tables>".  Adding "--perf_log" to the tool command line
+records the timings of each phase of each run.
+
+Example:
+
+    prjxray_db_cache_benchmark.py --connection_database channels.db -- \\
+        python3 prjxray_routing_import.py --connection_database {db} ...
+
+    prjxray_db_cache_benchmark.py --connection_database channels.db \\
+        --modes mmap --table_subsets graph_node graph_node,graph_edge -- \\
+        python3 prjxray_routing_import.py --connection_database {db} ...
+
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from prjxray_db_cache import CACHE_MODES, MMAP_MODE, PRAGMA_PROFILES
+
+# =============================================================================
+
+
+def run_command(command):
+    """
+    Runs the command, returns its wall time in seconds and peak RSS in GB.
+
+    The peak RSS includes all descendant processes that were waited for (e.g.
+    multiprocessing workers).
+    """
+    t0 = time.time()
+    process = subprocess.Popen(command)
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.time() - t0
+
+    # Let Popen know the process is gone.
+    if os.WIFEXITED(status):
+        process.returncode = os.WEXITSTATUS(status)
+    else:
+        process.returncode = -os.WTERMSIG(status)
+    assert process.returncode == 0, (command, process.returncode)
+
+    # ru_maxrss is in KB on Linux
+    return wall_time, rusage.ru_maxrss / (1024 * 1024)
+
+
+def mode_tables(modes, table_subsets):
+    """
+    Returns the (mode, tables) pairs to run.
+
+    Every mode is run without a table list, and the mmap mode again with each
+    comma separated subset of tables.
+    """
+    runs = [(mode, None) for mode in modes]
+    if MMAP_MODE in modes:
+        runs += [(MMAP_MODE, subset.split(',')) for subset in table_subsets]
+
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--connection_database',
+        required=True,
+        help='Connection database to copy for each run'
+    )
+    parser.add_argument(
+        '--modes',
+        nargs='+',
+        choices=CACHE_MODES,
+        default=CACHE_MODES,
+        help='DatabaseCache modes to benchmark'
+    )
+    parser.add_argument(
+        '--profiles',
+        nargs='+',
+        choices=sorted(PRAGMA_PROFILES),
+        help='Pragma profiles to benchmark, for tools with --db_profile'
+    )
+    parser.add_argument(
+        '--table_subsets',
+        nargs='+',
+        default=[],
+        help='Comma separated table subsets to benchmark in the mmap mode, '
+        'for tools with --db_cache_tables'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=1, help='Number of runs of each mode'
+    )
+    parser.add_argument(
+        'command',
+        nargs=argparse.REMAINDER,
+        help='Tool command line, "{db}" is replaced by the database copy'
+    )
+
+    args = parser.parse_args()
+
+    command = args.command
+    if command and command[0] == '--':
+        command = command[1:]
+    assert command, "No command given"
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_copy = os.path.join(tmp_dir, 'channels.db')
+
+        for mode, tables in mode_tables(args.modes, args.table_subsets):
+            for profile in args.profiles or [None]:
+                for run in range(args.repeat):
+                    shutil.copyfile(args.connection_database, db_copy)
+
+                    mode_command = [
+                        arg.replace('{db}', db_copy) for arg in command
+                    ]
+                    mode_command += ['--db_cache_mode', mode]
+                    if profile is not None:
+                        mode_command += ['--db_profile', profile]
+                    if tables is not None:
+                        mode_command += ['--db_cache_tables'] + tables
+
+                    print(
+                        "Running mode '{}', tables {}, profile '{}', run {}".
+                        format(mode, tables, profile, run)
+                    )
+                    wall_time, peak_rss = run_command(mode_command)
+                    results.append(
+                        (mode, tables, profile, run, wall_time, peak_rss)
+                    )
+
+    sys.stdout.write("Mode, Tables, Profile, Run, Wall [s], Peak RSS [GB]\n")
+    for mode, tables, profile, run, wall_time, peak_rss in results:
+        sys.stdout.write(
+            "{}, {}, {}, {}, {:.1f}, {:.2f}\n".format(
+                mode, ' '.join(tables) if tables is not None else '-', profile,
+                run, wall_time, peak_rss
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
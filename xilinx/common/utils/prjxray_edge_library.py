@@ -6,18 +6,27 @@ import simplejson as json
 from lib import progressbar_utils
 import datetime
 import functools
+import itertools
+import multiprocessing
+import os
+import sqlite3
+import tempfile
 from collections import namedtuple
 from lib.rr_graph import tracks
 from lib.rr_graph import graph2
 from prjxray.site_type import SitePinDirection
 from prjxray_constant_site_pins import yield_ties_to_wire
-from lib.connection_database import get_track_model, get_wire_in_tile_from_pin_name
+from lib.collections_extra import IntSet, WeightedLru
+from lib.connection_database import (
+    get_track_model, get_track_models, get_wire_in_tile_from_pin_name,
+    execute_in_chunks, load_int_rows
+)
 from lib.rr_graph.graph2 import NodeType
 import re
 import math
 import numpy
 
-from prjxray_db_cache import DatabaseCache
+from prjxray_db_cache import MMAP_MODE, DatabaseCache, analyze, connect
 
 now = datetime.datetime.now
 
@@ -253,6 +262,18 @@ WHERE
         )
         dest_wire_in_tile_pkey = self.c.fetchone()[0]
 
+        return self.get_switch_for_wires(
+            src_wire_in_tile_pkey, dest_wire_in_tile_pkey
+        )
+
+    def get_switch_for_wires(
+            self, src_wire_in_tile_pkey, dest_wire_in_tile_pkey
+    ):
+        """ Return the switch_pkey from src_wire_in_tile_pkey to
+        dest_wire_in_tile_pkey, see get_pip_switch. """
+        if self.switch_pkey == self.backward_switch_pkey:
+            return self.switch_pkey
+
         if src_wire_in_tile_pkey == self.src_wire_in_tile_pkey:
             assert dest_wire_in_tile_pkey == self.dest_wire_in_tile_pkey
             return self.switch_pkey
@@ -262,6 +283,33 @@ WHERE
             return self.backward_switch_pkey
 
 
+class ResolvedPip(object):
+    """ Pip used in one direction, between wires of known wire_in_tile.
+
+    The switch is selected from the wire_in_tile_pkeys given on creation,
+    instead of looking up the wires of every connection.  See PipTemplate.
+
+    """
+
+    def __init__(self, pip, src_wire_in_tile_pkey, dest_wire_in_tile_pkey):
+        self.pip = pip
+        self.pip_pkey = pip.pip_pkey
+        self.is_pseudo = pip.is_pseudo
+        self.src_wire_in_tile_pkey = src_wire_in_tile_pkey
+        self.dest_wire_in_tile_pkey = dest_wire_in_tile_pkey
+
+    def __iter__(self):
+        return iter(self.pip)
+
+    def get_pip_switch(self, src_wire_pkey, dest_wire_pkey):
+        assert src_wire_pkey is not None
+        assert dest_wire_pkey is not None
+
+        return self.pip.get_switch_for_wires(
+            self.src_wire_in_tile_pkey, self.dest_wire_in_tile_pkey
+        )
+
+
 def create_find_pip(conn):
     """Returns a function that takes (tile_type, pip) and returns a tuple
      containing: pip_in_tile_pkey, is_directional, is_pseudo, can_invert"""
@@ -274,15 +322,9 @@ def create_find_pip(conn):
     return find_pip
 
 
-def create_find_wire(conn):
-    """ Returns a function finds a wire based on tile name and wire name.
-
-    Args:
-        conn: Database connection
-
-    Returns:
-        Function.  See find_wire below for signature.
-    """
+def create_find_wire_in_tile(conn):
+    """ Returns a function that takes (tile_type, wire) and returns the
+    wire_in_tile_pkey of the wire in the physical tile type. """
     c = conn.cursor()
 
     @functools.lru_cache(maxsize=None)
@@ -309,6 +351,21 @@ WHERE
         assert result is not None, (tile_type, wire)
         return result[0]
 
+    return find_wire_in_tile
+
+
+def create_find_wire(conn):
+    """ Returns a function finds a wire based on tile name and wire name.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        Function.  See find_wire below for signature.
+    """
+    c = conn.cursor()
+    find_wire_in_tile = create_find_wire_in_tile(conn)
+
     @functools.lru_cache(maxsize=100000)
     def find_wire(phy_tile, tile_type, wire):
         """ Finds a wire in the database.
@@ -362,128 +419,22 @@ WHERE
 
 Pins = namedtuple('Pins', 'x y edge_map site_pin_direction')
 
-OPPOSITE_DIRECTIONS = {
-    tracks.Direction.TOP: tracks.Direction.BOTTOM,
-    tracks.Direction.BOTTOM: tracks.Direction.TOP,
-    tracks.Direction.LEFT: tracks.Direction.RIGHT,
-    tracks.Direction.RIGHT: tracks.Direction.LEFT,
-}
-
-
-class Connector(object):
-    """ Connector is an object for joining two nodes.
-
-    Connector represents either a site pin within a specific tile or routing
-    channel made of one or more channel nodes.
-
-
-    """
-
-    def __init__(self, conn, pins=None, tracks=None):
-        """ Create a Connector object.
-
-        Provide either pins or tracks, not both or neither.
-
-        Args:
-            pins (Pins namedtuple): If this Connector object represents a
-                site pin, provide the pins named arguments.
-            tracks (tuple of (tracks.Tracks, list of graph nodes)): If this
-                Connector object represents a routing channel, provide the
-                tracks named argument.
-
-                The tuple can most easily be constructed via
-                connection_database.get_track_model, which builds the Tracks
-                models and the graph node list.
-        """
-        self.conn = conn
-        self.pins = pins
-        self.tracks = tracks
-        self.track_connections = {}
-        assert (self.pins is not None) ^ (self.tracks is not None)
-
-    def find_wire_node(
-            self, wire_pkey, graph_node_pkey, track_graph_node_pkey
-    ):
-        """ Find/create graph node for site pin.
-
-        In order to support site pin timing modelling, an additional node
-        is required to support the timing model.  This function returns that
-        node, along with the switch that should be used to connect the
-        IPIN/OPIN to that node. See diagram for details.
-
-        Arguments
-        ---------
-        wire_pkey : int
-            Wire primary key to a wire attached to a site pin.
-        graph_node_pkey : int
-            Graph node primary key that represents which IPIN/OPIN node is
-            being used to connect the site pin to the routing graph.
-        track_graph_node_pkey : int
-            Graph node primary key that represents the first routing node this
-            site pin connects too.  See diagram for details.
-
-        Returns
-        -------
-        site_pin_switch_pkey : int
-            Switch primary key to the switch to connect IPIN/OPIN node to
-            new site pin wire node.  See diagram for details.
-        site_pin_graph_node_pkey : int
-            Graph node primary key that represents site pin wire node.
-            See diagram for details.
-
-        Diagram:
-
-           --+
-             |    tile wire #1  +-----+ tile wire #2
-             +==>-------------->+ pip +--------------->
-             | ^-Site pin       +-----+
-           --+
-
-            +----+           +-----+            +-----+
-            |OPIN+--edge #1->+CHAN1+--edge #2-->+CHAN2|->
-            +----+           +-----+            +-----+
+# Placeholder for a site pin wire node that has not been created yet.  See
+# Connector.find_wire_node and resolve_deferred_wire_nodes.
+DeferredWireNode = namedtuple(
+    'DeferredWireNode',
+    'serial wire_pkey graph_node_pkey track_graph_node_pkey'
+)
 
-        The timing information from the site pin is encoded in edge #1.
-        The timing information from tile wire #1 is encoded in CHAN1.
-        The timing information from pip is encoded in edge #2.
-        The remaining timing information is encoded in edges and channels
-        as expected.
+DEFERRED_WIRE_NODE_SERIAL = itertools.count()
 
-        This function returns edge #1 as the site_pin_switch_pkey.
-        This function returns CHAN1 as site_pin_graph_node_pkey.
 
-        The diagram for an IPIN is the same, except reverse all the arrows.
+def get_site_pin_switch(conn, wire_pkey):
+    """ Returns the site pin switch_pkey of the node containing wire_pkey. """
+    cur = conn.cursor()
 
+    cur.execute(
         """
-        cur = self.conn.cursor()
-
-        cur.execute(
-            """
-    SELECT site_wire_pkey FROM node WHERE pkey = (
-        SELECT node_pkey FROM wire WHERE pkey = ?
-        )
-        """, (wire_pkey, )
-        )
-        site_wire_pkey = cur.fetchone()[0]
-
-        cur.execute(
-            """
-SELECT
-    node_pkey,
-    top_graph_node_pkey,
-    bottom_graph_node_pkey,
-    right_graph_node_pkey,
-    left_graph_node_pkey,
-    site_pin_graph_node_pkey
-FROM wire WHERE pkey = ?""", (site_wire_pkey, )
-        )
-        values = cur.fetchone()
-        node_pkey = values[0]
-        edge_nodes = values[1:5]
-        site_pin_graph_node_pkey = values[5]
-
-        cur.execute(
-            """
 SELECT
   site_pin_switch_pkey
 FROM
@@ -506,60 +457,144 @@ AND
           pkey = ?
     )
   )""", (wire_pkey, )
+    )
+    results = cur.fetchall()
+    assert len(results) == 1, (wire_pkey, results)
+    site_pin_switch_pkey = results[0][0]
+    assert site_pin_switch_pkey is not None, wire_pkey
+
+    return site_pin_switch_pkey
+
+
+def find_wire_node(conn, wire_pkey, graph_node_pkey, track_graph_node_pkey):
+    """ Find/create graph node for site pin.
+
+    In order to support site pin timing modelling, an additional node
+    is required to support the timing model.  This function returns that
+    node, along with the switch that should be used to connect the
+    IPIN/OPIN to that node. See diagram for details.
+
+    Arguments
+    ---------
+    wire_pkey : int
+        Wire primary key to a wire attached to a site pin.
+    graph_node_pkey : int
+        Graph node primary key that represents which IPIN/OPIN node is
+        being used to connect the site pin to the routing graph.
+    track_graph_node_pkey : int
+        Graph node primary key that represents the first routing node this
+        site pin connects too.  See diagram for details.
+
+    Returns
+    -------
+    site_pin_switch_pkey : int
+        Switch primary key to the switch to connect IPIN/OPIN node to
+        new site pin wire node.  See diagram for details.
+    site_pin_graph_node_pkey : int
+        Graph node primary key that represents site pin wire node.
+        See diagram for details.
+
+    Diagram:
+
+       --+
+         |    tile wire #1  +-----+ tile wire #2
+         +==>-------------->+ pip +--------------->
+         | ^-Site pin       +-----+
+       --+
+
+        +----+           +-----+            +-----+
+        |OPIN+--edge #1->+CHAN1+--edge #2-->+CHAN2|->
+        +----+           +-----+            +-----+
+
+    The timing information from the site pin is encoded in edge #1.
+    The timing information from tile wire #1 is encoded in CHAN1.
+    The timing information from pip is encoded in edge #2.
+    The remaining timing information is encoded in edges and channels
+    as expected.
+
+    This function returns edge #1 as the site_pin_switch_pkey.
+    This function returns CHAN1 as site_pin_graph_node_pkey.
+
+    The diagram for an IPIN is the same, except reverse all the arrows.
+
+    """
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+    SELECT site_wire_pkey FROM node WHERE pkey = (
+        SELECT node_pkey FROM wire WHERE pkey = ?
         )
-        results = cur.fetchall()
-        assert len(results) == 1, (wire_pkey, results)
-        site_pin_switch_pkey = results[0][0]
-        assert site_pin_switch_pkey is not None, wire_pkey
+        """, (wire_pkey, )
+    )
+    site_wire_pkey = cur.fetchone()[0]
+
+    cur.execute(
+        """
+SELECT
+    node_pkey,
+    top_graph_node_pkey,
+    bottom_graph_node_pkey,
+    right_graph_node_pkey,
+    left_graph_node_pkey,
+    site_pin_graph_node_pkey
+FROM wire WHERE pkey = ?""", (site_wire_pkey, )
+    )
+    values = cur.fetchone()
+    node_pkey = values[0]
+    edge_nodes = values[1:5]
+    site_pin_graph_node_pkey = values[5]
+
+    site_pin_switch_pkey = get_site_pin_switch(conn, wire_pkey)
 
-        assert graph_node_pkey in edge_nodes, (
+    assert graph_node_pkey in edge_nodes, (
+        wire_pkey, graph_node_pkey, track_graph_node_pkey, edge_nodes
+    )
+
+    if site_pin_graph_node_pkey is None:
+        assert track_graph_node_pkey is not None, (
             wire_pkey, graph_node_pkey, track_graph_node_pkey, edge_nodes
         )
 
-        if site_pin_graph_node_pkey is None:
-            assert track_graph_node_pkey is not None, (
-                wire_pkey, graph_node_pkey, track_graph_node_pkey, edge_nodes
-            )
-
-            is_lv_node = False
-            for (name, ) in cur.execute("""
+        is_lv_node = False
+        for (name, ) in cur.execute("""
 SELECT wire_in_tile.name
 FROM wire_in_tile
 WHERE pkey IN (
     SELECT wire_in_tile_pkey FROM wire WHERE node_pkey = ?
 )""", (node_pkey, )):
-                if name.startswith('LV'):
-                    is_lv_node = True
-                    break
+            if name.startswith('LV'):
+                is_lv_node = True
+                break
 
-            capacitance = 0
-            resistance = 0
-            for idx, (wire_cap, wire_res) in enumerate(cur.execute("""
+        capacitance = 0
+        resistance = 0
+        for idx, (wire_cap, wire_res) in enumerate(cur.execute("""
 SELECT wire_in_tile.capacitance, wire_in_tile.resistance
 FROM wire_in_tile
 WHERE pkey IN (
     SELECT wire_in_tile_pkey FROM wire WHERE node_pkey = ?
 )""", (node_pkey, ))):
-                capacitance += wire_cap
-                resistance + wire_res
-
-                if is_lv_node and idx == 1:
-                    # Only use first 2 wire RC's, ignore the rest.  It appears
-                    # that some of the RC constant was lumped into the switch
-                    # timing, so don't double count.
-                    #
-                    # FIXME: Note that this is a hack, and should be fixed if
-                    # possible.
-                    break
+            capacitance += wire_cap
+            resistance + wire_res
+
+            if is_lv_node and idx == 1:
+                # Only use first 2 wire RC's, ignore the rest.  It appears
+                # that some of the RC constant was lumped into the switch
+                # timing, so don't double count.
+                #
+                # FIXME: Note that this is a hack, and should be fixed if
+                # possible.
+                break
 
-            # This node does not exist, create it now
-            write_cur = self.conn.cursor()
+        # This node does not exist, create it now
+        write_cur = conn.cursor()
 
-            write_cur.execute("INSERT INTO track DEFAULT VALUES")
-            new_track_pkey = write_cur.lastrowid
+        write_cur.execute("INSERT INTO track DEFAULT VALUES")
+        new_track_pkey = write_cur.lastrowid
 
-            write_cur.execute(
-                """
+        write_cur.execute(
+            """
 INSERT INTO
     graph_node(
         graph_node_type,
@@ -584,27 +619,97 @@ SELECT
     ?,
     ?
 FROM graph_node WHERE pkey = ?""", (
-                    node_pkey,
-                    capacitance,
-                    resistance,
-                    new_track_pkey,
-                    track_graph_node_pkey,
-                )
+                node_pkey,
+                capacitance,
+                resistance,
+                new_track_pkey,
+                track_graph_node_pkey,
             )
-            site_pin_graph_node_pkey = write_cur.lastrowid
+        )
+        site_pin_graph_node_pkey = write_cur.lastrowid
 
-            write_cur.execute(
-                """
+        write_cur.execute(
+            """
 UPDATE wire SET site_pin_graph_node_pkey = ?
 WHERE pkey = ?""", (
-                    site_pin_graph_node_pkey,
-                    wire_pkey,
-                )
+                site_pin_graph_node_pkey,
+                wire_pkey,
             )
+        )
 
-            write_cur.connection.commit()
+        write_cur.connection.commit()
 
-        return site_pin_switch_pkey, site_pin_graph_node_pkey
+    return site_pin_switch_pkey, site_pin_graph_node_pkey
+
+
+OPPOSITE_DIRECTIONS = {
+    tracks.Direction.TOP: tracks.Direction.BOTTOM,
+    tracks.Direction.BOTTOM: tracks.Direction.TOP,
+    tracks.Direction.LEFT: tracks.Direction.RIGHT,
+    tracks.Direction.RIGHT: tracks.Direction.LEFT,
+}
+
+
+class Connector(object):
+    """ Connector is an object for joining two nodes.
+
+    Connector represents either a site pin within a specific tile or routing
+    channel made of one or more channel nodes.
+
+
+    """
+
+    def __init__(self, conn, pins=None, tracks=None, defer_wire_nodes=False):
+        """ Create a Connector object.
+
+        Provide either pins or tracks, not both or neither.
+
+        Args:
+            pins (Pins namedtuple): If this Connector object represents a
+                site pin, provide the pins named arguments.
+            tracks (tuple of (tracks.Tracks, list of graph nodes)): If this
+                Connector object represents a routing channel, provide the
+                tracks named argument.
+
+                The tuple can most easily be constructed via
+                connection_database.get_track_model, which builds the Tracks
+                models and the graph node list.
+            defer_wire_nodes (bool): If True, site pin wire nodes are not
+                created in conn (which may be read-only), DeferredWireNode
+                placeholders are emitted instead.
+        """
+        self.conn = conn
+        self.pins = pins
+        self.tracks = tracks
+        self.defer_wire_nodes = defer_wire_nodes
+        self.track_connections = {}
+        assert (self.pins is not None) ^ (self.tracks is not None)
+
+    def find_wire_node(
+            self, wire_pkey, graph_node_pkey, track_graph_node_pkey
+    ):
+        """ Find/create graph node for site pin.
+
+        See find_wire_node for details.  When this Connector was created with
+        defer_wire_nodes, the site pin wire node is not created.  Instead a
+        DeferredWireNode is returned, which must be resolved with
+        resolve_deferred_wire_nodes against the writable database.
+
+        """
+        if self.defer_wire_nodes:
+            return (
+                get_site_pin_switch(self.conn, wire_pkey),
+                DeferredWireNode(
+                    serial=next(DEFERRED_WIRE_NODE_SERIAL),
+                    wire_pkey=wire_pkey,
+                    graph_node_pkey=graph_node_pkey,
+                    track_graph_node_pkey=track_graph_node_pkey,
+                )
+            )
+
+        return find_wire_node(
+            self.conn, wire_pkey, graph_node_pkey, track_graph_node_pkey
+        )
 
     def get_edge_with_mux_switch(
             self, src_wire_pkey, pip_pkey, dest_wire_pkey
@@ -834,19 +939,48 @@ AND
         )
 
 
-def create_find_connector(conn):
-    """ Returns a function returns a Connector object for a given wire and node.
+# Default weight budget of a ConnectorPool, see ConnectorPool.
+CONNECTOR_POOL_SIZE = 1 << 22
 
-    Args:
-        conn: Database connection
+# Directions of the top, bottom, left and right graph node columns of wire.
+EDGE_DIRECTIONS = (
+    tracks.Direction.TOP,
+    tracks.Direction.BOTTOM,
+    tracks.Direction.LEFT,
+    tracks.Direction.RIGHT,
+)
+
+
+class ConnectorPool(object):
+    """ Bounded pool of Connector objects, keyed by node_pkey.
+
+    Connectors only depend on the node of a wire, so the pool is keyed by
+    node_pkey.  Connectors of tracks are shared by every node of the track,
+    e.g. the GND and VCC tracks of the TIEOFF nodes.
+
+    The pool is a WeightedLru.  Pin connectors weigh their number of graph
+    nodes, track connectors weigh the number of graph nodes of the track, so
+    the pool size is roughly bounded in graph nodes.
+
+    prewarm_tile loads the connectors of all nodes of a tile with a few bulk
+    queries, instead of several queries per node on its first lookup.
+
+    Instances are called like the find_connector function returned by
+    create_find_connector.
 
-    Returns:
-        Function.  See find_connector below for signature.
     """
-    c = conn.cursor()
 
-    @functools.lru_cache(maxsize=100000)
-    def find_connector(wire_pkey, node_pkey):
+    def __init__(
+            self, conn, defer_wire_nodes=False, max_size=CONNECTOR_POOL_SIZE
+    ):
+        self.conn = conn
+        self.defer_wire_nodes = defer_wire_nodes
+        self.connectors = WeightedLru(max_size)
+        self.hits = 0
+        self.misses = 0
+        self.prewarmed = 0
+
+    def __call__(self, wire_pkey, node_pkey):
         """ Finds Connector for a wire and node in the database.
 
         Args:
@@ -857,49 +991,176 @@ def create_find_connector(conn):
         Returns:
             None if wire is disconnected, otherwise returns Connector objet.
         """
+        key = ('node', node_pkey)
+        if key in self.connectors:
+            self.hits += 1
+            return self.connectors.get(key)
 
-        # Find all graph_nodes for this node.
-        c.execute(
+        self.misses += 1
+        return self.load_nodes([node_pkey], wire_pkey)[node_pkey]
+
+    def prewarm_tile(self, tile_name):
+        """ Loads the connectors of the nodes of all wires in tile_name. """
+        cur = self.conn.cursor()
+        cur.execute(
             """
-        SELECT pkey, track_pkey, graph_node_type, x_low, x_high, y_low, y_high FROM graph_node
-        WHERE node_pkey = ?;""", (node_pkey, )
+SELECT DISTINCT node_pkey FROM wire WHERE phy_tile_pkey = (
+    SELECT pkey FROM phy_tile WHERE name = ?
+    ) AND node_pkey IS NOT NULL;""", (tile_name, )
         )
 
-        graph_nodes = c.fetchall()
+        node_pkeys = [
+            node_pkey for (node_pkey, ) in cur
+            if ('node', node_pkey) not in self.connectors
+        ]
+        self.load_nodes(node_pkeys)
+        self.prewarmed += len(node_pkeys)
+
+    def stats(self):
+        """ Returns dict of the pool counters. """
+        return {
+            'connector_hits': self.hits,
+            'connector_misses': self.misses,
+            'connector_prewarmed': self.prewarmed,
+            'connector_evictions': self.connectors.evictions,
+            'connector_pool_weight': self.connectors.weight,
+        }
+
+    def track_connector(self, track_pkey, track_models):
+        """ Returns the Connector of track_pkey, shared by all its nodes. """
+        key = ('track', track_pkey)
+        if key in self.connectors:
+            return self.connectors.get(key)
+
+        if track_pkey in track_models:
+            track_model = track_models[track_pkey]
+        else:
+            # Evicted while loading other nodes.
+            track_model = get_track_model(self.conn, track_pkey)
 
-        # If there are no graph nodes, this wire is likely disconnected.
-        if len(graph_nodes) == 0:
-            return
+        connector = Connector(
+            conn=self.conn,
+            tracks=track_model,
+            defer_wire_nodes=self.defer_wire_nodes,
+        )
+        self.connectors.put(key, connector, weight=len(track_model[1]))
 
-        # If this is a track (e.g. track_pkey is not NULL), then verify
-        # all graph_nodes for the specified node belong to the same track,
-        # and then retrieved and return the connector for the track.
-        track_pkey = graph_nodes[0][1]
-        if track_pkey is not None:
-            for node in graph_nodes:
-                assert node[1] == track_pkey
+        return connector
 
-            return Connector(
-                conn=conn, tracks=get_track_model(conn, track_pkey)
-            )
+    def load_nodes(self, node_pkeys, wire_pkey=None):
+        """ Creates and pools the connectors of node_pkeys.
 
-        # Check if this node has a special track.  This is being used to
-        # denote the GND and VCC track connections on TIEOFF HARD0 and HARD1.
-        c.execute(
-            """
+        Returns dict of node_pkey to Connector, or None if the node is
+        disconnected.
+
+        """
+        node_pkeys = sorted(node_pkeys)
+
+        graph_nodes = {}
+        for row in execute_in_chunks(self.conn, """
+SELECT
+  node_pkey, pkey, track_pkey, graph_node_type, x_low, x_high, y_low, y_high
+FROM
+  graph_node
+WHERE
+  node_pkey IN ({})
+ORDER BY
+  node_pkey, pkey;""", node_pkeys):
+            graph_nodes.setdefault(row[0], []).append(row[1:])
+
+        # Nodes that have a special track.  This is being used to denote the
+        # GND and VCC track connections on TIEOFF HARD0 and HARD1.
+        special_tracks = dict(
+            execute_in_chunks(
+                self.conn, """
 SELECT
-  track_pkey,
-  site_wire_pkey
+  pkey, track_pkey
 FROM
   node
 WHERE
-  pkey = ?;""", (node_pkey, )
+  pkey IN ({})
+AND
+  track_pkey IS NOT NULL
+AND
+  site_wire_pkey IS NOT NULL;""", node_pkeys
+            )
         )
-        for track_pkey, site_wire_pkey in c:
-            if track_pkey is not None and site_wire_pkey is not None:
-                return Connector(
-                    conn=conn, tracks=get_track_model(conn, track_pkey)
+
+        edge_keys = {}
+        for row in execute_in_chunks(self.conn, """
+SELECT
+  node_pkey,
+  top_graph_node_pkey,
+  bottom_graph_node_pkey,
+  left_graph_node_pkey,
+  right_graph_node_pkey
+FROM
+  wire
+WHERE
+  node_pkey IN ({})
+ORDER BY
+  node_pkey, pkey;""", node_pkeys):
+            edge_keys.setdefault(row[0], []).append(row[1:])
+
+        # Load the models of all tracks not pooled yet at once.
+        node_tracks = {}
+        for node_pkey, node_graph_nodes in graph_nodes.items():
+            track_pkey = node_graph_nodes[0][1]
+            if track_pkey is None:
+                track_pkey = special_tracks.get(node_pkey)
+
+            if track_pkey is not None:
+                node_tracks[node_pkey] = track_pkey
+
+        track_models = get_track_models(
+            self.conn, [
+                track_pkey for track_pkey in set(node_tracks.values())
+                if ('track', track_pkey) not in self.connectors
+            ]
+        )
+
+        connectors = {}
+        for node_pkey in node_pkeys:
+            node_graph_nodes = graph_nodes.get(node_pkey, [])
+
+            if node_pkey in node_tracks:
+                # If this is a track (e.g. track_pkey is not NULL), then
+                # verify all graph_nodes for the specified node belong to the
+                # same track.
+                track_pkey = node_graph_nodes[0][1]
+                if track_pkey is not None:
+                    for node in node_graph_nodes:
+                        assert node[1] == track_pkey
+
+                connector = self.track_connector(
+                    node_tracks[node_pkey], track_models
                 )
+                weight = 1
+            else:
+                connector = self.make_pin_connector(
+                    wire_pkey, node_pkey, node_graph_nodes,
+                    edge_keys.get(node_pkey, [])
+                )
+                weight = 1 if connector is None else len(
+                    connector.pins.edge_map
+                )
+
+            self.connectors.put(('node', node_pkey), connector, weight=weight)
+            connectors[node_pkey] = connector
+
+        return connectors
+
+    def make_pin_connector(
+            self, wire_pkey, node_pkey, graph_nodes, all_graph_node_pkeys
+    ):
+        """ Returns the site pin Connector of node_pkey.
+
+        Returns None if the node has no graph nodes or no connections.
+
+        """
+        # If there are no graph nodes, this wire is likely disconnected.
+        if len(graph_nodes) == 0:
+            return
 
         # This is not a track, so it must be a site pin.  Make sure the
         # graph_nodes share a type and verify that it is in fact a site pin.
@@ -918,21 +1179,6 @@ WHERE
             assert False, node_type
 
         # Build the edge_map (map of edge direction to graph node).
-        c.execute(
-            """
-SELECT
-  top_graph_node_pkey,
-  bottom_graph_node_pkey,
-  left_graph_node_pkey,
-  right_graph_node_pkey
-FROM
-  wire
-WHERE
-  node_pkey = ?;""", (node_pkey, )
-        )
-
-        all_graph_node_pkeys = c.fetchall()
-
         graph_node_pkeys = None
         for keys in all_graph_node_pkeys:
             if any(keys):
@@ -945,15 +1191,7 @@ WHERE
 
         edge_map = {}
 
-        for edge, graph_node in zip(
-            (
-                tracks.Direction.TOP,
-                tracks.Direction.BOTTOM,
-                tracks.Direction.LEFT,
-                tracks.Direction.RIGHT,
-            ),
-                graph_node_pkeys,
-        ):
+        for edge, graph_node in zip(EDGE_DIRECTIONS, graph_node_pkeys):
             if graph_node is not None:
                 edge_map[edge] = graph_node
 
@@ -975,19 +1213,36 @@ WHERE
             assert pkey in edge_map.values(), (pkey, edge_map)
 
         return Connector(
-            conn=conn,
+            conn=self.conn,
             pins=Pins(
                 edge_map=edge_map,
                 x=x,
                 y=y,
                 site_pin_direction=site_pin_direction,
-            )
+            ),
+            defer_wire_nodes=self.defer_wire_nodes,
         )
 
-    return find_connector
+
+def create_find_connector(
+        conn, defer_wire_nodes=False, max_size=CONNECTOR_POOL_SIZE
+):
+    """ Returns a function returns a Connector object for a given wire and node.
+
+    Args:
+        conn: Database connection
+        defer_wire_nodes: See Connector.
+        max_size: Weight budget of the pool, see ConnectorPool.
+
+    Returns:
+        ConnectorPool, called as find_connector(wire_pkey, node_pkey).
+    """
+    return ConnectorPool(
+        conn, defer_wire_nodes=defer_wire_nodes, max_size=max_size
+    )
 
 
-def create_const_connectors(conn):
+def create_const_connectors(conn, defer_wire_nodes=False):
     c = conn.cursor()
     c.execute(
         """
@@ -998,10 +1253,14 @@ SELECT vcc_track_pkey, gnd_track_pkey FROM constant_sources;
 
     const_connectors = {}
     const_connectors[0] = Connector(
-        conn=conn, tracks=get_track_model(conn, gnd_track_pkey)
+        conn=conn,
+        tracks=get_track_model(conn, gnd_track_pkey),
+        defer_wire_nodes=defer_wire_nodes,
     )
     const_connectors[1] = Connector(
-        conn=conn, tracks=get_track_model(conn, vcc_track_pkey)
+        conn=conn,
+        tracks=get_track_model(conn, vcc_track_pkey),
+        defer_wire_nodes=defer_wire_nodes,
     )
 
     return const_connectors
@@ -1072,83 +1331,6 @@ def yield_edges(
                 )
 
 
-def make_connection(
-        conn, input_only_nodes, output_only_nodes, find_wire, find_pip,
-        find_connector, get_tile_loc, tile_name, tile_type, pip,
-        delayless_switch, const_connectors, forward
-):
-    """ Attempt to connect graph nodes on either side of a pip.
-
-    Args:
-        input_only_nodes (set of node_pkey): Nodes that can only be used as
-            sinks. This is because a synthetic tile will use this node as a
-            source.
-        output_only_nodes (set of node_pkey): Nodes that can only be used as
-            sources. This is because a synthetic tile will use this node as a
-            sink.
-        find_wire (function): Return value from create_find_wire.
-        find_pip (function): Return value from create_find_pip.
-        find_connector (function): Return value from create_find_connector.
-        tile_name (str): Name of tile pip belongs too.
-        pip (prjxray.tile.Pip): Pip being connected.
-        switch_pkey (int): Primary key to switch table of switch to be used
-            in this connection.
-
-    Returns:
-        None if connection cannot be made, otherwise returns tuple of:
-            src_graph_node_pkey (int) - Primary key into graph_node table of
-                source.
-            dest_graph_node_pkey (int) - Primary key into graph_node table of
-                destination.
-            switch_pkey (int) - Primary key into switch table of switch used
-                in connection.
-            phy_tile_pkey (int) - Primary key into table of parent physical
-                tile of the pip.
-            pip_pkey (int) - Primary key into pip_in_tile table for this pip.
-
-    """
-
-    src_wire_pkey, tile_pkey, phy_tile_pkey, src_node_pkey = find_wire(
-        tile_name, tile_type, pip.net_from
-    )
-    sink_wire_pkey, tile_pkey2, phy_tile_pkey2, sink_node_pkey = find_wire(
-        tile_name, tile_type, pip.net_to
-    )
-
-    assert phy_tile_pkey == phy_tile_pkey2
-
-    # Skip nodes that are reserved because of ROI
-    if src_node_pkey in input_only_nodes:
-        return
-
-    if sink_node_pkey in output_only_nodes:
-        return
-
-    src_connector = find_connector(src_wire_pkey, src_node_pkey)
-    if src_connector is None:
-        return
-
-    sink_connector = find_connector(sink_wire_pkey, sink_node_pkey)
-    if sink_connector is None:
-        return
-
-    pip_obj = find_pip(tile_type, pip.name)
-
-    # Generally pseudo-pips are skipped, with the exception for BUFHCE related pips,
-    # for which we want to create a routing path to have VPR route thorugh these pips.
-    assert not pip_obj.is_pseudo or "CLK_HROW_CK" in pip.name
-
-    loc = get_tile_loc(tile_pkey)
-
-    for edge in yield_edges(
-            const_connectors=const_connectors,
-            delayless_switch=delayless_switch, phy_tile_pkey=phy_tile_pkey,
-            src_connector=src_connector, sink_connector=sink_connector,
-            pip=pip, pip_obj=pip_obj, src_wire_pkey=src_wire_pkey,
-            sink_wire_pkey=sink_wire_pkey, loc=loc, forward=forward):
-        yield edge
-
-
 def mark_track_liveness(conn, input_only_nodes, output_only_nodes):
     """ Checks tracks for liveness.
 
@@ -1157,26 +1339,34 @@ def mark_track_liveness(conn, input_only_nodes, output_only_nodes):
 
     Args:
         conn (sqlite3.Connection): Connection database
+        input_only_nodes (IntSet): Input only nodes of the ROI.
+        output_only_nodes (IntSet): Output only nodes of the ROI.
 
     """
-
-    alive_tracks = set()
     c = conn.cursor()
     write_cur = conn.cursor()
-    for graph_node_pkey, node_pkey, track_pkey in c.execute("""
+
+    graph_nodes = load_int_rows(
+        conn, """
 SELECT
   pkey,
-  node_pkey,
+  IFNULL(node_pkey, -1),
   track_pkey
 FROM
   graph_node
 WHERE
-  track_pkey IS NOT NULL;"""):
-        if track_pkey in alive_tracks:
-            continue
+  track_pkey IS NOT NULL;"""
+    )
 
-        if node_pkey in input_only_nodes or node_pkey in output_only_nodes:
-            alive_tracks.add(track_pkey)
+    # Tracks of nodes reserved by the ROI are always alive.
+    roi_nodes = input_only_nodes | output_only_nodes
+    reserved = roi_nodes.contains(graph_nodes[:, 1])
+    alive_tracks = set(graph_nodes[reserved, 2].tolist())
+
+    graph_nodes = graph_nodes[~reserved]
+    for graph_node_pkey, track_pkey in zip(graph_nodes[:, 0].tolist(),
+                                           graph_nodes[:, 2].tolist()):
+        if track_pkey in alive_tracks:
             continue
 
         write_cur.execute(
@@ -1213,11 +1403,11 @@ SELECT count() FROM (
     )
 
     write_cur.execute("""BEGIN EXCLUSIVE TRANSACTION;""")
-    for (track_pkey, ) in c.execute("""SELECT pkey FROM track;"""):
-        write_cur.execute(
-            "UPDATE track SET alive = ? WHERE pkey = ?;",
-            (track_pkey in alive_tracks, track_pkey)
-        )
+    write_cur.execute("UPDATE track SET alive = 0;")
+    write_cur.executemany(
+        "UPDATE track SET alive = 1 WHERE pkey = ?;",
+        ((track_pkey, ) for track_pkey in sorted(alive_tracks))
+    )
     write_cur.execute("""COMMIT TRANSACTION;""")
 
     print('{} Track aliveness committed'.format(now()))
@@ -2000,6 +2190,10 @@ SELECT DISTINCT canon_phy_tile_pkey FROM track WHERE pkey IN (
     write_cur.execute("""COMMIT TRANSACTION;""")
 
 
+# Number of edges inserted per write transaction.
+EDGE_COMMIT_SIZE = 1 << 18
+
+
 def commit_edges(write_cur, edges):
     write_cur.execute("""BEGIN EXCLUSIVE TRANSACTION;""")
     write_cur.executemany(
@@ -2059,13 +2253,435 @@ def create_edge_indices(conn):
     write_cur.execute("""COMMIT TRANSACTION;""")
     write_cur.connection.commit()
 
+    analyze(conn)
+
     print('{} Indices created, marking track liveness'.format(now()))
 
 
+def skip_pip(pip):
+    """ Returns True if no edges are created for pip in any tile. """
+    # FIXME: The PADOUT0/1 connections do not work.
+    #
+    # These connections are used for:
+    #  - XADC
+    #  - Differential signal signal connection between pads.
+    #
+    # Issue tracking fix:
+    # https://github.com/SymbiFlow/f4pga-arch-defs/issues/1033
+    if 'PADOUT0' in pip.name and 'DIFFI_IN1' not in pip.name:
+        return True
+    if 'PADOUT1' in pip.name and 'DIFFI_IN0' not in pip.name:
+        return True
+
+    # These edges are used for bringing general interconnect to the
+    # horizontal clock buffers.  This should only be used when routing
+    # clocks.
+    if 'CLK_HROW_CK_INT_' in pip.name:
+        return True
+
+    # Generally pseudo-pips are skipped, with the exception for BUFHCE related pips,
+    # for which we want to create a routing path to have VPR route thorugh these pips.
+    if pip.is_pseudo and "CLK_HROW_CK" not in pip.name:
+        return True
+
+    # Filter out PIPs related to MIO and DDR pins of the Zynq7 PS.
+    # These PIPs are actually not there, they are just informative.
+    if "PS72_" in pip.net_to or "PS72_" in pip.net_from:
+        return True
+
+    return False
+
+
+# Pips of a tile type that edges are created for, see make_pip_template.
+#
+#  - tile_type: Name of the tile type.
+#  - pips: List of (forward, pip), in make_sorted_pips order.
+#  - wire_in_tile_pkeys: Sorted array of the wire_in_tile_pkeys of the wires
+#    of the pips.
+#  - src_wires, sink_wires: Arrays of the index in wire_in_tile_pkeys of the
+#    net_from and net_to wire of each pip.
+#  - resolved_pips: List of the ResolvedPip of each pip, None until the pip
+#    is first connected.
+PipTemplate = namedtuple(
+    'PipTemplate',
+    'tile_type pips wire_in_tile_pkeys src_wires sink_wires resolved_pips'
+)
+
+
+def make_pip_template(find_wire_in_tile, tile_type, sorted_pips):
+    """ Returns the PipTemplate of tile_type.
+
+    sorted_pips is the return value of make_sorted_pips for the tile type.
+    Pips filtered by skip_pip are removed.
+
+    """
+    pips = [
+        (forward, pip) for forward, pip in sorted_pips if not skip_pip(pip)
+    ]
+
+    wire_in_tile_pkeys = [
+        find_wire_in_tile(tile_type, pip.net_from) for _, pip in pips
+    ]
+    wire_in_tile_pkeys.extend(
+        find_wire_in_tile(tile_type, pip.net_to) for _, pip in pips
+    )
+    wire_in_tile_pkeys, wire_idx = numpy.unique(
+        numpy.array(wire_in_tile_pkeys, dtype=numpy.int64),
+        return_inverse=True
+    )
+
+    return PipTemplate(
+        tile_type=tile_type,
+        pips=pips,
+        wire_in_tile_pkeys=wire_in_tile_pkeys,
+        src_wires=wire_idx[:len(pips)],
+        sink_wires=wire_idx[len(pips):],
+        resolved_pips=[None] * len(pips),
+    )
+
+
+def create_get_pip_template(conn, sorted_pips):
+    """ Returns a function that takes a tile_type and returns its PipTemplate.
+
+    sorted_pips is a dict of tile_type to the return value of
+    make_sorted_pips.  Templates are made on first use.
+
+    """
+    find_wire_in_tile = create_find_wire_in_tile(conn)
+    templates = {}
+
+    def get_pip_template(tile_type):
+        if tile_type not in templates:
+            templates[tile_type] = make_pip_template(
+                find_wire_in_tile, tile_type, sorted_pips[tile_type]
+            )
+
+        return templates[tile_type]
+
+    return get_pip_template
+
+
+def get_tile_wires(conn, tile_name, wire_in_tile_pkeys):
+    """ Returns the wires of tile_name with the given wire_in_tile_pkeys.
+
+    Returns phy_tile_pkey, lists of wire_pkey, tile_pkey and node_pkey
+    indexed like wire_in_tile_pkeys, and the node_pkeys as an array.  NULL
+    tile_pkey and node_pkey are None in the lists, and -1 in the array.
+
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT pkey FROM phy_tile WHERE name = ?", (tile_name, ))
+    (phy_tile_pkey, ) = cur.fetchone()
+
+    wires = load_int_rows(
+        conn, """
+SELECT
+  wire_in_tile_pkey,
+  pkey,
+  IFNULL(tile_pkey, -1),
+  IFNULL(node_pkey, -1)
+FROM
+  wire
+WHERE
+  phy_tile_pkey = ?
+ORDER BY
+  wire_in_tile_pkey, pkey;""", (phy_tile_pkey, )
+    )
+
+    idx = numpy.searchsorted(wires[:, 0], wire_in_tile_pkeys)
+    found = idx < len(wires)
+    found[found] = wires[idx[found], 0] == wire_in_tile_pkeys[found]
+    assert numpy.all(found
+                     ), (tile_name, phy_tile_pkey, wire_in_tile_pkeys[~found])
+
+    def keys(column):
+        return [
+            None if pkey < 0 else pkey for pkey in wires[idx, column].tolist()
+        ]
+
+    nodes = wires[idx, 3]
+    return phy_tile_pkey, wires[idx, 1].tolist(), keys(2), keys(3), nodes
+
+
+def yield_tile_connections(
+        conn, input_only_nodes, output_only_nodes, find_pip, find_connector,
+        get_tile_loc, tile_name, pip_template, delayless_switch,
+        const_connectors
+):
+    """ Yields graph edges for every pip of one tile instance.
+
+    The pips, wires and filters of the tile type are resolved once in
+    pip_template, only the wires and nodes of the tile instance are looked up
+    here, with one query.  find_connector is a ConnectorPool, it is prewarmed
+    with the nodes of the tile.
+
+    Args:
+        input_only_nodes (IntSet): Nodes that can only be used as sinks.
+            This is because a synthetic tile will use this node as a source.
+        output_only_nodes (IntSet): Nodes that can only be used as sources.
+            This is because a synthetic tile will use this node as a sink.
+        find_pip (function): Return value from create_find_pip.
+        find_connector (function): Return value from create_find_connector.
+        get_tile_loc (function): Return value from create_get_tile_loc.
+        tile_name (str): Name of tile pips belongs too.
+        pip_template (PipTemplate): Pips of the tile type.
+
+    Yields:
+        Tuples of:
+            src_graph_node_pkey (int) - Primary key into graph_node table of
+                source.
+            dest_graph_node_pkey (int) - Primary key into graph_node table of
+                destination.
+            switch_pkey (int) - Primary key into switch table of switch used
+                in connection.
+            phy_tile_pkey (int) - Primary key into table of parent physical
+                tile of the pip.
+            pip_pkey (int) - Primary key into pip_in_tile table for this pip.
+            backward (bool) - True if the edge goes from net_to to net_from.
+
+    """
+    if not pip_template.pips:
+        return
+
+    find_connector.prewarm_tile(tile_name)
+
+    (phy_tile_pkey, wire_pkeys, tile_pkeys, node_pkeys,
+     nodes) = get_tile_wires(conn, tile_name, pip_template.wire_in_tile_pkeys)
+
+    # Skip nodes that are reserved because of ROI
+    reserved = input_only_nodes.contains(nodes[pip_template.src_wires])
+    reserved |= output_only_nodes.contains(nodes[pip_template.sink_wires])
+
+    for idx in numpy.flatnonzero(~reserved).tolist():
+        forward, pip = pip_template.pips[idx]
+        src_idx = int(pip_template.src_wires[idx])
+        sink_idx = int(pip_template.sink_wires[idx])
+        src_node_pkey = node_pkeys[src_idx]
+        sink_node_pkey = node_pkeys[sink_idx]
+
+        src_wire_pkey = wire_pkeys[src_idx]
+        sink_wire_pkey = wire_pkeys[sink_idx]
+
+        src_connector = find_connector(src_wire_pkey, src_node_pkey)
+        if src_connector is None:
+            continue
+
+        sink_connector = find_connector(sink_wire_pkey, sink_node_pkey)
+        if sink_connector is None:
+            continue
+
+        pip_obj = pip_template.resolved_pips[idx]
+        if pip_obj is None:
+            # Generally pseudo-pips are skipped, with the exception for BUFHCE related pips,
+            # for which we want to create a routing path to have VPR route thorugh these pips.
+            pip_row = find_pip(pip_template.tile_type, pip.name)
+            assert not pip_row.is_pseudo or "CLK_HROW_CK" in pip.name
+
+            wire_in_tile_pkeys = pip_template.wire_in_tile_pkeys[[
+                src_idx, sink_idx
+            ]].tolist()
+            if not forward:
+                wire_in_tile_pkeys.reverse()
+
+            pip_obj = ResolvedPip(pip_row, *wire_in_tile_pkeys)
+            pip_template.resolved_pips[idx] = pip_obj
+
+        loc = get_tile_loc(tile_pkeys[src_idx])
+
+        for edge in yield_edges(
+                const_connectors=const_connectors,
+                delayless_switch=delayless_switch, phy_tile_pkey=phy_tile_pkey,
+                src_connector=src_connector, sink_connector=sink_connector,
+                pip=pip, pip_obj=pip_obj, src_wire_pkey=src_wire_pkey,
+                sink_wire_pkey=sink_wire_pkey, loc=loc, forward=forward):
+            yield edge
+
+
+def resolve_deferred_wire_nodes(conn, connections):
+    """ Replaces DeferredWireNode placeholders with real graph nodes.
+
+    Site pin wire nodes are created with find_wire_node in the order the
+    placeholders appear, which is the order a sequential run would have
+    created them in.  Placeholders are shared between the two edges that
+    connect through a site pin wire node, so they are resolved only once.
+
+    Args:
+        conn: Writable connection database.
+        connections: Edge tuples of one tile, as yielded by
+            yield_tile_connections using Connectors with defer_wire_nodes.
+
+    Yields:
+        Edge tuples with all placeholders resolved.
+
+    """
+    resolved = {}
+
+    for connection in connections:
+        out = []
+        for value in connection:
+            if isinstance(value, DeferredWireNode):
+                if value.serial not in resolved:
+                    _, resolved[value.serial] = find_wire_node(
+                        conn,
+                        wire_pkey=value.wire_pkey,
+                        graph_node_pkey=value.graph_node_pkey,
+                        track_graph_node_pkey=value.track_graph_node_pkey,
+                    )
+
+                value = resolved[value.serial]
+
+            out.append(value)
+
+        yield tuple(out)
+
+
+# Per process state of the create_and_insert_edges workers, initialized by
+# init_edge_worker.
+EDGE_WORKER = {}
+
+
+def init_edge_worker(
+        snapshot, sorted_pips, delayless_switch_pkey, input_only_nodes,
+        output_only_nodes, connector_pool_size, snapshot_tables
+):
+    if snapshot_tables is None:
+        conn = sqlite3.connect('file:{}?mode=ro'.format(snapshot), uri=True)
+    else:
+        # The cache stays open for the life of the worker.
+        EDGE_WORKER['cache'] = DatabaseCache(
+            snapshot, read_only=True, mode=MMAP_MODE, tables=snapshot_tables
+        )
+        conn = EDGE_WORKER['cache'].__enter__()
+
+    EDGE_WORKER['get_pip_template'] = create_get_pip_template(
+        conn, sorted_pips
+    )
+    EDGE_WORKER['kwargs'] = dict(
+        conn=conn,
+        input_only_nodes=input_only_nodes,
+        output_only_nodes=output_only_nodes,
+        find_pip=create_find_pip(conn),
+        find_connector=create_find_connector(
+            conn, defer_wire_nodes=True, max_size=connector_pool_size
+        ),
+        get_tile_loc=create_get_tile_loc(conn),
+        delayless_switch=KnownSwitch(delayless_switch_pkey),
+        const_connectors=create_const_connectors(conn, defer_wire_nodes=True),
+    )
+
+
+def edge_worker(tiles):
+    """ Returns the list of edge tuples for each (tile_name, tile_type).
+
+    Also returns the worker pid and the counters of its ConnectorPool.
+
+    """
+    connections = [
+        list(
+            yield_tile_connections(
+                tile_name=tile_name,
+                pip_template=EDGE_WORKER['get_pip_template'](tile_type),
+                **EDGE_WORKER['kwargs']
+            )
+        ) for tile_name, tile_type in tiles
+    ]
+
+    find_connector = EDGE_WORKER['kwargs']['find_connector']
+    return os.getpid(), find_connector.stats(), connections
+
+
+def yield_tile_connections_parallel(
+        conn,
+        tiles,
+        sorted_pips,
+        delayless_switch,
+        input_only_nodes,
+        output_only_nodes,
+        jobs,
+        connector_pool_size,
+        connector_stats,
+        snapshot_tables=None
+):
+    """ Yields the edges of each tile in tiles, computed by a process pool.
+
+    The tile list is split into shards of consecutive tiles.  Each worker
+    resolves wires, pips and connectors against a read-only snapshot of the
+    connection database taken before any edge is created.  Site pin wire
+    nodes are the only rows created while making connections, so workers emit
+    DeferredWireNode placeholders for them, which are resolved here, in tile
+    order, against conn.
+
+    Each worker has a ConnectorPool of connector_pool_size.  The sum of the
+    counters of the worker pools is stored in connector_stats.
+
+    When snapshot_tables is given, each worker opens the snapshot with a read
+    only mmap DatabaseCache, which copies these tables into memory.
+
+    """
+    shard_size = max(1, len(tiles) // (jobs * 32))
+    shards = [
+        tiles[idx:idx + shard_size]
+        for idx in range(0, len(tiles), shard_size)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot = os.path.join(tmp_dir, 'channels.db')
+
+        print(
+            '{} Writing database snapshot for {} workers'.format(now(), jobs)
+        )
+        snapshot_conn = connect(snapshot)
+        conn.backup(snapshot_conn)
+        snapshot_conn.close()
+
+        with multiprocessing.Pool(
+                processes=jobs,
+                initializer=init_edge_worker,
+                initargs=(
+                    snapshot,
+                    sorted_pips,
+                    delayless_switch.switch_pkey,
+                    input_only_nodes,
+                    output_only_nodes,
+                    connector_pool_size,
+                    snapshot_tables,
+                ),
+        ) as pool:
+            worker_stats = {}
+            for pid, stats, shard_connections in pool.imap(edge_worker,
+                                                           shards):
+                worker_stats[pid] = stats
+                for connections in shard_connections:
+                    yield resolve_deferred_wire_nodes(conn, connections)
+
+    for stats in worker_stats.values():
+        for key, value in stats.items():
+            connector_stats[key] = connector_stats.get(key, 0) + value
+
+
 def create_and_insert_edges(
-        db, grid, conn, use_roi, roi, input_only_nodes, output_only_nodes
+        db,
+        grid,
+        conn,
+        use_roi,
+        roi,
+        input_only_nodes,
+        output_only_nodes,
+        jobs=1,
+        connector_pool_size=CONNECTOR_POOL_SIZE,
+        stats=None,
+        snapshot_tables=None
 ):
+    """ Creates the graph edges of all pips of the tiles in the grid.
+
+    Connectors are pooled in a ConnectorPool of connector_pool_size, split
+    between the workers when jobs > 1.  The pool counters are added to the
+    stats dict, if given.  snapshot_tables are the tables the workers copy
+    into memory, see yield_tile_connections_parallel.
+
+    """
     write_cur = conn.cursor()
+    connector_stats = {}
 
     write_cur.execute(
         'SELECT pkey FROM switch WHERE name = ?;',
@@ -2074,95 +2690,200 @@ def create_and_insert_edges(
     delayless_switch_pkey = write_cur.fetchone()[0]
     delayless_switch = KnownSwitch(delayless_switch_pkey)
 
-    find_pip = create_find_pip(conn)
-    find_wire = create_find_wire(conn)
-    find_connector = create_find_connector(conn)
-    get_tile_loc = create_get_tile_loc(conn)
-
-    const_connectors = create_const_connectors(conn)
-
     sorted_pips = {}
-
-    num_edges = 0
-    edges = []
-    for loc in progressbar_utils.progressbar(grid.tile_locations()):
-        edge_set = set()
-
-        gridinfo = grid.gridinfo_at_loc(loc)
-        tile_name = grid.tilename_at_loc(loc)
-
+    tiles = []
+    for loc in grid.tile_locations():
         # Not a synth node, check if in ROI.
         if use_roi and not roi.tile_in_roi(loc):
             continue
 
-        tile_type = db.get_tile_type(gridinfo.tile_type)
-
-        if tile_type not in sorted_pips:
-            sorted_pips[tile_type] = make_sorted_pips(tile_type.get_pips())
+        gridinfo = grid.gridinfo_at_loc(loc)
 
-        for forward, pip in sorted_pips[tile_type]:
-            # FIXME: The PADOUT0/1 connections do not work.
-            #
-            # These connections are used for:
-            #  - XADC
-            #  - Differential signal signal connection between pads.
-            #
-            # Issue tracking fix:
-            # https://github.com/SymbiFlow/f4pga-arch-defs/issues/1033
-            if 'PADOUT0' in pip.name and 'DIFFI_IN1' not in pip.name:
-                continue
-            if 'PADOUT1' in pip.name and 'DIFFI_IN0' not in pip.name:
-                continue
+        if gridinfo.tile_type not in sorted_pips:
+            tile_type = db.get_tile_type(gridinfo.tile_type)
+            sorted_pips[gridinfo.tile_type] = make_sorted_pips(
+                tile_type.get_pips()
+            )
 
-            # These edges are used for bringing general interconnect to the
-            # horizontal clock buffers.  This should only be used when routing
-            # clocks.
-            if 'CLK_HROW_CK_INT_' in pip.name:
-                continue
+        tiles.append((grid.tilename_at_loc(loc), gridinfo.tile_type))
 
-            # Generally pseudo-pips are skipped, with the exception for BUFHCE related pips,
-            # for which we want to create a routing path to have VPR route thorugh these pips.
-            if pip.is_pseudo and "CLK_HROW_CK" not in pip.name:
-                continue
+    if jobs > 1:
+        tile_connections = yield_tile_connections_parallel(
+            conn=conn,
+            tiles=tiles,
+            sorted_pips=sorted_pips,
+            delayless_switch=delayless_switch,
+            input_only_nodes=input_only_nodes,
+            output_only_nodes=output_only_nodes,
+            jobs=jobs,
+            connector_pool_size=max(1, connector_pool_size // jobs),
+            connector_stats=connector_stats,
+            snapshot_tables=snapshot_tables,
+        )
+    else:
+        find_pip = create_find_pip(conn)
+        get_pip_template = create_get_pip_template(conn, sorted_pips)
+        find_connector = create_find_connector(
+            conn, max_size=connector_pool_size
+        )
+        get_tile_loc = create_get_tile_loc(conn)
 
-            # Filter out PIPs related to MIO and DDR pins of the Zynq7 PS.
-            # These PIPs are actually not there, they are just informative.
-            if "PS72_" in pip.net_to or "PS72_" in pip.net_from:
-                continue
+        const_connectors = create_const_connectors(conn)
 
-            connections = make_connection(
+        tile_connections = (
+            yield_tile_connections(
                 conn=conn,
                 input_only_nodes=input_only_nodes,
                 output_only_nodes=output_only_nodes,
                 find_pip=find_pip,
-                find_wire=find_wire,
                 find_connector=find_connector,
                 get_tile_loc=get_tile_loc,
                 tile_name=tile_name,
-                tile_type=gridinfo.tile_type,
-                pip=pip,
+                pip_template=get_pip_template(tile_type),
                 delayless_switch=delayless_switch,
                 const_connectors=const_connectors,
-                forward=forward,
-            )
+            ) for tile_name, tile_type in tiles
+        )
+
+    num_edges = 0
+    edges = []
+    for connections in progressbar_utils.progressbar(tile_connections,
+                                                     max_value=len(tiles)):
+        edge_set = set()
 
-            if connections:
-                for connection in connections:
-                    key = tuple(connection[0:3])
-                    if key in edge_set:
-                        continue
+        for connection in connections:
+            key = tuple(connection[0:3])
+            if key in edge_set:
+                continue
 
-                    edge_set.add(key)
-                    edges.append(connection)
+            edge_set.add(key)
+            edges.append(connection)
 
-        if len(edges) > 1000:
+        if len(edges) >= EDGE_COMMIT_SIZE:
             commit_edges(write_cur, edges)
 
             num_edges += len(edges)
             edges = []
 
+    if edges:
+        commit_edges(write_cur, edges)
+        num_edges += len(edges)
+
     print('{} Created {} edges, inserted'.format(now(), num_edges))
 
+    if jobs <= 1:
+        connector_stats = find_connector.stats()
+
+    print(
+        '{} Connector pool: {} hits, {} misses, {} prewarmed, {} evictions'.
+        format(
+            now(), connector_stats.get('connector_hits', 0),
+            connector_stats.get('connector_misses', 0),
+            connector_stats.get('connector_prewarmed', 0),
+            connector_stats.get('connector_evictions', 0)
+        )
+    )
+    if stats is not None:
+        stats.update(connector_stats)
+
+
+def find_wire_nodes(conn, tile_wires):
+    """ Returns array of the node_pkey of each (phy_tile, tile_type, wire).
+
+    Like find_wire, but all wires are resolved with one query, joined with a
+    temporary table of the names.  Wires without a node are -1.
+
+    """
+    cur = conn.cursor()
+    cur.execute(
+        """
+CREATE TEMP TABLE tile_wire_name(
+  idx INT, phy_tile TEXT, tile_type TEXT, wire TEXT
+);"""
+    )
+    cur.executemany(
+        "INSERT INTO tile_wire_name VALUES (?, ?, ?, ?);",
+        (
+            (idx, phy_tile, tile_type, wire)
+            for idx, (phy_tile, tile_type, wire) in enumerate(tile_wires)
+        ),
+    )
+
+    # Like find_wire_in_tile, the first wire_in_tile with the name is used.
+    rows = load_int_rows(
+        conn, """
+SELECT
+  tile_wire_name.idx,
+  IFNULL(wire.node_pkey, -1),
+  MIN(wire_in_tile.pkey)
+FROM
+  tile_wire_name
+  INNER JOIN phy_tile ON phy_tile.name = tile_wire_name.phy_tile
+  INNER JOIN tile_type ON tile_type.name = tile_wire_name.tile_type
+  INNER JOIN wire_in_tile ON wire_in_tile.name = tile_wire_name.wire
+  AND wire_in_tile.phy_tile_type_pkey = tile_type.pkey
+  INNER JOIN wire ON wire.phy_tile_pkey = phy_tile.pkey
+  AND wire.wire_in_tile_pkey = wire_in_tile.pkey
+GROUP BY
+  tile_wire_name.idx
+ORDER BY
+  tile_wire_name.idx;"""
+    )
+    cur.execute("DROP TABLE tile_wire_name;")
+    conn.commit()
+
+    missing = numpy.setdiff1d(numpy.arange(len(tile_wires)), rows[:, 0])
+    assert len(missing) == 0, [tile_wires[idx] for idx in missing[:10]]
+
+    return rows[:, 1]
+
+
+def find_roi_nodes(conn, grid, synth_tiles):
+    """ Returns IntSet's of the input only and output only nodes of the ROI.
+
+    The nodes of the synth tile pins, and of the wires outside of the ROI
+    relative to each synth tile pin, are resolved with find_wire_nodes.
+    Synth tiles that are not in the grid are skipped.
+
+    """
+    tile_wires = []
+    is_input = []
+    for loc in grid.tile_locations():
+        tile_name = grid.tilename_at_loc(loc)
+        if tile_name not in synth_tiles['tiles']:
+            continue
+
+        synth_tile = synth_tiles['tiles'][tile_name]
+        gridinfo = grid.gridinfo_at_loc(loc)
+
+        for pin in synth_tile['pins']:
+            if pin['port_type'] not in ['input', 'output']:
+                continue
+
+            pin_is_input = pin['port_type'] == 'input'
+
+            tile_wires.append((tile_name, gridinfo.tile_type, pin['wire']))
+            is_input.append(pin_is_input)
+
+            # Adding all wires outside of the ROI relative to this synth tile
+            # to the input/output only nodes, so that the corresponding nodes
+            # have only outgoing or incoming edges
+            for tile, wires in synth_tile['wires_outside_roi'].items():
+                tile_type = grid.gridinfo_at_tilename(tile).tile_type
+
+                for wire in wires:
+                    tile_wires.append((tile, tile_type, wire))
+                    is_input.append(pin_is_input)
+
+    node_pkeys = find_wire_nodes(conn, tile_wires)
+    is_input = numpy.array(is_input, dtype=bool)
+
+    # Input nodes can be used as sinks, output nodes can be used as srcs.
+    input_only_nodes = IntSet(node_pkeys[is_input & (node_pkeys >= 0)])
+    output_only_nodes = IntSet(node_pkeys[~is_input & (node_pkeys >= 0)])
+
+    return input_only_nodes, output_only_nodes
+
 
 def get_ccio_sites(grid):
     ccio_sites = set()
@@ -2178,11 +2899,12 @@ def get_ccio_sites(grid):
     return ccio_sites
 
 
-def create_edges(args):
+def create_edges(args, stats=None):
     db = prjxray.db.Database(args.db_root, args.part)
     grid = db.grid()
 
-    with DatabaseCache(args.connection_database) as conn:
+    with DatabaseCache(args.connection_database, mode=args.db_cache_mode,
+                       profile=args.db_profile) as conn:
 
         with open(args.pin_assignments) as f:
             pin_assignments = json.load(f)
@@ -2199,6 +2921,9 @@ def create_edges(args):
             ]
             add_graph_nodes_for_pins(conn, tile_type, wire, pins)
 
+        # Edge creation mostly queries the wires and graph nodes.
+        analyze(conn)
+
         if args.overlay:
             assert args.synth_tiles
             use_roi = True
@@ -2244,58 +2969,14 @@ def create_edges(args):
         else:
             use_roi = False
 
-        output_only_nodes = set()
-        input_only_nodes = set()
-
         print('{} Finding nodes belonging to ROI'.format(now()))
         if use_roi:
-            find_wire = create_find_wire(conn)
-            for loc in progressbar_utils.progressbar(grid.tile_locations()):
-                gridinfo = grid.gridinfo_at_loc(loc)
-                tile_name = grid.tilename_at_loc(loc)
-
-                if tile_name in synth_tiles['tiles']:
-                    synth_tile = synth_tiles['tiles'][tile_name]
-                    for pin in synth_tile['pins']:
-                        if pin['port_type'] not in ['input', 'output']:
-                            continue
-
-                        _, _, _, node_pkey = find_wire(
-                            tile_name, gridinfo.tile_type, pin['wire']
-                        )
-
-                        is_input = pin['port_type'] == 'input'
-                        is_output = pin['port_type'] == 'output'
-
-                        assert is_input or is_output, pin
-
-                        if is_input:
-                            # This track can be used as a sink.
-                            input_only_nodes.add(node_pkey)
-                        elif is_output:
-                            # This track can be used as a src.
-                            output_only_nodes.add(node_pkey)
-
-                        # Adding all wires outside of the ROI relative to this synth tile
-                        # to the input/output only nodes, so that the corresponding nodes
-                        # have only outgoing or incoming edges
-                        for tile, wires in synth_tile['wires_outside_roi'
-                                                      ].items():
-                            tile_type = grid.gridinfo_at_tilename(
-                                tile
-                            ).tile_type
-
-                            for wire in wires:
-                                _, _, _, node_pkey = find_wire(
-                                    tile, tile_type, wire
-                                )
-
-                                if is_input:
-                                    # This track can be used as a sink.
-                                    input_only_nodes.add(node_pkey)
-                                elif is_output:
-                                    # This track can be used as a src.
-                                    output_only_nodes.add(node_pkey)
+            input_only_nodes, output_only_nodes = find_roi_nodes(
+                conn, grid, synth_tiles
+            )
+        else:
+            input_only_nodes = IntSet()
+            output_only_nodes = IntSet()
 
         create_and_insert_edges(
             db=db,
@@ -2304,7 +2985,11 @@ def create_edges(args):
             use_roi=use_roi,
             roi=roi if use_roi else None,
             input_only_nodes=input_only_nodes,
-            output_only_nodes=output_only_nodes
+            output_only_nodes=output_only_nodes,
+            jobs=args.jobs,
+            connector_pool_size=args.connector_pool_size,
+            stats=stats,
+            snapshot_tables=args.db_cache_tables,
         )
 
         create_edge_indices(conn)
@@ -5,9 +5,9 @@ this wire?
 
 """
 import argparse
-import pickle
 import sqlite3
 from lib.rr_graph.graph2 import NodeType
+from lib.rr_graph.node_map import NodeMap
 
 
 def main():
@@ -18,8 +18,7 @@ def main():
 
     args = parser.parse_args()
 
-    with open(args.rrgraph_node_map, 'rb') as f:
-        node_map = pickle.load(f)
+    node_map = NodeMap(args.rrgraph_node_map)
     conn = sqlite3.connect(
         'file:{}?mode=ro'.format(args.connection_database), uri=True
     )
@@ -46,8 +45,8 @@ SELECT pkey, graph_node_type FROM graph_node WHERE node_pkey = ?
         """, (node_pkey, )):
         print(
             '  Node inode={} pkey={} {}'.format(
-                node_map.get(graph_node_pkey), graph_node_pkey,
-                NodeType(graph_node_type)
+                node_map.get(graph_node_pkey, (None, None))[0],
+                graph_node_pkey, NodeType(graph_node_type)
             )
         )
 
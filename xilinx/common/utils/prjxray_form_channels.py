@@ -36,6 +36,8 @@ import prjxray.db
 import prjxray.tile
 from prjxray.timing import PvtCorner
 from lib import progressbar_utils
+from lib.collections_extra import UnionFind
+from lib.perf_utils import PhaseLog, add_perf_args
 import tile_splitter.grid
 from lib.rr_graph import points
 from lib.rr_graph import tracks
@@ -43,9 +45,24 @@ from lib.rr_graph import graph2
 import datetime
 import os
 import os.path
-from lib.connection_database import NodeClassification, create_tables, node_to_site_pins
+from lib.connection_database import (
+    NodeClassification,
+    create_tables,
+    node_to_site_pins,
+    yield_channel_nodes,
+)
 
-from prjxray_db_cache import DatabaseCache
+from prjxray_build_inputs import (
+    FORM_CHANNELS_STAGE,
+    hash_prjxray_inputs,
+    hash_sources,
+    is_up_to_date,
+    read_build_inputs,
+    record_build_inputs,
+)
+from prjxray_db_cache import (
+    BUILD_PROFILE, PRAGMA_PROFILES, DatabaseCache, analyze, connect
+)
 from prjxray_define_segments import SegmentWireMap
 
 SINGLE_PRECISION_FLOAT_MIN = 2**-126
@@ -577,100 +594,96 @@ def import_nodes(db, grid, conn):
 
     cur = conn.cursor()
     write_cur = conn.cursor()
-    write_cur.execute("""BEGIN EXCLUSIVE TRANSACTION;""")
 
+    phy_tiles = {}
+    for phy_tile_pkey, name, tile_type_pkey in cur.execute(
+            "SELECT pkey, name, tile_type_pkey FROM phy_tile;"):
+        phy_tiles[name] = (phy_tile_pkey, tile_type_pkey)
+
+    wire_in_tile_pkeys = {}
+    for wire_in_tile_pkey, tile_type_pkey, name in cur.execute(
+            "SELECT pkey, tile_type_pkey, name FROM wire_in_tile ORDER BY pkey;"
+    ):
+        wire_in_tile_pkeys.setdefault(
+            (tile_type_pkey, name), wire_in_tile_pkey
+        )
+
+    # Wires are identified by their index in wire_rows until inserted.
     tile_wire_map = {}
-    wires = {}
+    wire_rows = []
     for tile in progressbar_utils.progressbar(grid.tiles()):
         gridinfo = grid.gridinfo_at_tilename(tile)
         tile_type = db.get_tile_type(gridinfo.tile_type)
 
-        cur.execute(
-            """SELECT pkey, tile_type_pkey FROM phy_tile WHERE name = ?;""",
-            (tile, )
-        )
-        phy_tile_pkey, tile_type_pkey = cur.fetchone()
+        phy_tile_pkey, tile_type_pkey = phy_tiles[tile]
 
         for wire in tile_type.get_wires():
-            # pkey node_pkey tile_pkey wire_in_tile_pkey
-            cur.execute(
-                """
-SELECT pkey FROM wire_in_tile WHERE name = ? and tile_type_pkey = ?;""",
-                (wire, tile_type_pkey)
-            )
-
-            wire_in_tile_pkey = cur.fetchone()
+            wire_in_tile_pkey = wire_in_tile_pkeys.get((tile_type_pkey, wire))
             if wire_in_tile_pkey is None:
                 continue
-            wire_in_tile_pkey = wire_in_tile_pkey[0]
-
-            write_cur.execute(
-                """
-INSERT INTO wire(phy_tile_pkey, wire_in_tile_pkey)
-VALUES
-  (?, ?);""", (phy_tile_pkey, wire_in_tile_pkey)
-            )
 
             assert (tile, wire) not in tile_wire_map
-            wire_pkey = write_cur.lastrowid
-            tile_wire_map[(tile, wire)] = wire_pkey
-            wires[wire_pkey] = None
+            tile_wire_map[(tile, wire)] = len(wire_rows)
+            wire_rows.append((phy_tile_pkey, wire_in_tile_pkey))
 
-    write_cur.execute("""COMMIT TRANSACTION;""")
+    del phy_tiles
+    del wire_in_tile_pkeys
+
+    nodes = UnionFind(len(wire_rows))
 
     connections = db.connections()
 
     for connection in progressbar_utils.progressbar(
             connections.get_connections()):
-        a_pkey = tile_wire_map[
-            (connection.wire_a.tile, connection.wire_a.wire)]
-        b_pkey = tile_wire_map[
-            (connection.wire_b.tile, connection.wire_b.wire)]
-
-        a_node = wires[a_pkey]
-        b_node = wires[b_pkey]
-
-        if a_node is None:
-            a_node = set((a_pkey, ))
-
-        if b_node is None:
-            b_node = set((b_pkey, ))
-
-        if a_node is not b_node:
-            a_node |= b_node
+        nodes.union(
+            tile_wire_map[(connection.wire_a.tile, connection.wire_a.wire)],
+            tile_wire_map[(connection.wire_b.tile, connection.wire_b.wire)],
+        )
 
-            for wire in a_node:
-                wires[wire] = a_node
+    del tile_wire_map
 
-    nodes = {}
-    for wire_pkey, node in wires.items():
-        if node is None:
-            node = set((wire_pkey, ))
+    cur.execute("SELECT coalesce(max(pkey), 0) FROM wire;")
+    wire_pkey_offset = cur.fetchone()[0] + 1
 
-        assert wire_pkey in node
+    cur.execute("SELECT coalesce(max(pkey), 0) FROM node;")
+    node_pkey_offset = cur.fetchone()[0] + 1
 
-        nodes[id(node)] = node
+    # Nodes are numbered in the order of their first wire.
+    node_pkeys = {}
 
-    wires_assigned = set()
-    for node in progressbar_utils.progressbar(nodes.values()):
-        write_cur.execute("""INSERT INTO node(number_pips) VALUES (0);""")
-        node_pkey = write_cur.lastrowid
+    def yield_wires():
+        for idx, (phy_tile_pkey, wire_in_tile_pkey) in enumerate(wire_rows):
+            root = nodes.find(idx)
+            node_pkey = node_pkeys.get(root)
+            if node_pkey is None:
+                node_pkey = node_pkey_offset + len(node_pkeys)
+                node_pkeys[root] = node_pkey
 
-        for wire_pkey in node:
-            wires_assigned.add(wire_pkey)
-            write_cur.execute(
-                """
-            UPDATE wire
-                SET node_pkey = ?
-                WHERE pkey = ?
-            ;""", (node_pkey, wire_pkey)
+            yield (
+                wire_pkey_offset + idx, node_pkey, phy_tile_pkey,
+                wire_in_tile_pkey
             )
 
-    assert len(set(wires.keys()) ^ wires_assigned) == 0
+    write_cur.execute("""BEGIN EXCLUSIVE TRANSACTION;""")
+    write_cur.executemany(
+        """
+INSERT INTO wire(pkey, node_pkey, phy_tile_pkey, wire_in_tile_pkey)
+VALUES
+  (?, ?, ?, ?);""", yield_wires()
+    )
+    write_cur.executemany(
+        """INSERT INTO node(pkey, number_pips) VALUES (?, 0);""", (
+            (node_pkey, ) for node_pkey in
+            range(node_pkey_offset, node_pkey_offset + len(node_pkeys))
+        )
+    )
+    write_cur.execute("""COMMIT TRANSACTION;""")
 
-    del tile_wire_map
-    del nodes
-    del wires
+    print(
+        "{}: Imported {} wires in {} nodes".format(
+            datetime.datetime.now(), len(wire_rows), len(node_pkeys)
+        )
+    )
 
     write_cur.execute(
         "CREATE INDEX wire_in_tile_index ON wire(wire_in_tile_pkey);"
@@ -1157,45 +1170,6 @@ SELECT capacitance, resistance FROM wire_in_tile WHERE pkey IN (
     return capacitance, resistance
 
 
-def get_segment_for_node(cur, segments, node_pkey):
-    """ Attempt to determine the segment for the given node.
-
-    Parameters
-    ----------
-    conn : sqlite3.Connection
-        Connection to channels.db
-    segments : SegmentWireMap
-        Object for determined segment based on wire names.
-    node_pkey : int
-        Node to determine segment of.  Is primary key into node table.
-
-    Returns
-    -------
-    segment_pkey : int
-        Primary key to segment table of segment for this node.
-
-    """
-
-    cur.execute(
-        """
-SELECT name FROM wire_in_tile WHERE pkey IN (
-    SELECT wire_in_tile_pkey FROM wire WHERE node_pkey = ?
-);""", (node_pkey, )
-    )
-
-    segment_name = segments.get_segment_for_wires(
-        wire for (wire, ) in cur.fetchall()
-    )
-
-    cur.execute(
-        """
-SELECT pkey FROM segment WHERE name = ?
-    """, (segment_name, )
-    )
-
-    return cur.fetchone()[0]
-
-
 def insert_tracks(conn, segments, tracks_to_insert):
     write_cur = conn.cursor()
     write_cur.execute('SELECT pkey FROM switch WHERE name = "short";')
@@ -1327,6 +1301,9 @@ FROM
     write_cur.execute(
         """CREATE INDEX graph_node_tracks ON graph_node(track_pkey);"""
     )
+    # Edge creation looks up the track edges while it inserts edges, the
+    # other graph_edge indices are created once all edges are inserted, see
+    # prjxray_edge_library.create_edge_indices.
     write_cur.execute(
         """CREATE INDEX graph_edge_tracks ON graph_edge(track_pkey);"""
     )
@@ -1345,7 +1322,6 @@ def create_track(node, unique_pos):
 
 def form_tracks(conn, segments):
     cur = conn.cursor()
-    cur2 = conn.cursor()
 
     cur.execute(
         'SELECT count(pkey) FROM node WHERE classification == ?;',
@@ -1353,112 +1329,32 @@ def form_tracks(conn, segments):
     )
     num_nodes = cur.fetchone()[0]
 
+    segment_pkeys = {}
+    for segment_pkey, segment_name in cur.execute(
+            "SELECT pkey, name FROM segment;"):
+        segment_pkeys[segment_name] = segment_pkey
+
+    # The VPR grid locations that each channel connects to are the locations
+    # of its wires, plus:
+    #
+    #  1. Identify all pips that connect to or from this node
+    #  2. Traverse each pip, and determine if the connected node is a
+    #     EDGES_TO_CHANNEL.  NULL nodes are uninteresting, and CHANNEL
+    #     nodes are already covered by the locations of their wires.
+    #  3a. For CHANNEL to CHANNEL connections, use the pip location.
+    #  3b. For CHANNEL to EDGES_TO_CHANNEL (e.g. site pin connections)
+    #      use location of site in VPR grid.
+    #
+    # See yield_channel_nodes.
     tracks_to_insert = []
     with progressbar_utils.ProgressBar(max_value=num_nodes) as bar:
         bar.update(0)
-        for idx, (node_pkey, ) in enumerate(cur.execute("""
-SELECT pkey FROM node WHERE classification == ?;
-""", (NodeClassification.CHANNEL.value, ))):
+        for idx, (node_pkey, unique_pos,
+                  wires) in enumerate(yield_channel_nodes(conn)):
             bar.update(idx)
 
-            unique_pos = set()
-
-            # Get coordinates for all wires in this node.
-            for grid_x, grid_y in cur2.execute("""
-SELECT DISTINCT grid_x, grid_y FROM tile WHERE pkey IN (
-    SELECT tile_pkey FROM wire WHERE node_pkey = ? AND tile_pkey IS NOT NULL
-    )""", (node_pkey, )):
-                unique_pos.add((grid_x, grid_y))
-
-            # Find the VPR grid locations that this channel connects to.
-            #
-            # Algorithm:
-            #  1. Identify all pips that connect to or from this node
-            #  2. Traverse each pip, and determine if the connected node is a
-            #     EDGES_TO_CHANNEL.  NULL nodes are uninteresting, and CHANNEL
-            #     nodes are already covered in the earlier loop getting
-            #     locations of the
-            #     discarded.
-            #  3a. For CHANNEL to CHANNEL connections, use the pip location.
-            #  3b. For CHANNEL to EDGES_TO_CHANNEL (e.g. site pin connections)
-            #      use location of site in VPR grid.
-
-            # 3a loop
-            for grid_x, grid_y in cur2.execute("""
--- Get wires from this node
-WITH wires_from_node(wire_in_tile_pkey, phy_tile_pkey) AS (
-  SELECT
-    wire_in_tile_pkey,
-    phy_tile_pkey
-  FROM
-    wire
-  WHERE
-    node_pkey = ? AND tile_pkey IS NOT NULL
-),
-  other_wires(phy_tile_pkey, wire_in_tile_pkey) AS (
-    SELECT
-        wires_from_node.phy_tile_pkey,
-        undirected_pips.other_wire_in_tile_pkey
-    FROM undirected_pips
-    INNER JOIN wires_from_node ON
-        undirected_pips.wire_in_tile_pkey = wires_from_node.wire_in_tile_pkey)
-SELECT tile.grid_x, tile.grid_y
-FROM tile
-WHERE pkey IN (
-    SELECT wire.tile_pkey FROM wire
-    INNER JOIN other_wires ON
-        wire.wire_in_tile_pkey = other_wires.wire_in_tile_pkey
-    AND
-        wire.phy_tile_pkey = other_wires.phy_tile_pkey
-        );""", (node_pkey, )):
-                unique_pos.add((grid_x, grid_y))
-
-            # 3b loop
-            for grid_x, grid_y in cur2.execute("""
--- Get wires from this node
-WITH wires_from_node(wire_in_tile_pkey, phy_tile_pkey) AS (
-  SELECT
-    wire_in_tile_pkey,
-    phy_tile_pkey
-  FROM
-    wire
-  WHERE
-    node_pkey = ? AND tile_pkey IS NOT NULL
-),
-  other_wires(phy_tile_pkey, wire_in_tile_pkey) AS (
-    SELECT
-        wires_from_node.phy_tile_pkey,
-        undirected_pips.other_wire_in_tile_pkey
-    FROM undirected_pips
-    INNER JOIN wires_from_node ON
-        undirected_pips.wire_in_tile_pkey = wires_from_node.wire_in_tile_pkey),
-  other_nodes(other_node_pkey) AS (
-    SELECT wire.node_pkey FROM wire
-    INNER JOIN other_wires ON
-        wire.wire_in_tile_pkey = other_wires.wire_in_tile_pkey
-    AND
-        wire.phy_tile_pkey = other_wires.phy_tile_pkey),
-  other_tiles(site_wire_pkey) AS (
-    SELECT node.site_wire_pkey FROM node
-    WHERE
-        pkey IN (SELECT other_node_pkey FROM other_nodes)
-    AND
-        classification = ?
-  )
-SELECT tile.grid_x, tile.grid_y
-FROM tile
-WHERE pkey IN (
-    SELECT DISTINCT tile_pkey
-    FROM wire
-    WHERE pkey IN (
-        SELECT other_tiles.site_wire_pkey FROM other_tiles
-        )
-    );
-  """, (node_pkey, NodeClassification.EDGES_TO_CHANNEL.value)):
-                unique_pos.add((grid_x, grid_y))
-
             # Determine segment for each routing resource.
-            segment_pkey = get_segment_for_node(cur2, segments, node_pkey)
+            segment_pkey = segment_pkeys[segments.get_segment_for_wires(wires)]
 
             tracks_to_insert.append(
                 create_track(node_pkey, unique_pos) + [segment_pkey]
@@ -2349,6 +2245,69 @@ INSERT INTO segment(name) VALUES (?)
     return segments
 
 
+def form_channels(args, perf):
+    """ Forms the connection database and grid map of args. """
+    print("{}: About to load database".format(datetime.datetime.now()))
+    db = prjxray.db.Database(args.db_root, args.part)
+    input_hashes = hash_prjxray_inputs(args.db_root, args.part, db.fabric)
+    input_hashes.update(
+        hash_sources(['prjxray', 'lib', 'tile_splitter', __name__])
+    )
+
+    if args.incremental:
+        recorded_hashes = read_build_inputs(
+            args.connection_database, FORM_CHANNELS_STAGE
+        )
+        outputs = [args.connection_database, args.grid_map_output]
+        if is_up_to_date(FORM_CHANNELS_STAGE, recorded_hashes, input_hashes,
+                         outputs):
+            return
+
+    if os.path.exists(args.connection_database):
+        os.remove(args.connection_database)
+
+    perf.context['db_profile'] = args.db_profile
+
+    with perf.phase('Form channels'), DatabaseCache(
+            args.connection_database, profile=args.db_profile) as conn:
+        with perf.phase('Forming initial database', conn):
+            create_tables(conn)
+
+            grid = db.grid()
+            get_switch, get_switch_timing = create_get_switch(conn)
+            import_phy_grid(db, grid, conn, get_switch, get_switch_timing)
+
+            segments = import_segments(conn, db)
+
+        with perf.phase('Making connections', conn):
+            import_nodes(db, grid, conn)
+        with perf.phase('Counting sites and pips', conn):
+            count_sites_and_pips_on_nodes(conn)
+        with perf.phase('Classifying nodes', conn):
+            classify_nodes(conn, get_switch_timing)
+        with perf.phase('Creating VPR grid', conn):
+            with open(args.grid_map_output, 'w') as f:
+                create_vpr_grid(conn, f)
+        with perf.phase('Forming tracks', conn):
+            form_tracks(conn, segments)
+        print("{}: Tracks formed".format(datetime.datetime.now()))
+
+        # The statistics are saved with the database, for the later stages.
+        with perf.phase('Analyze', conn):
+            analyze(conn)
+
+        print(
+            '{} Flushing database back to file "{}"'.format(
+                datetime.datetime.now(), args.connection_database
+            )
+        )
+
+    # Recorded once the database is written, an interrupted write leaves no
+    # hashes and the next --incremental build is a full rebuild.
+    with connect(args.connection_database, profile=args.db_profile) as conn:
+        record_build_inputs(conn, FORM_CHANNELS_STAGE, input_hashes)
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -2363,40 +2322,25 @@ def main():
         help='Location of the grid map output',
         required=True
     )
+    parser.add_argument(
+        '--db_profile',
+        choices=sorted(PRAGMA_PROFILES),
+        default=BUILD_PROFILE,
+        help='sqlite pragma profile, see prjxray_db_cache'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Keep the outputs if they were built from the same inputs, see '
+        'prjxray_build_inputs'
+    )
 
-    args = parser.parse_args()
-    if os.path.exists(args.connection_database):
-        os.remove(args.connection_database)
+    add_perf_args(parser)
 
-    with DatabaseCache(args.connection_database) as conn:
-        create_tables(conn)
-
-        print("{}: About to load database".format(datetime.datetime.now()))
-        db = prjxray.db.Database(args.db_root, args.part)
-        grid = db.grid()
-        get_switch, get_switch_timing = create_get_switch(conn)
-        import_phy_grid(db, grid, conn, get_switch, get_switch_timing)
-
-        segments = import_segments(conn, db)
-
-        print("{}: Initial database formed".format(datetime.datetime.now()))
-        import_nodes(db, grid, conn)
-        print("{}: Connections made".format(datetime.datetime.now()))
-        count_sites_and_pips_on_nodes(conn)
-        print("{}: Counted sites and pips".format(datetime.datetime.now()))
-        classify_nodes(conn, get_switch_timing)
-        print("{}: Create VPR grid".format(datetime.datetime.now()))
-        with open(args.grid_map_output, 'w') as f:
-            create_vpr_grid(conn, f)
-        print("{}: Nodes classified".format(datetime.datetime.now()))
-        form_tracks(conn, segments)
-        print("{}: Tracks formed".format(datetime.datetime.now()))
+    args = parser.parse_args()
 
-        print(
-            '{} Flushing database back to file "{}"'.format(
-                datetime.datetime.now(), args.connection_database
-            )
-        )
+    with PhaseLog.from_args(args) as perf:
+        form_channels(args, perf)
 
 
 if __name__ == '__main__':
@@ -21,7 +21,6 @@ rr_graph XML.
 
 import argparse
 import os.path
-from hilbertcurve.hilbertcurve import HilbertCurve
 import math
 import prjxray.db
 from prjxray.roi import Roi
@@ -29,21 +28,27 @@ from prjxray.overlay import Overlay
 import prjxray.grid as grid
 from lib.rr_graph import graph2
 from lib.rr_graph import tracks
+from lib.rr_graph import locality
 from lib.connection_database import get_wire_pkey, get_track_model
 import lib.rr_graph_capnp.graph2 as capnp_graph2
+from lib.rr_graph.node_map import write_node_map
 from prjxray_constant_site_pins import feature_when_routed
 from prjxray_tile_import import remove_vpr_tile_prefix
 import simplejson as json
 from lib import progressbar_utils
+from lib.perf_utils import PhaseLog, add_perf_args
 import datetime
 import re
 import functools
-import pickle
+import time
 
-import sqlite3
+from prjxray_db_cache import CACHE_MODES, MMAP_MODE, DatabaseCache
 
 now = datetime.datetime.now
 
+# Number of graph_edge rows fetched at a time when importing edges.
+EDGE_CHUNK_SIZE = 65536
+
 HCLK_CK_BUFHCLK_REGEX = re.compile('HCLK_CK_BUFHCLK[0-9]+')
 CLK_HROW_CK_MUX_REGEX = re.compile('CLK_HROW_CK_MUX_OUT_([LR])([0-9]+)')
 CASCOUT_REGEX = re.compile('BRAM_CASCOUT_ADDR((?:BWR)|(?:ARD))ADDRU([0-9]+)')
@@ -877,63 +882,117 @@ WHERE
                 assert False, pin
 
 
-def get_switch_name(conn, graph, switch_name_map, switch_pkey):
-    assert switch_pkey is not None
-    if switch_pkey not in switch_name_map:
-        cur = conn.cursor()
-        cur.execute(
-            """SELECT name FROM switch WHERE pkey = ?;""", (switch_pkey, )
-        )
-        (switch_name, ) = cur.fetchone()
-        switch_id = graph.get_switch_id(switch_name)
-        switch_name_map[switch_pkey] = switch_id
-    else:
-        switch_id = switch_name_map[switch_pkey]
+def create_get_switch_id(conn, graph):
+    """ Returns function mapping switch pkey to rr graph switch id. """
+    cur = conn.cursor()
+    cur.execute("SELECT pkey, name FROM switch;")
+    switch_names = dict(cur)
 
-    return switch_id
+    switch_ids = {}
 
+    def get_switch_id(switch_pkey):
+        switch_id = switch_ids.get(switch_pkey)
+        if switch_id is None:
+            switch_id = graph.get_switch_id(switch_names[switch_pkey])
+            switch_ids[switch_pkey] = switch_id
 
-def create_get_tile_name(conn):
+        return switch_id
+
+    return get_switch_id
+
+
+def load_tile_names(conn):
+    """ Returns list of phy_tile names, indexed by phy_tile pkey. """
     cur = conn.cursor()
+    cur.execute("SELECT max(pkey) FROM phy_tile;")
+    (max_pkey, ) = cur.fetchone()
 
-    @functools.lru_cache(maxsize=None)
-    def get_tile_name(tile_pkey):
-        cur.execute(
-            """
-        SELECT name FROM phy_tile WHERE pkey = ?;
-        """, (tile_pkey, )
-        )
-        return cur.fetchone()[0]
+    tile_names = [None] * ((max_pkey or 0) + 1)
+    for pkey, name in cur.execute("SELECT pkey, name FROM phy_tile;"):
+        tile_names[pkey] = name
 
-    return get_tile_name
+    return tile_names
 
 
-def create_get_pip_wire_names(conn):
+def load_pip_wire_names(conn):
+    """ Returns map of pip_in_tile pkey to (tile type, src wire, dest wire). """
     cur = conn.cursor()
+    cur.execute(
+        """
+SELECT
+  pip_in_tile.pkey,
+  tile_type.name,
+  src_wire_in_tile.name,
+  dest_wire_in_tile.name
+FROM
+  pip_in_tile
+INNER JOIN tile_type ON tile_type.pkey = pip_in_tile.tile_type_pkey
+INNER JOIN wire_in_tile AS src_wire_in_tile
+  ON src_wire_in_tile.pkey = pip_in_tile.src_wire_in_tile_pkey
+INNER JOIN wire_in_tile AS dest_wire_in_tile
+  ON dest_wire_in_tile.pkey = pip_in_tile.dest_wire_in_tile_pkey;"""
+    )
 
-    @functools.lru_cache(maxsize=None)
-    def get_pip_wire_names(pip_pkey):
-        cur.execute(
-            """SELECT src_wire_in_tile_pkey, dest_wire_in_tile_pkey
-            FROM pip_in_tile WHERE pkey = ?;""", (pip_pkey, )
-        )
-        src_wire_in_tile_pkey, dest_wire_in_tile_pkey = cur.fetchone()
+    pip_wire_names = {}
+    for pip_pkey, tile_type, src_net, dest_net in cur:
+        pip_wire_names[pip_pkey] = (tile_type, src_net, dest_net)
 
-        cur.execute(
-            """SELECT name FROM wire_in_tile WHERE pkey = ?;""",
-            (src_wire_in_tile_pkey, )
-        )
-        (src_net, ) = cur.fetchone()
+    return pip_wire_names
 
-        cur.execute(
-            """SELECT name FROM wire_in_tile WHERE pkey = ?;""",
-            (dest_wire_in_tile_pkey, )
-        )
-        (dest_net, ) = cur.fetchone()
 
-        return (src_net, dest_net)
+# Stands in for the tile name in features resolved once per tile type pip.
+TILE_NAME_PLACEHOLDER = '\x00'
 
-    return get_pip_wire_names
+
+def create_get_pip_feature(conn, extra_features):
+    """ Returns function returning the fasm feature of a pip in a tile.
+
+    The result of check_feature only depends on the tile instance for a few
+    cases: IOI3_SING tiles, REBUF sources, HCLK outputs and wires with extra
+    features.  All other pips are resolved once per pip of a tile type, with
+    a placeholder that is replaced by the tile name.
+
+    """
+    pip_wire_names = load_pip_wire_names(conn)
+
+    instance_wires = set(wire for _, wire in REBUF_SOURCES)
+    instance_wires |= set(wire for _, wire in extra_features.wires_to_nodes)
+
+    # (pip_pkey, backward) -> feature template, or None if the feature
+    # depends on the tile instance.
+    templates = {}
+
+    def get_pip_feature(tile_name, pip_pkey, backward):
+        key = pip_pkey, backward
+        if key not in templates:
+            tile_type, src_net, dest_net = pip_wire_names[pip_pkey]
+            if not backward:
+                wires = dest_net, src_net
+            else:
+                wires = src_net, dest_net
+
+            if 'IOI3_SING' in tile_type or wires[0] in instance_wires or \
+                    HCLK_OUT.fullmatch(wires[1]):
+                templates[key] = None
+            else:
+                templates[key] = check_feature(
+                    extra_features,
+                    '{}.{}.{}'.format(TILE_NAME_PLACEHOLDER, *wires)
+                )
+
+        template = templates[key]
+        if template is not None:
+            return template.replace(TILE_NAME_PLACEHOLDER, tile_name)
+
+        tile_type, src_net, dest_net = pip_wire_names[pip_pkey]
+        if not backward:
+            pip_name = '{}.{}.{}'.format(tile_name, dest_net, src_net)
+        else:
+            pip_name = '{}.{}.{}'.format(tile_name, src_net, dest_net)
+
+        return check_feature(extra_features, pip_name)
+
+    return get_pip_feature
 
 
 def get_number_graph_edges(conn, graph, node_mapping):
@@ -989,17 +1048,20 @@ def import_graph_edges(conn, graph, extra_features, node_mapping):
     cur.execute("SELECT count() FROM graph_edge;" "")
     (num_edges, ) = cur.fetchone()
 
-    get_tile_name = create_get_tile_name(conn)
-    get_pip_wire_names = create_get_pip_wire_names(conn)
+    tile_names = load_tile_names(conn)
+    get_pip_feature = create_get_pip_feature(conn, extra_features)
+    get_switch_id = create_get_switch_id(conn, graph)
 
-    switch_name_map = {}
+    pin_node_types = (graph2.NodeType.IPIN, graph2.NodeType.OPIN)
 
     nodes_set = set()
 
     print('{} Importing edges from database.'.format(now()))
-    with progressbar_utils.ProgressBar(max_value=num_edges) as bar:
-        for idx, (src_graph_node, dest_graph_node, switch_pkey, phy_tile_pkey,
-                  pip_pkey, backward) in enumerate(cur.execute("""
+    start_time = time.time()
+    edges_yielded = 0
+
+    cur.execute(
+        """
 SELECT
   src_graph_node_pkey,
   dest_graph_node_pkey,
@@ -1009,48 +1071,52 @@ SELECT
   backward
 FROM
   graph_edge;
-                """)):
-            if src_graph_node not in node_mapping:
-                continue
+                """
+    )
 
-            if dest_graph_node not in node_mapping:
-                continue
+    with progressbar_utils.ProgressBar(max_value=num_edges) as bar:
+        idx = 0
+        while True:
+            rows = cur.fetchmany(EDGE_CHUNK_SIZE)
+            if not rows:
+                break
 
-            src_node, src_node_type = node_mapping[src_graph_node]
-            sink_node, sink_node_type = node_mapping[dest_graph_node]
+            for (src_graph_node, dest_graph_node, switch_pkey, phy_tile_pkey,
+                 pip_pkey, backward) in rows:
+                src = node_mapping.get(src_graph_node)
+                if src is None:
+                    continue
 
-            pin_node_types = [graph2.NodeType.IPIN, graph2.NodeType.OPIN]
+                sink = node_mapping.get(dest_graph_node)
+                if sink is None:
+                    continue
 
-            src_node_is_site_pin = src_node_type in pin_node_types
-            sink_node_is_site_pin = sink_node_type in pin_node_types
+                src_node, src_node_type = src
+                sink_node, sink_node_type = sink
 
-            # It may happen that a same CHAN <-> PIN edge is generated and this is unaccepted
-            # by VPR, as it allows only multiple edges between CHAN nodes.
-            # If a src_node, sink_node CHAN <-> PIN pair has already an edge, no new edge gets
-            # added
-            if src_node_is_site_pin ^ sink_node_is_site_pin:
-                if (src_node, sink_node) in nodes_set:
-                    continue
-                else:
-                    nodes_set.add((src_node, sink_node))
+                src_node_is_site_pin = src_node_type in pin_node_types
+                sink_node_is_site_pin = sink_node_type in pin_node_types
 
-            if pip_pkey is not None:
-                tile_name = get_tile_name(phy_tile_pkey)
-                src_net, dest_net = get_pip_wire_names(pip_pkey)
+                # It may happen that a same CHAN <-> PIN edge is generated and this is unaccepted
+                # by VPR, as it allows only multiple edges between CHAN nodes.
+                # If a src_node, sink_node CHAN <-> PIN pair has already an edge, no new edge gets
+                # added
+                if src_node_is_site_pin ^ sink_node_is_site_pin:
+                    if (src_node, sink_node) in nodes_set:
+                        continue
+                    else:
+                        nodes_set.add((src_node, sink_node))
 
-                if not backward:
-                    pip_name = '{}.{}.{}'.format(tile_name, dest_net, src_net)
-                else:
-                    pip_name = '{}.{}.{}'.format(tile_name, src_net, dest_net)
-            else:
-                pip_name = None
+                switch_id = get_switch_id(switch_pkey)
 
-            switch_id = get_switch_name(
-                conn, graph, switch_name_map, switch_pkey
-            )
+                if pip_pkey is not None:
+                    feature = get_pip_feature(
+                        tile_names[phy_tile_pkey], pip_pkey, backward
+                    )
+                else:
+                    feature = None
 
-            if pip_name is not None:
-                feature = check_feature(extra_features, pip_name)
+                edges_yielded += 1
                 if feature:
                     yield (
                         src_node, sink_node, switch_id,
@@ -1058,11 +1124,17 @@ FROM
                     )
                 else:
                     yield (src_node, sink_node, switch_id, ())
-            else:
-                yield (src_node, sink_node, switch_id, ())
 
-            if idx % 1024 == 0:
-                bar.update(idx)
+            idx += len(rows)
+            bar.update(idx)
+
+    elapsed = time.time() - start_time
+    print(
+        '{} Imported {} edges from database in {:.1f} s ({:.0f} edges/s).'.
+        format(
+            now(), edges_yielded, elapsed, edges_yielded / max(elapsed, 1e-6)
+        )
+    )
 
 
 def create_channels(conn):
@@ -1095,15 +1167,6 @@ def create_channels(conn):
     )
 
 
-def yield_nodes(nodes):
-    with progressbar_utils.ProgressBar(max_value=len(nodes)) as bar:
-        for idx, node in enumerate(nodes):
-            yield node
-
-            if idx % 1024 == 0:
-                bar.update(idx)
-
-
 def phy_grid_dims(conn):
     """ Returns physical grid dimensions. """
     cur = conn.cursor()
@@ -1185,84 +1248,23 @@ def find_constant_network(graph):
     return synth_tiles
 
 
-def create_node_remap(nodes, channels_obj):
-    N = 2
-    p = math.ceil(math.log2(max(channels_obj.x_max, channels_obj.y_max)))
-
-    point_map = {}
-
-    for node in nodes:
-        x = node.loc.x_low
-        y = node.loc.y_low
-
-        if (x, y) not in point_map:
-            point_map[(x, y)] = []
+def create_node_remap(nodes, channels_obj, order='hilbert'):
+    """ Returns array mapping node ids to ids in a locality order.
 
-        point_map[(x, y)].append(node.id)
-
-    hilbert_curve = HilbertCurve(p, N)
-
-    idx = 0
-    id_map = {}
-    for h in range(hilbert_curve.max_h + 1):
-        coord = tuple(hilbert_curve.coordinates_from_distance(h))
-
-        if coord not in point_map:
-            continue
-
-        for old_id in point_map[coord]:
-            id_map[old_id] = idx
-            idx += 1
-
-        del point_map[coord]
-
-    return lambda x: id_map[x]
+    Nodes are sorted by the curve distance of their (x_low, y_low) location,
+    see lib.rr_graph.locality.NODE_ORDERS.  The array can be passed to the
+    capnp writer as node_remap.
 
+    """
+    bits = math.ceil(math.log2(max(channels_obj.x_max, channels_obj.y_max)))
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        '--db_root', required=True, help='Project X-Ray Database'
-    )
-    parser.add_argument('--part', required=True, help='FPGA part')
-    parser.add_argument(
-        '--read_rr_graph', required=True, help='Input rr_graph file'
-    )
-    parser.add_argument(
-        '--write_rr_graph', required=True, help='Output rr_graph file'
-    )
-    parser.add_argument(
-        '--write_rr_node_map',
-        required=True,
-        help='Output map of graph_node_pkey to rr inode file'
-    )
-    parser.add_argument(
-        '--connection_database',
-        help='Database of fabric connectivity',
-        required=True
-    )
-    parser.add_argument(
-        '--synth_tiles',
-        help='If using an ROI, synthetic tile defintion from prjxray-arch-import'
-    )
-    parser.add_argument(
-        '--overlay',
-        action='store_true',
-        required=False,
-        help='Use synth tiles for Overlay instead of ROI'
-    )
-    parser.add_argument(
-        '--graph_limit',
-        help='Limit grid to specified dimensions in x_min,y_min,x_max,y_max',
-    )
-    parser.add_argument(
-        '--vpr_capnp_schema_dir',
-        help='Directory container VPR schema files',
+    return locality.node_order_remap(
+        nodes.x_low, nodes.y_low, order=order, bits=bits
     )
 
-    print('{} Starting routing import'.format(now()))
-    args = parser.parse_args()
 
+def import_routing(args, perf):
+    """ Imports the routing of args.connection_database, see main. """
     db = prjxray.db.Database(args.db_root, args.part)
     populate_hclk_cmt_tiles(db)
 
@@ -1320,6 +1322,7 @@ def main():
         input_file_name=args.read_rr_graph,
         progressbar=progressbar_utils.progressbar,
         output_file_name=args.write_rr_graph,
+        mmap=True,
     )
 
     graph = capnp_graph.graph
@@ -1331,8 +1334,9 @@ def main():
         synth_tiles_const = find_constant_network(graph)
         synth_tiles['tiles'].update(synth_tiles_const['tiles'])
 
-    with sqlite3.connect("file:{}?mode=ro".format(args.connection_database),
-                         uri=True) as conn:
+    with DatabaseCache(args.connection_database, read_only=True,
+                       mode=args.db_cache_mode,
+                       tables=args.db_cache_tables) as conn:
 
         extra_features = ExtraFeatures()
         populate_freq_bb_features(conn, extra_features)
@@ -1383,51 +1387,128 @@ FROM
         node_mapping = {}
 
         # Match site pins rr nodes with graph_node's in the connection_database.
-        print('{} Importing graph nodes'.format(now()))
-        import_graph_nodes(conn, graph, node_mapping)
+        with perf.phase('Importing graph nodes', conn) as stats:
+            import_graph_nodes(conn, graph, node_mapping)
+            stats['nodes'] = len(node_mapping)
 
         # Walk all track graph nodes and add them.
-        print('{} Creating tracks'.format(now()))
-        segment_id = graph.get_segment_id_from_name('dummy')
-        create_track_rr_graph(
-            conn, graph, node_mapping, use_roi, roi, synth_tiles, segment_id
-        )
+        with perf.phase('Creating tracks', conn) as stats:
+            segment_id = graph.get_segment_id_from_name('dummy')
+            create_track_rr_graph(
+                conn, graph, node_mapping, use_roi, roi, synth_tiles,
+                segment_id
+            )
+            stats['nodes'] = len(graph.nodes)
 
         # Set of (src, sink, switch_id) tuples that pip edges have been sent to
         # VPR.  VPR cannot handle duplicate paths with the same switch id.
-        print('{} Adding synthetic edges'.format(now()))
-        add_synthetic_edges(
-            conn, graph, node_mapping, grid, synth_tiles, args.overlay
-        )
+        with perf.phase('Adding synthetic edges', conn) as stats:
+            add_synthetic_edges(
+                conn, graph, node_mapping, grid, synth_tiles, args.overlay
+            )
+            stats['edges'] = len(graph.edges)
 
-        print('{} Creating channels.'.format(now()))
-        channels_obj = create_channels(conn)
+        with perf.phase('Creating channels.', conn):
+            channels_obj = create_channels(conn)
 
-        node_remap = create_node_remap(capnp_graph.graph.nodes, channels_obj)
+        with perf.phase('Creating node remap'):
+            node_remap = create_node_remap(
+                capnp_graph.graph.nodes, channels_obj, order=args.node_order
+            )
 
         num_edges = get_number_graph_edges(conn, graph, node_mapping)
-        print('{} Serializing to disk.'.format(now()))
-
-        capnp_graph.serialize_to_capnp(
-            channels_obj=channels_obj,
-            num_nodes=len(capnp_graph.graph.nodes),
-            nodes_obj=yield_nodes(capnp_graph.graph.nodes),
-            num_edges=num_edges,
-            edges_obj=import_graph_edges(
-                conn, graph, extra_features, node_mapping
-            ),
-            node_remap=node_remap,
-        )
+
+        with perf.phase('Serializing to disk.', conn) as stats:
+            capnp_graph.serialize_to_capnp(
+                channels_obj=channels_obj,
+                num_nodes=len(capnp_graph.graph.nodes),
+                nodes_obj=capnp_graph.graph.nodes,
+                num_edges=num_edges,
+                edges_obj=import_graph_edges(
+                    conn, graph, extra_features, node_mapping
+                ),
+                node_remap=node_remap,
+            )
+            stats['nodes'] = len(capnp_graph.graph.nodes)
+            stats['edges'] = num_edges
 
         for k in node_mapping:
             node_id, node_type = node_mapping[k]
-            node_mapping[k] = (node_remap(node_id), node_type)
+            node_mapping[k] = (int(node_remap[node_id]), node_type)
 
-        print('{} Writing node map.'.format(now()))
-        with open(args.write_rr_node_map, 'wb') as f:
-            pickle.dump(node_mapping, f)
+        with perf.phase('Writing node map.') as stats:
+            write_node_map(args.write_rr_node_map, node_mapping)
+            stats['nodes'] = len(node_mapping)
         print('{} Done writing node map.'.format(now()))
 
 
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--db_root', required=True, help='Project X-Ray Database'
+    )
+    parser.add_argument('--part', required=True, help='FPGA part')
+    parser.add_argument(
+        '--read_rr_graph', required=True, help='Input rr_graph file'
+    )
+    parser.add_argument(
+        '--write_rr_graph', required=True, help='Output rr_graph file'
+    )
+    parser.add_argument(
+        '--write_rr_node_map',
+        required=True,
+        help='Output map of graph_node_pkey to rr inode file'
+    )
+    parser.add_argument(
+        '--connection_database',
+        help='Database of fabric connectivity',
+        required=True
+    )
+    parser.add_argument(
+        '--synth_tiles',
+        help='If using an ROI, synthetic tile defintion from prjxray-arch-import'
+    )
+    parser.add_argument(
+        '--overlay',
+        action='store_true',
+        required=False,
+        help='Use synth tiles for Overlay instead of ROI'
+    )
+    parser.add_argument(
+        '--graph_limit',
+        help='Limit grid to specified dimensions in x_min,y_min,x_max,y_max',
+    )
+    parser.add_argument(
+        '--vpr_capnp_schema_dir',
+        help='Directory container VPR schema files',
+    )
+    parser.add_argument(
+        '--db_cache_mode',
+        choices=CACHE_MODES,
+        default=MMAP_MODE,
+        help='How the connection database is accessed, see prjxray_db_cache'
+    )
+    parser.add_argument(
+        '--db_cache_tables',
+        nargs='+',
+        help='Tables copied into memory, the others are read from the memory '
+        'mapped file, requires the mmap --db_cache_mode'
+    )
+    parser.add_argument(
+        '--node_order',
+        choices=sorted(locality.NODE_ORDERS),
+        default='hilbert',
+        help='Locality order of the output rr node ids'
+    )
+
+    add_perf_args(parser)
+
+    print('{} Starting routing import'.format(now()))
+    args = parser.parse_args()
+
+    with PhaseLog.from_args(args) as perf:
+        import_routing(args, perf)
+
+
 if __name__ == '__main__':
     main()
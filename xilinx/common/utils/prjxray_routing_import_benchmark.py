@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+""" Measures the graph edge import of prjxray_routing_import.
+
+A synthetic connection database is generated with --tiles tiles and
+--edges graph_edge rows.  Besides interconnect tiles with --pips random pips,
+it has the tiles whose pip features depend on the tile instance: IOI3_SING
+tiles, REBUF sources, HCLK outputs and wires with extra features.
+
+The edge rate of import_graph_edges is measured end to end.  The features
+of the pip edges are then resolved with create_get_pip_feature, and with
+check_feature on every edge as the import did before.  Both must give the
+same features.
+
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from lib.connection_database import create_tables
+from lib.rr_graph import graph2
+import prjxray_routing_import
+from prjxray_routing_import import ExtraFeatures, check_feature, \
+    create_get_pip_feature, import_graph_edges, load_pip_wire_names, \
+    load_tile_names, populate_bufg_rebuf_map, populate_freq_bb_features
+
+# Pips (src wire, dest wire) of the tile types with instance dependent
+# features.
+IOI3_SING_PIPS = [
+    ('IOI_IMUX34_0', 'IOI_OLOGIC0_D1'),
+    ('IOI_LOGIC_OUTS18_1', 'IOI_ILOGIC0_D'),
+    ('IOI_IMUX31_0', 'IOI_OCLK_0'),
+    ('IOI_BYP3_0', 'IOI_IDELAY0_IDATAIN'),
+]
+
+SPECIAL_TILE_TYPE_PIPS = {
+    'RIOI3_SING':
+        IOI3_SING_PIPS,
+    'LIOI3_SING':
+        IOI3_SING_PIPS,
+    'CLK_BUFG_REBUF':
+        [
+            ('CLK_BUFG_REBUF_R_CK_GCLK0_BOT', 'CLK_BUFG_REBUF_R_CK_GCLK0_TOP'),
+            ('CLK_BUFG_REBUF_R_CK_GCLK1_TOP', 'CLK_BUFG_REBUF_R_CK_GCLK1_BOT'),
+        ],
+    'CLK_HROW_TOP_R':
+        [
+            ('CLK_HROW_CK_MUX_OUT_L0', 'CLK_HROW_CK_HCLK_OUT_L0'),
+            ('CLK_HROW_CK_MUX_OUT_R3', 'CLK_HROW_CK_HCLK_OUT_R3'),
+            ('CLK_HROW_R_CK_GCLK0', 'CLK_HROW_CK_MUX_OUT_L0'),
+            ('CLK_HROW_CK_IN_L0', 'CLK_HROW_R_CK_GCLK0'),
+        ],
+    'CMT_TOP_L_UPPER_T':
+        [
+            ('MMCM_CLK_FREQ_BB_NS0', 'CMT_TOP_L_UPPER_T_FREQ_BB0'),
+            ('CMT_TOP_L_UPPER_T_FREQ_BB1', 'MMCM_CLK_FREQ_BB_NS1'),
+        ],
+}
+
+# One row of tiles in this many rows has special tiles, a single tile type
+# per column.
+SPECIAL_TILE_RATIO = 8
+
+
+def build_edge_database(num_tiles, num_pips, num_edges, seed):
+    """ Returns a synthetic connection database with graph_edge rows.
+
+    Tiles are laid out in columns of 100 tiles, see SPECIAL_TILE_RATIO.
+    Every wire of a tile is its own node.
+
+    """
+    rand = random.Random(seed)
+
+    conn = sqlite3.connect(':memory:')
+    create_tables(conn)
+    cur = conn.cursor()
+
+    tile_type_pips = dict(SPECIAL_TILE_TYPE_PIPS)
+    tile_type_pips['INT_L'] = [
+        (
+            'INT_L_W{}'.format(rand.randrange(num_pips)),
+            'INT_L_W{}'.format(rand.randrange(num_pips))
+        ) for _ in range(num_pips)
+    ]
+
+    tile_types = {}
+    for tile_type, pips in sorted(tile_type_pips.items()):
+        cur.execute("INSERT INTO tile_type(name) VALUES (?)", (tile_type, ))
+        tile_type_pkey = cur.lastrowid
+
+        wire_in_tile = {}
+        for wire in sorted(set(wire for pip in pips for wire in pip)):
+            cur.execute(
+                """
+INSERT INTO wire_in_tile(name, phy_tile_type_pkey, tile_type_pkey)
+VALUES (?, ?, ?)""", (wire, tile_type_pkey, tile_type_pkey)
+            )
+            wire_in_tile[wire] = cur.lastrowid
+
+        pip_pkeys = []
+        for src_wire, dest_wire in pips:
+            cur.execute(
+                """
+INSERT INTO pip_in_tile(
+  name, tile_type_pkey, src_wire_in_tile_pkey, dest_wire_in_tile_pkey)
+VALUES (?, ?, ?, ?)""", (
+                    '{}.{}->>{}'.format(tile_type, src_wire,
+                                        dest_wire), tile_type_pkey,
+                    wire_in_tile[src_wire], wire_in_tile[dest_wire]
+                )
+            )
+            pip_pkeys.append(cur.lastrowid)
+
+        tile_types[tile_type] = (tile_type_pkey, wire_in_tile, pip_pkeys)
+
+    special_tile_types = sorted(SPECIAL_TILE_TYPE_PIPS)
+    tiles = []
+    for idx in range(num_tiles):
+        grid_x, grid_y = divmod(idx, 100)
+        if grid_y % SPECIAL_TILE_RATIO == 0:
+            tile_type = special_tile_types[grid_x % len(special_tile_types)]
+        else:
+            tile_type = 'INT_L'
+
+        tile_type_pkey, wire_in_tile, pip_pkeys = tile_types[tile_type]
+        cur.execute(
+            """
+INSERT INTO phy_tile(name, tile_type_pkey, grid_x, grid_y)
+VALUES (?, ?, ?, ?)""", (
+                '{}_X{}Y{}'.format(tile_type, grid_x, grid_y), tile_type_pkey,
+                grid_x, grid_y
+            )
+        )
+        phy_tile_pkey = cur.lastrowid
+        tiles.append((phy_tile_pkey, pip_pkeys))
+
+        for wire_in_tile_pkey in wire_in_tile.values():
+            cur.execute("INSERT INTO node(number_pips) VALUES (1)")
+            cur.execute(
+                """
+INSERT INTO wire(node_pkey, phy_tile_pkey, wire_in_tile_pkey)
+VALUES (?, ?, ?)""", (cur.lastrowid, phy_tile_pkey, wire_in_tile_pkey)
+            )
+
+    switch_pkeys = [
+        pkey for (pkey, ) in cur.execute("SELECT pkey FROM switch")
+    ]
+
+    edges = []
+    for _ in range(num_edges):
+        phy_tile_pkey, pip_pkeys = rand.choice(tiles)
+
+        # Track to track edges have no pip.
+        if rand.randrange(4) == 0:
+            pip_pkey = None
+            backward = None
+        else:
+            pip_pkey = rand.choice(pip_pkeys)
+            backward = rand.randrange(2)
+
+        edges.append(
+            (
+                rand.randrange(num_edges), rand.randrange(num_edges),
+                rand.choice(switch_pkeys), phy_tile_pkey, pip_pkey, backward
+            )
+        )
+
+    cur.executemany(
+        """
+INSERT INTO graph_edge(
+  src_graph_node_pkey, dest_graph_node_pkey, switch_pkey, phy_tile_pkey,
+  pip_in_tile_pkey, backward)
+VALUES (?, ?, ?, ?, ?, ?)""", edges
+    )
+
+    conn.commit()
+    return conn
+
+
+def populate_features(conn):
+    """ Populates the instance dependent feature tables of the database.
+
+    Returns the ExtraFeatures to give to import_graph_edges.  Every other
+    CLK_HROW tile gets an HCLK_CMT tile on its left.
+
+    """
+    extra_features = ExtraFeatures()
+    populate_freq_bb_features(conn, extra_features)
+    populate_bufg_rebuf_map(conn)
+
+    prjxray_routing_import.HCLK_CMT_TILES = {}
+    for idx, (tile, grid_x, grid_y) in enumerate(conn.execute("""
+SELECT name, grid_x, grid_y FROM phy_tile
+WHERE name LIKE "CLK_HROW_TOP_R_%" ORDER BY pkey;""")):
+        if idx % 2 == 0:
+            prjxray_routing_import.HCLK_CMT_TILES[tile, 'L'] = \
+                'HCLK_CMT_X{}Y{}'.format(grid_x - 1, grid_y)
+
+    return extra_features
+
+
+class Graph(object):
+    """ The parts of graph2.Graph used by import_graph_edges. """
+
+    def __init__(self):
+        self.edges = []
+        self.switch_ids = {}
+
+    def get_switch_id(self, switch_name):
+        return self.switch_ids.setdefault(switch_name, len(self.switch_ids))
+
+
+def load_pip_edges(conn):
+    """ Returns (tile name, pip_in_tile pkey, backward) of the pip edges. """
+    tile_names = load_tile_names(conn)
+
+    return [
+        (tile_names[phy_tile_pkey], pip_pkey, backward)
+        for phy_tile_pkey, pip_pkey, backward in conn.execute(
+            """
+SELECT phy_tile_pkey, pip_in_tile_pkey, backward FROM graph_edge
+WHERE pip_in_tile_pkey IS NOT NULL;"""
+        )
+    ]
+
+
+def check_pip_features(conn, extra_features, pip_edges):
+    """ Returns the check_feature result of each pip edge. """
+    pip_wire_names = load_pip_wire_names(conn)
+
+    features = []
+    for tile_name, pip_pkey, backward in pip_edges:
+        _, src_net, dest_net = pip_wire_names[pip_pkey]
+        if not backward:
+            pip_name = '{}.{}.{}'.format(tile_name, dest_net, src_net)
+        else:
+            pip_name = '{}.{}.{}'.format(tile_name, src_net, dest_net)
+
+        features.append(check_feature(extra_features, pip_name))
+
+    return features
+
+
+def get_pip_features(conn, extra_features, pip_edges):
+    """ Returns the create_get_pip_feature result of each pip edge. """
+    get_pip_feature = create_get_pip_feature(conn, extra_features)
+
+    return [
+        get_pip_feature(tile_name, pip_pkey, backward)
+        for tile_name, pip_pkey, backward in pip_edges
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tiles', type=int, default=5000)
+    parser.add_argument('--pips', type=int, default=3000)
+    parser.add_argument('--edges', type=int, default=500000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    conn = build_edge_database(
+        num_tiles=args.tiles,
+        num_pips=args.pips,
+        num_edges=args.edges,
+        seed=args.seed
+    )
+    extra_features = populate_features(conn)
+    pip_edges = load_pip_edges(conn)
+
+    # Every graph node is a channel, so no edge is skipped.
+    node_mapping = dict(
+        (graph_node_pkey, (graph_node_pkey, graph2.NodeType.CHANX))
+        for graph_node_pkey in range(args.edges)
+    )
+
+    results = []
+    for run in range(args.repeat):
+        start = time.perf_counter()
+        edges = list(
+            import_graph_edges(conn, Graph(), extra_features, node_mapping)
+        )
+        results.append(
+            (
+                'import_graph_edges', run, len(edges),
+                time.perf_counter() - start
+            )
+        )
+
+        features = {}
+        for method, get_features in (
+            ('get_pip_feature', get_pip_features),
+            ('check_feature', check_pip_features),
+        ):
+            start = time.perf_counter()
+            features[method] = get_features(conn, extra_features, pip_edges)
+            results.append(
+                (method, run, len(pip_edges), time.perf_counter() - start)
+            )
+
+        assert features['get_pip_feature'] == features['check_feature']
+
+    print("Method, Run, Edges, Wall [s], Edges/s")
+    for method, run, num_edges, elapsed in results:
+        print(
+            "{}, {}, {}, {:.2f}, {:.0f}".format(
+                method, run, num_edges, elapsed, num_edges / elapsed
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()